@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ACUMULADORES DE MOMENTOS POR SEGMENTO
+=====================================
+
+Acumuladores de uma passada para contagens, médias e co-momentos dos
+indicadores Likert, mescláveis entre blocos e processos:
+- Cada par de indicadores guarda (n do par, média condicional, co-momento
+  centrado), então ausentes são tratados par a par sem reler os dados
+- Blocos são centrados antes dos produtos e combinados pela fórmula de
+  Chan et al. (extensão de Welford), numericamente estável
+- O acumulador segmentado mantém um acumulador por rótulo de cada variável
+  do Perfil Socioeconômico (gênero, raça, faixa etária, renda, escolaridade)
+
+Os momentos resultantes (MomentosAmostrais) alimentam correlação,
+confiabilidade, análise fatorial e SEM diretamente.
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from codec_likert import normalizar_rotulo
+from memoria_compartilhada import anexar_matriz, publicar_matriz
+from momentos_amostrais import MomentosAmostrais, definida_positiva, indicadores_likert, matriz_da_base
+
+# Segmentos: nome -> início do cabeçalho da coluna no Perfil Socioeconômico
+SEGMENTOS = {
+    'genero': 'Gênero',
+    'raca': 'Raça',
+    'faixa_etaria': 'Idade',
+    'renda': 'Renda',
+    'escolaridade': 'Nível de escolaridade',
+}
+
+
+def rotulo_segmento(valor):
+    """Harmoniza rótulos de segmento entre versões do questionário ('18–24 anos' = '18–24')"""
+    if pd.isna(valor):
+        return None
+    texto = re.sub(r'\s+', ' ', str(valor).replace('\xa0', ' ')).strip()
+    return re.sub(r'\s+anos\b', '', texto)
+
+
+def coluna_segmento(base, segmento):
+    """Nome da coluna (da base ou de um DataFrame) correspondente a um segmento de SEGMENTOS"""
+    prefixo = normalizar_rotulo(SEGMENTOS.get(segmento, segmento))
+    colunas = base.colunas() if hasattr(base, 'colunas') else list(base.columns)
+    for coluna in colunas:
+        if normalizar_rotulo(coluna).startswith(prefixo):
+            return coluna
+    raise KeyError(f"Segmento sem coluna na base: {segmento}")
+
+
+def _estatisticas_bloco(x):
+    """(linhas, n por par, média condicional, co-momento) de um bloco com NaN nos ausentes"""
+    presente = ~np.isnan(x)
+    p = presente.astype(np.float64)
+    # Deslocamento pela média do bloco: os produtos cruzados ficam pequenos
+    with np.errstate(invalid='ignore'):
+        deslocamento = np.nan_to_num(np.nanmean(x, axis=0)) if presente.any() else np.zeros(x.shape[1])
+    centrado = np.where(presente, x - deslocamento, 0.0)
+    n = p.T @ p
+    soma = centrado.T @ p                 # soma de x_i (centrado) onde x_j está presente
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_c = np.where(n > 0, soma / n, 0.0)
+    comomento = centrado.T @ centrado - media_c * soma.T
+    media = np.where(n > 0, media_c + deslocamento[:, None], 0.0)
+    return x.shape[0], n, media, np.where(n > 0, comomento, 0.0)
+
+
+class AcumuladorMomentos:
+    """Contagens, médias e co-momentos par a par, atualizáveis e mescláveis"""
+
+    def __init__(self, colunas):
+        self.colunas = list(colunas)
+        k = len(self.colunas)
+        self.linhas = 0
+        self.n = np.zeros((k, k))
+        self.media = np.zeros((k, k))
+        self.comomento = np.zeros((k, k))
+
+    def __repr__(self):
+        return f"AcumuladorMomentos(linhas={self.linhas}, indicadores={len(self.colunas)})"
+
+    def _combinar(self, linhas, n, media, comomento):
+        """Fórmula de Chan: combina as estatísticas de outro bloco nestas"""
+        total = self.n + n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = media - self.media
+            peso = np.where(total > 0, n / total, 0.0)
+            self.comomento = self.comomento + comomento + delta * delta.T * self.n * peso
+        self.media = self.media + delta * peso
+        self.n = total
+        self.linhas += linhas
+
+    def atualizar(self, x):
+        """Acrescenta um bloco de respondentes (matriz float com NaN nos ausentes)"""
+        x = np.asarray(x, dtype=np.float64)
+        if x.shape[0]:
+            self._combinar(*_estatisticas_bloco(x))
+        return self
+
+    def mesclar(self, outro):
+        """Incorpora outro acumulador com as mesmas colunas"""
+        if outro.colunas != self.colunas:
+            raise ValueError("Acumuladores com colunas diferentes não podem ser mesclados")
+        self._combinar(outro.linhas, outro.n, outro.media, outro.comomento)
+        return self
+
+    def copia(self):
+        novo = AcumuladorMomentos(self.colunas)
+        novo.linhas, novo.n, novo.media, novo.comomento = self.linhas, self.n.copy(), self.media.copy(), \
+            self.comomento.copy()
+        return novo
+
+    def momentos(self, ausentes='pairwise', grupo=None):
+        """
+        Momentos acumulados.
+
+        Args:
+            ausentes: 'pairwise' (cada par com suas linhas completas) ou 'media'
+                (equivale à imputação pela média, como em prepare_sem_data)
+            grupo: Rótulo guardado em MomentosAmostrais
+
+        Returns:
+            MomentosAmostrais (n = linhas acumuladas; na deleção por par, a menor
+            contagem entre os pares, com a covariância projetada na PD mais próxima)
+        """
+        medias = np.diag(self.media).copy()
+        medias[np.diag(self.n) == 0] = np.nan
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if ausentes == 'pairwise':
+                cov = np.where(self.n > 0, self.comomento / self.n, np.nan)
+            elif ausentes == 'media':
+                # Desvios em relação à média da coluna inteira, só onde o par existe
+                desvio = self.media - medias[:, None]
+                cov = (self.comomento + self.n * desvio * desvio.T) / self.linhas
+            else:
+                raise ValueError(f"Tratamento de ausentes inválido para acumuladores: {ausentes}")
+        n, n_par = self.linhas, None
+        if ausentes == 'pairwise':
+            n_par = self.n.astype(np.int64)
+            n = int(n_par.min(initial=self.linhas))
+            cov = definida_positiva(cov, grupo)
+        return MomentosAmostrais(n, pd.Series(medias, index=self.colunas),
+                                 pd.DataFrame(cov, index=self.colunas, columns=self.colunas), grupo, n_par)
+
+    def correlacao(self):
+        """Correlação par a par (Pearson) acumulada"""
+        return self.momentos('pairwise').correlacao()
+
+    def salvar(self, caminho):
+        """Grava o estado do acumulador (.npz) para continuar em outra execução"""
+        np.savez(caminho, colunas=np.array(self.colunas, dtype=str), linhas=np.array(self.linhas),
+                 n=self.n, media=self.media, comomento=self.comomento)
+
+
+def carregar_acumulador(caminho):
+    """Lê um AcumuladorMomentos gravado por AcumuladorMomentos.salvar"""
+    with np.load(caminho) as arq:
+        acumulador = AcumuladorMomentos([str(c) for c in arq['colunas']])
+        acumulador.linhas = int(arq['linhas'])
+        acumulador.n, acumulador.media, acumulador.comomento = arq['n'], arq['media'], arq['comomento']
+    return acumulador
+
+
+class AcumuladorSegmentado:
+    """Acumulador total mais um acumulador por rótulo de cada segmento"""
+
+    def __init__(self, colunas, segmentos=tuple(SEGMENTOS)):
+        self.colunas = list(colunas)
+        self.segmentos = list(segmentos)
+        self.total = AcumuladorMomentos(self.colunas)
+        self.por_segmento = {segmento: {} for segmento in self.segmentos}
+
+    def __repr__(self):
+        niveis = {s: len(r) for s, r in self.por_segmento.items()}
+        return f"AcumuladorSegmentado(linhas={self.total.linhas}, segmentos={niveis})"
+
+    def atualizar(self, x, rotulos):
+        """
+        Acrescenta um bloco de respondentes.
+
+        Args:
+            x: Matriz float (NaN nos ausentes) com as colunas do acumulador
+            rotulos: dict segmento -> array com o rótulo de cada linha
+        """
+        x = np.asarray(x, dtype=np.float64)
+        self.total.atualizar(x)
+        for segmento in self.segmentos:
+            codigos, niveis = pd.factorize(pd.Series(rotulos[segmento], dtype=object).map(rotulo_segmento),
+                                           use_na_sentinel=True)
+            acumuladores = self.por_segmento[segmento]
+            for g, nivel in enumerate(niveis):
+                if nivel not in acumuladores:
+                    acumuladores[nivel] = AcumuladorMomentos(self.colunas)
+                acumuladores[nivel].atualizar(x[codigos == g])
+        return self
+
+    def mesclar(self, outro):
+        """Incorpora outro acumulador segmentado (mesmas colunas e segmentos)"""
+        if outro.segmentos != self.segmentos:
+            raise ValueError("Acumuladores com segmentos diferentes não podem ser mesclados")
+        self.total.mesclar(outro.total)
+        for segmento, acumuladores in outro.por_segmento.items():
+            for nivel, acumulador in acumuladores.items():
+                if nivel in self.por_segmento[segmento]:
+                    self.por_segmento[segmento][nivel].mesclar(acumulador)
+                else:
+                    self.por_segmento[segmento][nivel] = acumulador.copia()
+        return self
+
+    def momentos(self, segmento=None, ausentes='pairwise'):
+        """
+        Momentos da amostra inteira (segmento=None) ou por rótulo de um segmento.
+
+        Returns:
+            dict rótulo -> MomentosAmostrais (chave None para a amostra inteira)
+        """
+        if segmento is None:
+            return {None: self.total.momentos(ausentes)}
+        return {nivel: acumulador.momentos(ausentes, grupo=nivel)
+                for nivel, acumulador in self.por_segmento[segmento].items()}
+
+    def atualizar_da_base(self, base, linhas=None):
+        """Acrescenta respondentes da base (todas as linhas ou um slice/índices)"""
+        x = matriz_da_base(base, self.colunas)
+        rotulos = {s: np.asarray(base.coluna(coluna_segmento(base, s)), dtype=object) for s in self.segmentos}
+        if linhas is not None:
+            x = x[linhas]
+            rotulos = {s: r[linhas] for s, r in rotulos.items()}
+        return self.atualizar(x, rotulos)
+
+
+def _acumular_bloco(colunas, segmentos, info_matriz, info_rotulos, inicio, fim):
+    """Tarefa do pool: acumula as linhas [inicio, fim) publicadas em memória compartilhada"""
+    x = anexar_matriz(info_matriz)[inicio:fim]
+    codigos = anexar_matriz(info_rotulos)[inicio:fim]
+    rotulos = {}
+    for j, segmento in enumerate(segmentos):
+        niveis = np.array(info_rotulos['niveis'][j] + [None], dtype=object)
+        rotulos[segmento] = niveis[codigos[:, j]]
+    return AcumuladorSegmentado(colunas, segmentos).atualizar(x, rotulos)
+
+
+def acumular_base(base, colunas=None, segmentos=tuple(SEGMENTOS), tamanho_bloco=50_000, n_workers=1):
+    """
+    Acumula a base inteira em blocos, opcionalmente em processos paralelos.
+
+    Args:
+        base: BaseRespondentes (modo 'codificado')
+        colunas: Indicadores (padrão: todas as colunas Likert)
+        segmentos: Segmentos do Perfil Socioeconômico
+        tamanho_bloco: Respondentes por bloco
+        n_workers: Processos (1 = sequencial, None = todos os núcleos)
+
+    Returns:
+        AcumuladorSegmentado
+    """
+    colunas = indicadores_likert(base) if colunas is None else list(colunas)
+    segmentos = list(segmentos)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    blocos = [(i, min(i + tamanho_bloco, len(base))) for i in range(0, len(base), tamanho_bloco)]
+    acumulador = AcumuladorSegmentado(colunas, segmentos)
+
+    if n_workers <= 1 or len(blocos) <= 1:
+        for inicio, fim in blocos:
+            acumulador.atualizar_da_base(base, slice(inicio, fim))
+        return acumulador
+
+    # Rótulos como códigos inteiros (-1 = ausente) para caber em memória compartilhada
+    x = matriz_da_base(base, colunas)
+    codigos, niveis = [], []
+    for segmento in segmentos:
+        rotulos = pd.Series(np.asarray(base.coluna(coluna_segmento(base, segmento)), dtype=object))
+        c, n = pd.factorize(rotulos.map(rotulo_segmento), use_na_sentinel=True)
+        codigos.append(c)
+        niveis.append(list(n))
+    codigos = np.stack(codigos, axis=1).astype(np.int32)
+
+    with publicar_matriz(x) as info_matriz, publicar_matriz(codigos) as info_rotulos:
+        info_rotulos['niveis'] = niveis
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(blocos))) as pool:
+            parciais = [pool.submit(_acumular_bloco, colunas, segmentos, info_matriz, info_rotulos, inicio, fim)
+                        for inicio, fim in blocos]
+            for parcial in parciais:
+                acumulador.mesclar(parcial.result())
+    return acumulador
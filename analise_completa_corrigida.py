@@ -20,6 +20,7 @@ from sklearn.preprocessing import LabelEncoder
 from factor_analyzer import FactorAnalyzer
 from factor_analyzer.factor_analyzer import calculate_bartlett_sphericity, calculate_kmo
 import warnings
+from cache_dados import carregar_tabela
 warnings.filterwarnings('ignore')
 
 # Configurações
@@ -54,7 +55,7 @@ def carregar_dados():
     for arquivo in arquivos:
         try:
             caminho = f'csv_extraidos/{arquivo}'
-            df = pd.read_csv(caminho)
+            df = carregar_tabela(caminho)
             nome = arquivo.replace('.csv', '').replace(' ', '_')
             datasets[nome] = df
             
@@ -5,6 +5,7 @@ import seaborn as sns
 from scipy import stats
 from sklearn.preprocessing import LabelEncoder
 import warnings
+from cache_dados import carregar_tabela
 warnings.filterwarnings('ignore')
 
 # Configuração para português
@@ -15,11 +16,11 @@ def carregar_dados():
     """Carrega e processa todos os datasets"""
     
     # Carregar dados
-    perfil = pd.read_csv('csv_extraidos/Perfil Socioeconomico.csv')
-    qualidade = pd.read_csv('csv_extraidos/Qualidade do serviço.csv')
-    percepcao = pd.read_csv('csv_extraidos/Percepção novos serviços.csv')
-    intencao = pd.read_csv('csv_extraidos/Intenção comportamental.csv')
-    utilizacao = pd.read_csv('csv_extraidos/Utilização.csv')
+    perfil = carregar_tabela('csv_extraidos/Perfil Socioeconomico.csv')
+    qualidade = carregar_tabela('csv_extraidos/Qualidade do serviço.csv')
+    percepcao = carregar_tabela('csv_extraidos/Percepção novos serviços.csv')
+    intencao = carregar_tabela('csv_extraidos/Intenção comportamental.csv')
+    utilizacao = carregar_tabela('csv_extraidos/Utilização.csv')
     
     print("=== ANÁLISE CORRETA DOS DADOS ===")
     print(f"Perfil Socioeconômico: {len(perfil)} registros")
@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 from scipy.stats import chi2_contingency, f_oneway, kruskal
+import sklearn
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.decomposition import PCA
@@ -15,6 +16,8 @@ from statsmodels.formula.api import ols
 from statsmodels.stats.anova import anova_lm
 from statsmodels.stats.multicomp import pairwise_tukeyhsd
 import warnings
+from base_respondentes import carregar_base_respondentes
+from cache_resultados import resultado_em_cache
 warnings.filterwarnings('ignore')
 
 # Configuração para gráficos
@@ -28,36 +31,24 @@ def carregar_e_preparar_dados():
     print("📊 CARREGANDO E PREPARANDO DADOS PARA ANÁLISES AVANÇADAS")
     print("="*70)
     
-    # Carregar datasets
-    datasets = {}
-    files = [
-        'Qualidade do serviço.csv',
-        'Utilização.csv', 
-        'Percepção novos serviços.csv',
-        'Intenção comportamental.csv',
-        'Aceitação da tecnologia.csv',
-        'Experiência do usuário.csv',
-        'Perfil Socioeconomico.csv'
-    ]
-    
-    for file in files:
-        try:
-            df = pd.read_csv(f'csv_extraidos/{file}', encoding='utf-8')
-            # Limpar nomes das colunas
-            df.columns = [col.strip().replace('\xa0', '').replace('\n', '').replace('\r', '') 
-                         for col in df.columns]
-            name = file.replace('.csv', '').replace(' ', '_').lower()
-            datasets[name] = df
-            print(f"✓ {file}: {len(df)} registros")
-        except Exception as e:
-            print(f"✗ Erro ao carregar {file}: {e}")
+    # Carregar datasets (base indexada por ID, sem merges)
+    base = carregar_base_respondentes()
     
-    # Criar dataset integrado
-    base_data = datasets['perfil_socioeconomico'].copy()
+    def limpar_nomes(df):
+        # Limpar nomes das colunas
+        df.columns = [col.strip().replace('\xa0', '').replace('\n', '').replace('\r', '') 
+                      for col in df.columns]
+        return df
     
-    for name, df in datasets.items():
-        if name != 'perfil_socioeconomico':
-            base_data = pd.merge(base_data, df, on='ID', how='left')
+    datasets = {}
+    for tabela in base.tabelas:
+        name = tabela.replace(' ', '_').lower()
+        datasets[name] = limpar_nomes(base.quadro(tabela))
+        print(f"✓ {tabela}.csv: {len(datasets[name])} registros")
+    
+    # Criar dataset integrado: perfil primeiro, depois as demais tabelas
+    ordem = ['Perfil Socioeconomico'] + [t for t in base.tabelas if t != 'Perfil Socioeconomico']
+    base_data = limpar_nomes(base.quadro(ordem))
     
     print(f"\n✓ Dataset integrado criado: {len(base_data)} registros, {len(base_data.columns)} colunas")
     
@@ -240,6 +231,36 @@ def analise_regressao_renda_uso_tp(data):
         'significativo': p_value < 0.05
     }
 
+def _kmeans_perfis(cluster_data, k_optimal):
+    """Inércias do cotovelo (k = 2..10), rótulos do K-means final e projeção PCA dos dados padronizados"""
+    # Padronizar dados
+    scaler = StandardScaler()
+    cluster_data_scaled = scaler.fit_transform(cluster_data)
+    
+    # Determinar número ótimo de clusters (método do cotovelo)
+    inertias = []
+    K_range = range(2, 11)
+    
+    for k in K_range:
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+        kmeans.fit(cluster_data_scaled)
+        inertias.append(kmeans.inertia_)
+    
+    # Aplicar K-means
+    kmeans = KMeans(n_clusters=k_optimal, random_state=42, n_init=10)
+    cluster_labels = kmeans.fit_predict(cluster_data_scaled)
+    
+    # PCA para visualização
+    pca = PCA(n_components=2)
+    cluster_data_pca = pca.fit_transform(cluster_data_scaled)
+    
+    return {
+        'inercias': np.array(inertias),
+        'rotulos': cluster_labels,
+        'pca': cluster_data_pca,
+        'variancia_pca': pca.explained_variance_ratio_
+    }
+
 def analise_clusters_perfil_usuarios(data):
     """Análise de Clusters: Perfil dos Usuários"""
     print("\n🎯 ANÁLISE DE CLUSTERS: PERFIL DOS USUÁRIOS")
@@ -282,25 +303,18 @@ def analise_clusters_perfil_usuarios(data):
     
     print(f"Dataset final para clustering: {len(cluster_data)} observações")
     
-    # Padronizar dados
-    scaler = StandardScaler()
-    cluster_data_scaled = scaler.fit_transform(cluster_data)
-    
-    # Determinar número ótimo de clusters (método do cotovelo)
-    inertias = []
-    K_range = range(2, 11)
-    
-    for k in K_range:
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-        kmeans.fit(cluster_data_scaled)
-        inertias.append(kmeans.inertia_)
-    
     # Escolher k=4 como padrão (pode ser ajustado)
     k_optimal = 4
     
-    # Aplicar K-means
-    kmeans = KMeans(n_clusters=k_optimal, random_state=42, n_init=10)
-    cluster_labels = kmeans.fit_predict(cluster_data_scaled)
+    # K-means e PCA em cache pelo conteúdo dos dados de clustering, pelo código
+    # chamado por _kmeans_perfis e pela versão do sklearn
+    agrupamento, do_cache = resultado_em_cache('clusters_perfil', cluster_data,
+                                               lambda: _kmeans_perfis(cluster_data, k_optimal),
+                                               parametros={'k': k_optimal, 'sklearn': sklearn.__version__},
+                                               codigo=(_kmeans_perfis, StandardScaler, KMeans, PCA))
+    if do_cache:
+        print("🔁 Clusters recuperados do cache de resultados")
+    cluster_labels = agrupamento['rotulos']
     
     # Adicionar labels aos dados originais
     cluster_data['Cluster'] = cluster_labels
@@ -331,9 +345,8 @@ def analise_clusters_perfil_usuarios(data):
             'caracteristicas': cluster_means
         })
     
-    # PCA para visualização
-    pca = PCA(n_components=2)
-    cluster_data_pca = pca.fit_transform(cluster_data_scaled)
+    cluster_data_pca = agrupamento['pca']
+    variancia_pca = agrupamento['variancia_pca']
     
     # Criar visualização
     plt.figure(figsize=(12, 8))
@@ -344,8 +357,8 @@ def analise_clusters_perfil_usuarios(data):
         plt.scatter(cluster_data_pca[mask, 0], cluster_data_pca[mask, 1], 
                    c=colors[i], label=f'Cluster {i+1}', alpha=0.6)
     
-    plt.xlabel(f'PC1 ({pca.explained_variance_ratio_[0]:.1%} da variância)')
-    plt.ylabel(f'PC2 ({pca.explained_variance_ratio_[1]:.1%} da variância)')
+    plt.xlabel(f'PC1 ({variancia_pca[0]:.1%} da variância)')
+    plt.ylabel(f'PC2 ({variancia_pca[1]:.1%} da variância)')
     plt.title('Análise de Clusters - Perfil dos Usuários (PCA)')
     plt.legend()
     plt.grid(True, alpha=0.3)
@@ -359,7 +372,7 @@ def analise_clusters_perfil_usuarios(data):
     return {
         'cluster_summary': cluster_summary,
         'k_optimal': k_optimal,
-        'pca_variance_explained': pca.explained_variance_ratio_[:2].sum(),
+        'pca_variance_explained': variancia_pca[:2].sum(),
         'data_with_clusters': cluster_data
     }
 
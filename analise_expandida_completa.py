@@ -8,6 +8,8 @@ from factor_analyzer import FactorAnalyzer
 from statsmodels.formula.api import ols
 from statsmodels.stats.anova import anova_lm
 import warnings
+from cache_dados import carregar_tabela
+from policorica import matriz_correlacao
 warnings.filterwarnings('ignore')
 
 # Configuração global para gráficos
@@ -33,7 +35,7 @@ def carregar_dados():
     
     for file in files:
         try:
-            df = pd.read_csv(f'csv_extraidos/{file}', encoding='utf-8')
+            df = carregar_tabela(f'csv_extraidos/{file}')
             name = file.replace('.csv', '').replace(' ', '_').lower()
             datasets[name] = df
             print(f"✓ {file}: {len(df)} registros, {len(df.columns)} colunas")
@@ -505,8 +507,8 @@ def analises_cruzadas_avancadas(datasets):
     
     return resultados
 
-def analise_qualidade_detalhada(datasets):
-    """Análise detalhada da qualidade do serviço"""
+def analise_qualidade_detalhada(datasets, correlacao='pearson'):
+    """Análise detalhada da qualidade do serviço (correlacao: 'pearson' ou 'policorica')"""
     print("\n⭐ ANÁLISE DETALHADA DA QUALIDADE DO SERVIÇO")
     print("="*55)
     
@@ -587,7 +589,7 @@ def analise_qualidade_detalhada(datasets):
             numeric_data[col] = values
     
     if not numeric_data.empty:
-        corr_matrix = numeric_data.corr()
+        corr_matrix = matriz_correlacao(numeric_data, correlacao)
         
         # Encontrar correlações mais altas (excluindo diagonal)
         corr_pairs = []
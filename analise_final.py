@@ -6,6 +6,7 @@ from scipy import stats
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
 import warnings
+from cache_dados import carregar_tabela
 warnings.filterwarnings('ignore')
 
 # Configuração para português
@@ -17,10 +18,10 @@ def main():
     
     # 1. CARREGAR DADOS
     print("1. Carregando dados...")
-    perfil = pd.read_csv('csv_extraidos/Perfil Socioeconomico.csv')
-    qualidade = pd.read_csv('csv_extraidos/Qualidade do serviço.csv')
-    percepcao = pd.read_csv('csv_extraidos/Percepção novos serviços.csv')
-    intencao = pd.read_csv('csv_extraidos/Intenção comportamental.csv')
+    perfil = carregar_tabela('csv_extraidos/Perfil Socioeconomico.csv')
+    qualidade = carregar_tabela('csv_extraidos/Qualidade do serviço.csv')
+    percepcao = carregar_tabela('csv_extraidos/Percepção novos serviços.csv')
+    intencao = carregar_tabela('csv_extraidos/Intenção comportamental.csv')
     
     print(f"   - Perfil: {len(perfil)} registros")
     print(f"   - Qualidade: {len(qualidade)} registros")
@@ -23,6 +23,8 @@ from scipy import stats
 import networkx as nx
 from matplotlib.patches import FancyBboxPatch, Circle, Rectangle, Ellipse
 import warnings
+from cache_dados import carregar_tabela
+from codec_likert import decodificar_tabela, registrar_escala
 warnings.filterwarnings('ignore')
 
 # Configuração de gráficos
@@ -50,7 +52,7 @@ def carregar_todos_dados():
     for arquivo in arquivos:
         try:
             caminho = f'csv_extraidos/{arquivo}'
-            df = pd.read_csv(caminho)
+            df = carregar_tabela(caminho)
             nome = arquivo.replace('.csv', '').replace(' ', '_')
             datasets[nome] = df
             vars_sem_id = [col for col in df.columns if col != 'ID']
@@ -60,30 +62,16 @@ def carregar_todos_dados():
     
     return datasets
 
-def converter_likert_avancado(value):
-    """Converte escalas Likert complexas para numérico"""
-    if pd.isna(value):
-        return np.nan
-    
-    value = str(value).strip().lower()
-    
-    # Mapeamentos mais completos
-    likert_maps = {
-        # Satisfação
-        'muito insatisfeito': 1, 'insatisfeito': 2, 'neutro': 3, 'satisfeito': 4, 'muito satisfeito': 5,
-        # Concordância
-        'discordo totalmente': 1, 'discordo': 2, 'concordo': 4, 'concordo totalmente': 5,
-        # Frequência
-        'nunca': 1, 'raramente': 2, 'às vezes': 3, 'frequentemente': 4, 'sempre': 5,
-        # Qualidade
-        'péssimo': 1, 'ruim': 2, 'regular': 3, 'bom': 4, 'excelente': 5,
-        # Valores numéricos diretos
-        '1': 1, '2': 2, '3': 3, '4': 4, '5': 5,
-        # Sim/Não
-        'sim': 5, 'não': 1, 'yes': 5, 'no': 1,
-    }
-    
-    return likert_maps.get(value, np.nan)
+# Escalas adicionais aceitas pela conversão avançada
+registrar_escala('qualidade', ['Péssimo', 'Ruim', 'Regular', 'Bom', 'Excelente'])
+registrar_escala('numerica', ['1', '2', '3', '4', '5'])
+registrar_escala('sim_nao', {'sim': 5, 'não': 1, 'yes': 5, 'no': 1})
+
+ESCALAS_AVANCADAS = ['satisfacao', 'concordancia', 'frequencia', 'qualidade', 'numerica', 'sim_nao']
+
+def converter_likert_avancado(df):
+    """Converte escalas Likert complexas para numérico (todas as colunas de uma vez)"""
+    return decodificar_tabela(df, ESCALAS_AVANCADAS, como_float=True)
 
 def preparar_construtos_completos(datasets):
     """Prepara TODOS os construtos com TODAS as variáveis"""
@@ -96,8 +84,8 @@ def preparar_construtos_completos(datasets):
     qualidade_vars = [col for col in qualidade_df.columns if col != 'ID']
     
     print(f"\n1. QUALIDADE DO SERVIÇO ({len(qualidade_vars)} variáveis):")
+    qualidade_df[qualidade_vars] = converter_likert_avancado(qualidade_df[qualidade_vars])
     for col in qualidade_vars:
-        qualidade_df[col] = qualidade_df[col].apply(converter_likert_avancado)
         print(f"   ✓ {col}")
     
     construtos_completos['QUALIDADE'] = {
@@ -112,8 +100,8 @@ def preparar_construtos_completos(datasets):
     utilizacao_vars = [col for col in utilizacao_df.columns if col != 'ID']
     
     print(f"\n2. UTILIZAÇÃO ({len(utilizacao_vars)} variáveis):")
+    utilizacao_df[utilizacao_vars] = converter_likert_avancado(utilizacao_df[utilizacao_vars])
     for col in utilizacao_vars:
-        utilizacao_df[col] = utilizacao_df[col].apply(converter_likert_avancado)
         print(f"   ✓ {col}")
     
     construtos_completos['UTILIZACAO'] = {
@@ -128,8 +116,8 @@ def preparar_construtos_completos(datasets):
     percepcao_vars = [col for col in percepcao_df.columns if col != 'ID']
     
     print(f"\n3. PERCEPÇÃO DE RECOMPENSAS ({len(percepcao_vars)} variáveis):")
+    percepcao_df[percepcao_vars] = converter_likert_avancado(percepcao_df[percepcao_vars])
     for col in percepcao_vars:
-        percepcao_df[col] = percepcao_df[col].apply(converter_likert_avancado)
         print(f"   ✓ {col}")
     
     construtos_completos['PERCEPCAO'] = {
@@ -144,8 +132,8 @@ def preparar_construtos_completos(datasets):
     intencao_vars = [col for col in intencao_df.columns if col != 'ID']
     
     print(f"\n4. INTENÇÃO COMPORTAMENTAL ({len(intencao_vars)} variáveis):")
+    intencao_df[intencao_vars] = converter_likert_avancado(intencao_df[intencao_vars])
     for col in intencao_vars:
-        intencao_df[col] = intencao_df[col].apply(converter_likert_avancado)
         print(f"   ✓ {col}")
     
     construtos_completos['INTENCAO'] = {
@@ -160,8 +148,8 @@ def preparar_construtos_completos(datasets):
     tecnologia_vars = [col for col in tecnologia_df.columns if col != 'ID']
     
     print(f"\n5. ACEITAÇÃO TECNOLÓGICA ({len(tecnologia_vars)} variáveis):")
+    tecnologia_df[tecnologia_vars] = converter_likert_avancado(tecnologia_df[tecnologia_vars])
     for col in tecnologia_vars:
-        tecnologia_df[col] = tecnologia_df[col].apply(converter_likert_avancado)
         print(f"   ✓ {col}")
     
     construtos_completos['TECNOLOGIA'] = {
@@ -176,8 +164,8 @@ def preparar_construtos_completos(datasets):
     experiencia_vars = [col for col in experiencia_df.columns if col != 'ID']
     
     print(f"\n6. EXPERIÊNCIA DO USUÁRIO ({len(experiencia_vars)} variáveis):")
+    experiencia_df[experiencia_vars] = converter_likert_avancado(experiencia_df[experiencia_vars])
     for col in experiencia_vars:
-        experiencia_df[col] = experiencia_df[col].apply(converter_likert_avancado)
         print(f"   ✓ {col}")
     
     construtos_completos['EXPERIENCIA'] = {
@@ -16,49 +16,32 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 import warnings
+from base_respondentes import carregar_base_respondentes
+from codec_likert import decodificar_tabela
 warnings.filterwarnings('ignore')
 
 def carregar_dados_processados():
     """Carrega e processa os dados para análise SEM"""
     print("=== CARREGAMENTO DOS DADOS PARA SEM ===")
     
-    # Carregar dados
+    # Carregar dados (todas as tabelas alinhadas pela base indexada por ID)
+    base = carregar_base_respondentes()
     datasets = {}
-    arquivos = [
-        'Qualidade do serviço.csv',
-        'Utilização.csv', 
-        'Percepção novos serviços.csv',
-        'Intenção comportamental.csv',
-        'Aceitação da tecnologia.csv',
-        'Experiência do usuário.csv',
-        'Perfil Socioeconomico.csv'
-    ]
-    
-    for arquivo in arquivos:
-        caminho = f'csv_extraidos/{arquivo}'
-        df = pd.read_csv(caminho)
-        nome = arquivo.replace('.csv', '').replace(' ', '_')
-        datasets[nome] = df
+    for tabela in base.tabelas:
+        nome = tabela.replace(' ', '_')
+        datasets[nome] = base.quadro(tabela)
     
     return datasets
 
 def aplicar_codificacao_sem(datasets):
     """Aplica codificação para análise SEM"""
     
-    # Mapeamentos
-    satisfacao_map = {
-        'Muito insatisfeito': 1, 'Insatisfeito': 2, 'Neutro': 3,
-        'Satisfeito': 4, 'Muito satisfeito': 5
-    }
-    
-    concordancia_map = {
-        'Discordo totalmente': 1, 'Discordo': 2, 'Neutro': 3, 
-        'Concordo': 4, 'Concordo totalmente': 5
-    }
-    
-    facilidade_map = {
-        'Muito difícil': 1, 'Difícil': 2, 'Neutro': 3,
-        'Fácil': 4, 'Muito Fácil': 5
+    # Escala de cada tabela temática (todas as colunas exceto ID)
+    escalas_por_tabela = {
+        'Qualidade_do_serviço': 'satisfacao',
+        'Percepção_novos_serviços': 'concordancia',
+        'Intenção_comportamental': 'concordancia',
+        'Aceitação_da_tecnologia': 'concordancia'
     }
     
     datasets_coded = {}
@@ -66,34 +49,17 @@ def aplicar_codificacao_sem(datasets):
     for nome, df in datasets.items():
         df_coded = df.copy()
         
-        if nome == 'Qualidade_do_serviço':
-            for col in df.columns:
-                if col != 'ID':
-                    df_coded[col] = df[col].map(satisfacao_map)
-        
-        elif nome == 'Percepção_novos_serviços':
-            for col in df.columns:
-                if col != 'ID':
-                    df_coded[col] = df[col].map(concordancia_map)
-        
-        elif nome == 'Intenção_comportamental':
-            for col in df.columns:
-                if col != 'ID':
-                    df_coded[col] = df[col].map(concordancia_map)
-        
-        elif nome == 'Aceitação_da_tecnologia':
-            for col in df.columns:
-                if col != 'ID':
-                    df_coded[col] = df[col].map(concordancia_map)
+        if nome in escalas_por_tabela:
+            cols = [col for col in df.columns if col != 'ID']
+            df_coded[cols] = decodificar_tabela(df[cols], escalas_por_tabela[nome], como_float=True)
         
         elif nome == 'Experiência_do_usuário':
-            for col in df.columns:
-                if col == 'ID':
-                    continue
-                elif any(palavra in col for palavra in ['satisfeito', 'correspondem', 'necessidades', 'custo', 'recompensado']):
-                    df_coded[col] = df[col].map(concordancia_map)
-                elif any(palavra in col for palavra in ['Cartões', 'Aplicativos', 'Qr', 'Bilhete']):
-                    df_coded[col] = df[col].map(facilidade_map)
+            cols_concordancia = [col for col in df.columns if col != 'ID' and
+                                 any(palavra in col for palavra in ['satisfeito', 'correspondem', 'necessidades', 'custo', 'recompensado'])]
+            cols_facilidade = [col for col in df.columns if col != 'ID' and col not in cols_concordancia and
+                               any(palavra in col for palavra in ['Cartões', 'Aplicativos', 'Qr', 'Bilhete'])]
+            df_coded[cols_concordancia] = decodificar_tabela(df[cols_concordancia], 'concordancia', como_float=True)
+            df_coded[cols_facilidade] = decodificar_tabela(df[cols_facilidade], 'facilidade', como_float=True)
         
         datasets_coded[nome] = df_coded
     
@@ -346,11 +312,9 @@ def analise_segmentacao_sem(df_construtos, datasets_coded):
             break
     
     if genero_col:
-        # Merge com dados de perfil
-        df_analise = df_construtos.reset_index().merge(
-            df_perfil[['ID', genero_col]], 
-            left_on='index', right_on='ID', how='inner'
-        )
+        # Construtos e perfil compartilham a ordem da base de respondentes: sem merge
+        base = carregar_base_respondentes()
+        df_analise = df_construtos.assign(**{genero_col: base.coluna(genero_col)[df_construtos.index.to_numpy()]})
         
         # Análise por gênero
         print("Médias dos construtos por gênero:")
@@ -11,6 +11,7 @@ Script para análise SEM completa com:
 - Variáveis latentes e observadas claramente especificadas
 """
 
+import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -19,11 +20,14 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score, mean_squared_error
 from scipy import stats
-from scipy.stats import chi2
 import networkx as nx
 from matplotlib.patches import FancyBboxPatch, Circle, FancyArrowPatch
 from matplotlib.patches import Rectangle
 import warnings
+from cache_dados import carregar_tabela
+from codec_likert import decodificar_tabela
+from estatisticas_ajuste import indices_exatos
+from mediacao import analisar_mediacao, covariaveis_perfil
 warnings.filterwarnings('ignore')
 
 # Configuração de gráficos
@@ -33,6 +37,10 @@ plt.rcParams['font.size'] = 10
 plt.rcParams['axes.titlesize'] = 14
 plt.rcParams['axes.labelsize'] = 12
 
+# Respondentes sem algum construto: 'listwise' (remove a linha) ou 'fiml'
+# (esperança condicional sob os momentos de máxima verossimilhança do EM, mantendo o N)
+AUSENTES_CONSTRUTOS = os.environ.get('AUSENTES_CONSTRUTOS', 'listwise')
+
 def carregar_dados_completos():
     """Carrega todos os datasets necessários para análise SEM"""
     print("=== CARREGAMENTO DOS DADOS ===")
@@ -51,7 +59,7 @@ def carregar_dados_completos():
     for arquivo in arquivos:
         try:
             caminho = f'csv_extraidos/{arquivo}'
-            df = pd.read_csv(caminho)
+            df = carregar_tabela(caminho)
             nome = arquivo.replace('.csv', '').replace(' ', '_')
             datasets[nome] = df
             print(f"✓ {arquivo}: {df.shape[0]} registros, {df.shape[1]} colunas")
@@ -60,36 +68,13 @@ def carregar_dados_completos():
     
     return datasets
 
-def preparar_construtos_latentes(datasets):
-    """Prepara construtos latentes a partir dos dados observados"""
+def preparar_construtos_latentes(datasets, ausentes=None):
+    """Prepara construtos latentes a partir dos dados observados (ausentes: 'listwise' ou 'fiml')"""
+    ausentes = ausentes or AUSENTES_CONSTRUTOS
     print("\n=== PREPARAÇÃO DE CONSTRUTOS LATENTES ===")
     
-    # Função para converter Likert em texto para numérico
-    def converter_likert(value):
-        """Converte escala Likert de texto para numérico"""
-        if pd.isna(value):
-            return np.nan
-        value = str(value).strip().lower()
-        
-        likert_map = {
-            'muito insatisfeito': 1,
-            'insatisfeito': 2,
-            'neutro': 3,
-            'satisfeito': 4,
-            'muito satisfeito': 5,
-            'discordo totalmente': 1,
-            'discordo': 2,
-            'neutro': 3,
-            'concordo': 4,
-            'concordo totalmente': 5,
-            'nunca': 1,
-            'raramente': 2,
-            'às vezes': 3,
-            'frequentemente': 4,
-            'sempre': 5
-        }
-        
-        return likert_map.get(value, np.nan)
+    # Escalas verbais reconhecidas na conversão Likert -> numérico
+    escalas_likert = ['satisfacao', 'concordancia', 'frequencia']
     
     # Dataset principal para combinar construtos
     base_df = datasets['Perfil_Socioeconomico'][['ID']].copy()
@@ -103,8 +88,7 @@ def preparar_construtos_latentes(datasets):
     print(f"Convertendo {len(qualidade_cols)} variáveis de qualidade...")
     
     # Converter para numérico
-    for col in qualidade_cols:
-        qualidade_df[col] = qualidade_df[col].apply(converter_likert)
+    qualidade_df[qualidade_cols] = decodificar_tabela(qualidade_df[qualidade_cols], escalas_likert, como_float=True)
     
     # Criar construto latente QUALIDADE
     dados_qualidade = qualidade_df[qualidade_cols].mean(axis=1)
@@ -125,8 +109,7 @@ def preparar_construtos_latentes(datasets):
     
     print(f"Convertendo {len(percepcao_cols)} variáveis de percepção...")
     
-    for col in percepcao_cols:
-        percepcao_df[col] = percepcao_df[col].apply(converter_likert)
+    percepcao_df[percepcao_cols] = decodificar_tabela(percepcao_df[percepcao_cols], escalas_likert, como_float=True)
     
     dados_percepcao = percepcao_df[percepcao_cols].mean(axis=1)
     dados_percepcao_validos = dados_percepcao.dropna()
@@ -146,8 +129,7 @@ def preparar_construtos_latentes(datasets):
     
     print(f"Convertendo {len(intencao_cols)} variáveis de intenção...")
     
-    for col in intencao_cols:
-        intencao_df[col] = intencao_df[col].apply(converter_likert)
+    intencao_df[intencao_cols] = decodificar_tabela(intencao_df[intencao_cols], escalas_likert, como_float=True)
     
     dados_intencao = intencao_df[intencao_cols].mean(axis=1)
     dados_intencao_validos = dados_intencao.dropna()
@@ -167,8 +149,7 @@ def preparar_construtos_latentes(datasets):
     
     print(f"Convertendo {len(tecnologia_cols)} variáveis de tecnologia...")
     
-    for col in tecnologia_cols:
-        tecnologia_df[col] = tecnologia_df[col].apply(converter_likert)
+    tecnologia_df[tecnologia_cols] = decodificar_tabela(tecnologia_df[tecnologia_cols], escalas_likert, como_float=True)
     
     dados_tecnologia = tecnologia_df[tecnologia_cols].mean(axis=1)
     dados_tecnologia_validos = dados_tecnologia.dropna()
@@ -188,8 +169,7 @@ def preparar_construtos_latentes(datasets):
     
     print(f"Convertendo {len(experiencia_cols)} variáveis de experiência...")
     
-    for col in experiencia_cols:
-        experiencia_df[col] = experiencia_df[col].apply(converter_likert)
+    experiencia_df[experiencia_cols] = decodificar_tabela(experiencia_df[experiencia_cols], escalas_likert, como_float=True)
     
     dados_experiencia = experiencia_df[experiencia_cols].mean(axis=1)
     dados_experiencia_validos = dados_experiencia.dropna()
@@ -208,8 +188,18 @@ def preparar_construtos_latentes(datasets):
     for nome, info in construtos.items():
         df_final[info['latent_var']] = info['data']
     
-    # Remover casos com missing
-    df_final = df_final.dropna()
+    latentes = [info['latent_var'] for info in construtos.values()]
+    if ausentes == 'fiml':
+        # As regressões exigem casos completos: os construtos ausentes recebem a esperança
+        # condicional dados os observados do respondente, por padrão de ausência
+        from fiml import imputar_condicional
+        df_final = df_final[df_final[latentes].notna().any(axis=1)].copy()
+        incompletos = df_final[latentes].isna().any(axis=1).sum()
+        df_final[latentes] = imputar_condicional(df_final[latentes])
+        print(f"Casos com construtos ausentes completados por EM: {incompletos}")
+    else:
+        # Remover casos com missing
+        df_final = df_final.dropna()
     
     print(f"\nConstrutos criados: {len(construtos)}")
     print(f"Casos válidos para SEM: {len(df_final)}")
@@ -220,8 +210,14 @@ def preparar_construtos_latentes(datasets):
     
     return df_final, construtos
 
-def modelo_sem_estrutural(df_construtos):
-    """Executa modelo SEM estrutural completo"""
+def modelo_sem_estrutural(df_construtos, covariaveis=None, n_bootstrap=5000):
+    """
+    Executa modelo SEM estrutural completo.
+    
+    O efeito indireto via Percepcao_Recompensas (a×b) é testado com bootstrap
+    (n_bootstrap réplicas); covariaveis (indexadas por ID, ex.: do Perfil
+    Socioeconômico) entram nas duas equações da mediação.
+    """
     print("\n=== MODELO SEM ESTRUTURAL ===")
     
     # Variáveis do modelo
@@ -264,7 +260,14 @@ def modelo_sem_estrutural(df_construtos):
     corr_matrix = data.corr()
     
     # Cálculo de índices de ajuste
-    indices_ajuste = calcular_indices_ajuste(data, model2)
+    indices_ajuste = calcular_indices_ajuste(data, {y_mediador: (X_vars, model1),
+                                                    y_final: (X_vars + [y_mediador], model2)})
+    
+    # Mediação: efeitos indiretos com intervalos bootstrap
+    mediacao = analisar_mediacao(df_construtos.set_index('ID'), X_vars, [y_mediador], y_final,
+                                 covariaveis=covariaveis, n_replicas=n_bootstrap)
+    print("\nEfeitos da mediação (bootstrap):")
+    print(mediacao.to_string(index=False))
     
     return {
         'model1': model1,  # Percepcao ~ Qualidade + Tecnologia + Experiencia
@@ -278,62 +281,71 @@ def modelo_sem_estrutural(df_construtos):
         'correlations': corr_matrix,
         'data': data,
         'n_obs': len(data),
-        'indices_ajuste': indices_ajuste
+        'indices_ajuste': indices_ajuste,
+        'mediacao': mediacao
     }
 
-def calcular_indices_ajuste(data, model):
-    """Calcula índices de ajuste do modelo SEM"""
-    
-    # Predições do modelo
-    X = data[['Qualidade_Percebida', 'Aceitacao_Tecnologica', 'Experiencia_Usuario', 'Percepcao_Recompensas']]
-    y = data['Intencao_Comportamental']
-    y_pred = model.predict(X)
-    
-    # Estatísticas básicas
-    n = len(data)
-    k = X.shape[1]  # número de parâmetros
-    
-    # Resíduos
-    residuals = y - y_pred
-    sse = np.sum(residuals ** 2)
-    mse = sse / (n - k - 1)
-    rmse = np.sqrt(mse)
-    
-    # R² ajustado
-    r2 = model.score(X, y)
+def calcular_indices_ajuste(data, equacoes):
+    """
+    Índices de ajuste exatos (estatisticas_ajuste) do modelo de caminhos
+    formado pelas regressões: Σ = (I − B)⁻¹ Ψ (I − B)⁻ᵀ, com B pelos
+    coeficientes e Ψ pela covariância amostral das exógenas e pelas
+    variâncias residuais. Com setas entre todas as variáveis o modelo é
+    saturado (gl = 0): χ² = 0, CFI = 1 e RMSEA = 0.
+    
+    Args:
+        data: DataFrame com as variáveis do modelo
+        equacoes: dict dependente -> (preditores, LinearRegression ajustada); a última
+            equação é a da variável final (RMSE e R²)
+    """
+    dependentes = list(equacoes)
+    exogenas = [v for preditores, _ in equacoes.values() for v in preditores if v not in dependentes]
+    exogenas = list(dict.fromkeys(exogenas))
+    variaveis = exogenas + dependentes
+    posicao = {v: i for i, v in enumerate(variaveis)}
+    n, p = len(data), len(variaveis)
+    
+    S = data[variaveis].cov(ddof=0).to_numpy()
+    B = np.zeros((p, p))
+    psi = np.zeros((p, p))
+    psi[:len(exogenas), :len(exogenas)] = S[:len(exogenas), :len(exogenas)]
+    n_parametros = len(exogenas) * (len(exogenas) + 1) // 2 + len(dependentes)
+    for dependente, (preditores, modelo) in equacoes.items():
+        B[posicao[dependente], [posicao[v] for v in preditores]] = modelo.coef_
+        residuos = data[dependente] - modelo.predict(data[preditores])
+        psi[posicao[dependente], posicao[dependente]] = np.mean(residuos ** 2)
+        n_parametros += len(preditores)
+    inversa = np.linalg.inv(np.identity(p) - B)
+    sigma = inversa @ psi @ inversa.T
+    exatos = indices_exatos([S], [sigma], n, n_parametros).iloc[0]
+    
+    # Qualidade da predição da variável final
+    y_final = dependentes[-1]
+    preditores, modelo = equacoes[y_final]
+    X, y = data[preditores], data[y_final]
+    k = X.shape[1]
+    sse = np.sum((y - modelo.predict(X)) ** 2)
+    rmse = np.sqrt(sse / (n - k - 1))
+    r2 = modelo.score(X, y)
     r2_adj = 1 - (1 - r2) * (n - 1) / (n - k - 1)
     
-    # Chi-quadrado aproximado (baseado em resíduos)
-    chi2_stat = n * np.log(sse / n)
-    df = k
-    p_value = 1 - chi2.cdf(chi2_stat, df) if df > 0 else 1.0
-    
-    # Índices de ajuste aproximados
-    # CFI (Comparative Fit Index) - aproximação
-    cfi = max(0, min(1, 1 - (chi2_stat - df) / max(chi2_stat, df)))
-    
-    # TLI (Tucker-Lewis Index) - aproximação
-    tli = max(0, min(1, 1 - (chi2_stat / df - 1) / max(chi2_stat / df, 1)))
-    
-    # RMSEA (Root Mean Square Error of Approximation)
-    rmsea = np.sqrt(max(0, (chi2_stat - df) / (df * (n - 1))))
-    
-    # SRMR (Standardized Root Mean Square Residual) - aproximação
-    srmr = np.sqrt(np.mean((residuals / np.std(y)) ** 2))
-    
     return {
-        'chi2': chi2_stat,
-        'df': df,
-        'p_value': p_value,
-        'cfi': cfi,
-        'tli': tli,
-        'rmsea': rmsea,
-        'srmr': srmr,
+        'chi2': exatos['chi2'],
+        'df': int(exatos['DoF']),
+        'p_value': exatos['chi2 p-value'],
+        'cfi': exatos['CFI'],
+        'tli': exatos['TLI'],
+        'rmsea': exatos['RMSEA'],
+        'rmsea_inf': exatos['RMSEA inf'],
+        'rmsea_sup': exatos['RMSEA sup'],
+        'srmr': exatos['SRMR'],
+        'aic': exatos['AIC'],
+        'bic': exatos['BIC'],
         'rmse': rmse,
         'r2': r2,
         'r2_adj': r2_adj,
         'n': n,
-        'k': k
+        'k': n_parametros
     }
 
 def criar_diagrama_caminho(resultados, construtos, salvar=True):
@@ -527,11 +539,14 @@ def gerar_tabela_indices_ajuste(resultados):
     status_list = []
     status_list.append('Calculado')  # Chi-quadrado
     status_list.append('-')  # Graus de liberdade
-    status_list.append('✓ Bom' if indices['p_value'] > 0.05 else '✗ Ruim')  # p-valor
+    saturado = indices['df'] == 0
+    status_list.append('Saturado (gl = 0)' if saturado else
+                       ('✓ Bom' if indices['p_value'] > 0.05 else '✗ Ruim'))  # p-valor
     status_list.append('✓ Excelente' if indices['cfi'] > 0.95 else 
                       ('✓ Bom' if indices['cfi'] > 0.90 else '✗ Ruim'))  # CFI
-    status_list.append('✓ Excelente' if indices['tli'] > 0.95 else 
-                      ('✓ Bom' if indices['tli'] > 0.90 else '✗ Ruim'))  # TLI
+    status_list.append('Saturado (gl = 0)' if saturado else
+                       ('✓ Excelente' if indices['tli'] > 0.95 else
+                        ('✓ Bom' if indices['tli'] > 0.90 else '✗ Ruim')))  # TLI
     status_list.append('✓ Excelente' if indices['rmsea'] < 0.05 else 
                       ('✓ Bom' if indices['rmsea'] < 0.08 else '✗ Ruim'))  # RMSEA
     status_list.append('✓ Excelente' if indices['srmr'] < 0.05 else 
@@ -616,6 +631,14 @@ Correlação = {np.sqrt(resultados['r2_principal']):.3f}
         f.write(f"• Qualidade atual tem impacto limitado na intenção ({eq2_coefs[0]:.3f})\n")
         f.write(f"• Tecnologia facilita a percepção de recompensas ({eq1_coefs[1]:.3f})\n")
         f.write(f"• O modelo explica {resultados['r2_intencao']*100:.1f}% da variância na intenção\n")
+        
+        # Efeitos indiretos via Percepção de Recompensas
+        if 'mediacao' in resultados:
+            f.write("\nEFEITOS INDIRETOS (a×b, IC 95% BCa):\n")
+            f.write("-"*30 + "\n")
+            for _, linha in resultados['mediacao'].query("efeito == 'indireto'").iterrows():
+                f.write(f"• {linha['x']} → {linha['mediador']} → Intenção: {linha['Estimate']:.3f} "
+                        f"[{linha['BCa inf']:.3f}; {linha['BCa sup']:.3f}]\n")
     
     print("✓ Equações salvas como 'equacoes_estruturais_sem.txt'")
     
@@ -644,8 +667,9 @@ def executar_analise_sem_completa():
         print("Verifique se os dados estão no formato correto.")
         return None
     
-    # 3. Executar modelo SEM
-    resultados = modelo_sem_estrutural(df_construtos)
+    # 3. Executar modelo SEM (mediação ajustada pelo perfil socioeconômico)
+    covariaveis = covariaveis_perfil(datasets['Perfil_Socioeconomico'])
+    resultados = modelo_sem_estrutural(df_construtos, covariaveis=covariaveis)
     
     # 4. Gerar outputs
     print("\n" + "="*60)
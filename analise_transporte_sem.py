@@ -27,6 +27,17 @@ from statsmodels.formula.api import logit
 from scipy import stats
 import os
 import sys
+import json
+import hashlib
+import functools
+from bootstrap_sem import bootstrap_sem
+from cache_dados import DIRETORIO_CACHE
+from cache_resultados import chave_resultado, gravar_resultado, ler_resultado
+from codec_likert import LIKERT_AUSENTE, decodificar_coluna, para_float
+from memoria_compartilhada import anexar_matriz, publicar_matriz
+from momentos_amostrais import MomentosAmostrais, ajustar_por_momentos, calcular_momentos
+from motor_sem import ModeloSEM, ResultadoAjuste, compilar_especificacao
+from concurrent.futures import ProcessPoolExecutor
 
 print("DEBUG: Bibliotecas importadas com sucesso.") # DEBUG PRINT 2
 
@@ -64,24 +75,22 @@ def load_data(file_path='csv_extraidos/BDTP.csv'):
         return None
 
 # --- 2. Limpeza e Preparação dos Dados ---
+# Tabela de tradução pré-compilada: acentos -> ASCII e quebras de linha/tabs -> espaço
+_COLUMN_NAME_TRANSLATION = str.maketrans('áàâãäéèêëíìîïóòôõöúùûüç\n\r\t', 'aaaaaeeeeiiiiooooouuuuc   ')
+_RE_COLUMN_NAME_INVALID = re.compile(r'[^a-z0-9_ ]')
+_RE_COLUMN_NAME_SPACES = re.compile(r'\s+')
+_RE_COLUMN_NAME_UNDERSCORES = re.compile(r'_+')
+
+@functools.lru_cache(maxsize=4096)
 def normalize_column_name(col_name):
     '''Normaliza o nome da coluna: minúsculas, snake_case, remove acentos e caracteres especiais.'''
     if not isinstance(col_name, str):
         return str(col_name) # Garante que é string
-    name = col_name.lower()
-    name = re.sub(r'[\n\r\t]+', ' ', name) # Remove quebras de linha e tabs, substitui por espaço
-    name = name.strip()
-    # Remove acentos (simplificado, pode precisar de unicodedata para robustez total)
-    name = re.sub(r'[áàâãä]', 'a', name)
-    name = re.sub(r'[éèêë]', 'e', name)
-    name = re.sub(r'[íìîï]', 'i', name)
-    name = re.sub(r'[óòôõö]', 'o', name)
-    name = re.sub(r'[úùûü]', 'u', name)
-    name = re.sub(r'ç', 'c', name)
+    name = col_name.lower().translate(_COLUMN_NAME_TRANSLATION).strip()
     # Remove caracteres especiais exceto underscore e alphanumeric. Mantém espaços para substituir por underscore depois.
-    name = re.sub(r'[^a-z0-9_ ]', '', name)
-    name = re.sub(r'\s+', '_', name) # Substitui um ou mais espaços por um único underscore
-    name = re.sub(r'_+', '_', name) # Remove underscores duplicados
+    name = _RE_COLUMN_NAME_INVALID.sub('', name)
+    name = _RE_COLUMN_NAME_SPACES.sub('_', name) # Substitui um ou mais espaços por um único underscore
+    name = _RE_COLUMN_NAME_UNDERSCORES.sub('_', name) # Remove underscores duplicados
     return name.strip('_')
 
 def get_column_mappings():
@@ -157,15 +166,79 @@ def get_column_mappings():
     }
     return mapping
 
-def clean_data(df):
-    '''Aplica todas as etapas de limpeza e preparação no DataFrame.'''
-    print("DEBUG: Entrando na função clean_data") # DEBUG PRINT
-    if df is None:
-        print("DEBUG: clean_data - DataFrame de entrada é None, retornando None.") # DEBUG PRINT
-        return None
+def get_likert_scale_for_column(col):
+    """Retorna o nome da escala Likert (codec_likert) de uma coluna já renomeada (ou None)."""
+    if col.startswith('qual_'):
+        return 'satisfacao'
+    if col.startswith('exp_facilidade_'):
+        return 'facilidade'
+    if col.startswith(('percep_', 'intencao_', 'aceit_', 'exp_satisfeito', 'exp_corresponde',
+                       'exp_necessidades', 'exp_bom_custo', 'exp_sente')):
+        return 'concordancia'
+    return None
 
+COLUMN_MAPPING_CACHE_DIR = os.path.join(DIRETORIO_CACHE, 'mapeamento_colunas')
+_resolved_headers = {}
+
+def _header_key(col_name):
+    """Chave tolerante a variantes de cabeçalho (NBSP, quebras de linha, espaços repetidos ou nas bordas)."""
+    return re.sub(r'\s+', ' ', str(col_name).replace('\xa0', ' ')).strip()
+
+@functools.lru_cache(maxsize=1)
+def _column_mapping_index():
+    """Mapeamento exato, índice de variantes e hash do mapeamento (montados uma vez por processo)."""
     col_map = get_column_mappings()
+    variants = {}
+    for source, target in col_map.items():
+        variants.setdefault(_header_key(source), target)
+    digest = hashlib.blake2b(json.dumps(col_map, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+    return col_map, variants, digest
+
+def header_fingerprint(raw_columns):
+    """Hash da linha de cabeçalho bruta (ordem e caracteres invisíveis incluídos)."""
+    h = hashlib.blake2b(digest_size=16)
+    for col in raw_columns:
+        h.update(str(col).encode('utf-8'))
+        h.update(b'\x1f')
+    return h.hexdigest()
+
+def resolve_column_mapping(raw_columns, cache_dir=COLUMN_MAPPING_CACHE_DIR):
+    """
+    Resolve o cabeçalho bruto de um arquivo para os nomes finais (renomeação +
+    normalização). O resultado é guardado por impressão digital do cabeçalho,
+    em memória e em disco, de modo que o mesmo cabeçalho é resolvido uma vez.
+
+    Returns:
+        (lista de nomes finais na ordem do cabeçalho, True se veio do cache)
+    """
+    col_map, variants, mapping_digest = _column_mapping_index()
+    key = f"{header_fingerprint(raw_columns)}-{mapping_digest}"
 
+    if key in _resolved_headers:
+        return list(_resolved_headers[key]), True
+    cache_path = os.path.join(cache_dir, f'{key}.json') if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            _resolved_headers[key] = json.load(f)
+        return list(_resolved_headers[key]), True
+
+    resolved = []
+    for raw in raw_columns:
+        target = col_map.get(raw)
+        if target is None:
+            target = variants.get(_header_key(raw), raw)
+        resolved.append(normalize_column_name(target))
+
+    _resolved_headers[key] = resolved
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(resolved, f, ensure_ascii=False)
+        os.replace(cache_path + '.tmp', cache_path)
+    return list(resolved), False
+
+def _diagnose_header_before_rename(df, col_map):
+    '''Compara cada chave do mapeamento com as colunas brutas do DataFrame.'''
     # Diagnóstico ANTES de renomear - IMPRIMIR CHAVES E COLUNAS REAIS
     print("\n--- DEBUG: DIAGNÓSTICO DETALHADO ANTES DO RENAME ---")
     print("Chaves do dicionário de mapeamento (col_map.keys()):")
@@ -188,14 +261,8 @@ def clean_data(df):
         #     print(f"  -> Chave ENCONTRADA: '{key_map}'")
     print("----------------------------------------------------\n")
 
-    try:
-        print("DEBUG: clean_data - Tentando renomear colunas...") # DEBUG PRINT
-        df.rename(columns=col_map, inplace=True, errors='raise') # Usar 'raise' para ver se alguma chave causa erro
-        print("DEBUG: clean_data - Renomeação concluída (ou nenhuma chave incompatível encontrada).") # DEBUG PRINT
-    except Exception as e:
-        print(f"ERRO CRÍTICO DURANTE RENAME: {e}") # DEBUG PRINT
-        return None # Aborta a limpeza se o rename falhar
-
+def _diagnose_header_after_rename(df, col_map):
+    '''Confere se colunas-chave existem após a renomeação.'''
     # Diagnóstico *após* rename
     print("\n--- Diagnóstico Pós-Rename ---")
     expected_new_cols = ['qual_temperatura_interna', 'possui_filhos', 'util_qtd_passagens_dia']
@@ -221,8 +288,24 @@ def clean_data(df):
 
     print("----------------------------")
 
-    print("DEBUG: clean_data - Iniciando normalização de todos os nomes de colunas...") # DEBUG PRINT
-    df.columns = [normalize_column_name(col) for col in df.columns]
+def clean_data(df):
+    '''Aplica todas as etapas de limpeza e preparação no DataFrame.'''
+    print("DEBUG: Entrando na função clean_data") # DEBUG PRINT
+    if df is None:
+        print("DEBUG: clean_data - DataFrame de entrada é None, retornando None.") # DEBUG PRINT
+        return None
+
+    resolved_columns, cache_hit = resolve_column_mapping(df.columns)
+    if cache_hit:
+        print("🔁 Cabeçalho já resolvido (cache de mapeamento): diagnósticos de renomeação ignorados")
+        df.columns = resolved_columns
+    else:
+        col_map = get_column_mappings()
+        _diagnose_header_before_rename(df, col_map)
+        print("Aplicando mapeamento de colunas resolvido (renomeação + normalização)...")
+        df.columns = resolved_columns
+        _diagnose_header_after_rename(df, col_map)
+
     print("\nNomes das colunas após mapeamento e normalização final:")
     # Imprimir todos pode ser verboso, descomente se necessário
     # for col_name in df.columns:
@@ -236,52 +319,11 @@ def clean_data(df):
     else:
         print(cols_final)
 
-    likert_map_5pt_satisfacao = {
-        'Muito insatisfeito': 1,
-        'Insatisfeito': 2,
-        'Neutro': 3,
-        'Satisfeito': 4,
-        'Muito satisfeito': 5
-    }
-    likert_map_5pt_concordancia = {
-        'Discordo totalmente': 1,
-        'Discordo': 2,
-        'Neutro': 3,
-        'Concordo': 4,
-        'Concordo totalmente': 5
-    }
-    likert_map_5pt_facilidade = {
-        'Muito difícil': 1,
-        'Difícil': 2,
-        'Neutro': 3,
-        'Fácil': 4,
-        'Muito Fácil': 5
-    }
-    
-    cols_satisfacao = [col for col in df.columns if col.startswith('qual_') ]
-    cols_concordancia = [col for col in df.columns if col.startswith('percep_') or col.startswith('intencao_') or col.startswith('aceit_') or col.startswith('exp_satisfeito') or col.startswith('exp_corresponde') or col.startswith('exp_necessidades') or col.startswith('exp_bom_custo') or col.startswith('exp_sente') ]
-    cols_facilidade = [col for col in df.columns if col.startswith('exp_facilidade_')]
-
-    for col_list, likert_map in [
-        (cols_satisfacao, likert_map_5pt_satisfacao),
-        (cols_concordancia, likert_map_5pt_concordancia),
-        (cols_facilidade, likert_map_5pt_facilidade)
-    ]:
-        for col in col_list:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.strip().replace({'(?i)^nan$': pd.NA, '(?i)^None$': pd.NA, '^$': pd.NA}, regex=True)
-                df[col] = df[col].replace({
-                    'Fácil ': 'Fácil', 'Muito Fácil ': 'Muito Fácil',
-                    'Fácil\xa0': 'Fácil', 'Muito Fácil\xa0': 'Muito Fácil',
-                    'Concordo ': 'Concordo', 'Concordo totalmente ': 'Concordo totalmente',
-                    'Discordo ': 'Discordo', 'Discordo totalmente ': 'Discordo totalmente',
-                    'Neutro ': 'Neutro',
-                    'Satisfeito ': 'Satisfeito', 'Muito satisfeito ': 'Muito satisfeito',
-                    'Insatisfeito ': 'Insatisfeito', 'Muito insatisfeito ': 'Muito insatisfeito',
-                })
-                df[col] = pd.to_numeric(df[col].map(likert_map), errors='coerce')
-            # else:
-                # print(f"Aviso DEBUG: Coluna '{col}' não encontrada para mapeamento Likert após normalização.")
+    # Uma busca por valor distinto em cada coluna Likert (NBSP e espaços já normalizados pelo codec)
+    for col in df.columns:
+        likert_scale = get_likert_scale_for_column(col)
+        if likert_scale is not None:
+            df[col] = para_float(decodificar_coluna(df[col], likert_scale))
 
     print("DEBUG: clean_data - Verificando coluna 'possui_filhos'...") # DEBUG PRINT
     if 'possui_filhos' in df.columns:
@@ -299,6 +341,192 @@ def clean_data(df):
     print("DEBUG: clean_data - Saindo da função clean_data") # DEBUG PRINT
     return df
 
+# --- 2b. Ingestão em streaming para arquivos grandes ---
+STREAM_CHUNK_SIZE = 50000
+LIKERT_MISSING = LIKERT_AUSENTE  # sentinela int8 para Likert ausente/não reconhecido
+
+def _streaming_column_plan(raw_columns, first_chunk):
+    """
+    Define nome final e tipo de armazenamento de cada coluna, espelhando clean_data.
+    Colunas não Likert cujos valores do primeiro bloco são todos numéricos ficam
+    como float32 (NaN nos ausentes); as demais viram códigos de categoria.
+    """
+    plan = []
+    for i, name in enumerate(resolve_column_mapping(raw_columns)[0]):
+        likert_scale = get_likert_scale_for_column(name)
+        if likert_scale is not None:
+            plan.append({'name': name, 'kind': 'likert', 'dtype': 'int8', 'scale': likert_scale})
+            continue
+        values = first_chunk.iloc[:, i].str.strip().replace('', np.nan)
+        present = values.notna()
+        numeric = pd.to_numeric(values, errors='coerce')
+        if name == 'id':
+            plan.append({'name': name, 'kind': 'numeric', 'dtype': 'int64'})
+        elif name == 'possui_filhos':
+            # clean_data converte com errors='coerce'; ausentes viram 0 só na carga
+            plan.append({'name': name, 'kind': 'numeric', 'dtype': 'float32', 'coerce': True})
+        elif present.any() and numeric[present].notna().all():
+            plan.append({'name': name, 'kind': 'numeric', 'dtype': 'float32'})
+        else:
+            plan.append({'name': name, 'kind': 'categorical', 'dtype': 'int16', 'categories': {}})
+    return plan
+
+def _encode_chunk_column(values, col_plan):
+    """Codifica uma coluna de um bloco; a normalização roda uma vez por valor distinto."""
+    if col_plan['kind'] == 'numeric':
+        present = values.notna() & (values.str.strip() != '')
+        numeric = pd.to_numeric(values.where(present), errors='coerce')
+        invalid = present & numeric.isna()
+        if invalid.any() and not col_plan.get('coerce'):
+            raise ValueError(f"Coluna '{col_plan['name']}' (numérica no primeiro bloco) tem valores não numéricos: "
+                             f"{list(values[invalid].unique()[:5])}")
+        if col_plan['dtype'] == 'int64':
+            if numeric.isna().any() or (numeric % 1 != 0).any():
+                raise ValueError(f"Coluna '{col_plan['name']}' com identificadores ausentes ou não inteiros")
+            return numeric.to_numpy().astype(np.int64)
+        return numeric.to_numpy(dtype=np.float32)
+
+    if col_plan['kind'] == 'likert':
+        return decodificar_coluna(values, col_plan['scale'])
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    categories = col_plan['categories']
+    table = []
+    for u in uniques:
+        label = str(u).strip()
+        if label == '' or label.lower() in ('nan', 'none'):
+            table.append(-1)
+        else:
+            table.append(categories.setdefault(label, len(categories)))
+    # Códigos no menor inteiro que comporta as categorias vistas até aqui
+    for dtype in ('int16', 'int32'):
+        if len(categories) <= np.iinfo(dtype).max:
+            break
+    else:
+        raise ValueError(f"Coluna '{col_plan['name']}' com categorias demais para int32: {len(categories)}")
+    table = np.array(table + [-1], dtype=dtype)
+    return table[codes]
+
+def _widen_column_file(path, old_dtype, new_dtype):
+    """Regrava os códigos já escritos de uma coluna com um inteiro mais largo."""
+    values = np.fromfile(path, dtype=old_dtype).astype(new_dtype)
+    values.tofile(path)
+
+def ingest_data_streaming(file_path='csv_extraidos/BDTP.csv', chunk_size=STREAM_CHUNK_SIZE, output_dir=None):
+    """
+    Lê o CSV consolidado em blocos de tamanho fixo, aplica renomeação e
+    mapeamento Likert em cada bloco e grava arrays compactos (int8 para
+    Likert, float32 para numéricas, int16/int32 para códigos de categoria)
+    em disco. O pico de memória depende de chunk_size, não do número de
+    respondentes.
+
+    Args:
+        file_path: CSV consolidado (BDTP.csv ou 'segmentada - BDTP.csv')
+        chunk_size: Número de linhas por bloco
+        output_dir: Diretório de saída (padrão: .cache_dados/stream_<arquivo>-<hash>)
+
+    Returns:
+        Caminho do diretório com os arrays e o meta.json
+    """
+    import itertools
+    import shutil
+    from cache_dados import hash_tabela
+
+    source_hash = hash_tabela(file_path)
+    if output_dir is None:
+        stem = re.sub(r'[^\w]+', '_', os.path.splitext(os.path.basename(file_path))[0]).strip('_')
+        output_dir = os.path.join(DIRETORIO_CACHE, f'stream_{stem}-{source_hash}')
+
+    meta_path = os.path.join(output_dir, 'meta.json')
+    if os.path.exists(meta_path):
+        print(f"Ingestão em streaming já disponível em {output_dir}")
+        return output_dir
+
+    # Restos de uma execução interrompida não são reaproveitados
+    tmp_dir = output_dir + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    raw_columns = pd.read_csv(file_path, nrows=0).columns
+    chunks = pd.read_csv(file_path, chunksize=chunk_size, dtype=str, keep_default_na=True)
+    first_chunk = next(iter(chunks), None)
+    plan = _streaming_column_plan(raw_columns, first_chunk if first_chunk is not None
+                                  else pd.DataFrame(columns=raw_columns, dtype=str))
+    paths = [os.path.join(tmp_dir, f'c{i:03d}.bin') for i in range(len(plan))]
+    outputs = [open(path, 'wb') for path in paths]
+
+    n_rows = 0
+    try:
+        for chunk in itertools.chain([first_chunk] if first_chunk is not None else [], chunks):
+            for i, col_plan in enumerate(plan):
+                encoded = _encode_chunk_column(chunk.iloc[:, i], col_plan)
+                if encoded.dtype != np.dtype(col_plan['dtype']):
+                    # Mais categorias do que o int16 comporta: alarga o que já foi gravado
+                    outputs[i].close()
+                    _widen_column_file(paths[i], col_plan['dtype'], encoded.dtype)
+                    col_plan['dtype'] = encoded.dtype.name
+                    outputs[i] = open(paths[i], 'ab')
+                outputs[i].write(encoded.tobytes())
+            n_rows += len(chunk)
+            print(f"  Bloco processado: {n_rows} linhas acumuladas")
+    finally:
+        for f in outputs:
+            f.close()
+
+    meta = {'source': os.path.abspath(file_path), 'source_hash': source_hash, 'rows': n_rows, 'columns': []}
+    for i, col_plan in enumerate(plan):
+        info = {'name': col_plan['name'], 'kind': col_plan['kind'], 'dtype': col_plan['dtype'],
+                'file': f'c{i:03d}.bin'}
+        if col_plan['kind'] == 'categorical':
+            info['categories'] = list(col_plan['categories'])
+        meta['columns'].append(info)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Saída parcial (sem meta.json) de uma execução anterior impediria o os.replace
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    print(f"Ingestão em streaming concluída: {n_rows} linhas, {len(plan)} colunas -> {output_dir}")
+    return output_dir
+
+def load_data_streaming(file_path='csv_extraidos/BDTP.csv', chunk_size=STREAM_CHUNK_SIZE, output_dir=None,
+                        columns=None):
+    """
+    Equivalente a clean_data(load_data()) para arquivos grandes: devolve um
+    DataFrame sobre os arrays memory-mapped gerados por ingest_data_streaming.
+    Likert vira Int8 (nulo = ausente), colunas numéricas ficam float32 com NaN
+    e as demais colunas de texto, category.
+    columns (nomes finais, ex.: sem_model_columns()) projeta só essas colunas.
+    """
+    output_dir = ingest_data_streaming(file_path, chunk_size, output_dir)
+    with open(os.path.join(output_dir, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+
+    n_rows = meta['rows']
+    data = {}
+    wanted = None if columns is None else set(columns)
+    for info in meta['columns']:
+        if wanted is not None and info['name'] not in wanted:
+            continue
+        path = os.path.join(output_dir, info['file'])
+        if n_rows > 0:
+            values = np.memmap(path, dtype=info['dtype'], mode='r', shape=(n_rows,)).view(np.ndarray)
+        else:
+            values = np.zeros(0, dtype=info['dtype'])
+        if info['kind'] == 'likert':
+            data[info['name']] = pd.arrays.IntegerArray(values, values == LIKERT_MISSING)
+        elif info['kind'] == 'categorical':
+            data[info['name']] = pd.Categorical.from_codes(values, categories=info['categories'])
+        elif info['name'] == 'possui_filhos':
+            data[info['name']] = np.nan_to_num(values, nan=0.0).astype(int)  # como clean_data
+        else:
+            data[info['name']] = values
+    df = pd.DataFrame(data, copy=False)
+    print(f"Dados carregados em modo streaming. Shape: {df.shape}")
+    return df
+
 # --- 3. Especificações do Modelo SEM (semopy) ---
 
 # Modelo 1: Qualidade Percebida e Satisfação
@@ -370,58 +598,213 @@ sem_models = {
 }
 
 def extract_vars_from_sem_spec(spec_string):
-    '''Extrai nomes de variáveis observadas (indicadores) de uma string SEM.
-       Assume que indicadores são snake_case ou palavras simples minúsculas.'''
-    
-    # Primeiro, limpar a string para remover possíveis quebras de linha que possam
-    # ter sido incluídas em variáveis ou especificações
-    spec_string = re.sub(r'(\w+)\n\s*(\w+)', r'\1 \2', spec_string)
-    
-    # Padrão para encontrar variáveis observadas em relações de medida (format varLatente =~ var1 + var2 + ...)
-    # ou em relações estruturais (var1 ~ var2)
-    pattern = r'(?:=~|~)\s*([a-zA-Z0-9_\s+]+)'
-    matches = re.findall(pattern, spec_string)
-    
-    # Processar cada match para extrair os nomes de variáveis individuais
-    observed_vars = set()
-    for match in matches:
-        # Dividir por '+' para obter variáveis individuais nas relações de medida
-        individual_vars = [v.strip() for v in match.split('+')]
-        for var in individual_vars:
-            # Ignorar variáveis latentes (começam com letra maiúscula) e strings vazias
-            if var and not var[0].isupper():
-                # Verificar se a variável contém quebras de linha e remover
-                var = var.replace('\n', '').strip()
-                
-                # Extrair apenas o nome da variável (parte antes do espaço)
-                # Isso garante que apenas o nome real da variável seja usado,
-                # descartando qualquer texto adicional após o nome
-                if ' ' in var:
-                    var = var.split(' ')[0].strip()
-                
-                if var:  # Verificar novamente se não está vazio
-                    observed_vars.add(var)
-    
-    # Definir keywords para excluir falsos positivos
-    sem_keywords = {
-        'sem', 'model', 'measurement', 'structural', 'regressions', 'covariances', 
-        'latents', 'observed', 'define', 'load', 'data', 'fit', 'params', 
-        'inspect', 'compare', 'calc_stats', 'semopy', 'pd',
-        # Adicionar palavras-chave capitalizadas que podem ser confundidas com variáveis
-        'Model', 'Measurement', 'Structural', 'Latent', 'Observed', 'Regressions', 'Covariances',
-        # Palavras comuns de comentários
-        'modelo', 'relações', 'estruturais', 'apenas', 'usando', 'para'
+    '''Extrai nomes de variáveis observadas (indicadores) de uma string SEM,
+       pela especificação compilada (motor_sem.compilar_especificacao, em cache).'''
+    return set(compilar_especificacao(spec_string).observadas)
+
+def sem_model_columns(model_specs=None):
+    """Colunas observadas (nomes finais) usadas pelas especificações, para projetar só elas na carga."""
+    model_specs = sem_models if model_specs is None else model_specs
+    return sorted(set().union(*(compilar_especificacao(spec).observadas for spec in model_specs.values())))
+
+def prepare_sem_data(df_cleaned, cols_for_model, impute=True):
+    """
+    Monta a matriz numérica usada no ajuste SEM: codificação ordinal das
+    categóricas, conversão para float64, imputação pela média e remoção de
+    colunas constantes. Cada etapa é feita coluna a coluna, então preparar a
+    união das colunas de vários modelos e depois selecionar é equivalente.
+    Com impute=False os ausentes ficam como NaN (para o ajuste FIML).
+    """
+    # Criar subset de dados apenas com as colunas necessárias
+    data_for_model = df_cleaned[list(cols_for_model)].copy()
+    
+    # Pré-processar variáveis categóricas - mostrar estatísticas
+    categorical_cols = data_for_model.select_dtypes(include=['object', 'category']).columns
+    if len(categorical_cols) > 0:
+        print(f"\nVariáveis categóricas no modelo: {list(categorical_cols)}")
+        print("Convertendo variáveis categóricas para formatos numéricos...")
+        
+        for col in categorical_cols:
+            # Mostrar valores únicos para debug
+            unique_vals = data_for_model[col].dropna().unique()
+            print(f"  {col}: {len(unique_vals)} valores únicos - {unique_vals[:5]}...")
+            
+            # MELHORIA: Usar codificação ordinal mais robusta para variáveis categóricas
+            # Em vez de tentar converter para numérico diretamente (o que causa falhas),
+            # sempre usar codificação ordinal para variáveis categóricas
+            if len(unique_vals) > 0:  # Certifica-se que existe pelo menos um valor não-nulo
+                data_for_model[col] = data_for_model[col].astype(object)
+                values = data_for_model[col].dropna().unique()
+                value_map = {val: idx+1 for idx, val in enumerate(values)}
+                data_for_model[col] = data_for_model[col].map(value_map)
+                print(f"  {col}: Aplicada codificação ordinal - mapeamento: {value_map}")
+            else:
+                print(f"  {col}: Sem valores únicos não-nulos, preenchendo com 0.")
+                data_for_model[col] = 0
+    
+    # MELHORIA: Converter todas as colunas para numérico com tratamento mais robusto
+    for col in data_for_model.columns:
+        # Tentar converter para numérico, se falhar, preencher com valores ausentes
+        try:
+            data_for_model[col] = pd.to_numeric(data_for_model[col], errors='coerce').astype('float64')
+            # Preencher valores ausentes com a média da coluna ou 0 se não houver média
+            if impute and data_for_model[col].isna().any():
+                fill_value = data_for_model[col].mean()
+                if pd.isna(fill_value):
+                    fill_value = 0
+                data_for_model[col] = data_for_model[col].fillna(fill_value)
+        except Exception as e:
+            print(f"  Erro ao converter {col}: {e}")
+            data_for_model[col] = data_for_model[col].astype('float64').fillna(0)
+    
+    # Verificar distribuição das colunas numéricas para debug
+    for col in data_for_model.columns:
+        unique_vals = data_for_model[col].unique()
+        if len(unique_vals) < 10:  # Mostrar apenas para variáveis com poucos valores únicos
+            print(f"Distribuição de {col}: {data_for_model[col].value_counts().head(5)}")
+    
+    # MELHORIA: Não remover linhas com valores ausentes, em vez disso, imputar valores
+    orig_shape = data_for_model.shape
+    # Verificar se há valores ausentes após o tratamento
+    if impute and data_for_model.isna().any().any():
+        print("Ainda há valores ausentes após conversão, imputando com 0")
+        data_for_model = data_for_model.fillna(0)
+    
+    print(f"Shape após tratamento: {data_for_model.shape}")
+    
+    # Verificar se há variáveis com variância zero (constantes)
+    constant_cols = [col for col in data_for_model.columns if data_for_model[col].nunique(dropna=True) <= 1]
+    if constant_cols:
+        print(f"AVISO: Removendo colunas constantes: {constant_cols}")
+        data_for_model.drop(columns=constant_cols, inplace=True)
+    
+    return data_for_model
+
+def fit_sem_model(model_name, model_spec, data_for_model=None, moments=None, x0=None):
+    """
+    Ajusta um modelo SEM (semopy) sobre dados já preparados e retorna o
+    dicionário de resultados, ou None se não houver dados suficientes.
+    
+    Com moments (MomentosAmostrais) o ajuste usa apenas n e a covariância,
+    sem tocar nas linhas. Dados completos são reduzidos aos seus momentos e
+    ajustados da mesma forma, pelo motor nativo (partidas determinísticas);
+    'moments' e o modelo nativo ('native_model') são guardados e 'data' fica
+    None (só o FIML guarda as linhas). x0 (estimativas nativas de um ajuste anterior) faz um
+    reajuste com partida quente (SLSQP a partir de x0).
+    
+    Dados com ausentes (prepare_sem_data com impute=False) são ajustados por
+    FIML (fiml.ModeloFIML): as estimativas são carregadas no semopy com os
+    momentos saturados do EM e chi2, CFI, TLI e RMSEA vêm do FIML.
+    """
+    # Criar instância do modelo
+    sem_model = semopy.Model(model_spec)
+    
+    if moments is not None:
+        n_obs, n_vars = moments.n, len(moments.colunas)
+    else:
+        n_obs, n_vars = len(data_for_model), len(data_for_model.columns)
+    
+    # Verificar se há dados suficientes
+    if n_vars == 0 or n_obs < 10:  # MELHORIA: Ajustar limite para no mínimo 10 observações
+        print(f"ERRO: Dados insuficientes para ajustar o modelo ({n_obs} linhas, {n_vars} colunas).")
+        return None
+    
+    # Ajustar o modelo
+    use_fiml = moments is None and data_for_model.isna().any().any()
+    if use_fiml:
+        from fiml import ajustar_fiml
+        print(f"Ajustando modelo por FIML com {n_obs} observações e {n_vars} variáveis...")
+        native = ajustar_fiml(model_spec, data_for_model, x0=x0)
+        moments = native.momentos_saturados()
+        res = _load_native_estimates(sem_model, native.modelo, moments)
+    else:
+        if moments is None:
+            print(f"Ajustando modelo com {n_obs} observações e {n_vars} variáveis...")
+            # Sem ausentes a verossimilhança só depende de (n, covariância)
+            moments = calcular_momentos(data_for_model)
+        else:
+            print(f"Ajustando modelo a partir dos momentos de {n_obs} observações e {n_vars} variáveis...")
+        # O ótimo do semopy varia entre execuções e o cache o congelaria: o motor
+        # nativo (partidas determinísticas) ajusta e o resultado é carregado no semopy
+        native = ajustar_por_momentos(model_spec, moments, x0=x0, partidas='multiplas')
+        res = _load_native_estimates(sem_model, native, moments)
+    
+    # Calcular estatísticas do modelo
+    stats = semopy.calc_stats(sem_model)
+    
+    # Extrair params para tabela de resultados
+    params = sem_model.inspect()
+    if use_fiml:
+        from scipy.stats import chi2 as chi2_dist
+        # Estatísticas contra o saturado do FIML; erros pela informação observada, com os interceptos
+        indices = native.calc_indices()
+        for key in ('chi2', 'DoF', 'chi2 Baseline', 'DoF Baseline', 'CFI', 'TLI', 'RMSEA'):
+            stats.loc['Value', key] = indices[key]
+        stats.loc['Value', 'chi2 p-value'] = chi2_dist.sf(indices['chi2'], indices['DoF'])
+        # Verossimilhança do FIML, com os interceptos entre os parâmetros
+        log_lik = native.log_verossimilhanca()
+        stats.loc['Value', 'LogLik'] = log_lik
+        stats.loc['Value', 'AIC'] = 2 * native.n_parametros - 2 * log_lik
+        stats.loc['Value', 'BIC'] = native.n_parametros * np.log(n_obs) - 2 * log_lik
+        params = native.inspect()
+    
+    # Criar dicionário de resultados
+    results = {
+        'model': sem_model,
+        'fit_result': res,
+        'stats': stats,
+        'params': params,
+        'data': data_for_model if use_fiml else None,
+        'n_obs': n_obs,
+        'moments': moments,
+        'native_model': native
     }
     
-    # Filtrar keywords e variáveis vazias
-    observed_vars = {var for var in observed_vars if var.lower() not in sem_keywords}
+    # Exibir resumo dos resultados
+    print(f"\nResultados do modelo '{model_name}':")
+    print(f"Convergência: {res}")
+    
+    # Verificar como as estatísticas são retornadas (pode variar conforme a versão do semopy)
+    print("\nEstatísticas de ajuste:")
+    if hasattr(stats, 'Tbl'):
+        print(stats.Tbl)
+    else:
+        print(stats)  # Assumindo que stats é um DataFrame em versões mais recentes
     
-    # Imprimir as variáveis encontradas para diagnóstico
-    print(f"DEBUG: Variáveis extraídas: {observed_vars}")
+    # Resumo dos parâmetros
+    print("\nResumo dos parâmetros estimados:")
+    if not params.empty:
+        display_cols = ['lval', 'op', 'rval', 'Estimate']
+        if all(col in params.columns for col in display_cols):
+            print(params[display_cols].head(10))
+            if len(params) > 10:
+                print(f"... e mais {len(params) - 10} parâmetros.")
+        else:
+            print("Formato de parâmetros inesperado, exibindo colunas disponíveis:")
+            print(params.head(10))
+    else:
+        print("Nenhum parâmetro estimado retornado.")
     
-    return observed_vars
+    return results
 
-def run_sem_model(df_cleaned, model_name, model_spec):
+def _load_native_estimates(sem_model, native, moments):
+    """
+    Carrega no semopy.Model as estimativas do motor nativo (motor_sem), casando
+    os parâmetros pela posição nas matrizes; devolve o resultado do ajuste.
+    """
+    sem_model.load(cov=moments.cov, n_samples=moments.n, clean_slate=True)
+    native_matrices = native._preencher(native.param_vals)
+    matrix_names = {id(sem_model.mx_beta): 'beta', id(sem_model.mx_lambda): 'lambda',
+                    id(sem_model.mx_psi): 'psi', id(sem_model.mx_theta): 'theta'}
+    x = np.array([native_matrices[matrix_names[id(param.locations[0].matrix)]][param.locations[0].indices]
+                  for param in sem_model.parameters.values() if param.active])
+    sem_model.param_vals = x
+    sem_model.update_matrices(x)
+    fit = native.last_result
+    sem_model.last_result = ResultadoAjuste(x, fit.fun, fit.success, fit.n_it, fit.message, fit.name_obj)
+    return sem_model.last_result
+
+def run_sem_model(df_cleaned, model_name, model_spec, missing='mean'):
     """
     Executa um modelo SEM específico e retorna os resultados.
     
@@ -429,6 +812,8 @@ def run_sem_model(df_cleaned, model_name, model_spec):
         df_cleaned: DataFrame com dados limpos
         model_name: Nome do modelo para fins de log
         model_spec: Especificação do modelo em formato semopy
+        missing: 'mean' (imputação pela média) ou 'fiml' (máxima verossimilhança
+            com informação completa, por padrão de ausência)
         
     Returns:
         Dicionário com resultados do modelo ou None se falhar
@@ -438,11 +823,8 @@ def run_sem_model(df_cleaned, model_name, model_spec):
     print(f"{'='*80}")
     
     try:
-        # Criar instância do modelo
-        sem_model = semopy.Model(model_spec)
-        
         # Extrair variáveis necessárias
-        cols_for_model = extract_vars_from_sem_spec(model_spec)
+        cols_for_model = compilar_especificacao(model_spec).observadas
         print(f"Variáveis necessárias para o modelo: {sorted(list(cols_for_model))}")
         
         # Verificar se todas as colunas estão disponíveis
@@ -451,118 +833,14 @@ def run_sem_model(df_cleaned, model_name, model_spec):
             print(f"ERRO: Colunas ausentes no DataFrame: {missing_cols}")
             return None
         
-        # Criar subset de dados apenas com as colunas necessárias
-        data_for_model = df_cleaned[list(cols_for_model)].copy()
-        
-        # Pré-processar variáveis categóricas - mostrar estatísticas
-        categorical_cols = data_for_model.select_dtypes(include=['object']).columns
-        if len(categorical_cols) > 0:
-            print(f"\nVariáveis categóricas no modelo: {list(categorical_cols)}")
-            print("Convertendo variáveis categóricas para formatos numéricos...")
-            
-            for col in categorical_cols:
-                # Mostrar valores únicos para debug
-                unique_vals = data_for_model[col].dropna().unique()
-                print(f"  {col}: {len(unique_vals)} valores únicos - {unique_vals[:5]}...")
-                
-                # MELHORIA: Usar codificação ordinal mais robusta para variáveis categóricas
-                # Em vez de tentar converter para numérico diretamente (o que causa falhas),
-                # sempre usar codificação ordinal para variáveis categóricas
-                if len(unique_vals) > 0:  # Certifica-se que existe pelo menos um valor não-nulo
-                    values = data_for_model[col].dropna().unique()
-                    value_map = {val: idx+1 for idx, val in enumerate(values)}
-                    data_for_model[col] = data_for_model[col].map(value_map)
-                    print(f"  {col}: Aplicada codificação ordinal - mapeamento: {value_map}")
-                else:
-                    print(f"  {col}: Sem valores únicos não-nulos, preenchendo com 0.")
-                    data_for_model[col] = 0
-        
-        # MELHORIA: Converter todas as colunas para numérico com tratamento mais robusto
-        for col in data_for_model.columns:
-            # Tentar converter para numérico, se falhar, preencher com valores ausentes
-            try:
-                data_for_model[col] = pd.to_numeric(data_for_model[col], errors='coerce')
-                # Preencher valores ausentes com a média da coluna ou 0 se não houver média
-                if data_for_model[col].isna().any():
-                    fill_value = data_for_model[col].mean()
-                    if pd.isna(fill_value):
-                        fill_value = 0
-                    data_for_model[col] = data_for_model[col].fillna(fill_value)
-            except Exception as e:
-                print(f"  Erro ao converter {col}: {e}")
-                data_for_model[col] = data_for_model[col].astype('float64').fillna(0)
-        
-        # Verificar distribuição das colunas numéricas para debug
-        for col in data_for_model.columns:
-            unique_vals = data_for_model[col].unique()
-            if len(unique_vals) < 10:  # Mostrar apenas para variáveis com poucos valores únicos
-                print(f"Distribuição de {col}: {data_for_model[col].value_counts().head(5)}")
-        
-        # MELHORIA: Não remover linhas com valores ausentes, em vez disso, imputar valores
-        orig_shape = data_for_model.shape
-        # Verificar se há valores ausentes após o tratamento
-        if data_for_model.isna().any().any():
-            print("Ainda há valores ausentes após conversão, imputando com 0")
-            data_for_model = data_for_model.fillna(0)
-        
-        print(f"Shape após tratamento: {data_for_model.shape}")
-        
-        # Verificar se há variáveis com variância zero (constantes)
-        constant_cols = [col for col in data_for_model.columns if data_for_model[col].nunique(dropna=False) <= 1]
-        if constant_cols:
-            print(f"AVISO: Removendo colunas constantes: {constant_cols}")
-            data_for_model.drop(columns=constant_cols, inplace=True)
-        
-        # Verificar se há dados suficientes
-        if data_for_model.empty or len(data_for_model) < 10:  # MELHORIA: Ajustar limite para no mínimo 10 observações
-            print(f"ERRO: Dados insuficientes para ajustar o modelo ({len(data_for_model)} linhas, {len(data_for_model.columns)} colunas).")
-            return None
-        
-        # Ajustar o modelo
-        print(f"Ajustando modelo com {len(data_for_model)} observações e {len(data_for_model.columns)} variáveis...")
-        res = sem_model.fit(data_for_model, clean_slate=True)
-        
-        # Calcular estatísticas do modelo
-        stats = semopy.calc_stats(sem_model)
-        
-        # Extrair params para tabela de resultados
-        params = sem_model.inspect()
-        
-        # Criar dicionário de resultados
-        results = {
-            'model': sem_model,
-            'fit_result': res,
-            'stats': stats,
-            'params': params,
-            'data': data_for_model,
-            'n_obs': len(data_for_model)
-        }
-        
-        # Exibir resumo dos resultados
-        print(f"\nResultados do modelo '{model_name}':")
-        print(f"Convergência: {res}")
-        
-        # Verificar como as estatísticas são retornadas (pode variar conforme a versão do semopy)
-        print("\nEstatísticas de ajuste:")
-        if hasattr(stats, 'Tbl'):
-            print(stats.Tbl)
-        else:
-            print(stats)  # Assumindo que stats é um DataFrame em versões mais recentes
-        
-        # Resumo dos parâmetros
-        print("\nResumo dos parâmetros estimados:")
-        if not params.empty:
-            display_cols = ['lval', 'op', 'rval', 'Estimate']
-            if all(col in params.columns for col in display_cols):
-                print(params[display_cols].head(10))
-                if len(params) > 10:
-                    print(f"... e mais {len(params) - 10} parâmetros.")
-            else:
-                print("Formato de parâmetros inesperado, exibindo colunas disponíveis:")
-                print(params.head(10))
-        else:
-            print("Nenhum parâmetro estimado retornado.")
-        
+        data_for_model = prepare_sem_data(df_cleaned, cols_for_model, impute=missing != 'fiml')
+        key = _sem_cache_key(model_spec, data_for_model)
+        cached = _cached_sem_result(model_name, model_spec, data_for_model, key)
+        if cached is not None:
+            return cached
+        results = fit_sem_model(model_name, model_spec, data_for_model)
+        if results is not None:
+            _store_sem_result(key, results)
         return results
         
     except Exception as e:
@@ -571,26 +849,485 @@ def run_sem_model(df_cleaned, model_name, model_spec):
         traceback.print_exc()
         return None
 
-def run_all_sem_models(df_cleaned):
+def _sem_cache_key(model_spec, data_for_model):
+    """
+    Chave do ajuste no cache de resultados: conteúdo dos dados preparados
+    (os ausentes decidem entre ML e FIML), especificação compilada, versões do
+    semopy e do scipy (otimizador do motor nativo) e código do ajuste.
+    """
+    import scipy
+    import fiml
+    import momentos_amostrais
+    import motor_sem
+    parameters = {'spec': compilar_especificacao(model_spec).chave, 'semopy': semopy.__version__,
+                  'scipy': scipy.__version__}
+    return chave_resultado('sem', data_for_model, parameters,
+                           codigo=(fit_sem_model, _load_native_estimates, motor_sem, momentos_amostrais, fiml))
+
+def _cached_sem_result(model_name, model_spec, data_for_model, key):
+    """Resultado de fit_sem_model recuperado do cache (modelo reconstruído sem reotimizar), ou None."""
+    cached = ler_resultado(key)
+    if cached is None:
+        return None
+    fit = cached['fit']
+    fit_result = ResultadoAjuste(fit['x'], fit['fun'], fit['success'], fit['n_it'], fit['message'], fit['name_obj'])
+    fit_result.name_method = fit['name_method']
+    moments = MomentosAmostrais(**cached['moments']) if 'moments' in cached else None
+    print(f"🔁 Modelo '{model_name}' recuperado do cache de resultados")
+    results = {
+        'model': _restore_fitted_model(model_spec, data_for_model, fit_result, moments),
+        'fit_result': fit_result,
+        'stats': cached['stats'],
+        'params': cached['params'],
+        'data': data_for_model if data_for_model.isna().to_numpy().any() else None,
+        'n_obs': cached['n_obs']
+    }
+    if moments is not None:
+        results['moments'] = moments
+    if 'native_x' in cached:
+        # Modelo nativo nas estimativas guardadas, sobre os momentos (saturados, no FIML)
+        native = ModeloSEM(model_spec)
+        native.load(cov=moments.cov, n_samples=moments.n)
+        native.param_vals = cached['native_x']
+        native.last_result = ResultadoAjuste(cached['native_x'], fit_result.fun, fit_result.success, fit_result.n_it,
+                                             fit_result.message, fit_result.name_obj)
+        results['native_model'] = native
+    return results
+
+def _store_sem_result(key, results):
+    """Grava no cache o vetor de parâmetros, as estatísticas e a tabela de parâmetros de um ajuste."""
+    fit = results['fit_result']
+    payload = {
+        'fit': {'x': np.asarray(fit.x, dtype=np.float64), 'fun': float(fit.fun), 'success': bool(fit.success),
+                'n_it': None if fit.n_it is None else int(fit.n_it), 'message': str(fit.message),
+                'name_obj': str(fit.name_obj), 'name_method': str(fit.name_method)},
+        'stats': results['stats'],
+        'params': results['params'],
+        'n_obs': int(results['n_obs'])
+    }
+    moments = results.get('moments')
+    if moments is not None:
+        payload['moments'] = {'n': moments.n, 'media': moments.media, 'cov': moments.cov}
+    native = results.get('native_model')
+    if native is not None:
+        payload['native_x'] = np.asarray(getattr(native, 'modelo', native).param_vals, dtype=np.float64)
+    gravar_resultado(key, payload)
+
+def _fit_sem_model_worker(model_name, model_spec, columns, matrix_info):
+    """Tarefa do pool: lê a matriz preparada da memória compartilhada e ajusta um modelo."""
+    try:
+        matrix = anexar_matriz(matrix_info)
+        index = [matrix_info['columns'].index(col) for col in columns]
+        data_for_model = pd.DataFrame(matrix[:, index], columns=columns)
+        result = fit_sem_model(model_name, model_spec, data_for_model)
+        if result is not None:
+            # semopy.Model não é serializável e os dados ficam no processo principal:
+            # o modelo é reconstruído lá a partir de fit_result (vetor de parâmetros)
+            result['data'] = None
+            result.pop('model')
+        return result
+    except Exception as e:
+        print(f"ERRO ao executar modelo '{model_name}': {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def _restore_fitted_model(model_spec, data_for_model, fit_result, moments=None):
+    """
+    Recria um semopy.Model ajustado a partir do resultado do otimizador, sem
+    reotimizar (com moments, os momentos saturados de um ajuste FIML).
+    """
+    sem_model = semopy.Model(model_spec)
+    if moments is not None:
+        sem_model.load(cov=moments.cov, n_samples=moments.n, clean_slate=True)
+    else:
+        sem_model.load(data=data_for_model, clean_slate=True)
+    sem_model.param_vals = fit_result.x
+    sem_model.update_matrices(fit_result.x)
+    sem_model.last_result = fit_result
+    return sem_model
+
+def _attach_fit_indices(results):
+    """
+    Substitui nas tabelas 'stats' os índices do semopy pelos exatos de
+    estatisticas_ajuste (χ², CFI, TLI, RMSEA com intervalo de 90%, SRMR, AIC,
+    BIC e log-verossimilhança), calculados para todos os modelos numa única
+    passagem vetorizada. Em ajustes FIML, χ², CFI, TLI, RMSEA, AIC e BIC
+    continuam os do FIML; entram o SRMR (contra a covariância saturada do EM)
+    e o intervalo do RMSEA pelo χ² do FIML.
+    """
+    from estatisticas_ajuste import INDICES_EXATOS, indices_dos_modelos, intervalo_rmsea
+    
+    fitted = {name: result for name, result in results.items() if result}
+    if not fitted:
+        return results
+    table = indices_dos_modelos({name: result['model'] for name, result in fitted.items()})
+    for name, result in fitted.items():
+        stats = result['stats']
+        data = result.get('data')
+        if data is not None and data.isna().to_numpy().any():
+            lower, upper = intervalo_rmsea(stats.loc['Value', 'chi2'], stats.loc['Value', 'DoF'], result['n_obs'])
+            stats.loc['Value', 'RMSEA inf'] = lower[0]
+            stats.loc['Value', 'RMSEA sup'] = upper[0]
+            stats.loc['Value', 'SRMR'] = table.loc[name, 'SRMR']
+        else:
+            for key in INDICES_EXATOS:
+                stats.loc['Value', key] = table.loc[name, key]
+    return results
+
+def run_all_sem_models(df_cleaned, n_workers=1, use_moments=False, missing='mean'):
     """
     Executa todos os modelos SEM definidos e retorna os resultados.
     
     Args:
         df_cleaned: DataFrame com dados limpos
+        n_workers: Número de processos; 1 ajusta em sequência, None usa todos os núcleos.
+            Em modo paralelo a matriz numérica preparada é publicada uma vez em
+            memória compartilhada e cada worker ajusta um modelo sobre ela.
+        use_moments: Se True, prepara os dados e calcula (n, médias, covariância)
+            uma única vez e ajusta cada modelo só a partir dos momentos.
+            Ajustes com dados completos não carregam as linhas ('data' None).
+        missing: 'mean' (imputação pela média) ou 'fiml' (máxima verossimilhança
+            com informação completa; exige as linhas, então ignora use_moments)
         
     Returns:
         Dicionário com resultados de todos os modelos
     """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    
     results = {}
     
-    # Executar cada modelo individualmente
+    if use_moments and missing == 'fiml':
+        print("⚠️ FIML usa as linhas com ausentes: ajuste por momentos desativado")
+    elif use_moments:
+        return run_all_sem_models_from_moments(df_cleaned)
+    
+    if n_workers <= 1:
+        # Executar cada modelo individualmente
+        for model_name, model_spec in sem_models.items():
+            print(f"\nProcessando modelo: {model_name}")
+            model_result = run_sem_model(df_cleaned, model_name, model_spec, missing)
+            if model_result:
+                results[model_name] = model_result
+        return _attach_fit_indices(results)
+    
+    # Colunas de cada modelo; a preparação é feita uma vez sobre a união
+    model_columns = {}
     for model_name, model_spec in sem_models.items():
-        print(f"\nProcessando modelo: {model_name}")
-        model_result = run_sem_model(df_cleaned, model_name, model_spec)
-        if model_result:
-            results[model_name] = model_result
+        cols_for_model = compilar_especificacao(model_spec).observadas
+        missing_cols = [col for col in cols_for_model if col not in df_cleaned.columns]
+        if missing_cols:
+            print(f"ERRO: Colunas ausentes no DataFrame para '{model_name}': {missing_cols}")
+            continue
+        model_columns[model_name] = sorted(cols_for_model)
     
-    return results
+    if not model_columns:
+        return results
+    data_all = prepare_sem_data(df_cleaned, sorted(set().union(*model_columns.values())), impute=missing != 'fiml')
+    prepared_columns = list(data_all.columns)
+    
+    # Maiores modelos primeiro, para o tempo total ficar próximo do modelo mais lento
+    order = sorted(model_columns, key=lambda name: len(model_columns[name]), reverse=True)
+    n_procs = min(n_workers, len(order))
+    print(f"\nAjustando {len(order)} modelos SEM em paralelo com {n_procs} processos...")
+    
+    fitted = {}
+    with publicar_matriz(data_all.to_numpy(dtype=np.float64)) as matrix_info:
+        matrix_info['columns'] = prepared_columns
+        with ProcessPoolExecutor(max_workers=n_procs) as pool:
+            futures = {}
+            for model_name in order:
+                columns = [col for col in model_columns[model_name] if col in prepared_columns]
+                # Modelos já no cache de resultados não vão para o pool
+                key = _sem_cache_key(sem_models[model_name], data_all[columns])
+                cached = _cached_sem_result(model_name, sem_models[model_name], data_all[columns], key)
+                if cached is not None:
+                    fitted[model_name] = cached
+                    continue
+                futures[model_name] = (columns, key, pool.submit(_fit_sem_model_worker, model_name,
+                                                                sem_models[model_name], columns, matrix_info))
+            for model_name, (columns, key, future) in futures.items():
+                model_result = future.result()
+                if model_result:
+                    data_for_model = data_all[columns]
+                    model_result['data'] = data_for_model if data_for_model.isna().to_numpy().any() else None
+                    model_result['model'] = _restore_fitted_model(sem_models[model_name], data_for_model,
+                                                                  model_result['fit_result'],
+                                                                  model_result.get('moments'))
+                    _store_sem_result(key, model_result)
+                    fitted[model_name] = model_result
+    
+    # Mesma ordem do dicionário sem_models
+    for model_name in sem_models:
+        if model_name in fitted:
+            results[model_name] = fitted[model_name]
+    return _attach_fit_indices(results)
+
+def run_all_sem_models_from_moments(df_cleaned):
+    """
+    Ajusta todos os modelos a partir dos momentos amostrais: os dados brutos
+    são preparados e percorridos uma vez; cada modelo usa a subcovariância
+    das suas variáveis.
+    """
+    model_columns = {}
+    for model_name, model_spec in sem_models.items():
+        cols_for_model = compilar_especificacao(model_spec).observadas
+        missing_cols = [col for col in cols_for_model if col not in df_cleaned.columns]
+        if missing_cols:
+            print(f"ERRO: Colunas ausentes no DataFrame para '{model_name}': {missing_cols}")
+            continue
+        model_columns[model_name] = sorted(cols_for_model)
+    
+    results = {}
+    if not model_columns:
+        return results
+    data_all = prepare_sem_data(df_cleaned, sorted(set().union(*model_columns.values())))
+    moments = calcular_momentos(data_all)
+    print(f"\nMomentos calculados: {moments}")
+    
+    for model_name, columns in model_columns.items():
+        print(f"\n{'='*80}")
+        print(f"Executando modelo SEM (momentos): {model_name}")
+        print(f"{'='*80}")
+        try:
+            columns = [col for col in columns if col in moments.colunas]
+            model_result = fit_sem_model(model_name, sem_models[model_name], moments=moments.subconjunto(columns))
+            if model_result:
+                results[model_name] = model_result
+        except Exception as e:
+            print(f"ERRO ao executar modelo '{model_name}': {e}")
+            import traceback
+            traceback.print_exc()
+    return _attach_fit_indices(results)
+
+def run_bootstrap_models(df_cleaned, model_names=("Modelo Global",), n_replicas=1000, n_workers=1,
+                         seed=None, output_dir="resultados/tabelas"):
+    """
+    Intervalos de confiança bootstrap (percentil e BCa) para cargas, caminhos
+    e índices de ajuste dos modelos indicados; as tabelas vão para output_dir.
+    """
+    bootstrap_results = {}
+    for model_name in model_names:
+        model_spec = sem_models[model_name]
+        cols_for_model = compilar_especificacao(model_spec).observadas
+        missing_cols = [col for col in cols_for_model if col not in df_cleaned.columns]
+        if missing_cols:
+            print(f"ERRO: Colunas ausentes para o bootstrap de '{model_name}': {missing_cols}")
+            continue
+        print(f"\n--- Bootstrap: {model_name} ({n_replicas} réplicas) ---")
+        data_for_model = prepare_sem_data(df_cleaned, cols_for_model)
+        result = bootstrap_sem(model_spec, data_for_model, n_replicas=n_replicas, n_workers=n_workers, semente=seed)
+        print(result['parametros'].to_string())
+        print(result['indices'].to_string())
+        safe_name = model_name.replace(' ', '_')
+        result['parametros'].to_csv(os.path.join(output_dir, f"bootstrap_{safe_name}_parametros.csv"), index=False)
+        result['indices'].to_csv(os.path.join(output_dir, f"bootstrap_{safe_name}_indices.csv"))
+        bootstrap_results[model_name] = result
+    return bootstrap_results
+
+def run_multigroup_models(segments=("genero", "raca", "faixa_etaria", "renda", "escolaridade"), equal=("loadings",),
+                          n_workers=1, output_path="resultados/tabelas/multigrupo.csv"):
+    """
+    Ajuste multigrupo (cargas iguais entre grupos, por padrão) de todos os
+    modelos em cada segmento do Perfil Socioeconômico; resumo em output_path.
+    """
+    from base_respondentes import carregar_base_respondentes
+    from multigrupo import multigrupo_por_segmentos, tabela_multigrupo
+
+    print("\n--- SEM Multigrupo por Segmento ---")
+    base = carregar_base_respondentes(modo='codificado')
+    multigroup_results = multigrupo_por_segmentos(base, segmentos=segments, iguais=equal, n_workers=n_workers)
+    summary = tabela_multigrupo(multigroup_results)
+    print(summary.to_string())
+    summary.to_csv(output_path, index=False)
+    return multigroup_results
+
+def run_invariance_tests(model_name="Modelo Global", segments=("genero", "raca", "faixa_etaria", "renda", "escolaridade"),
+                         n_workers=1, output_dir="resultados/tabelas"):
+    """
+    Escada de invariância (configural, métrica, escalar, estrita) do modelo em
+    cada segmento, com busca de invariância parcial no primeiro nível que falhar.
+    """
+    from base_respondentes import carregar_base_respondentes
+    from invariancia import invariancia_por_segmento
+
+    print(f"\n--- Invariância de Medida: {model_name} ---")
+    base = carregar_base_respondentes(modo='codificado')
+    invariance_results = {}
+    for segment in segments:
+        try:
+            result = invariancia_por_segmento(base, model_name, segment, n_workers=n_workers)
+        except ValueError as e:
+            print(f"⚠️ {segment}: {e}")
+            continue
+        print(result['ajustes'].to_string())
+        print(result['comparacoes'].to_string())
+        safe_name = f"{model_name.replace(' ', '_')}_{segment}"
+        result['ajustes'].to_csv(os.path.join(output_dir, f"invariancia_{safe_name}_ajustes.csv"))
+        result['comparacoes'].to_csv(os.path.join(output_dir, f"invariancia_{safe_name}_comparacoes.csv"), index=False)
+        if result['parcial'] is not None:
+            result['parcial']['passos'].to_csv(os.path.join(output_dir, f"invariancia_{safe_name}_parcial.csv"),
+                                               index=False)
+        invariance_results[segment] = result
+    return invariance_results
+
+def run_ordinal_models(segments=("genero", "raca", "faixa_etaria", "renda", "escolaridade"), n_bootstrap=0,
+                       n_workers=1, seed=None, output_dir="resultados/tabelas"):
+    """
+    Ajuste WLSMV (itens ordinais, DWLS sobre as policóricas) de todos os
+    modelos na amostra inteira e nos grupos de cada segmento. A covariância
+    assintótica das policóricas é calculada uma vez por amostra/grupo (e fica
+    em cache); com n_bootstrap > 0 ela também pesa as réplicas do modelo global.
+    """
+    from base_respondentes import carregar_base_respondentes
+    from wlsmv import itens_dos_modelos, momentos_ordinais, tabela_wlsmv, wlsmv_por_segmento
+
+    print("\n--- SEM Ordinal (WLSMV) ---")
+    base = carregar_base_respondentes(modo='codificado')
+    ordinal_results = wlsmv_por_segmento(base)
+    for segment in segments:
+        try:
+            ordinal_results.update({(f"{segment}: {label}", model_name): model
+                                    for (label, model_name), model in wlsmv_por_segmento(base, segment).items()})
+        except KeyError as e:
+            print(f"⚠️ {segment}: {e}")
+    summary = tabela_wlsmv(ordinal_results)
+    print(summary.to_string())
+    summary.to_csv(os.path.join(output_dir, "wlsmv.csv"), index=False)
+
+    if n_bootstrap > 0:
+        model_name = "Modelo Global"
+        print(f"\n--- Bootstrap WLSMV: {model_name} ({n_bootstrap} réplicas) ---")
+        # Γ da união dos itens de todos os modelos, já em cache pelo ajuste acima
+        items, model_columns = itens_dos_modelos(base)
+        result = bootstrap_sem(sem_models[model_name], items[model_columns[model_name]], n_replicas=n_bootstrap,
+                               n_workers=n_workers, semente=seed, obj='DWLS', acov=momentos_ordinais(items).acov)
+        print(result['parametros'].to_string())
+        print(result['indices'].to_string())
+        result['parametros'].to_csv(os.path.join(output_dir, "bootstrap_wlsmv_Modelo_Global_parametros.csv"),
+                                    index=False)
+        result['indices'].to_csv(os.path.join(output_dir, "bootstrap_wlsmv_Modelo_Global_indices.csv"))
+        ordinal_results['bootstrap'] = result
+    return ordinal_results
+
+def run_modification_indices(results, top=20, output_dir="resultados/tabelas"):
+    """
+    Índices de modificação e EPC (motor_sem.ModeloSEM.indices_modificacao) de
+    cada modelo já ajustado, sem reajustar os candidatos. Usa o modelo nativo
+    do ajuste (no FIML, sobre os momentos saturados do EM); resultados sem ele
+    têm o ajuste nativo refeito a partir dos momentos guardados.
+    """
+    print("\n--- Índices de Modificação ---")
+    tables = {}
+    for model_name, result in results.items():
+        if not result:
+            continue
+        native = result.get('native_model')
+        if native is None:
+            native = ajustar_por_momentos(sem_models[model_name], result['moments'], partidas='multiplas')
+        native = getattr(native, 'modelo', native)
+        table = native.indices_modificacao()
+        tables[model_name] = table
+        print(f"\n{model_name}: {len(table)} candidatos, {int((table['p-value'] < 0.05).sum())} com p < 0,05")
+        print(table.head(top).to_string())
+        safe_name = model_name.replace(' ', '_')
+        table.to_csv(os.path.join(output_dir, f"indices_modificacao_{safe_name}.csv"), index=False)
+    return tables
+
+def run_specification_search(n_workers=1, output_dir="resultados/tabelas"):
+    """
+    Busca automática dos caminhos estruturais entre os sete construtos
+    (busca_especificacao): vizinhos podados por índices de modificação e
+    p-valores, ajustados em paralelo com partida quente e em cache pelo hash
+    da especificação canônica; grava todos os ajustes e a fronteira de Pareto.
+    """
+    from base_respondentes import carregar_base_respondentes
+    from busca_especificacao import busca_da_base
+
+    print("\n--- Busca de Especificação Estrutural ---")
+    search = busca_da_base(carregar_base_respondentes(modo='codificado'), n_workers=n_workers)
+    print("\nFronteira de Pareto (χ² × parâmetros livres):")
+    print(search['pareto'].to_string())
+    search['ajustes'].to_csv(os.path.join(output_dir, "busca_especificacao_ajustes.csv"), index=False)
+    search['pareto'].to_csv(os.path.join(output_dir, "busca_especificacao_pareto.csv"), index=False)
+    return search
+
+def run_pls_model(items='construtos', scheme='caminho', n_bootstrap=0, n_workers=1, seed=None,
+                  output_dir="resultados/tabelas"):
+    """
+    Modelo PLS-SEM dos sete construtos do diagrama (pls_sem): pesos, cargas,
+    caminhos e R²; com n_bootstrap > 0, erros padrão, t e intervalos percentis
+    por bootstrap em paralelo. items='tabelas' usa todos os indicadores
+    numéricos das tabelas temáticas.
+    """
+    from base_respondentes import carregar_base_respondentes
+    from pls_sem import pls_da_base
+
+    print(f"\n--- PLS-SEM: modelo de sete construtos ({items}, esquema {scheme}) ---")
+    pls = pls_da_base(carregar_base_respondentes(modo='codificado'), itens=items, esquema=scheme,
+                      n_bootstrap=n_bootstrap, n_workers=n_workers, semente=seed)
+    model = pls['modelo']
+    print(f"{model}: {model.n_iter} iterações, n = {model.n}")
+    print(pls['parametros'][pls['parametros']['tipo'] == 'caminho'].to_string())
+    print("\nR²:")
+    print(model.r2.to_string())
+    pls['parametros'].to_csv(os.path.join(output_dir, f"pls_{items}_parametros.csv"), index=False)
+    model.r2.rename('R2').to_csv(os.path.join(output_dir, f"pls_{items}_r2.csv"))
+    return pls
+
+def run_reliability(n_bootstrap=0, n_workers=1, seed=None, output_dir="resultados/tabelas"):
+    """
+    Confiabilidade e validade dos sete construtos (confiabilidade): α, α se o
+    item for excluído, ω, CR, AVE, HTMT e Fornell–Larcker a partir da
+    covariância dos itens; com n_bootstrap > 0, intervalos percentis pelos
+    pesos de reamostragem de bootstrap_sem. A matriz reamostrada é a dos itens
+    de itens_construtos, não a de prepare_sem_data: com a mesma semente, as
+    réplicas não são as mesmas de run_bootstrap_models.
+    """
+    from base_respondentes import carregar_base_respondentes
+    from confiabilidade import confiabilidade_da_base
+    
+    print("\n--- Confiabilidade e Validade dos Construtos ---")
+    reliability = confiabilidade_da_base(carregar_base_respondentes(modo='codificado'), n_bootstrap=n_bootstrap,
+                                         n_workers=n_workers, semente=seed)
+    print(reliability['construtos'].round(3).to_string())
+    print("\nHTMT:")
+    print(reliability['htmt'].round(3).to_string())
+    flagged = [(a, b) for i, a in enumerate(reliability['htmt'].index) for b in reliability['htmt'].columns[i + 1:]
+               if reliability['htmt'].loc[a, b] > 0.85]
+    if flagged:
+        print(f"⚠️ HTMT > 0,85 (validade discriminante): {', '.join(f'{a} × {b}' for a, b in flagged)}")
+    reliability['construtos'].to_csv(os.path.join(output_dir, "confiabilidade_construtos.csv"))
+    reliability['itens'].to_csv(os.path.join(output_dir, "confiabilidade_itens.csv"), index=False)
+    reliability['htmt'].to_csv(os.path.join(output_dir, "confiabilidade_htmt.csv"))
+    reliability['fornell_larcker'].to_csv(os.path.join(output_dir, "confiabilidade_fornell_larcker.csv"))
+    if 'medidas' in reliability:
+        reliability['medidas'].to_csv(os.path.join(output_dir, "confiabilidade_bootstrap.csv"), index=False)
+    return reliability
+
+def run_multiple_imputation(n_imputations=20, n_workers=1, seed=0, output_dir="resultados/tabelas"):
+    """
+    Imputação múltipla (equações encadeadas) das colunas Likert e categóricas,
+    com os modelos SEM, os logit e as ANOVAs por segmento rodados em cada cópia
+    e combinados pelas regras de Rubin (testes pela regra D2). As cópias ficam
+    em cache e são reutilizadas enquanto a base, m e a semente não mudarem.
+    """
+    from base_respondentes import carregar_base_respondentes
+    from imputacao_multipla import analisar_imputacoes, imputacoes_da_base
+
+    print(f"\n--- Imputação Múltipla ({n_imputations} cópias) ---")
+    base = carregar_base_respondentes(modo='codificado')
+    imputations = imputacoes_da_base(base, m=n_imputations, semente=seed, n_workers=n_workers)
+    print(imputations)
+    pooled = analisar_imputacoes(imputations, n_workers=n_workers)
+    for stage, table in pooled.items():
+        if table.empty:
+            print(f"⚠️ Imputação múltipla: estágio '{stage}' sem resultados em todas as cópias")
+            continue
+        print(table.to_string())
+        table.to_csv(os.path.join(output_dir, f"imputacao_multipla_{stage}.csv"), index=stage != 'testes')
+    return pooled
 
 def create_results_directory():
     """Cria diretório para salvar resultados se não existir"""
@@ -916,6 +1653,13 @@ def analyze_factors_by_sociodemographics(df, results, output_dir="resultados/fig
     # Extrair fatores latentes do modelo global
     global_model = results['Modelo Global']['model']
     global_data = results['Modelo Global']['data']
+    if global_data is None:
+        # Ajustes com dados completos guardam só os momentos: as linhas são preparadas de novo
+        global_data = prepare_sem_data(df, results['Modelo Global']['moments'].colunas)
+    if global_data.isna().any().any():
+        # Ajuste FIML: ausentes pela esperança condicional sob os momentos do EM antes dos scores
+        from fiml import imputar_condicional
+        global_data = imputar_condicional(global_data)
     
     try:
         # Estimar scores dos fatores latentes
@@ -1005,6 +1749,47 @@ def analyze_factors_by_sociodemographics(df, results, output_dir="resultados/fig
         traceback.print_exc() 
 
 # Adicionar função para análise Mixed Logit
+def _fit_logit(y, X, name):
+    """
+    Ajusta sm.Logit(y, X); com separação perfeita ou falha do ajuste normal,
+    usa o ajuste regularizado (L1). Coeficientes do ajuste normal ficam no
+    cache de resultados e, num acerto, o resultado é reconstruído nesses
+    coeficientes sem iterar (erros-padrão e resumo recalculados).
+    """
+    import warnings
+    import statsmodels
+    import statsmodels.api as sm
+    from statsmodels.tools.sm_exceptions import PerfectSeparationError
+    
+    model = sm.Logit(y, X)
+    # A chave cobre o código do ajuste e a versão do statsmodels (otimizador do Logit)
+    parameters = {'y': str(y.name), 'statsmodels': statsmodels.__version__}
+    key = chave_resultado('logit', X.assign(__y__=y), parameters, codigo=(_fit_logit, sm.Logit))
+    cached = ler_resultado(key)
+    if cached is not None:
+        print(f"🔁 Logit '{name}' recuperado do cache de resultados")
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            result = model.fit(start_params=cached['params'], method='newton', maxiter=0, disp=0)
+        result.mle_retvals['converged'] = cached['converged']
+        result.mle_retvals['iterations'] = cached['iterations']
+        return result
+    
+    try:
+        # Primeiro tentar ajuste normal
+        result = model.fit(disp=0, maxiter=100)
+    except PerfectSeparationError:
+        print(f"Perfeita separação detectada para {name}, usando ajuste regularizado (L1)")
+        return model.fit_regularized(method='l1', alpha=0.01, disp=0, maxiter=100)
+    except Exception:
+        print(f"Erro no ajuste normal para {name}, usando ajuste regularizado (L1)")
+        return model.fit_regularized(method='l1', alpha=0.01, disp=0, maxiter=100)
+    
+    gravar_resultado(key, {'params': np.asarray(result.params, dtype=np.float64),
+                           'converged': bool(result.mle_retvals['converged']),
+                           'iterations': int(result.mle_retvals['iterations'])})
+    return result
+
 def run_mixed_logit_analysis(df_cleaned, output_dir="resultados/tabelas"):
     """
     Executa análise Mixed Logit para modelar a escolha de transporte e
@@ -1012,7 +1797,7 @@ def run_mixed_logit_analysis(df_cleaned, output_dir="resultados/tabelas"):
     
     Args:
         df_cleaned: DataFrame com dados limpos
-        output_dir: Diretório para salvar os resultados
+        output_dir: Diretório para salvar os resultados (None = não grava, ex.: cópias da imputação múltipla)
     """
     print("\n--- Executando Análise Mixed Logit ---")
     
@@ -1036,7 +1821,13 @@ def run_mixed_logit_analysis(df_cleaned, output_dir="resultados/tabelas"):
         # MELHORIA: Tratamento mais robusto para variáveis categóricas
         for col in ['util_frequencia_uso_tp', 'renda_faixa', 'idade_faixa', 'genero']:
             if col in df_analysis.columns:
-                if df_analysis[col].dtype == 'object':
+                if isinstance(df_analysis[col].dtype, pd.CategoricalDtype):
+                    # Categorias fixas (ex.: cópias imputadas): mesma codificação em todas as cópias
+                    df_analysis[col + '_coded'] = df_analysis[col].cat.codes.where(df_analysis[col].notna())
+                    formula_diario = formula_diario.replace(col, col + '_coded')
+                    formula_mensal = formula_mensal.replace(col, col + '_coded')
+                    formula_km = formula_km.replace(col, col + '_coded')
+                elif df_analysis[col].dtype == 'object':
                     # Substituir NaN por categoria "Desconhecido"
                     df_analysis[col] = df_analysis[col].fillna('Desconhecido')
                     
@@ -1170,8 +1961,6 @@ def run_mixed_logit_analysis(df_cleaned, output_dir="resultados/tabelas"):
                     # Continuar sem verificação VIF
                 
                 # Ajustar modelo logit com tratamento para singularidade
-                from statsmodels.tools.sm_exceptions import PerfectSeparationError
-                
                 try:
                     # Preparar dados para modelagem
                     y = data_subset[bin_var]
@@ -1181,19 +1970,7 @@ def run_mixed_logit_analysis(df_cleaned, output_dir="resultados/tabelas"):
                     if 'const' not in X.columns:
                         X = add_constant(X)
                     
-                    # Usar fit_regularized para lidar com separação perfeita
-                    import statsmodels.api as sm
-                    model = sm.Logit(y, X)
-                    
-                    try:
-                        # Primeiro tentar ajuste normal
-                        result = model.fit(disp=0, maxiter=100)
-                    except PerfectSeparationError:
-                        print(f"Perfeita separação detectada para {name}, usando ajuste regularizado (L1)")
-                        result = model.fit_regularized(method='l1', alpha=0.01, disp=0, maxiter=100)
-                    except Exception:
-                        print(f"Erro no ajuste normal para {name}, usando ajuste regularizado (L1)")
-                        result = model.fit_regularized(method='l1', alpha=0.01, disp=0, maxiter=100)
+                    result = _fit_logit(y, X, name)
                     
                     # Armazenar resultado
                     results[name] = result
@@ -1212,6 +1989,8 @@ def run_mixed_logit_analysis(df_cleaned, output_dir="resultados/tabelas"):
                 traceback.print_exc()
         
         # Salvar resultados
+        if results and output_dir is None:
+            return results
         if results:
             output_path = os.path.join(output_dir, "resultados_mixed_logit.txt")
             with open(output_path, 'w', encoding='utf-8') as f:
@@ -1369,12 +2148,13 @@ if __name__ == '__main__':
     print("DEBUG: Dentro do bloco if __name__ == '__main__'") # DEBUG PRINT 4
     print("Iniciando script de análise de transporte...")
     
-    # 1. Carregamento dos dados
-    df_raw = load_data()
+    # 1. Carregamento dos dados (--stream: ingestão em blocos para arquivos grandes)
+    streaming = '--stream' in sys.argv
+    df_raw = None if streaming else load_data()
     
-    if df_raw is not None:
+    if streaming or df_raw is not None:
         # 2. Limpeza e preparação
-        df_cleaned = clean_data(df_raw.copy())
+        df_cleaned = load_data_streaming() if streaming else clean_data(df_raw.copy())
         
         if df_cleaned is not None:
             print("\nInformações do DataFrame limpo (primeiras linhas e tipos):")
@@ -1387,14 +2167,54 @@ if __name__ == '__main__':
             # 3. Executar modelos SEM individualmente
             try:
                 print("\n--- Executando Modelos SEM Individualmente ---")
-                results = {}
+                # SEM_WORKERS > 1 ajusta os modelos em paralelo (0 = todos os núcleos);
+                # SEM_MOMENTS=1 ajusta a partir da covariância amostral, sem reler as linhas
+                sem_workers = int(os.environ.get('SEM_WORKERS', '1'))
+                use_moments = os.environ.get('SEM_MOMENTS', '0') == '1'
+                # SEM_MISSING=fiml: ausentes por FIML (padrões de ausência) em vez da imputação pela média
+                sem_missing = os.environ.get('SEM_MISSING', 'mean')
+                results = run_all_sem_models(df_cleaned, n_workers=sem_workers or None, use_moments=use_moments,
+                                             missing=sem_missing)
+                
+                # SEM_BOOTSTRAP=N: intervalos bootstrap (N réplicas) para o modelo global
+                n_bootstrap = int(os.environ.get('SEM_BOOTSTRAP', '0'))
+                if n_bootstrap > 0:
+                    run_bootstrap_models(df_cleaned, n_replicas=n_bootstrap, n_workers=sem_workers or None)
+                
+                # SEM_MULTIGROUP=1: ajustes multigrupo por gênero, raça, idade, renda e escolaridade
+                if os.environ.get('SEM_MULTIGROUP', '0') == '1':
+                    run_multigroup_models(n_workers=sem_workers or None)
+                
+                # SEM_INVARIANCE=1: escada de invariância do modelo global por segmento
+                if os.environ.get('SEM_INVARIANCE', '0') == '1':
+                    run_invariance_tests(n_workers=sem_workers or None)
+                
+                # SEM_ORDINAL=1: ajustes WLSMV (itens ordinais); o bootstrap usa as réplicas de SEM_BOOTSTRAP
+                if os.environ.get('SEM_ORDINAL', '0') == '1':
+                    run_ordinal_models(n_bootstrap=n_bootstrap, n_workers=sem_workers or None)
+                
+                # SEM_IMPUTATIONS=m: SEM, logit e testes por segmento em m cópias imputadas (regras de Rubin)
+                n_imputations = int(os.environ.get('SEM_IMPUTATIONS', '0'))
+                if n_imputations > 0:
+                    run_multiple_imputation(n_imputations, n_workers=sem_workers or None)
+                
+                # SEM_MODINDICES=N: índices de modificação e EPC de cada modelo (N maiores impressos)
+                n_modindices = int(os.environ.get('SEM_MODINDICES', '0'))
+                if n_modindices > 0:
+                    run_modification_indices(results, top=n_modindices)
+                
+                # SEM_SEARCH=1: busca de caminhos estruturais entre os sete construtos (fronteira de Pareto)
+                if os.environ.get('SEM_SEARCH', '0') == '1':
+                    run_specification_search(n_workers=sem_workers or None)
+                
+                # SEM_PLS=construtos|tabelas: PLS-SEM dos sete construtos (bootstrap com as réplicas de SEM_BOOTSTRAP)
+                pls_items = os.environ.get('SEM_PLS', '')
+                if pls_items:
+                    run_pls_model(pls_items, n_bootstrap=n_bootstrap, n_workers=sem_workers or None)
                 
-                # Lista de modelos para testar - agora incluindo todos os modelos definidos
-                for model_name, model_spec in sem_models.items():
-                    print(f"\nProcessando modelo: {model_name}")
-                    model_result = run_sem_model(df_cleaned, model_name, model_spec)
-                    if model_result:
-                        results[model_name] = model_result
+                # SEM_RELIABILITY=1: α, ω, CR, AVE, HTMT e Fornell–Larcker (bootstrap com as réplicas de SEM_BOOTSTRAP)
+                if os.environ.get('SEM_RELIABILITY', '0') == '1':
+                    run_reliability(n_bootstrap=n_bootstrap, n_workers=sem_workers or None)
                 
                 # 4. Executar análise Mixed Logit
                 mixed_logit_results = run_mixed_logit_analysis(df_cleaned)
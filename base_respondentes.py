@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BASE DE RESPONDENTES INDEXADA POR ID
+====================================
+
+Ordena e indexa as tabelas temáticas por ID uma única vez e serve
+qualquer subconjunto de construtos como views das colunas, sem merges:
+- Os IDs de todas as tabelas formam um índice único ordenado
+- Tabelas já alinhadas a esse índice têm as colunas guardadas sem cópia
+- Tabelas com IDs faltantes são espalhadas uma vez (NaN nos ausentes)
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache_dados import ARQUIVOS_TEMATICOS, DIRETORIO_DADOS, carregar_tabela, hash_tabela
+
+COLUNA_ID = 'ID'
+
+# Memo em processo: (arquivos, modo, hashes) -> BaseRespondentes
+_bases_abertas = {}
+
+
+def _alinhar(valores, posicoes, n):
+    """Espalha os valores de uma tabela nas posições do índice global"""
+    if valores.dtype.kind in 'iub':
+        valores = valores.astype(np.float64)
+    alinhado = np.full(n, np.nan, dtype=valores.dtype if valores.dtype.kind in 'fc' else object)
+    alinhado[posicoes] = valores
+    return alinhado
+
+
+class BaseRespondentes:
+    """Tabelas temáticas alinhadas por ID, com acesso colunar sem cópia"""
+
+    def __init__(self, tabelas, coluna_id=COLUNA_ID):
+        """
+        Args:
+            tabelas: dict nome -> DataFrame com a coluna de ID
+            coluna_id: Nome da coluna identificadora
+        """
+        self.coluna_id = coluna_id
+        # Identifica o conteúdo da base (preenchida por carregar_base_respondentes)
+        self.assinatura = None
+        self.ids = np.unique(np.concatenate([np.asarray(df[coluna_id]) for df in tabelas.values()]))
+
+        self._colunas = {}
+        self._tabela_da_coluna = {}
+        self._colunas_da_tabela = {}
+        n = len(self.ids)
+
+        for nome, df in tabelas.items():
+            ids_tabela = np.asarray(df[coluna_id])
+            if pd.Index(ids_tabela).has_duplicates:
+                raise ValueError(f"IDs duplicados na tabela {nome}")
+
+            alinhada = len(ids_tabela) == n and np.array_equal(ids_tabela, self.ids)
+            if not alinhada:
+                ordem = np.argsort(ids_tabela, kind='stable')
+                posicoes = np.searchsorted(self.ids, ids_tabela[ordem])
+
+            colunas = []
+            for coluna in df.columns:
+                if coluna == coluna_id:
+                    continue
+                if coluna in self._tabela_da_coluna:
+                    raise ValueError(f"Coluna '{coluna}' presente em {self._tabela_da_coluna[coluna]} e {nome}")
+                valores = df[coluna].array if isinstance(df[coluna].dtype, pd.CategoricalDtype) \
+                    else df[coluna].to_numpy(copy=False)
+                if not alinhada:
+                    if isinstance(valores, pd.Categorical):
+                        codigos = np.full(n, -1, dtype=valores.codes.dtype)
+                        codigos[posicoes] = valores.codes[ordem]
+                        valores = pd.Categorical.from_codes(codigos, dtype=valores.dtype)
+                    else:
+                        valores = _alinhar(valores[ordem], posicoes, n)
+                self._colunas[coluna] = valores
+                self._tabela_da_coluna[coluna] = nome
+                colunas.append(coluna)
+            self._colunas_da_tabela[nome] = colunas
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def tabelas(self):
+        """Nomes das tabelas na ordem de registro"""
+        return list(self._colunas_da_tabela)
+
+    def colunas(self, tabelas=None):
+        """Colunas (sem o ID) de uma tabela, de várias ou de todas"""
+        if tabelas is None:
+            tabelas = self.tabelas
+        elif isinstance(tabelas, str):
+            tabelas = [tabelas]
+        return [coluna for nome in tabelas for coluna in self._colunas_da_tabela[nome]]
+
+    def tabela_da_coluna(self, coluna):
+        """Tabela de origem de uma coluna"""
+        return self._tabela_da_coluna[coluna]
+
+    def coluna(self, coluna):
+        """Array (view, sem cópia) de uma coluna alinhada ao índice de IDs"""
+        return self._colunas[coluna]
+
+    def quadro(self, tabelas=None, colunas=None, incluir_id=True):
+        """
+        DataFrame com um subconjunto de tabelas/colunas, montado sobre as views.
+
+        Args:
+            tabelas: Nome ou lista de tabelas (padrão: todas)
+            colunas: Lista explícita de colunas (tem precedência sobre tabelas)
+            incluir_id: Inclui a coluna de ID na primeira posição
+
+        Returns:
+            DataFrame com uma linha por respondente, na ordem dos IDs
+        """
+        if colunas is None:
+            colunas = self.colunas(tabelas)
+        dados = {self.coluna_id: self.ids} if incluir_id else {}
+        for coluna in colunas:
+            dados[coluna] = self._colunas[coluna]
+        return pd.DataFrame(dados, copy=False)
+
+    def posicoes(self, ids):
+        """Posições de IDs no índice (-1 para IDs desconhecidos)"""
+        ids = np.asarray(ids)
+        posicoes = np.searchsorted(self.ids, ids)
+        posicoes = np.minimum(posicoes, len(self.ids) - 1)
+        return np.where(self.ids[posicoes] == ids, posicoes, -1)
+
+
+def _concatenar_tabelas(partes):
+    """Empilha as linhas de uma tabela vinda de duas bases, preservando categorias"""
+    combinada = pd.concat(partes, ignore_index=True)
+    for coluna in combinada.columns:
+        series = [parte[coluna] for parte in partes if coluna in parte.columns]
+        if len(series) == len(partes) and all(isinstance(s.dtype, pd.CategoricalDtype) for s in series):
+            combinada[coluna] = pd.api.types.union_categoricals([s.array for s in series])
+    return combinada
+
+
+def anexar_onda(base, onda):
+    """
+    Base com os respondentes de uma nova onda acrescentados (IDs não podem se repetir).
+
+    Args:
+        base: BaseRespondentes das ondas anteriores
+        onda: BaseRespondentes da nova onda (mesmo modo de carregamento)
+
+    Returns:
+        Nova BaseRespondentes; a assinatura combina as das duas bases
+    """
+    repetidos = np.intersect1d(base.ids, onda.ids)
+    if len(repetidos):
+        raise ValueError(f"{len(repetidos)} IDs da onda já existem na base (ex.: {repetidos[:5].tolist()})")
+    tabelas = {}
+    for nome in dict.fromkeys(base.tabelas + onda.tabelas):
+        partes = [b.quadro(nome) for b in (base, onda) if nome in b.tabelas]
+        tabelas[nome] = _concatenar_tabelas(partes)
+    combinada = BaseRespondentes(tabelas, base.coluna_id)
+    combinada.assinatura = hashlib.blake2b(f'{base.assinatura}+{onda.assinatura}'.encode('utf-8'),
+                                           digest_size=16).hexdigest()
+    return combinada
+
+
+def carregar_base_respondentes(diretorio=DIRETORIO_DADOS, arquivos=None, modo='texto'):
+    """
+    Carrega as tabelas temáticas e devolve a base indexada por ID.
+    A base é compartilhada no processo enquanto os arquivos não mudarem.
+
+    Args:
+        diretorio: Diretório dos CSVs temáticos
+        arquivos: Lista de arquivos (padrão: as sete tabelas temáticas)
+        modo: Modo de carregamento do cache_dados ('texto' ou 'codificado')
+
+    Returns:
+        BaseRespondentes; as tabelas são nomeadas pelo arquivo sem extensão
+    """
+    caminhos = [os.path.join(diretorio, arquivo) for arquivo in arquivos or ARQUIVOS_TEMATICOS]
+    chave = (modo, tuple((c, hash_tabela(c)) for c in caminhos))
+    if chave not in _bases_abertas:
+        tabelas = {os.path.basename(c).replace('.csv', ''): carregar_tabela(c, modo=modo) for c in caminhos}
+        base = BaseRespondentes(tabelas)
+        # Assinatura pelo conteúdo e nome dos arquivos, sem o diretório: mover a pasta não muda a base
+        conteudo = (modo, tuple((os.path.basename(c), h) for c, h in chave[1]))
+        base.assinatura = hashlib.blake2b(repr(conteudo).encode('utf-8'), digest_size=16).hexdigest()
+        _bases_abertas[chave] = base
+    return _bases_abertas[chave]
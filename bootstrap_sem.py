@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BOOTSTRAP NÃO PARAMÉTRICO PARA MODELOS SEM
+==========================================
+
+Intervalos de confiança por reamostragem de respondentes para cargas,
+caminhos estruturais e índices de ajuste (CFI, RMSEA), adequados a dados
+Likert não normais:
+- Cada réplica é um vetor de pesos (contagens de np.bincount sobre índices
+  sorteados); a covariância da réplica sai da matriz publicada em memória
+  compartilhada, sem copiar DataFrames
+- Cada réplica tem seu próprio fluxo aleatório (SeedSequence.spawn), então
+  o resultado não depende do número de processos nem do tamanho dos blocos
+- Os reajustes partem da solução da amostra completa (Fisher scoring)
+- Intervalos percentil e BCa (aceleração pelo jackknife por grupos)
+- Com obj='DWLS' (itens ordinais, WLSMV) cada réplica recalcula só as
+  policóricas ponderadas; os pesos vêm da covariância assintótica da
+  amostra completa, calculada (ou lida do cache) uma única vez
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from memoria_compartilhada import anexar_matriz, publicar_matriz
+from motor_sem import ModeloSEM
+from policorica import codigos_ordinais, matriz_assintotica, matriz_policorica, policoricas_ponderadas
+
+INDICES_BOOTSTRAP = ('chi2', 'CFI', 'TLI', 'RMSEA')
+
+TIPOS_PARAMETRO = ('carga', 'caminho', 'variancia', 'covariancia')
+
+
+def tipo_parametro(modelo, local):
+    """Classifica um parâmetro do ModeloSEM: carga, caminho, variância ou covariância"""
+    if local['op'] == '~~':
+        return 'variancia' if local['lval'] == local['rval'] else 'covariancia'
+    if local['lval'] in modelo.efeitos['=~'].get(local['rval'], {}):
+        return 'carga'
+    return 'caminho'
+
+
+def pesos_bootstrap(semente, n):
+    """Pesos de frequência de uma réplica: contagens dos n índices sorteados pelo fluxo da semente"""
+    return np.bincount(np.random.default_rng(semente).integers(0, n, n), minlength=n).astype(np.float64)
+
+
+def _momentos_ponderados(x, pesos):
+    """Covariância (divisor n) da amostra com pesos de frequência"""
+    n = pesos.sum()
+    media = pesos @ x / n
+    centrado = x - media
+    return (centrado * pesos[:, None]).T @ centrado / n
+
+
+def _momentos_replica(x, pesos, ordinal):
+    """Covariância ponderada da réplica ou, no DWLS, sua matriz policórica (partida nos ρ da amostra)"""
+    if ordinal is None:
+        return _momentos_ponderados(x, pesos)
+    return policoricas_ponderadas(x, pesos, ordinal['rho'])
+
+
+def _ajustar_replica(modelo, S, n, x0, obj, ordinal=None):
+    """Estimativas e índices de uma réplica; NaN se nem a partida fria convergir"""
+    acov = None if ordinal is None else ordinal['acov']
+    try:
+        resultado = modelo.fit(cov=S, n_samples=n, obj=obj, x0=x0, metodo='fisher', acov=acov)
+        if not resultado.success:
+            resultado = modelo.fit(cov=S, n_samples=n, obj=obj, acov=acov)
+    except np.linalg.LinAlgError:
+        return None, None
+    if not resultado.success:
+        return None, None
+    indices = modelo.calc_indices()
+    return modelo.param_vals.copy(), [indices[i] for i in INDICES_BOOTSTRAP]
+
+
+def _replicas_bloco(descricao, info_matriz, x0, obj, ordinal, sementes):
+    """Tarefa do pool: ajusta as réplicas das sementes dadas"""
+    x = anexar_matriz(info_matriz)
+    n = x.shape[0]
+    modelo = ModeloSEM(descricao)
+    estimativas = np.full((len(sementes), len(x0)), np.nan)
+    indices = np.full((len(sementes), len(INDICES_BOOTSTRAP)), np.nan)
+    for r, semente in enumerate(sementes):
+        pesos = pesos_bootstrap(semente, n)
+        theta, valores = _ajustar_replica(modelo, _momentos_replica(x, pesos, ordinal), n, x0, obj, ordinal)
+        if theta is not None:
+            estimativas[r], indices[r] = theta, valores
+    return estimativas, indices
+
+
+def _jackknife_bloco(descricao, info_matriz, x0, obj, ordinal, grupos):
+    """Tarefa do pool: reajustes excluindo cada grupo de respondentes"""
+    x = anexar_matriz(info_matriz)
+    modelo = ModeloSEM(descricao)
+    estimativas = np.full((len(grupos), len(x0)), np.nan)
+    indices = np.full((len(grupos), len(INDICES_BOOTSTRAP)), np.nan)
+    for r, grupo in enumerate(grupos):
+        pesos = np.ones(x.shape[0])
+        pesos[grupo] = 0.0
+        theta, valores = _ajustar_replica(modelo, _momentos_replica(x, pesos, ordinal), int(pesos.sum()), x0, obj,
+                                          ordinal)
+        if theta is not None:
+            estimativas[r], indices[r] = theta, valores
+    return estimativas, indices
+
+
+def _executar(tarefa, descricao, info_matriz, x0, obj, ordinal, itens, n_workers, tamanho_bloco):
+    """Distribui itens (sementes ou grupos) em blocos, sequencialmente ou no pool"""
+    blocos = [itens[i:i + tamanho_bloco] for i in range(0, len(itens), tamanho_bloco)]
+    if n_workers <= 1 or len(blocos) <= 1:
+        partes = [tarefa(descricao, info_matriz, x0, obj, ordinal, bloco) for bloco in blocos]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(blocos))) as pool:
+            partes = list(pool.map(tarefa, *zip(*[(descricao, info_matriz, x0, obj, ordinal, b) for b in blocos])))
+    return np.vstack([p[0] for p in partes]), np.vstack([p[1] for p in partes])
+
+
+def intervalo_percentil(replicas, nivel=0.95):
+    """Limites percentis (colunas de replicas = estatísticas)"""
+    alfa = (1 - nivel) / 2
+    return np.nanquantile(replicas, [alfa, 1 - alfa], axis=0)
+
+
+def intervalo_bca(replicas, estimativa, jackknife, nivel=0.95):
+    """
+    Limites BCa: viés pela fração de réplicas abaixo da estimativa e
+    aceleração pela assimetria das estimativas jackknife.
+    """
+    alfa = (1 - nivel) / 2
+    limites = np.full((2, replicas.shape[1]), np.nan)
+    for j in range(replicas.shape[1]):
+        validas = replicas[~np.isnan(replicas[:, j]), j]
+        jack = jackknife[~np.isnan(jackknife[:, j]), j]
+        if len(validas) == 0 or np.ptp(validas) == 0:
+            continue
+        fracao = np.clip((validas < estimativa[j]).mean(), 1 / len(validas), 1 - 1 / len(validas))
+        z0 = norm.ppf(fracao)
+        desvio = jack.mean() - jack
+        denominador = 6 * (desvio ** 2).sum() ** 1.5
+        a = (desvio ** 3).sum() / denominador if denominador > 0 else 0.0
+        z = norm.ppf([alfa, 1 - alfa])
+        ajustado = norm.cdf(z0 + (z0 + z) / (1 - a * (z0 + z)))
+        limites[:, j] = np.quantile(validas, ajustado)
+    return limites
+
+
+def bootstrap_sem(descricao, dados, n_replicas=1000, n_workers=1, semente=None, obj='MLW', nivel=0.95,
+                  bca=True, grupos_jackknife=200, tamanho_bloco=100, tipos=('carga', 'caminho'), acov=None):
+    """
+    Bootstrap não paramétrico de uma especificação SEM.
+
+    Args:
+        descricao: Especificação lavaan/semopy
+        dados: DataFrame numérico já preparado (sem ausentes) com as observadas do modelo;
+            no DWLS, os itens ordinais (ausentes permitidos, exclusão por par)
+        n_replicas: Número de réplicas
+        n_workers: Processos (1 = sequencial, None = todos os núcleos)
+        semente: Semente da SeedSequence (None = aleatória)
+        obj: 'MLW', 'GLS' ou 'DWLS'
+        nivel: Nível de confiança dos intervalos
+        bca: Calcula também os intervalos BCa (exige o jackknife)
+        grupos_jackknife: Grupos do jackknife por exclusão de grupos (n = jackknife completo)
+        tamanho_bloco: Réplicas por tarefa do pool
+        tipos: Tipos de parâmetro na tabela (ver TIPOS_PARAMETRO)
+        acov: No DWLS, covariância assintótica já calculada (ex.: MomentosOrdinais.acov
+            da base inteira); padrão: matriz_assintotica dos itens do modelo (em cache)
+
+    Returns:
+        dict com 'parametros' e 'indices' (DataFrames com estimativa, erro padrão
+        bootstrap e limites percentil/BCa), 'replicas' (matriz réplicas × parâmetros
+        livres) e 'n_falhas'
+    """
+    modelo = ModeloSEM(descricao)
+    observadas = modelo.vars['observed']
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    ordinal = None
+    if obj == 'DWLS':
+        itens = dados[observadas]
+        x = codigos_ordinais(itens)
+        n = x.shape[0]
+        correlacao = matriz_policorica(itens)
+        modelo.fit(cov=correlacao, n_samples=n, obj=obj, acov=matriz_assintotica(itens) if acov is None else acov)
+        # Réplicas: Γ da amostra completa já na ordem dos momentos do modelo e ρ como partida
+        pares_i, pares_j = np.triu_indices(len(observadas), k=1)
+        ordinal = {'acov': modelo.mx_acov, 'rho': correlacao.loc[observadas, observadas].to_numpy()[pares_i, pares_j]}
+    else:
+        x = np.ascontiguousarray(dados[observadas].to_numpy(dtype=np.float64))
+        if np.isnan(x).any():
+            raise ValueError("O bootstrap exige dados sem ausentes (use prepare_sem_data antes)")
+        n = x.shape[0]
+        modelo.fit(cov=_momentos_ponderados(x, np.ones(n)), n_samples=n, obj=obj)
+    x0 = modelo.param_vals.copy()
+    estimativa_indices = modelo.calc_indices()
+    print(f"🔁 Bootstrap: {n_replicas} réplicas, {len(x0)} parâmetros, {n} respondentes, {n_workers} processo(s)")
+
+    sementes = np.random.SeedSequence(semente).spawn(n_replicas)
+    with publicar_matriz(x) as info_matriz:
+        replicas, replicas_indices = _executar(_replicas_bloco, descricao, info_matriz, x0, obj, ordinal, sementes,
+                                               n_workers, tamanho_bloco)
+        if bca:
+            embaralhados = np.random.default_rng(sementes[0].spawn(1)[0]).permutation(n)
+            grupos = np.array_split(embaralhados, min(grupos_jackknife, n))
+            jack, jack_indices = _executar(_jackknife_bloco, descricao, info_matriz, x0, obj, ordinal, grupos,
+                                           n_workers, tamanho_bloco)
+    n_falhas = int(np.isnan(replicas[:, 0]).sum()) if len(x0) else 0
+    if n_falhas:
+        print(f"⚠️ {n_falhas} réplicas não convergiram e foram descartadas")
+
+    def tabela(valores, amostras, jackknife):
+        quadro = pd.DataFrame({'Estimate': valores, 'Boot SE': np.nanstd(amostras, axis=0, ddof=1)})
+        quadro[['Perc. inf', 'Perc. sup']] = intervalo_percentil(amostras, nivel).T
+        if bca:
+            quadro[['BCa inf', 'BCa sup']] = intervalo_bca(amostras, valores, jackknife, nivel).T
+        return quadro
+
+    # Uma linha por parâmetro livre (primeiro local de cada índice)
+    locais = {}
+    for local in modelo.parametros:
+        if local['indice'] is not None and local['indice'] not in locais:
+            locais[local['indice']] = local
+    ordem = [k for k, local in locais.items() if tipo_parametro(modelo, local) in tipos]
+    parametros = tabela(x0[ordem], replicas[:, ordem], jack[:, ordem] if bca else None)
+    parametros.insert(0, 'tipo', [tipo_parametro(modelo, locais[k]) for k in ordem])
+    parametros.insert(0, 'rval', [locais[k]['rval'] for k in ordem])
+    parametros.insert(0, 'op', [locais[k]['op'] for k in ordem])
+    parametros.insert(0, 'lval', [locais[k]['lval'] for k in ordem])
+
+    indices = tabela(np.array([estimativa_indices[i] for i in INDICES_BOOTSTRAP]), replicas_indices,
+                     jack_indices if bca else None)
+    indices.index = list(INDICES_BOOTSTRAP)
+    return {'parametros': parametros.reset_index(drop=True), 'indices': indices, 'replicas': replicas,
+            'n_falhas': n_falhas}
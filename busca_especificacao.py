@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BUSCA DE ESPECIFICAÇÃO ESTRUTURAL
+=================================
+
+Busca automática dos caminhos estruturais entre os sete construtos
+(Qualidade, Utilização, Percepção, Intenção, Aceitação, Experiência e
+Perfil), com o modelo de medida fixo e o espaço restrito a modelos
+recursivos (sem ciclos; Perfil só como preditor):
+- a partir do modelo global (CAMINHOS_INICIAIS), cada passo gera os vizinhos
+  dos modelos do feixe: acrescenta um caminho com índice de modificação
+  acima de mi_minimo ou remove um caminho não significativo (p > alfa);
+  os demais vizinhos nem chegam a ser ajustados
+- os vizinhos são ajustados em paralelo, com partida quente nas estimativas
+  do modelo de origem (caminhos novos partem de zero)
+- o feixe seguinte fica com os largura melhores vizinhos pelo critério
+  (BIC) entre os que melhoram o modelo de origem
+
+Cada ajuste é guardado (memória do processo e disco) pelo hash da
+especificação canônica (medida na ordem de CONSTRUTOS, regressões ordenadas)
+e dos momentos, de modo que um mesmo conjunto de caminhos alcançado por
+outro percurso, ou em outra execução, não é reajustado. O resultado traz
+todos os modelos ajustados e a fronteira de Pareto entre ajuste (χ²) e
+parcimônia (número de parâmetros livres).
+"""
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from analise_transporte_sem import resolve_column_mapping
+from cache_dados import DIRETORIO_CACHE
+from cache_resultados import versao_codigo
+from estatisticas_ajuste import indices_exatos
+from momentos_amostrais import calcular_momentos
+import motor_sem
+from motor_sem import ModeloSEM
+from ondas import matriz_da_onda
+
+# Modelo de medida de cada construto (nomes finais do pipeline SEM)
+CONSTRUTOS = {
+    'Qualidade': ['qual_preco_passagem', 'qual_espaco_disponivel', 'qual_seguranca', 'qual_confiabilidade_horarios'],
+    'Utilizacao': ['util_frequencia_uso_tp', 'util_qtd_passagens_dia', 'util_tempo_gasto_transporte'],
+    'Percepcao': ['percep_gostaria_pontos_creditos', 'percep_gostaria_cashback_km',
+                  'percep_gostaria_desconto_fora_pico'],
+    'Intencao': ['intencao_usaria_mais_com_pontos', 'intencao_usaria_mais_cashback_km',
+                 'intencao_usaria_mais_desconto_fora_pico'],
+    'Aceitacao': ['aceit_participar_10_pontos', 'aceit_receber_50cent_km', 'aceit_desconto_1real_fora_pico'],
+    'Experiencia': ['exp_satisfeito_servico', 'exp_corresponde_expectativas', 'exp_necessidades_atendidas'],
+    'Perfil': ['renda_faixa', 'escolaridade', 'idade_faixa'],
+}
+
+# Itens categóricos com ordem natural: (padrão do rótulo, escore); o primeiro padrão que casar vale
+ESCORES_ORDINAIS = {
+    # Usos por semana
+    'util_frequencia_uso_tp': [(r'n[aã]o utilizo', 0.0), (r'menos de uma', 0.5), (r'uma ou duas', 1.5),
+                               (r'uma vez', 1.0), (r'duas vezes', 2.0), (r'tr[eê]s a quatro', 3.5),
+                               (r'cinco ou mais', 5.5)],
+    'util_qtd_passagens_dia': [(r'n[aã]o utilizo', 0.0), (r'^uma', 1.0), (r'^duas', 2.0), (r'^tr[eê]s', 3.0),
+                               (r'^quatro', 4.0)],
+    # Horas por dia
+    'util_tempo_gasto_transporte': [(r'^at[eé] 30', 0.25), (r'30 minutos e 1 hora', 0.75), (r'1 hora e 2', 1.5),
+                                    (r'2 horas e 3', 2.5), (r'3 horas e 4', 3.5), (r'mais de 4', 4.5)],
+    'renda_faixa': [(r'n[aã]o possuo', 0.0), (r'^at[eé] 1 ', 1.0), (r'^de 1 a 2', 2.0), (r'^de 2 a 3', 3.0),
+                    (r'^de 3 a 5', 4.0), (r'^de 5 a 10', 5.0), (r'^acima de 10', 6.0)],
+    'escolaridade': [(r'^fundamental', 1.0), (r'^ensino m[eé]dio', 2.0), (r'^gradua', 3.0), (r'^p[oó]s', 4.0)],
+    'idade_faixa': [(r'^menor que 18', 1.0), (r'^18', 2.0), (r'^25', 3.0), (r'^50', 4.0), (r'^65', 5.0)],
+}
+
+# Caminhos (dependente, preditor) do model_spec_global de analise_transporte_sem
+CAMINHOS_INICIAIS = (('Experiencia', 'Qualidade'), ('Aceitacao', 'Percepcao'), ('Aceitacao', 'Experiencia'))
+
+# Construtos que não recebem caminhos
+EXOGENOS = ('Perfil',)
+
+INDICES_BUSCA = ['chi2', 'DoF', 'CFI', 'TLI', 'RMSEA', 'SRMR', 'AIC', 'BIC']
+
+DIRETORIO_BUSCA = os.path.join(DIRETORIO_CACHE, 'especificacoes')
+
+_VERSAO_CACHE = 3
+
+# Memo em processo: chave do ajuste -> resumo
+_ajustes_conhecidos = {}
+
+
+def _pontuar(valores, escores):
+    """Escores de uma coluna categórica (NaN onde nenhum padrão casa ou não há resposta)"""
+    rotulos = pd.Series(np.asarray(valores, dtype=object))
+    rotulos = rotulos.map(lambda v: re.sub(r'\s+', ' ', str(v).replace('\xa0', ' ')).strip().lower()
+                          if pd.notna(v) else '')
+    pontuados = {}
+    for rotulo in rotulos.unique():
+        pontuados[rotulo] = next((escore for padrao, escore in escores if re.search(padrao, rotulo)), np.nan)
+    return rotulos.map(pontuados).to_numpy(dtype=np.float64)
+
+
+def itens_construtos(base, construtos=None):
+    """
+    Itens dos construtos na base: Likert pela codificação de prepare_sem_data e
+    categóricas ordenadas pelos escores de ESCORES_ORDINAIS.
+
+    Returns:
+        DataFrame (NaN nos ausentes) pelos nomes finais
+    """
+    construtos = CONSTRUTOS if construtos is None else construtos
+    nomes_finais, _ = resolve_column_mapping(base.colunas())
+    por_nome = dict(zip(nomes_finais, base.colunas()))
+    itens = [i for indicadores in construtos.values() for i in indicadores]
+    faltantes = [i for i in itens if i not in por_nome]
+    if faltantes:
+        raise KeyError(f"Itens dos construtos sem coluna na base: {faltantes}")
+    likert = [i for i in itens if i not in ESCORES_ORDINAIS]
+    dados = pd.DataFrame(matriz_da_onda(base, {i: por_nome[i] for i in likert}, {}), columns=likert)
+    for item in itens:
+        if item in ESCORES_ORDINAIS:
+            dados[item] = _pontuar(base.coluna(por_nome[item]), ESCORES_ORDINAIS[item])
+    return dados[itens]
+
+
+def especificacao_canonica(caminhos, construtos=None):
+    """Especificação lavaan com a medida na ordem de construtos e as regressões ordenadas"""
+    construtos = CONSTRUTOS if construtos is None else construtos
+    linhas = [f"{lat} =~ {' + '.join(itens)}" for lat, itens in construtos.items()]
+    preditores = {}
+    for dep, pred in caminhos:
+        preditores.setdefault(dep, []).append(pred)
+    linhas += [f"{dep} ~ {' + '.join(sorted(preditores[dep]))}" for dep in sorted(preditores)]
+    return '\n'.join(linhas)
+
+
+def _texto_caminhos(caminhos):
+    return '; '.join(f"{dep} ~ {pred}" for dep, pred in sorted(caminhos))
+
+
+def _chave_ajuste(descricao, momentos):
+    """Hash da especificação canônica, dos momentos (n, covariância das observadas), do código do ajuste e da versão do scipy"""
+    h = hashlib.blake2b(digest_size=16)
+    cabecalho = {'versao': _VERSAO_CACHE, 'descricao': descricao, 'scipy': scipy.__version__,
+                 'codigo': versao_codigo(_ajustar_especificacao, motor_sem)}
+    h.update(json.dumps(cabecalho, ensure_ascii=False).encode('utf-8'))
+    h.update(str(momentos.n).encode('utf-8'))
+    h.update(json.dumps(momentos.colunas, ensure_ascii=False).encode('utf-8'))
+    h.update(np.ascontiguousarray(momentos.cov.to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def _ler_cache(chave, diretorio):
+    if chave in _ajustes_conhecidos:
+        return _ajustes_conhecidos[chave]
+    if diretorio is None:
+        return None
+    caminho = os.path.join(diretorio, f"{chave}.json")
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as f:
+        resumo = json.load(f)
+    _ajustes_conhecidos[chave] = resumo
+    return resumo
+
+
+def _gravar_cache(chave, resumo, diretorio):
+    _ajustes_conhecidos[chave] = resumo
+    if diretorio is None:
+        return
+    os.makedirs(diretorio, exist_ok=True)
+    with open(os.path.join(diretorio, f"{chave}.json"), 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, ensure_ascii=False)
+
+
+def _ajustar_especificacao(descricao, momentos, partida):
+    """
+    Tarefa do pool: ajusta uma especificação e resume índices, estimativas
+    (partida dos vizinhos), índices de modificação e p-valores dos caminhos.
+    """
+    modelo = ModeloSEM(descricao)
+    x0 = None
+    try:
+        if partida:
+            modelo.load(cov=momentos.cov, n_samples=momentos.n)
+            x0 = modelo._valores_iniciais('semopy')
+            for local in modelo._livres:
+                chave = f"{local['lval']} {local['op']} {local['rval']}"
+                if chave in partida:
+                    x0[local['indice']] = partida[chave]
+            resultado = modelo.fit(cov=momentos.cov, n_samples=momentos.n, x0=x0, metodo='fisher')
+            if not resultado.success:
+                # Partida quente em outra bacia: refaz com as partidas padrão
+                resultado = modelo.fit(cov=momentos.cov, n_samples=momentos.n)
+        else:
+            # Ajuste de partida da busca: um só por modelo, vale a busca do mínimo global
+            resultado = modelo.fit(cov=momentos.cov, n_samples=momentos.n, partidas='multiplas')
+        indices = indices_exatos([modelo.mx_cov], [modelo.calc_sigma()[0]], momentos.n,
+                                 modelo.n_parametros).iloc[0]
+        tabela = modelo.inspect()
+        modificacao = modelo.indices_modificacao()
+    except np.linalg.LinAlgError as e:
+        print(f"⚠️ Ajuste falhou ({e})")
+        return {**{k: None for k in INDICES_BUSCA}, 'Parâmetros': modelo.n_parametros, 'convergiu': False}
+
+    k = modelo.n_parametros
+    estruturais = tabela[(tabela['op'] == '~') & tabela['lval'].isin(modelo.vars['latent'])]
+    modificacao = modificacao[(modificacao['op'] == '~') & modificacao['lval'].isin(modelo.vars['latent'])]
+    return {
+        **{c: float(indices[c]) for c in INDICES_BUSCA},
+        'Parâmetros': k,
+        'convergiu': bool(resultado.success),
+        'estimativas': {f"{l['lval']} {l['op']} {l['rval']}": float(modelo.param_vals[l['indice']])
+                        for l in modelo._livres},
+        'MI': {f"{r.lval} ~ {r.rval}": float(r.MI) for r in modificacao.itertuples()},
+        'p-value': {f"{lval} ~ {rval}": float(p) for lval, rval, p in
+                    zip(estruturais['lval'], estruturais['rval'], estruturais['p-value'])},
+    }
+
+
+def _ajustar_varios(pedidos, momentos, pool, diretorio_cache):
+    """
+    Ajusta uma lista de (caminhos, partida), consultando o cache e
+    distribuindo só os ajustes novos pelo pool (None = sequencial).
+
+    Returns:
+        Lista de resumos e número de ajustes novos
+    """
+    descricoes = [especificacao_canonica(caminhos) for caminhos, _ in pedidos]
+    chaves = [_chave_ajuste(d, momentos) for d in descricoes]
+    resumos = [_ler_cache(chave, diretorio_cache) for chave in chaves]
+    faltantes = [i for i, r in enumerate(resumos) if r is None]
+    if faltantes:
+        tarefas = [(descricoes[i], momentos, pedidos[i][1]) for i in faltantes]
+        if pool is None or len(tarefas) <= 1:
+            novos = [_ajustar_especificacao(*tarefa) for tarefa in tarefas]
+        else:
+            novos = list(pool.map(_ajustar_especificacao, *zip(*tarefas)))
+        for i, resumo in zip(faltantes, novos):
+            resumos[i] = resumo
+            if resumo['convergiu']:
+                _gravar_cache(chaves[i], resumo, diretorio_cache)
+    return resumos, len(faltantes)
+
+
+def _cria_ciclo(caminhos, dep, pred):
+    """Acrescentar dep ~ pred fecha um ciclo se pred já depende (direta ou indiretamente) de dep"""
+    sucessores = {}
+    for d, p in caminhos:
+        sucessores.setdefault(p, []).append(d)
+    pilha, vistos = [dep], set()
+    while pilha:
+        v = pilha.pop()
+        if v == pred:
+            return True
+        if v not in vistos:
+            vistos.add(v)
+            pilha.extend(sucessores.get(v, []))
+    return False
+
+
+def _vizinhos(caminhos, resumo, mi_minimo, alfa, exogenos):
+    """Acréscimos com MI ≥ mi_minimo que mantêm o modelo recursivo e remoções de caminhos com p > alfa"""
+    vizinhos = []
+    for chave, mi in resumo['MI'].items():
+        dep, pred = chave.split(' ~ ')
+        if mi >= mi_minimo and dep not in exogenos and (dep, pred) not in caminhos \
+                and not _cria_ciclo(caminhos, dep, pred):
+            vizinhos.append(caminhos | {(dep, pred)})
+    for dep, pred in caminhos:
+        if resumo['p-value'].get(f"{dep} ~ {pred}", 0.0) > alfa:
+            vizinhos.append(caminhos - {(dep, pred)})
+    return vizinhos
+
+
+def fronteira_pareto(tabela, ajuste='chi2', complexidade='Parâmetros'):
+    """Modelos não dominados em (ajuste, complexidade), ambos a minimizar, em ordem de complexidade"""
+    ordenada = tabela.sort_values([complexidade, ajuste]).reset_index(drop=True)
+    melhor, manter = np.inf, []
+    for i, valor in enumerate(ordenada[ajuste]):
+        if valor < melhor:
+            melhor = valor
+            manter.append(i)
+    return ordenada.iloc[manter].reset_index(drop=True)
+
+
+def buscar_especificacao(momentos, inicial=CAMINHOS_INICIAIS, criterio='BIC', largura=4, max_passos=10,
+                         mi_minimo=3.84, alfa=0.05, exogenos=EXOGENOS, n_workers=1,
+                         diretorio_cache=DIRETORIO_BUSCA):
+    """
+    Busca em feixe sobre os caminhos estruturais entre os construtos.
+
+    Args:
+        momentos: MomentosAmostrais com os itens de CONSTRUTOS (ver itens_construtos)
+        inicial: Caminhos (dependente, preditor) do modelo de partida
+        criterio: Índice a minimizar na escolha do feixe ('BIC', 'AIC', 'chi2', 'RMSEA')
+        largura: Modelos mantidos no feixe a cada passo
+        max_passos: Máximo de passos da busca
+        mi_minimo: Índice de modificação mínimo para acrescentar um caminho
+        alfa: p-valor acima do qual um caminho é candidato à remoção
+        exogenos: Construtos que não recebem caminhos
+        n_workers: Processos para os ajustes de cada passo (1 = sequencial)
+        diretorio_cache: Diretório do cache de ajustes (None = só em memória)
+
+    Returns:
+        dict com 'ajustes' (DataFrame de todos os modelos ajustados) e
+        'pareto' (fronteira de χ² × parâmetros livres entre os que convergiram)
+    """
+    momentos = momentos.subconjunto([i for itens in CONSTRUTOS.values() for i in itens])
+    ajustados, origem = {}, {}
+    inicial = frozenset(inicial)
+    feixe = [inicial]
+    with ExitStack() as pilha:
+        pool = None if n_workers is not None and n_workers <= 1 else \
+            pilha.enter_context(ProcessPoolExecutor(max_workers=n_workers))
+        (resumo,), novos = _ajustar_varios([(inicial, None)], momentos, pool, diretorio_cache)
+        ajustados[inicial], origem[inicial] = resumo, (0, None)
+        print(f"🔎 Modelo inicial: {criterio} = {resumo[criterio]:.2f}, {len(inicial)} caminhos")
+
+        for passo in range(1, max_passos + 1):
+            pedidos = {}
+            for pai in feixe:
+                for filho in _vizinhos(pai, ajustados[pai], mi_minimo, alfa, exogenos):
+                    if filho not in ajustados and filho not in pedidos:
+                        pedidos[filho] = pai
+            if not pedidos:
+                break
+            resumos, novos = _ajustar_varios([(f, ajustados[p]['estimativas']) for f, p in pedidos.items()],
+                                             momentos, pool, diretorio_cache)
+            melhorias = []
+            for (filho, pai), resumo in zip(pedidos.items(), resumos):
+                ajustados[filho], origem[filho] = resumo, (passo, pai)
+                if resumo['convergiu'] and resumo[criterio] < ajustados[pai][criterio]:
+                    melhorias.append(filho)
+            feixe = sorted(melhorias, key=lambda c: ajustados[c][criterio])[:largura]
+            print(f"   passo {passo}: {len(pedidos)} vizinhos ({novos} ajustes novos), "
+                  f"{len(melhorias)} melhoram o {criterio}")
+            if not feixe:
+                break
+
+    linhas = []
+    for caminhos, resumo in ajustados.items():
+        passo, pai = origem[caminhos]
+        linhas.append({'caminhos': _texto_caminhos(caminhos), 'n caminhos': len(caminhos), 'passo': passo,
+                       'origem': None if pai is None else _texto_caminhos(pai),
+                       **{k: resumo[k] for k in INDICES_BUSCA}, 'Parâmetros': resumo['Parâmetros'],
+                       'convergiu': resumo['convergiu']})
+    tabela = pd.DataFrame(linhas).sort_values(criterio, ignore_index=True)
+    return {'ajustes': tabela, 'pareto': fronteira_pareto(tabela[tabela['convergiu']])}
+
+
+def busca_da_base(base, **opcoes):
+    """Busca de especificação sobre os itens da base (ausentes pela média, como em prepare_sem_data)"""
+    return buscar_especificacao(calcular_momentos(itens_construtos(base)), **opcoes)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CACHE COLUNAR DAS TABELAS TEMÁTICAS
+===================================
+
+Converte cada CSV de csv_extraidos uma única vez para um cache colunar
+tipado em disco e serve as leituras seguintes a partir de arrays
+memory-mapped:
+- Escalas Likert verbais -> códigos int8 (0 = ausente)
+- Demais colunas de texto -> códigos categóricos + lista de categorias
+- Colunas numéricas -> arrays numéricos nativos
+
+O cache é indexado pelo hash do conteúdo do arquivo de origem; qualquer
+alteração no CSV gera uma nova entrada e descarta a anterior.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from codec_likert import ESCALAS_PADRAO, decodificar_coluna, identificar_escala
+
+DIRETORIO_DADOS = 'csv_extraidos'
+DIRETORIO_CACHE = '.cache_dados'
+
+ARQUIVOS_TEMATICOS = [
+    'Qualidade do serviço.csv',
+    'Utilização.csv',
+    'Percepção novos serviços.csv',
+    'Intenção comportamental.csv',
+    'Aceitação da tecnologia.csv',
+    'Experiência do usuário.csv',
+    'Perfil Socioeconomico.csv'
+]
+
+_VERSAO_FORMATO = 1
+
+# Memo em processo: caminho -> (tamanho, mtime, hash) e hash -> tabela carregada
+_hashes_conhecidos = {}
+_tabelas_abertas = {}
+
+
+def _hash_arquivo(caminho):
+    """Calcula (com memo por tamanho/mtime) o hash do conteúdo do arquivo"""
+    info = os.stat(caminho)
+    chave = os.path.abspath(caminho)
+    assinatura = (info.st_size, info.st_mtime_ns)
+
+    conhecido = _hashes_conhecidos.get(chave)
+    if conhecido is not None and conhecido[0] == assinatura:
+        return conhecido[1]
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    digest = h.hexdigest()
+    _hashes_conhecidos[chave] = (assinatura, digest)
+    return digest
+
+
+def _nome_base(caminho):
+    """Nome seguro para o diretório de cache de um arquivo"""
+    stem = os.path.splitext(os.path.basename(caminho))[0]
+    return re.sub(r'[^\w]+', '_', stem).strip('_')
+
+
+def _construir_cache(caminho, destino):
+    """Lê o CSV uma vez e grava cada coluna como array .npy tipado"""
+    df = pd.read_csv(caminho, encoding='utf-8')
+
+    temporario = destino + '.tmp'
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+
+    colunas = []
+    for i, coluna in enumerate(df.columns):
+        serie = df[coluna]
+        info = {'nome': coluna, 'arquivo': f'c{i:03d}.npy'}
+
+        if pd.api.types.is_numeric_dtype(serie):
+            info['tipo'] = 'numerica'
+            np.save(os.path.join(temporario, info['arquivo']), serie.to_numpy())
+        else:
+            # Ordem de aparição, igual a unique() usado nos scripts de análise
+            codigos, categorias = pd.factorize(serie, use_na_sentinel=True)
+            dtype = np.int16 if len(categorias) < np.iinfo(np.int16).max else np.int32
+            categorias = [str(c) for c in categorias]
+            info['categorias'] = categorias
+            np.save(os.path.join(temporario, info['arquivo']), codigos.astype(dtype))
+
+            escala = identificar_escala(categorias, exigir_todos=True, escalas=ESCALAS_PADRAO)
+            if escala is not None:
+                info['tipo'] = 'likert'
+                info['escala'] = escala
+                info['arquivo_likert'] = f'l{i:03d}.npy'
+                np.save(os.path.join(temporario, info['arquivo_likert']), decodificar_coluna(serie, escala))
+            else:
+                info['tipo'] = 'categorica'
+
+        colunas.append(info)
+
+    meta = {
+        'versao': _VERSAO_FORMATO,
+        'origem': os.path.abspath(caminho),
+        'linhas': len(df),
+        'colunas': colunas
+    }
+    with open(os.path.join(temporario, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporario, destino)
+
+
+def _remover_entradas_antigas(diretorio_cache, nome_base, atual):
+    """Descarta caches de versões anteriores do mesmo arquivo"""
+    for entrada in os.listdir(diretorio_cache):
+        if entrada.startswith(nome_base + '-') and entrada != atual and not entrada.endswith('.tmp'):
+            shutil.rmtree(os.path.join(diretorio_cache, entrada), ignore_errors=True)
+
+
+def _abrir_cache(caminho, diretorio_cache=DIRETORIO_CACHE):
+    """Garante que o cache do arquivo existe e abre seus arrays via mmap"""
+    digest = _hash_arquivo(caminho)
+    if digest in _tabelas_abertas:
+        return _tabelas_abertas[digest]
+
+    nome_base = _nome_base(caminho)
+    entrada = f'{nome_base}-{digest}'
+    destino = os.path.join(diretorio_cache, entrada)
+    arquivo_meta = os.path.join(destino, 'meta.json')
+
+    meta = None
+    if os.path.exists(arquivo_meta):
+        with open(arquivo_meta, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('versao') != _VERSAO_FORMATO:
+            meta = None
+
+    if meta is None:
+        os.makedirs(diretorio_cache, exist_ok=True)
+        _construir_cache(caminho, destino)
+        _remover_entradas_antigas(diretorio_cache, nome_base, entrada)
+        with open(arquivo_meta, encoding='utf-8') as f:
+            meta = json.load(f)
+
+    arrays = {}
+    for info in meta['colunas']:
+        arrays[info['nome']] = np.load(os.path.join(destino, info['arquivo']), mmap_mode='r')
+        if info['tipo'] == 'likert':
+            arrays[info['nome'] + '#likert'] = np.load(os.path.join(destino, info['arquivo_likert']),
+                                                       mmap_mode='r')
+
+    tabela = {'meta': meta, 'arrays': arrays, 'hash': digest}
+    _tabelas_abertas[digest] = tabela
+    return tabela
+
+
+def carregar_tabela(caminho, modo='texto', diretorio_cache=DIRETORIO_CACHE):
+    """
+    Carrega um CSV temático através do cache colunar.
+
+    Args:
+        caminho: Caminho do CSV de origem
+        modo: 'texto' reconstrói exatamente o DataFrame de pd.read_csv;
+              'codificado' devolve Likert como int8 (0 = ausente), demais
+              colunas de texto como pd.Categorical e numéricas sem cópia
+        diretorio_cache: Diretório raiz do cache
+
+    Returns:
+        DataFrame com as colunas na ordem original do arquivo
+    """
+    if modo not in ('texto', 'codificado'):
+        raise ValueError(f"Modo inválido: {modo}")
+
+    tabela = _abrir_cache(caminho, diretorio_cache)
+    arrays = tabela['arrays']
+
+    dados = {}
+    for info in tabela['meta']['colunas']:
+        nome = info['nome']
+        valores = arrays[nome]
+
+        if info['tipo'] == 'numerica':
+            dados[nome] = valores.view(np.ndarray)
+        elif modo == 'codificado' and info['tipo'] == 'likert':
+            dados[nome] = arrays[nome + '#likert'].view(np.ndarray)
+        elif modo == 'codificado':
+            dados[nome] = pd.Categorical.from_codes(np.asarray(valores), categories=info['categorias'])
+        else:
+            # Categorias + NaN no fim: o código -1 aponta para o ausente
+            categorias = np.array(info['categorias'] + [np.nan], dtype=object)
+            dados[nome] = categorias[valores]
+
+    return pd.DataFrame(dados, copy=False)
+
+
+def carregar_tabelas_tematicas(diretorio=DIRETORIO_DADOS, modo='texto', arquivos=None):
+    """Carrega as sete tabelas temáticas; chaves são os nomes dos arquivos sem extensão"""
+    tabelas = {}
+    for arquivo in arquivos or ARQUIVOS_TEMATICOS:
+        nome = arquivo.replace('.csv', '')
+        tabelas[nome] = carregar_tabela(os.path.join(diretorio, arquivo), modo=modo)
+    return tabelas
+
+
+def info_colunas(caminho, diretorio_cache=DIRETORIO_CACHE):
+    """Metadados das colunas (tipo, escala e categorias) de um arquivo em cache"""
+    return _abrir_cache(caminho, diretorio_cache)['meta']['colunas']
+
+
+def hash_tabela(caminho):
+    """Hash do conteúdo do arquivo usado como chave do cache"""
+    return _hash_arquivo(caminho)
+
+
+if __name__ == "__main__":
+    for arquivo in ARQUIVOS_TEMATICOS:
+        caminho = os.path.join(DIRETORIO_DADOS, arquivo)
+        df = carregar_tabela(caminho, modo='codificado')
+        n_likert = sum(1 for c in info_colunas(caminho) if c['tipo'] == 'likert')
+        print(f"✓ {arquivo}: {df.shape[0]} registros, {n_likert} colunas Likert em cache")
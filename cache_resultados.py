@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CACHE DE RESULTADOS ENDEREÇADO POR CONTEÚDO
+===========================================
+
+Guarda em disco os resultados das etapas de análise (ajustes SEM, análise
+fatorial, varredura de KMeans, logit), indexados pelo hash de:
+- conteúdo dos dados de entrada (valores, tipos e nomes das colunas, em
+  qualquer ordem de colunas)
+- parâmetros da etapa (especificação, fórmula, opções)
+- versão do código: fonte das funções/módulos que calculam a etapa
+
+Qualquer mudança nos dados, na especificação ou no código da etapa gera uma
+chave nova; mudanças só no texto dos relatórios reaproveitam tudo.
+
+Cada resultado é um único .npz compactado: arrays, tabelas (coluna a
+coluna), séries, escalares numpy e estruturas aninhadas (dict/list/tuple)
+viram arrays binários mais a estrutura em JSON, sem pickle. O diretório tem
+tamanho limitado (CACHE_RESULTADOS_MB): ao gravar, os arquivos menos
+usados recentemente (mtime, renovado a cada leitura) são removidos.
+"""
+
+import hashlib
+import inspect
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache_dados import DIRETORIO_CACHE
+
+DIRETORIO_RESULTADOS = os.path.join(DIRETORIO_CACHE, 'resultados')
+
+# CACHE_RESULTADOS_MB: limite do diretório (0 desativa o cache)
+LIMITE_BYTES = int(float(os.environ.get('CACHE_RESULTADOS_MB', '256')) * 2 ** 20)
+
+_VERSAO_FORMATO = 1
+
+# Memo em processo: id do objeto -> hash do código-fonte
+_versoes_codigo = {}
+
+
+def hash_dados(dados):
+    """
+    Hash do conteúdo de um DataFrame, Series ou array. Nas tabelas, as
+    colunas entram ordenadas pelo nome, com tipo e valores (categóricas pelos
+    rótulos), de modo que a mesma matriz em outra ordem de colunas tem o mesmo hash.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(dados, pd.Series):
+        dados = dados.to_frame()
+    if isinstance(dados, pd.DataFrame):
+        h.update(str(len(dados)).encode('utf-8'))
+        for coluna in sorted(dados.columns, key=str):
+            valores = dados[coluna]
+            h.update(json.dumps([str(coluna), str(valores.dtype)], ensure_ascii=False).encode('utf-8'))
+            h.update(pd.util.hash_pandas_object(valores, index=False).to_numpy().tobytes())
+    else:
+        valores = np.ascontiguousarray(dados)
+        h.update(json.dumps([valores.dtype.str, valores.shape]).encode('utf-8'))
+        h.update(valores.tobytes())
+    return h.hexdigest()
+
+
+def versao_codigo(*objetos):
+    """Hash do código-fonte de funções ou módulos (memo por processo)"""
+    h = hashlib.blake2b(digest_size=16)
+    for objeto in objetos:
+        versao = _versoes_codigo.get(id(objeto))
+        if versao is None:
+            try:
+                fonte = inspect.getsource(objeto)
+            except (OSError, TypeError):
+                fonte = getattr(objeto, '__qualname__', repr(objeto))
+            versao = _versoes_codigo[id(objeto)] = hashlib.blake2b(fonte.encode('utf-8'), digest_size=16).hexdigest()
+        h.update(versao.encode('utf-8'))
+    return h.hexdigest()
+
+
+def chave_resultado(estagio, dados, parametros=None, codigo=()):
+    """
+    Chave de um resultado.
+
+    Args:
+        estagio: Nome da etapa ('sem', 'analise_fatorial', ...)
+        dados: Entrada da etapa (DataFrame, Series ou array)
+        parametros: Opções da etapa serializáveis em JSON
+        codigo: Funções/módulos cuja alteração invalida o resultado
+    """
+    h = hashlib.blake2b(digest_size=16)
+    cabecalho = {'formato': _VERSAO_FORMATO, 'estagio': estagio, 'parametros': parametros,
+                 'codigo': versao_codigo(*codigo)}
+    h.update(json.dumps(cabecalho, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'))
+    h.update(hash_dados(dados).encode('utf-8'))
+    return f"{estagio}_{h.hexdigest()}"
+
+
+# ----------------------------------------------------------------------
+# Serialização
+# ----------------------------------------------------------------------
+def _valores_json(valores):
+    """Valores de um array de objetos como lista JSON (None nos ausentes)"""
+    lista = []
+    for v in valores:
+        if v is None or (isinstance(v, float) and np.isnan(v)) or v is pd.NA:
+            lista.append(None)
+        elif isinstance(v, np.generic):
+            lista.append(v.item())
+        elif isinstance(v, (str, bool, int, float)):
+            lista.append(v)
+        else:
+            raise TypeError(f"Valor não serializável no cache: {type(v).__name__}")
+    return lista
+
+
+def _codificar(objeto, arrays):
+    """Estrutura JSON do objeto; os dados binários vão para arrays (nome -> ndarray)"""
+    if objeto is None or isinstance(objeto, (bool, str)):
+        return {'t': 'valor', 'v': objeto}
+    if isinstance(objeto, (int, float)) and not isinstance(objeto, np.generic):
+        return {'t': 'valor', 'v': objeto}
+    if isinstance(objeto, (np.ndarray, np.generic)):
+        valores = np.asarray(objeto)
+        if valores.dtype == object:
+            return {'t': 'objetos', 'forma': list(valores.shape), 'v': _valores_json(valores.ravel())}
+        nome = f"a{len(arrays)}"
+        arrays[nome] = valores
+        return {'t': 'escalar' if isinstance(objeto, np.generic) else 'array', 'v': nome}
+    if isinstance(objeto, pd.Categorical):
+        return {'t': 'categorica', 'codigos': _codificar(objeto.codes, arrays),
+                'categorias': _codificar(objeto.categories, arrays), 'ordenada': bool(objeto.ordered)}
+    if isinstance(objeto, pd.MultiIndex):
+        return {'t': 'multiindice', 'niveis': [_codificar(objeto.get_level_values(i), arrays)
+                                               for i in range(objeto.nlevels)],
+                'nomes': list(objeto.names)}
+    if isinstance(objeto, pd.RangeIndex):
+        return {'t': 'intervalo', 'v': [objeto.start, objeto.stop, objeto.step], 'nome': objeto.name}
+    if isinstance(objeto, pd.Index):
+        return {'t': 'indice', 'v': _codificar(objeto.to_numpy(), arrays), 'nome': objeto.name}
+    if isinstance(objeto, pd.Series):
+        valores = objeto.array if isinstance(objeto.dtype, pd.CategoricalDtype) else objeto.to_numpy()
+        return {'t': 'serie', 'v': _codificar(valores, arrays), 'indice': _codificar(objeto.index, arrays),
+                'nome': _codificar(objeto.name, arrays), 'dtype': str(objeto.dtype)}
+    if isinstance(objeto, pd.DataFrame):
+        return {'t': 'tabela', 'colunas': _codificar(objeto.columns, arrays),
+                'v': [_codificar(objeto.iloc[:, j], arrays) for j in range(objeto.shape[1])],
+                'indice': _codificar(objeto.index, arrays)}
+    if isinstance(objeto, dict):
+        return {'t': 'dict', 'chaves': [_codificar(k, arrays) for k in objeto],
+                'v': [_codificar(v, arrays) for v in objeto.values()]}
+    if isinstance(objeto, (list, tuple)):
+        return {'t': type(objeto).__name__, 'v': [_codificar(v, arrays) for v in objeto]}
+    raise TypeError(f"Tipo não serializável no cache: {type(objeto).__name__}")
+
+
+def _decodificar(estrutura, arrays):
+    t, v = estrutura['t'], estrutura.get('v')
+    if t == 'valor':
+        return v
+    if t == 'array':
+        return arrays[v]
+    if t == 'escalar':
+        return arrays[v][()]
+    if t == 'objetos':
+        valores = np.empty(len(v), dtype=object)
+        valores[:] = v
+        return valores.reshape(estrutura['forma'])
+    if t == 'categorica':
+        return pd.Categorical.from_codes(_decodificar(estrutura['codigos'], arrays),
+                                         categories=_decodificar(estrutura['categorias'], arrays),
+                                         ordered=estrutura['ordenada'])
+    if t == 'multiindice':
+        return pd.MultiIndex.from_arrays([_decodificar(n, arrays) for n in estrutura['niveis']],
+                                         names=estrutura['nomes'])
+    if t == 'intervalo':
+        return pd.RangeIndex(*v, name=estrutura['nome'])
+    if t == 'indice':
+        return pd.Index(_decodificar(v, arrays), name=estrutura['nome'])
+    if t == 'serie':
+        valores = _decodificar(v, arrays)
+        if estrutura['dtype'] not in ('object', 'category') and not isinstance(valores, pd.Categorical):
+            valores = pd.array(valores, dtype=estrutura['dtype'])
+        return pd.Series(valores, index=_decodificar(estrutura['indice'], arrays),
+                         name=_decodificar(estrutura['nome'], arrays))
+    if t == 'tabela':
+        indice = _decodificar(estrutura['indice'], arrays)
+        # Colunas por posição (índices repetidos não são realinhados)
+        tabela = pd.DataFrame({j: _decodificar(c, arrays).reset_index(drop=True) for j, c in enumerate(v)},
+                              index=pd.RangeIndex(len(indice)))
+        tabela.index = indice
+        tabela.columns = _decodificar(estrutura['colunas'], arrays)
+        return tabela
+    if t == 'dict':
+        return {_decodificar(k, arrays): _decodificar(x, arrays) for k, x in zip(estrutura['chaves'], v)}
+    if t == 'list':
+        return [_decodificar(x, arrays) for x in v]
+    if t == 'tuple':
+        return tuple(_decodificar(x, arrays) for x in v)
+    raise ValueError(f"Tipo desconhecido no cache: {t}")
+
+
+# ----------------------------------------------------------------------
+# Leitura, gravação e remoção dos menos usados
+# ----------------------------------------------------------------------
+def _caminho(chave, diretorio):
+    return os.path.join(diretorio, f"{chave}.npz")
+
+
+def ler_resultado(chave, diretorio=DIRETORIO_RESULTADOS):
+    """Resultado guardado sob a chave, ou None (também com o cache desativado)"""
+    if diretorio is None or LIMITE_BYTES <= 0:
+        return None
+    caminho = _caminho(chave, diretorio)
+    try:
+        with np.load(caminho, allow_pickle=False) as arquivo:
+            arrays = {nome: arquivo[nome] for nome in arquivo.files}
+    except (OSError, ValueError):
+        return None
+    estrutura = json.loads(str(arrays.pop('__estrutura__')))
+    # Leitura renova o arquivo na ordem de remoção (LRU pelo mtime)
+    try:
+        os.utime(caminho)
+    except OSError:
+        pass
+    return _decodificar(estrutura, arrays)
+
+
+def gravar_resultado(chave, resultado, diretorio=DIRETORIO_RESULTADOS, limite_bytes=None):
+    """
+    Grava o resultado sob a chave e remove os arquivos menos usados além do
+    limite. Devolve False (sem gravar) se o resultado tiver tipos não suportados.
+    """
+    limite_bytes = LIMITE_BYTES if limite_bytes is None else limite_bytes
+    if diretorio is None or limite_bytes <= 0:
+        return False
+    arrays = {}
+    try:
+        estrutura = _codificar(resultado, arrays)
+    except TypeError as e:
+        print(f"⚠️ Resultado fora do cache ({e})")
+        return False
+    arrays['__estrutura__'] = np.array(json.dumps(estrutura, ensure_ascii=False))
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = _caminho(chave, diretorio)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'wb') as f:
+        f.write(buffer.getbuffer())
+    os.replace(temporario, caminho)
+    _remover_excedente(diretorio, limite_bytes)
+    return True
+
+
+def _remover_excedente(diretorio, limite_bytes):
+    """Remove os resultados de uso mais antigo até o diretório caber no limite"""
+    arquivos = []
+    for entrada in os.scandir(diretorio):
+        if entrada.name.endswith('.npz'):
+            info = entrada.stat()
+            arquivos.append((info.st_mtime_ns, info.st_size, entrada.path))
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= limite_bytes:
+            break
+        try:
+            os.remove(caminho)
+            total -= tamanho
+        except OSError:
+            pass
+
+
+def resultado_em_cache(estagio, dados, calcular, parametros=None, codigo=(), diretorio=DIRETORIO_RESULTADOS):
+    """
+    calcular() com o resultado em cache pela chave de chave_resultado;
+    resultados None não são guardados.
+
+    Returns:
+        (resultado, True se veio do cache)
+    """
+    chave = chave_resultado(estagio, dados, parametros, codigo)
+    resultado = ler_resultado(chave, diretorio)
+    if resultado is not None:
+        return resultado, True
+    resultado = calcular()
+    if resultado is not None:
+        gravar_resultado(chave, resultado, diretorio)
+    return resultado, False
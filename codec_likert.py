@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CODEC LIKERT VETORIZADO
+=======================
+
+Registro único das escalas verbais do questionário e decodificação de
+tabelas inteiras para códigos int8:
+- Cada coluna é fatorada uma vez (códigos categóricos + valores distintos)
+- A normalização de texto (NBSP, espaços, caixa) roda uma vez por valor
+  distinto, não por célula
+- O resultado é int8 com sentinela LIKERT_AUSENTE para ausentes
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Sentinela para respostas ausentes ou não reconhecidas
+LIKERT_AUSENTE = 0
+
+_ESCALAS = {}
+
+
+def normalizar_rotulo(valor):
+    """Normaliza um rótulo verbal: NBSP, espaços repetidos, bordas e caixa"""
+    return re.sub(r'\s+', ' ', str(valor).replace('\xa0', ' ')).strip().lower()
+
+
+def registrar_escala(nome, rotulos):
+    """
+    Registra (ou substitui) uma escala no codec.
+
+    Args:
+        nome: Identificador da escala
+        rotulos: Lista ordenada de rótulos (códigos 1..k) ou dict rótulo -> código
+    """
+    if not isinstance(rotulos, dict):
+        rotulos = {rotulo: i + 1 for i, rotulo in enumerate(rotulos)}
+    _ESCALAS[nome] = {normalizar_rotulo(k): int(v) for k, v in rotulos.items()}
+    return _ESCALAS[nome]
+
+
+registrar_escala('satisfacao', ['Muito insatisfeito', 'Insatisfeito', 'Neutro', 'Satisfeito', 'Muito satisfeito'])
+registrar_escala('concordancia', ['Discordo totalmente', 'Discordo', 'Neutro', 'Concordo', 'Concordo totalmente'])
+registrar_escala('facilidade', ['Muito difícil', 'Difícil', 'Neutro', 'Fácil', 'Muito Fácil'])
+registrar_escala('frequencia', ['Nunca', 'Raramente', 'Às vezes', 'Frequentemente', 'Sempre'])
+
+# Escalas do questionário; escalas registradas depois pelos scripts ficam fora daqui
+ESCALAS_PADRAO = ('satisfacao', 'concordancia', 'facilidade', 'frequencia')
+
+
+def escalas_registradas():
+    """Nomes das escalas registradas, na ordem de registro"""
+    return list(_ESCALAS)
+
+
+def obter_escala(nome):
+    """Mapeamento rótulo normalizado -> código de uma escala"""
+    return dict(_ESCALAS[nome])
+
+
+def _tabela_de_busca(escalas):
+    """Une as escalas pedidas em um único dict rótulo normalizado -> código"""
+    if escalas is None:
+        escalas = list(_ESCALAS)
+    elif isinstance(escalas, str):
+        escalas = [escalas]
+    busca = {}
+    for nome in escalas:
+        busca.update(_ESCALAS[nome])
+    return busca
+
+
+def _fatorar(serie):
+    """Códigos e valores distintos de uma coluna (reaproveita Categorical quando houver)"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return np.asarray(serie.cat.codes), list(serie.cat.categories)
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+    return codigos, list(distintos)
+
+
+def identificar_escala(valores, exigir_todos=False, escalas=None):
+    """
+    Identifica a escala que cobre mais valores distintos de uma coluna.
+
+    Args:
+        valores: Valores distintos (ou a própria Series)
+        exigir_todos: Se True, só aceita escalas que cobrem todos os valores
+        escalas: Nomes candidatos (padrão: todas as escalas registradas)
+
+    Returns:
+        Nome da escala ou None
+    """
+    if isinstance(valores, pd.Series):
+        valores = _fatorar(valores.dropna())[1]
+    normalizados = {normalizar_rotulo(v) for v in valores if not pd.isna(v)}
+    if not normalizados:
+        return None
+
+    melhor, cobertura_melhor = None, 0
+    for nome in escalas or list(_ESCALAS):
+        cobertura = len(normalizados & _ESCALAS[nome].keys())
+        if exigir_todos and cobertura < len(normalizados):
+            continue
+        if cobertura > cobertura_melhor:
+            melhor, cobertura_melhor = nome, cobertura
+    return melhor
+
+
+def decodificar_coluna(serie, escalas=None, padrao=LIKERT_AUSENTE):
+    """
+    Decodifica uma coluna verbal para int8.
+
+    Args:
+        serie: Series de texto (ou Categorical)
+        escalas: Nome, lista de nomes ou None (todas as escalas registradas)
+        padrao: Código para valores presentes mas não reconhecidos
+
+    Returns:
+        np.ndarray int8 com LIKERT_AUSENTE nos ausentes
+    """
+    busca = _tabela_de_busca(escalas)
+    codigos, distintos = _fatorar(serie)
+    tabela = np.array([busca.get(normalizar_rotulo(v), padrao) for v in distintos] + [LIKERT_AUSENTE],
+                      dtype=np.int8)
+    return tabela[codigos]
+
+
+def para_float(codigos):
+    """Converte códigos int8 em float64 com NaN no lugar da sentinela"""
+    codigos = np.asarray(codigos)
+    return np.where(codigos == LIKERT_AUSENTE, np.nan, codigos.astype(np.float64))
+
+
+def decodificar_tabela(df, escalas=None, padrao=LIKERT_AUSENTE, como_float=False):
+    """
+    Decodifica todas as colunas de um DataFrame com uma busca por coluna.
+
+    Args:
+        df: DataFrame com colunas verbais
+        escalas: Nome, lista de nomes, None (todas) ou 'auto' (detecta por coluna)
+        padrao: Código para valores presentes mas não reconhecidos
+        como_float: Se True, devolve float64 com NaN em vez de int8 + sentinela
+
+    Returns:
+        DataFrame com o mesmo índice e colunas
+    """
+    dados = {}
+    for coluna in df.columns:
+        escalas_coluna = identificar_escala(df[coluna]) if escalas == 'auto' else escalas
+        if escalas == 'auto' and escalas_coluna is None:
+            codigos = np.full(len(df), LIKERT_AUSENTE, dtype=np.int8)
+        else:
+            codigos = decodificar_coluna(df[coluna], escalas_coluna, padrao)
+        dados[coluna] = para_float(codigos) if como_float else codigos
+    return pd.DataFrame(dados, index=df.index, columns=df.columns)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CONFIABILIDADE E VALIDADE DOS CONSTRUTOS
+========================================
+
+α de Cronbach, α se o item for excluído, correlação item-total corrigida,
+ω de McDonald, confiabilidade composta (CR), variância média extraída
+(AVE), HTMT e critério de Fornell–Larcker de todos os construtos a partir
+de uma única matriz de covariância:
+- Com a matriz indicadora W (itens × construtos), variâncias dos escores
+  somados, traços e somas de blocos saem de um único produto S W
+- α sem o item i: o total do construto perde 2 (SW)_ic − S_ii e o traço
+  perde S_ii (atualização de posto um), para todos os pares item-construto
+  de uma vez
+- HTMT pelas médias dos blocos de W'|R|W (correlações em valor absoluto)
+- ω, CR, AVE e as correlações entre fatores (Fornell–Larcker) de um único
+  ajuste fatorial confirmatório (motor_sem.ModeloSEM) na mesma covariância;
+  construtos de um só item ficam fora do ajuste
+- Intervalos bootstrap com os pesos de reamostragem de bootstrap_sem
+  (pesos_bootstrap sobre SeedSequence.spawn): com a mesma semente e a mesma
+  matriz de dados (mesmas linhas, na mesma ordem), as réplicas sorteiam os
+  mesmos respondentes dos intervalos dos modelos SEM; confiabilidade_da_base
+  usa os itens de itens_construtos, não a matriz de prepare_sem_data, então
+  suas réplicas não coincidem com as de run_bootstrap_models
+- Variâncias residuais (θ) no limite zero (casos de Heywood) são avisadas:
+  inflam CR e AVE do construto
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bootstrap_sem import _ajustar_replica, _momentos_ponderados, intervalo_percentil, pesos_bootstrap
+from busca_especificacao import CONSTRUTOS, especificacao_canonica, itens_construtos
+from memoria_compartilhada import anexar_matriz, publicar_matriz
+from momentos_amostrais import calcular_momentos
+from motor_sem import ModeloSEM
+
+MEDIDAS_CONSTRUTO = ['alfa', 'omega', 'CR', 'AVE']
+
+# θ abaixo desta fração da variância implicada do item conta como no limite (Heywood)
+TOL_HEYWOOD = 1e-6
+
+
+def matriz_indicadora(itens, construtos):
+    """W (itens × construtos) com 1 onde o item mede o construto"""
+    posicao = {item: i for i, item in enumerate(itens)}
+    W = np.zeros((len(itens), len(construtos)))
+    for j, indicadores in enumerate(construtos.values()):
+        W[[posicao[i] for i in indicadores], j] = 1.0
+    return W
+
+
+def _medidas_classicas(S, W):
+    """α, α sem cada item, correlação item-total corrigida e HTMT de uma covariância"""
+    variancias = np.diag(S)
+    k = W.sum(axis=0)
+    SW = S @ W
+    total = (W * SW).sum(axis=0)
+    traco = variancias @ W
+    medida = W > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alfa = np.where(k > 1, k / (k - 1) * (1 - traco / total), np.nan)
+        total_sem = total - 2 * SW + variancias[:, None]
+        traco_sem = traco - variancias[:, None]
+        alfa_sem = np.where(medida & (k > 2), (k - 1) / (k - 2) * (1 - traco_sem / total_sem), np.nan)
+        item_total = np.where(medida & (k > 1), (SW - variancias[:, None]) / np.sqrt(variancias[:, None] * total_sem),
+                              np.nan)
+        dp = np.sqrt(variancias)
+        blocos = W.T @ np.abs(S / np.outer(dp, dp)) @ W
+        monotraco = (np.diag(blocos) - k) / (k * (k - 1))
+        htmt = blocos / np.outer(k, k) / np.sqrt(np.outer(monotraco, monotraco))
+    np.fill_diagonal(htmt, 1.0)
+    return {'alfa': alfa, 'alfa_sem': alfa_sem, 'item_total': item_total, 'htmt': htmt}
+
+
+def _medidas_fatoriais(modelo, construtos):
+    """ω, CR, AVE e correlações entre fatores do ajuste confirmatório, na ordem de construtos"""
+    m = len(construtos)
+    medidas = {'omega': np.full(m, np.nan), 'CR': np.full(m, np.nan), 'AVE': np.full(m, np.nan),
+               'correlacoes': np.full((m, m), np.nan)}
+    if modelo is None:
+        return medidas
+    nomes = list(construtos)
+    no_modelo = [j for j, c in enumerate(nomes) if c in modelo._idx_int]
+    latentes = [modelo._idx_int[nomes[j]] for j in no_modelo]
+    W = matriz_indicadora(modelo.vars['observed'], {nomes[j]: construtos[nomes[j]] for j in no_modelo})
+    sigma, _, _, mats = modelo._sigma(modelo.param_vals)
+    cargas = mats['lambda'][:, latentes] * W
+    psi = mats['psi'][np.ix_(latentes, latentes)]
+    variancia_fator = np.diag(psi)
+    # ω na métrica dos itens (escore somado); CR e AVE pelas cargas padronizadas
+    comum = cargas.sum(axis=0) ** 2 * variancia_fator
+    medidas['omega'][no_modelo] = comum / (comum + (W * (mats['theta'] @ W)).sum(axis=0))
+    padronizadas = cargas * np.sqrt(variancia_fator)[None, :] / np.sqrt(np.diag(sigma))[:, None]
+    soma = padronizadas.sum(axis=0) ** 2
+    medidas['CR'][no_modelo] = soma / (soma + (W * (1 - padronizadas ** 2)).sum(axis=0))
+    medidas['AVE'][no_modelo] = (padronizadas ** 2).sum(axis=0) / W.sum(axis=0)
+    dp = np.sqrt(variancia_fator)
+    medidas['correlacoes'][np.ix_(no_modelo, no_modelo)] = psi / np.outer(dp, dp)
+    return medidas
+
+
+def casos_heywood(modelo, construtos, tol=TOL_HEYWOOD):
+    """(item, construto) com variância residual θ no limite inferior zero"""
+    if modelo is None:
+        return []
+    sigma, _, _, mats = modelo._sigma(modelo.param_vals)
+    theta = np.diag(mats['theta'])
+    casos = []
+    for i, item in enumerate(modelo.vars['observed']):
+        if theta[i] <= tol * sigma[i, i]:
+            casos.extend((item, c) for c, indicadores in construtos.items() if item in indicadores)
+    return casos
+
+
+def _modelo_medida(construtos):
+    """ModeloSEM confirmatório dos construtos com pelo menos dois itens (None se não houver)"""
+    fatoriais = {c: itens for c, itens in construtos.items() if len(itens) >= 2}
+    return ModeloSEM(especificacao_canonica((), fatoriais)) if fatoriais else None
+
+
+def _vetor(medidas):
+    """Medidas por construto e triângulos superiores do HTMT e das correlações entre fatores, num vetor"""
+    superior = np.triu_indices(len(medidas['alfa']), k=1)
+    return np.concatenate([medidas[c] for c in MEDIDAS_CONSTRUTO] +
+                          [medidas['htmt'][superior], medidas['correlacoes'][superior]])
+
+
+def _rotulos(construtos):
+    """(medida, construto) de cada posição de _vetor"""
+    nomes = list(construtos)
+    pares = [f"{nomes[i]} × {nomes[j]}" for i, j in zip(*np.triu_indices(len(nomes), k=1))]
+    return ([(medida, c) for medida in MEDIDAS_CONSTRUTO for c in nomes] +
+            [('HTMT', par) for par in pares] + [('correlação fatorial', par) for par in pares])
+
+
+def _medir(momentos, construtos, fatorial):
+    """Medidas (arrays na ordem de construtos), itens, W e o modelo de medida ajustado"""
+    itens = list(dict.fromkeys(i for indicadores in construtos.values() for i in indicadores))
+    W = matriz_indicadora(itens, construtos)
+    medidas = _medidas_classicas(momentos.cov.loc[itens, itens].to_numpy(dtype=np.float64), W)
+    modelo = _modelo_medida(construtos) if fatorial else None
+    if modelo is not None:
+        resultado = modelo.fit(cov=momentos.cov, n_samples=momentos.n)
+        if not resultado.success:
+            print(f"⚠️ Ajuste da medida não convergiu ({resultado.message}): ω, CR e AVE podem não ser confiáveis")
+        heywood = casos_heywood(modelo, construtos)
+        if heywood:
+            print(f"⚠️ Caso de Heywood (θ = 0 no limite): {', '.join(f'{i} ({c})' for i, c in heywood)}; "
+                  f"CR e AVE desses construtos ficam inflados")
+    medidas.update(_medidas_fatoriais(modelo, construtos))
+    return medidas, itens, W, modelo
+
+
+def confiabilidade(momentos, construtos=None, fatorial=True):
+    """
+    Confiabilidade e validade discriminante de todos os construtos.
+
+    Args:
+        momentos: MomentosAmostrais com os itens dos construtos (ex.: calcular_momentos
+            ou momentos_da_base, em cache)
+        construtos: dict construto -> itens (padrão: busca_especificacao.CONSTRUTOS)
+        fatorial: Ajusta a medida para ω, CR, AVE e Fornell–Larcker (False: só as medidas fechadas)
+
+    Returns:
+        dict com 'construtos' (itens, α, ω, CR, AVE), 'itens' (α se excluído e
+        correlação item-total corrigida), 'htmt', 'fornell_larcker' (√AVE na
+        diagonal, correlações entre fatores fora dela), 'modelo' (ModeloSEM
+        ajustado ou None) e 'heywood' ((item, construto) com θ no limite zero)
+    """
+    construtos = CONSTRUTOS if construtos is None else construtos
+    medidas, itens, W, modelo = _medir(momentos, construtos, fatorial)
+    return _tabelas(medidas, construtos, itens, W) | {'modelo': modelo, 'heywood': casos_heywood(modelo, construtos)}
+
+
+def _tabelas(medidas, construtos, itens, W):
+    """DataFrames de confiabilidade a partir das medidas em arrays"""
+    nomes = list(construtos)
+    tabela = pd.DataFrame({'itens': W.sum(axis=0).astype(int)}, index=nomes)
+    for medida in MEDIDAS_CONSTRUTO:
+        tabela[medida] = medidas[medida]
+    linhas, colunas = np.nonzero(W)
+    por_item = pd.DataFrame({'construto': [nomes[j] for j in colunas], 'item': [itens[i] for i in linhas],
+                             'alfa se excluído': medidas['alfa_sem'][linhas, colunas],
+                             'item-total corrigida': medidas['item_total'][linhas, colunas]})
+    fornell_larcker = medidas['correlacoes'].copy()
+    np.fill_diagonal(fornell_larcker, np.sqrt(medidas['AVE']))
+    return {'construtos': tabela, 'itens': por_item,
+            'htmt': pd.DataFrame(medidas['htmt'], index=nomes, columns=nomes),
+            'fornell_larcker': pd.DataFrame(fornell_larcker, index=nomes, columns=nomes)}
+
+
+def _replicas_bloco(construtos, info_matriz, x0, sementes):
+    """Tarefa do pool: medidas das réplicas das sementes dadas"""
+    x = anexar_matriz(info_matriz)
+    n = x.shape[0]
+    itens = list(dict.fromkeys(i for indicadores in construtos.values() for i in indicadores))
+    W = matriz_indicadora(itens, construtos)
+    modelo = None if x0 is None else _modelo_medida(construtos)
+    replicas = np.full((len(sementes), len(_rotulos(construtos))), np.nan)
+    for r, semente in enumerate(sementes):
+        S = _momentos_ponderados(x, pesos_bootstrap(semente, n))
+        medidas = _medidas_classicas(S, W)
+        ajustado = None
+        if modelo is not None:
+            theta, _ = _ajustar_replica(modelo, pd.DataFrame(S, index=itens, columns=itens), n, x0, 'MLW')
+            ajustado = modelo if theta is not None else None
+        medidas.update(_medidas_fatoriais(ajustado, construtos))
+        replicas[r] = _vetor(medidas)
+    return replicas
+
+
+def bootstrap_confiabilidade(dados, construtos=None, n_replicas=1000, n_workers=1, semente=None, nivel=0.95,
+                             fatorial=True, tamanho_bloco=100):
+    """
+    Intervalos bootstrap das medidas de confiabilidade e validade.
+
+    Args:
+        dados: DataFrame numérico sem ausentes com os itens dos construtos
+        construtos: dict construto -> itens (padrão: busca_especificacao.CONSTRUTOS)
+        n_replicas: Número de réplicas
+        n_workers: Processos (1 = sequencial, None = todos os núcleos)
+        semente: Semente da SeedSequence (com a mesma de bootstrap_sem e a mesma matriz
+            de dados, as réplicas sorteiam os mesmos respondentes)
+        nivel: Nível de confiança dos intervalos percentis
+        fatorial: Inclui ω, CR, AVE e correlações entre fatores (um reajuste por réplica)
+        tamanho_bloco: Réplicas por tarefa do pool
+
+    Returns:
+        dict de confiabilidade() com 'medidas' (estimativa, erro padrão bootstrap
+        e limites percentis), 'replicas' e 'n_falhas'
+    """
+    construtos = CONSTRUTOS if construtos is None else construtos
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    itens = list(dict.fromkeys(i for indicadores in construtos.values() for i in indicadores))
+    x = np.ascontiguousarray(dados[itens].to_numpy(dtype=np.float64))
+    if np.isnan(x).any():
+        raise ValueError("O bootstrap exige dados sem ausentes (use prepare_sem_data antes)")
+    medidas, _, W, modelo = _medir(calcular_momentos(x, itens), construtos, fatorial)
+    x0 = None if modelo is None else modelo.param_vals.copy()
+    print(f"🔁 Bootstrap de confiabilidade: {n_replicas} réplicas, {len(construtos)} construtos, {len(x)} respondentes, "
+          f"{n_workers} processo(s)")
+
+    sementes = np.random.SeedSequence(semente).spawn(n_replicas)
+    blocos = [sementes[i:i + tamanho_bloco] for i in range(0, len(sementes), tamanho_bloco)]
+    with publicar_matriz(x) as info_matriz:
+        if n_workers <= 1 or len(blocos) <= 1:
+            partes = [_replicas_bloco(construtos, info_matriz, x0, bloco) for bloco in blocos]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(blocos))) as pool:
+                partes = list(pool.map(_replicas_bloco, *zip(*[(construtos, info_matriz, x0, b) for b in blocos])))
+    replicas = np.vstack(partes)
+    n_falhas = 0
+    if x0 is not None:
+        n_falhas = int(np.isnan(replicas[:, len(construtos):2 * len(construtos)]).all(axis=1).sum())
+        if n_falhas:
+            print(f"⚠️ {n_falhas} réplicas sem ajuste da medida: ω, CR, AVE e correlações descartados nelas")
+
+    tabela = pd.DataFrame(_rotulos(construtos), columns=['medida', 'construto'])
+    tabela['Estimate'] = _vetor(medidas)
+    with np.errstate(invalid='ignore'):
+        tabela['Boot SE'] = np.nanstd(replicas, axis=0, ddof=1)
+        tabela[['Perc. inf', 'Perc. sup']] = intervalo_percentil(replicas, nivel).T
+    return _tabelas(medidas, construtos, itens, W) | {'modelo': modelo, 'heywood': casos_heywood(modelo, construtos),
+                                                      'medidas': tabela, 'replicas': replicas, 'n_falhas': n_falhas}
+
+
+def confiabilidade_da_base(base, construtos=None, n_bootstrap=0, n_workers=1, semente=None, fatorial=True):
+    """
+    Confiabilidade dos construtos na base de respondentes (itens de
+    itens_construtos, ausentes pela média, como em busca_da_base). Essa matriz
+    não é a de prepare_sem_data: mesmo com a semente de run_bootstrap_models, as
+    réplicas bootstrap daqui reamostram outras linhas.
+
+    Args:
+        base: BaseRespondentes (modo='codificado')
+        n_bootstrap: Réplicas bootstrap (0 = só as estimativas pontuais)
+    """
+    itens = itens_construtos(base, construtos)
+    if n_bootstrap > 0:
+        return bootstrap_confiabilidade(itens.fillna(itens.mean()), construtos, n_replicas=n_bootstrap,
+                                        n_workers=n_workers, semente=semente, fatorial=fatorial)
+    return confiabilidade(calcular_momentos(itens), construtos, fatorial)
@@ -14,6 +14,7 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 from factor_analyzer import FactorAnalyzer
 import warnings
+from cache_dados import carregar_tabela
 warnings.filterwarnings('ignore')
 
 # Configuração de visualização
@@ -43,7 +44,7 @@ def carregar_dados():
     for arquivo in arquivos:
         nome = arquivo.replace('.csv', '').replace(' ', '_')
         try:
-            df = pd.read_csv(f'csv_extraidos/{arquivo}')
+            df = carregar_tabela(f'csv_extraidos/{arquivo}')
             datasets[nome] = df
             print(f"✅ {arquivo}: {df.shape[0]} registros, {df.shape[1]} variáveis")
             # Limpar nomes das colunas
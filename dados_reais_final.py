@@ -1,12 +1,13 @@
 import pandas as pd
 import numpy as np
+from cache_dados import carregar_tabela
 
 # Carregar dados
-perfil = pd.read_csv('csv_extraidos/Perfil Socioeconomico.csv')
-qualidade = pd.read_csv('csv_extraidos/Qualidade do serviço.csv')
-percepcao = pd.read_csv('csv_extraidos/Percepção novos serviços.csv')
-intencao = pd.read_csv('csv_extraidos/Intenção comportamental.csv')
-utilizacao = pd.read_csv('csv_extraidos/Utilização.csv')
+perfil = carregar_tabela('csv_extraidos/Perfil Socioeconomico.csv')
+qualidade = carregar_tabela('csv_extraidos/Qualidade do serviço.csv')
+percepcao = carregar_tabela('csv_extraidos/Percepção novos serviços.csv')
+intencao = carregar_tabela('csv_extraidos/Intenção comportamental.csv')
+utilizacao = carregar_tabela('csv_extraidos/Utilização.csv')
 
 print('=== DADOS REAIS PARA CORREÇÃO DO RELATÓRIO ===')
 print(f'Total: {len(perfil)} respondentes')
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ÍNDICES DE AJUSTE EXATOS
+========================
+
+χ², CFI, TLI, RMSEA (com intervalo de confiança), SRMR, AIC e BIC
+calculados diretamente das covariâncias amostral (S) e implícita (Σ):
+- Todos os modelos são avaliados numa única passagem vetorizada: S e Σ de
+  cada modelo são completadas com blocos identidade até o maior número de
+  observadas (o que não altera F_ML nem F_GLS) e empilhadas para os
+  slogdet/solve em lote
+- O modelo de base (observadas independentes) tem solução fechada e fica
+  em memória por conjunto de dados (hash de S, n e objetivo)
+- Limites do RMSEA pela inversão do χ² não central (bissecção vetorizada)
+- AIC e BIC pela log-verossimilhança normal, com as médias saturadas
+
+χ², CFI, TLI e RMSEA seguem as fórmulas de motor_sem.indices_ajuste
+(as do semopy.calc_stats), de modo que as tabelas coincidem com os ajustes.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2 as chi2_dist, ncx2
+
+INDICES_EXATOS = ['chi2', 'DoF', 'chi2 p-value', 'chi2 Baseline', 'DoF Baseline', 'CFI', 'TLI', 'RMSEA',
+                  'RMSEA inf', 'RMSEA sup', 'SRMR', 'AIC', 'BIC', 'LogLik']
+
+# Memo em processo: hash (S, n, objetivo) -> (χ² da base, gl da base)
+_bases = {}
+
+
+def _completar(matrizes, dimensao):
+    """Pilha m × d × d com cada matriz no canto superior e identidade no restante"""
+    pilha = np.tile(np.identity(dimensao), (len(matrizes), 1, 1))
+    for i, matriz in enumerate(matrizes):
+        p = len(matriz)
+        pilha[i, :p, :p] = matriz
+    return pilha
+
+
+def _objetivo_base(S, obj):
+    """Objetivo mínimo com Σ diagonal: diag(S) no MLW e o mínimo quadrático do GLS (como em ModeloSEM)"""
+    if obj == 'MLW':
+        return float(np.log(np.diag(S)).sum() - np.linalg.slogdet(S)[1])
+    inv = np.linalg.inv(S)
+    d = np.maximum(np.linalg.solve(inv * inv, np.diag(inv)), 0.0)
+    t = d[:, None] * inv - np.identity(len(inv))
+    return float(np.einsum('ij,ji->', t, t))
+
+
+def estatisticas_base(S, n, obj='MLW'):
+    """(χ², gl) do modelo de base de uma covariância amostral, em memória por conjunto de dados"""
+    S = np.ascontiguousarray(S, dtype=np.float64)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(S.tobytes())
+    h.update(f"{S.shape}|{n}|{obj}".encode('utf-8'))
+    chave = h.hexdigest()
+    if chave not in _bases:
+        p = len(S)
+        _bases[chave] = (float(n * _objetivo_base(S, obj)), p * (p + 1) // 2 - p)
+    return _bases[chave]
+
+
+def intervalo_rmsea(chi2, dof, n, nivel=0.90, iteracoes=60):
+    """
+    Limites do RMSEA: λ tal que F(χ²; gl, λ) = 1 − α/2 e α/2 na distribuição
+    χ² não central, convertidos por √(λ / (gl (n − 1))); λ = 0 quando o
+    próprio χ² central já fica abaixo do alvo. Vetorizado sobre os modelos.
+
+    Returns:
+        (limites inferiores, limites superiores)
+    """
+    chi2, dof, n = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in (chi2, dof, n)))
+    validos = (dof > 0) & np.isfinite(chi2)
+    gl = np.where(validos, dof, 1.0)
+    estatistica = np.where(validos, np.maximum(chi2, 0.0), 0.0)
+    alfa = (1 - nivel) / 2
+    limites = []
+    for alvo in (1 - alfa, alfa):
+        # F(χ²; gl, λ) decresce em λ; o topo deixa χ² muitos desvios abaixo da média gl + λ
+        baixo = np.zeros_like(estatistica)
+        alto = estatistica + 20 * np.sqrt(estatistica + gl) + 100
+        for _ in range(iteracoes):
+            meio = (baixo + alto) / 2
+            acima = ncx2.cdf(estatistica, gl, meio) > alvo
+            baixo = np.where(acima, meio, baixo)
+            alto = np.where(acima, alto, meio)
+        lam = np.where(chi2_dist.cdf(estatistica, gl) < alvo, 0.0, (baixo + alto) / 2)
+        limites.append(np.where(validos, np.sqrt(lam / (gl * (n - 1))), np.where(dof == 0, 0.0, np.nan)))
+    return limites[0], limites[1]
+
+
+def indices_exatos(S, sigma, n, n_parametros, obj='MLW', nivel=0.90, nomes=None):
+    """
+    Índices de ajuste de vários modelos numa única passagem.
+
+    Args:
+        S: Covariâncias amostrais (divisor n), uma por modelo
+        sigma: Covariâncias implícitas, na mesma ordem e dimensão de S
+        n: Tamanho da amostra (escalar ou um por modelo)
+        n_parametros: Parâmetros livres de cada modelo
+        obj: Discrepância do χ² ('MLW' ou 'GLS')
+        nivel: Nível de confiança do intervalo do RMSEA
+        nomes: Índice das linhas (padrão 0..m-1)
+
+    Returns:
+        DataFrame com uma linha por modelo e as colunas de INDICES_EXATOS
+    """
+    if obj not in ('MLW', 'GLS'):
+        raise ValueError(f"Objetivo sem índices exatos por covariância: {obj!r} (use 'MLW' ou 'GLS')")
+    S = [np.asarray(s, dtype=np.float64) for s in S]
+    sigma = [np.asarray(s, dtype=np.float64) for s in sigma]
+    m = len(S)
+    p = np.array([len(s) for s in S], dtype=np.float64)
+    dimensao = int(p.max())
+    n = np.broadcast_to(np.asarray(n, dtype=np.float64), (m,))
+    k = np.broadcast_to(np.asarray(n_parametros, dtype=np.float64), (m,))
+
+    pilha_s, pilha_sigma = _completar(S, dimensao), _completar(sigma, dimensao)
+    _, logdet_s = np.linalg.slogdet(pilha_s)
+    sinal, logdet_sigma = np.linalg.slogdet(pilha_sigma)
+    # Traço de Σ⁻¹S sem os blocos identidade do preenchimento
+    traco = np.trace(np.linalg.solve(pilha_sigma, pilha_s), axis1=1, axis2=2) - (dimensao - p)
+    if obj == 'MLW':
+        discrepancia = np.where(sinal > 0, logdet_sigma + traco - logdet_s - p, np.nan)
+    else:
+        t = pilha_sigma @ np.linalg.inv(pilha_s) - np.identity(dimensao)
+        discrepancia = np.einsum('mij,mji->m', t, t)
+    chi2 = n * discrepancia
+    dof = p * (p + 1) / 2 - k
+    base = np.array([estatisticas_base(s, ni, obj) for s, ni in zip(S, n)])
+    chi2_base, dof_base = base[:, 0], base[:, 1]
+
+    com_gl = dof > 0
+    gl = np.where(com_gl, dof, 1.0)
+    cfi = 1 - (chi2 - dof) / (chi2_base - dof_base)
+    tli = np.where(com_gl & (dof_base > 0), (chi2_base / dof_base - chi2 / gl) / (chi2_base / dof_base - 1), np.nan)
+    rmsea = np.where(com_gl, np.sqrt(np.maximum(chi2 / gl - 1, 0.0) / (n - 1)), np.where(dof == 0, 0.0, np.nan))
+    rmsea_inf, rmsea_sup = intervalo_rmsea(chi2, dof, n, nivel)
+
+    # SRMR: resíduos padronizados pelos desvios amostrais, sobre os p(p+1)/2 momentos distintos
+    desvios = np.sqrt(np.diagonal(pilha_s, axis1=1, axis2=2))
+    residuos = (pilha_s - pilha_sigma) / (desvios[:, :, None] * desvios[:, None, :])
+    superior = np.triu(np.ones((dimensao, dimensao), dtype=bool))
+    srmr = np.sqrt((residuos ** 2 * superior).sum(axis=(1, 2)) / (p * (p + 1) / 2))
+
+    log_verossimilhanca = -n / 2 * (p * np.log(2 * np.pi) + logdet_sigma + traco)
+    return pd.DataFrame({
+        'chi2': chi2, 'DoF': dof, 'chi2 p-value': np.where(com_gl, chi2_dist.sf(chi2, gl), np.nan),
+        'chi2 Baseline': chi2_base, 'DoF Baseline': dof_base, 'CFI': cfi, 'TLI': tli, 'RMSEA': rmsea,
+        'RMSEA inf': rmsea_inf, 'RMSEA sup': rmsea_sup, 'SRMR': srmr,
+        'AIC': -2 * log_verossimilhanca + 2 * k, 'BIC': -2 * log_verossimilhanca + k * np.log(n),
+        'LogLik': log_verossimilhanca,
+    }, index=list(range(m)) if nomes is None else list(nomes))[INDICES_EXATOS]
+
+
+def indices_dos_modelos(modelos, obj='MLW', nivel=0.90):
+    """
+    Índices exatos de modelos já ajustados (semopy.Model ou motor_sem.ModeloSEM),
+    lidos de mx_cov, calc_sigma(), n_samples e param_vals.
+
+    Args:
+        modelos: dict nome -> modelo ajustado
+
+    Returns:
+        DataFrame indexado pelos nomes
+    """
+    nomes = list(modelos)
+    return indices_exatos([modelos[m].mx_cov for m in nomes], [modelos[m].calc_sigma()[0] for m in nomes],
+                          [modelos[m].n_samples for m in nomes], [len(modelos[m].param_vals) for m in nomes],
+                          obj=obj, nivel=nivel, nomes=nomes)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FIML POR PADRÃO DE AUSÊNCIA
+===========================
+
+Máxima verossimilhança com informação completa para dados com ausentes:
+cada respondente contribui com a verossimilhança normal das variáveis que
+respondeu, sem imputação e sem descartar linhas.
+- Respondentes com a mesma máscara de ausência (bits das variáveis
+  observadas) compartilham a submatriz Σ_oo; os dados são resumidos uma
+  vez em (n, média, covariância) por padrão, então o custo por iteração
+  depende do número de padrões, não de N
+- A cada avaliação Σ é fatorada uma vez; Σ_oo⁻¹ e log|Σ_oo| de cada padrão
+  saem do complemento de Schur de Σ⁻¹, fatorando só o bloco (pequeno) das
+  variáveis ausentes
+- As fatorações ficam no estado do Fisher scoring: gradiente e informação
+  da iteração reutilizam as da avaliação aceita na busca linear
+- O modelo saturado (EM sobre os mesmos padrões) dá a partida e a
+  referência do qui-quadrado; o de base (variáveis independentes) tem
+  solução fechada
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import cho_solve
+from scipy.stats import norm
+
+from momentos_amostrais import MomentosAmostrais
+from motor_sem import ModeloSEM, ResultadoAjuste, fisher_scoring, indices_ajuste
+
+
+def padroes_ausencia(x):
+    """
+    Agrupa as linhas de x (NaN = ausente) pela máscara de variáveis observadas.
+
+    Returns:
+        Lista de dicts por padrão: 'observadas' e 'ausentes' (índices das
+        colunas), 'linhas', 'n', 'media' e 'cov' (divisor n) das observadas.
+        Linhas sem nenhuma resposta ficam de fora.
+    """
+    presente = ~np.isnan(x)
+    mascaras = np.ascontiguousarray(np.packbits(presente, axis=1))
+    _, inverso = np.unique(mascaras.view(np.dtype((np.void, mascaras.shape[1]))).ravel(), return_inverse=True)
+    ordem = np.argsort(inverso, kind='stable')
+    padroes = []
+    for linhas in np.split(ordem, np.cumsum(np.bincount(inverso))[:-1]):
+        observadas = np.flatnonzero(presente[linhas[0]])
+        if not len(observadas):
+            continue
+        xo = x[np.ix_(linhas, observadas)]
+        media = xo.mean(axis=0)
+        centrado = xo - media
+        padroes.append({'observadas': observadas, 'ausentes': np.flatnonzero(~presente[linhas[0]]), 'linhas': linhas,
+                        'n': len(linhas), 'media': media, 'cov': centrado.T @ centrado / len(linhas)})
+    return padroes
+
+
+def _fatorar(sigma, padroes):
+    """
+    (Σ_oo⁻¹, log|Σ_oo|) de cada padrão a partir de uma única fatoração de Σ:
+    Σ_oo⁻¹ = K_oo − K_om K_mm⁻¹ K_mo e |Σ_oo| = |Σ|·|K_mm|, com K = Σ⁻¹.
+    Levanta LinAlgError se Σ não for positiva definida.
+    """
+    chol = np.linalg.cholesky(sigma)
+    k = cho_solve((chol, True), np.identity(len(sigma)))
+    logdet = 2.0 * np.log(np.diag(chol)).sum()
+    fatores = []
+    for padrao in padroes:
+        o, m = padrao['observadas'], padrao['ausentes']
+        if not len(m):
+            fatores.append((k, logdet))
+            continue
+        chol_m = np.linalg.cholesky(k[np.ix_(m, m)])
+        k_mo = k[np.ix_(m, o)]
+        fatores.append((k[np.ix_(o, o)] - k_mo.T @ cho_solve((chol_m, True), k_mo),
+                        logdet + 2.0 * np.log(np.diag(chol_m)).sum()))
+    return fatores
+
+
+def _objetivo_fiml(padroes, n_total, mu, fatores):
+    """
+    F = Σ_g (n_g/N)[log|Σ_oo| + tr(Σ_oo⁻¹ T_g)], T_g = S_g + (x̄_g − μ_o)(x̄_g − μ_o)ᵀ
+    (−2 log L / N sem a constante); devolve também (d, T) de cada padrão.
+    """
+    valor, termos = 0.0, []
+    for padrao, (k_oo, logdet) in zip(padroes, fatores):
+        d = padrao['media'] - mu[padrao['observadas']]
+        t = padrao['cov'] + np.outer(d, d)
+        valor += padrao['n'] / n_total * (logdet + np.einsum('ij,ji->', k_oo, t))
+        termos.append((d, t))
+    return valor, termos
+
+
+def momentos_em(padroes, p, max_iter=1000, tol=1e-10):
+    """
+    μ e Σ saturados de máxima verossimilhança com ausentes, por EM sobre os
+    padrões (o passo E usa só as estatísticas suficientes de cada padrão).
+
+    Returns:
+        (μ, Σ, iterações)
+    """
+    n_total = sum(padrao['n'] for padrao in padroes)
+    soma, contagem = np.zeros(p), np.zeros(p)
+    for padrao in padroes:
+        soma[padrao['observadas']] += padrao['n'] * padrao['media']
+        contagem[padrao['observadas']] += padrao['n']
+    mu = soma / np.maximum(contagem, 1)
+    quadrados = np.zeros(p)
+    for padrao in padroes:
+        d = padrao['media'] - mu[padrao['observadas']]
+        quadrados[padrao['observadas']] += padrao['n'] * (np.diag(padrao['cov']) + d * d)
+    sigma = np.diag(quadrados / np.maximum(contagem, 1))
+
+    for iteracao in range(1, max_iter + 1):
+        soma, produtos = np.zeros(p), np.zeros((p, p))
+        for padrao in padroes:
+            o, m, n = padrao['observadas'], padrao['ausentes'], padrao['n']
+            s_o = n * padrao['media']
+            s_oo = n * (padrao['cov'] + np.outer(padrao['media'], padrao['media']))
+            soma[o] += s_o
+            produtos[np.ix_(o, o)] += s_oo
+            if not len(m):
+                continue
+            # E[x_m | x_o] = c + B x_o, Var[x_m | x_o] = Σ_mm − B Σ_om
+            b = np.linalg.solve(sigma[np.ix_(o, o)], sigma[np.ix_(o, m)]).T
+            c = mu[m] - b @ mu[o]
+            condicional = sigma[np.ix_(m, m)] - b @ sigma[np.ix_(o, m)]
+            b_s = b @ s_o
+            soma[m] += n * c + b_s
+            cruzado = np.outer(c, s_o) + b @ s_oo
+            produtos[np.ix_(m, o)] += cruzado
+            produtos[np.ix_(o, m)] += cruzado.T
+            produtos[np.ix_(m, m)] += n * (condicional + np.outer(c, c)) + np.outer(c, b_s) + np.outer(b_s, c) \
+                + b @ s_oo @ b.T
+        mu_novo = soma / n_total
+        sigma_novo = produtos / n_total - np.outer(mu_novo, mu_novo)
+        variacao = max(np.abs(mu_novo - mu).max(), np.abs(sigma_novo - sigma).max())
+        mu, sigma = mu_novo, sigma_novo
+        if variacao < tol:
+            break
+    return mu, sigma, iteracao
+
+
+def imputar_condicional(dados):
+    """
+    Preenche os ausentes pela esperança condicional E[x_m | x_o] sob os
+    momentos saturados do EM (um sistema linear por padrão de ausência).
+    Para etapas que exigem matriz completa (análise fatorial, regressões),
+    no lugar da mediana ou da remoção de linhas.
+    """
+    x = dados.to_numpy(dtype=np.float64).copy()
+    padroes = padroes_ausencia(x)
+    mu, sigma, _ = momentos_em(padroes, x.shape[1])
+    for padrao in padroes:
+        o, m, linhas = padrao['observadas'], padrao['ausentes'], padrao['linhas']
+        if len(m):
+            b = np.linalg.solve(sigma[np.ix_(o, o)], sigma[np.ix_(o, m)])
+            x[np.ix_(linhas, m)] = mu[m] + (x[np.ix_(linhas, o)] - mu[o]) @ b
+    return pd.DataFrame(x, index=dados.index, columns=dados.columns)
+
+
+class ModeloFIML:
+    """
+    Modelo SEM com interceptos saturados (μ = ν, médias latentes 0) ajustado
+    por FIML. Interface como ModeloSEM: fit(), inspect(), calc_se(),
+    calc_indices(), param_vals (θ do modelo seguido de ν) e n_samples.
+    """
+
+    def __init__(self, descricao):
+        self.descricao = descricao
+        self.modelo = ModeloSEM(descricao)
+        self.vars = self.modelo.vars
+        p = len(self.vars['observed'])
+        self.n_parametros = self.modelo.n_parametros + p
+        self._limites = np.concatenate([self.modelo._limites, np.full(p, -np.inf)])
+        self.n_samples = None
+
+    def load(self, dados):
+        """Padrões de ausência das observadas e momentos saturados (EM)"""
+        obs = self.vars['observed']
+        x = np.asarray(dados[obs], dtype=np.float64)
+        self.padroes = padroes_ausencia(x)
+        self.n_samples = sum(padrao['n'] for padrao in self.padroes)
+        self.media_saturada, self.cov_saturada, _ = momentos_em(self.padroes, len(obs))
+        fatores = _fatorar(self.cov_saturada, self.padroes)
+        self.fun_saturada, _ = _objetivo_fiml(self.padroes, self.n_samples, self.media_saturada, fatores)
+        # (Co)variâncias fixas de observadas exógenas vêm do Σ saturado
+        self.modelo.load(cov=self.cov_saturada, n_samples=self.n_samples)
+
+    def momentos_saturados(self):
+        """μ e Σ do EM como MomentosAmostrais (para carregar o ajuste no semopy)"""
+        obs = self.vars['observed']
+        return MomentosAmostrais(self.n_samples, pd.Series(self.media_saturada, index=obs),
+                                 pd.DataFrame(self.cov_saturada, index=obs, columns=obs))
+
+    def _avaliar(self, theta):
+        """F em θ e o estado (fatorações por padrão) reutilizado pelas derivadas"""
+        k = self.modelo.n_parametros
+        try:
+            sigma, m, c, mats = self.modelo._sigma(theta[:k])
+            fatores = _fatorar(sigma, self.padroes)
+        except np.linalg.LinAlgError:
+            return np.inf, None
+        valor, termos = _objetivo_fiml(self.padroes, self.n_samples, theta[k:], fatores)
+        return valor, (m, c, mats, fatores, termos)
+
+    def _derivadas(self, estado):
+        """
+        Gradiente e informação esperada somados pelos padrões: cada padrão usa
+        as linhas observadas de ∂Σ/∂θ com W = Σ_oo⁻¹ − Σ_oo⁻¹T Σ_oo⁻¹ e V = Σ_oo⁻¹;
+        os interceptos têm gradiente −2Σ_oo⁻¹d e informação 2Σ_oo⁻¹.
+        """
+        m, c, mats, fatores, termos = estado
+        a, b, h = self.modelo._vetores_derivada(m, c, mats['psi'])
+        k = self.modelo.n_parametros
+        grad = np.zeros(self.n_parametros)
+        info = np.zeros((self.n_parametros, self.n_parametros))
+        for padrao, (k_oo, _), (d, t) in zip(self.padroes, fatores, termos):
+            o = padrao['observadas']
+            peso = padrao['n'] / self.n_samples
+            w = k_oo - k_oo @ t @ k_oo
+            g_padrao, info_padrao = self.modelo._gradiente_informacao(a[o], b[o], h, w, k_oo)
+            grad[:k] += peso * g_padrao
+            info[:k, :k] += peso * info_padrao
+            grad[k + o] -= 2.0 * peso * k_oo @ d
+            info[np.ix_(k + o, k + o)] += 2.0 * peso * k_oo
+        return grad, info
+
+    def fit(self, dados, x0=None, max_iter=500, tol=1e-9):
+        """
+        Ajusta o modelo por FIML.
+
+        Args:
+            dados: DataFrame com as observadas do modelo (NaN = ausente)
+            x0: Vetor inicial (θ seguido de ν); padrão: ajuste ML aos momentos do EM
+            max_iter: Máximo de iterações do Fisher scoring
+            tol: Tolerância do gradiente projetado
+
+        Returns:
+            ResultadoAjuste (fun = F − F do modelo saturado, então chi2 = n·fun)
+        """
+        self.load(dados)
+        if x0 is None:
+            self.modelo.fit(cov=self.cov_saturada, n_samples=self.n_samples)
+            x0 = np.concatenate([self.modelo.param_vals, self.media_saturada])
+        theta, valor, sucesso, iteracoes, mensagem = fisher_scoring(
+            self._avaliar, self._derivadas, np.array(x0, dtype=np.float64), self._limites, max_iter, tol)
+        self.param_vals = theta
+        k = self.modelo.n_parametros
+        self.modelo.param_vals = theta[:k]
+        self.modelo.last_result = ResultadoAjuste(theta[:k], valor - self.fun_saturada, sucesso, iteracoes, mensagem,
+                                                  'MLW')
+        self.last_result = ResultadoAjuste(theta, valor - self.fun_saturada, sucesso, iteracoes, mensagem, 'FIML')
+        return self.last_result
+
+    @property
+    def interceptos(self):
+        """ν estimado (média implícita de cada observada)"""
+        return pd.Series(self.param_vals[self.modelo.n_parametros:], index=self.vars['observed'])
+
+    def calc_fim(self, inverse=False):
+        """
+        Informação observada (n/2)·∂²F por diferenças centrais do gradiente
+        analítico, como é usual no FIML (a esperada subestima os erros sob MAR).
+        Usa a informação esperada se um passo sair da região admissível.
+        """
+        theta = self.param_vals
+        _, estado = self._avaliar(theta)
+        grad, esperada = self._derivadas(estado)
+        hessiana = np.empty_like(esperada)
+        for j in range(len(theta)):
+            passo = 1e-5 * max(1.0, abs(theta[j]))
+            desvio = np.zeros_like(theta)
+            desvio[j] = passo
+            _, acima = self._avaliar(theta + desvio)
+            _, abaixo = self._avaliar(theta - desvio)
+            if acima is None or abaixo is None:
+                hessiana = esperada
+                break
+            hessiana[:, j] = (self._derivadas(acima)[0] - self._derivadas(abaixo)[0]) / (2 * passo)
+        fim = self.n_samples / 2 * (hessiana + hessiana.T) / 2
+        if not inverse:
+            return fim
+        try:
+            fim_inv = np.linalg.inv(fim)
+        except np.linalg.LinAlgError:
+            fim_inv = np.linalg.pinv(fim)
+        return fim, fim_inv
+
+    def calc_se(self):
+        """Erros padrão pela informação observada"""
+        _, fim_inv = self.calc_fim(inverse=True)
+        return np.sqrt(np.abs(np.diag(fim_inv)))
+
+    def dof(self):
+        """Graus de liberdade: os interceptos saturados não alteram os da estrutura de covariância"""
+        return self.modelo.dof()
+
+    def objetivo_base(self):
+        """F do modelo de base: variáveis independentes, média e variância de cada uma pelos casos observados"""
+        p = len(self.vars['observed'])
+        soma, contagem, quadrados = np.zeros(p), np.zeros(p), np.zeros(p)
+        for padrao in self.padroes:
+            soma[padrao['observadas']] += padrao['n'] * padrao['media']
+            contagem[padrao['observadas']] += padrao['n']
+        media = soma / contagem
+        for padrao in self.padroes:
+            d = padrao['media'] - media[padrao['observadas']]
+            quadrados[padrao['observadas']] += padrao['n'] * (np.diag(padrao['cov']) + d * d)
+        fatores = _fatorar(np.diag(quadrados / contagem), self.padroes)
+        return _objetivo_fiml(self.padroes, self.n_samples, media, fatores)[0]
+
+    def log_verossimilhanca(self):
+        """log L no ajuste (com a constante da normal)"""
+        constante = sum(padrao['n'] * len(padrao['observadas']) for padrao in self.padroes) * np.log(2 * np.pi)
+        return float(-(self.n_samples * (self.last_result.fun + self.fun_saturada) + constante) / 2)
+
+    def calc_indices(self):
+        """chi2 (razão de verossimilhanças contra o saturado), DoF, CFI, TLI e RMSEA"""
+        n = self.n_samples
+        p = len(self.vars['observed'])
+        chi2_base = n * (self.objetivo_base() - self.fun_saturada)
+        indices = indices_ajuste(n * self.last_result.fun, self.dof(), chi2_base, p * (p + 1) // 2 - p, n)
+        indices['Padrões'] = len(self.padroes)
+        return indices
+
+    def inspect(self, std_est=False):
+        """Tabela do ModeloSEM.inspect() com erros do FIML e os interceptos (op '~1')"""
+        se = self.calc_se()
+        k = self.modelo.n_parametros
+        tabela = self.modelo.inspect(std_est=std_est, erros=se[:k])
+        z = self.param_vals[k:] / se[k:]
+        linhas = pd.DataFrame({'lval': self.vars['observed'], 'op': '~1', 'rval': '',
+                               'Estimate': self.param_vals[k:], 'Std. Err': se[k:], 'z-value': z,
+                               'p-value': 2 * (1 - norm.cdf(np.abs(z)))})
+        if std_est:
+            linhas.insert(4, 'Est. Std', np.nan)
+        return pd.concat([tabela, linhas], ignore_index=True)
+
+
+def ajustar_fiml(descricao, dados, x0=None):
+    """Ajusta uma especificação SEM por FIML aos dados com ausentes; devolve o ModeloFIML"""
+    modelo = ModeloFIML(descricao)
+    faltantes = [v for v in modelo.vars['observed'] if v not in dados.columns]
+    if faltantes:
+        raise KeyError(f"Variáveis do modelo ausentes nos dados: {faltantes}")
+    modelo.fit(dados, x0=x0)
+    print(f"🧩 FIML: {modelo.n_samples} respondentes em {len(modelo.padroes)} padrões de ausência")
+    return modelo
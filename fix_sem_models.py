@@ -4,14 +4,20 @@ import os
 import matplotlib.pyplot as plt
 import seaborn as sns
 import networkx as nx
+from importlib import metadata
 from factor_analyzer import FactorAnalyzer
 from factor_analyzer.factor_analyzer import calculate_bartlett_sphericity, calculate_kmo
+import sklearn
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import FactorAnalysis
 from sklearn.metrics import mean_squared_error
 from scipy import stats
-from scipy.stats import chi2
 import warnings
+from cache_dados import carregar_tabela
+from cache_resultados import resultado_em_cache
+from estatisticas_ajuste import indices_exatos
+from codec_likert import decodificar_coluna, identificar_escala, para_float
+from policorica import matriz_correlacao
 warnings.filterwarnings('ignore')
 
 # Configuração para gráficos
@@ -22,11 +28,19 @@ plt.rcParams['font.size'] = 11
 
 # Diretório para salvar resultados
 diretorio_saida = "resultados_sem_fixed"
+
+# Correlação entre itens Likert: 'pearson' ou 'policorica' (itens tratados como ordinais)
+CORRELACAO_ITENS = os.environ.get('CORRELACAO_ITENS', 'pearson')
+# Ausentes nos itens: 'mediana' ou 'fiml' (esperança condicional sob os momentos de máxima verossimilhança do EM)
+AUSENTES_ITENS = os.environ.get('AUSENTES_ITENS', 'mediana')
 if not os.path.exists(diretorio_saida):
     os.makedirs(diretorio_saida)
 
-def calcular_alpha_cronbach(dados_df):
-    """Calcula o Alpha de Cronbach de forma robusta"""
+def calcular_alpha_cronbach(dados_df, correlacao=None, corr_matrix=None):
+    """
+    Calcula o Alpha de Cronbach de forma robusta (alfa ordinal com correlacao='policorica').
+    corr_matrix (correlações já calculadas dos itens, com sinal) evita recalcular a matriz.
+    """
     try:
         # Remover valores ausentes
         dados_clean = dados_df.dropna()
@@ -35,27 +49,21 @@ def calcular_alpha_cronbach(dados_df):
             return np.nan, "Dados insuficientes"
         
         # Calcular correlações entre itens
-        corr_matrix = dados_clean.corr()
+        if corr_matrix is None:
+            corr_matrix = matriz_correlacao(dados_clean, correlacao or CORRELACAO_ITENS)
         
         # Número de itens
         k = len(dados_clean.columns)
         
-        # Soma das correlações entre todos os pares de itens
-        soma_correlacoes = 0
-        count_correlacoes = 0
-        
-        for i in range(k):
-            for j in range(i + 1, k):
-                corr_ij = corr_matrix.iloc[i, j]
-                if not np.isnan(corr_ij):
-                    soma_correlacoes += corr_ij
-                    count_correlacoes += 1
+        # Correlações de todos os pares de itens (triângulo superior)
+        pares = corr_matrix.loc[dados_clean.columns, dados_clean.columns].to_numpy()[np.triu_indices(k, k=1)]
+        pares = pares[~np.isnan(pares)]
         
-        if count_correlacoes == 0:
+        if len(pares) == 0:
             return np.nan, "Correlações não calculáveis"
         
         # Média das correlações entre itens
-        media_correlacoes = soma_correlacoes / count_correlacoes
+        media_correlacoes = pares.mean()
         
         # Fórmula do Alpha de Cronbach
         alpha = (k * media_correlacoes) / (1 + (k - 1) * media_correlacoes)
@@ -96,7 +104,7 @@ def carregar_dados_para_sem():
     for nome_modelo, arquivo in arquivos_modelos.items():
         if os.path.exists(arquivo):
             try:
-                df = pd.read_csv(arquivo, encoding='utf-8')
+                df = carregar_tabela(arquivo)
                 print(f"✅ {nome_modelo}: {df.shape[0]} linhas, {df.shape[1]} colunas")
                 dados_por_modelo[nome_modelo] = df
             except Exception as e:
@@ -110,32 +118,9 @@ def converter_likert_verbal_para_numerico(df):
     """Converte escalas Likert verbais para numéricas"""
     print("🔄 Convertendo escalas Likert verbais para numéricas...")
     
-    # Mapeamento padrão para escalas Likert de satisfação
-    mapeamento_satisfacao = {
-        'Muito insatisfeito': 1,
-        'Insatisfeito': 2,
-        'Neutro': 3,
-        'Satisfeito': 4,
-        'Muito satisfeito': 5
-    }
-    
-    # Mapeamento para escalas de concordância
-    mapeamento_concordancia = {
-        'Discordo totalmente': 1,
-        'Discordo': 2,
-        'Neutro': 3,
-        'Concordo': 4,
-        'Concordo totalmente': 5
-    }
-    
-    # Mapeamento para escalas de frequência
-    mapeamento_frequencia = {
-        'Nunca': 1,
-        'Raramente': 2,
-        'Às vezes': 3,
-        'Frequentemente': 4,
-        'Sempre': 5
-    }
+    # Escalas candidatas; cada coluna usa a que reconhece mais rótulos distintos
+    escalas_candidatas = ['satisfacao', 'concordancia', 'frequencia']
+    nomes_escalas = {'satisfacao': 'satisfação', 'concordancia': 'concordância', 'frequencia': 'frequência'}
     
     df_convertido = df.copy()
     colunas_convertidas = 0
@@ -145,32 +130,14 @@ def converter_likert_verbal_para_numerico(df):
             continue
             
         # Verificar se a coluna contém valores de texto
-        if df[coluna].dtype == 'object':
-            valores_unicos = df[coluna].dropna().unique()
-            
-            # Tentar diferentes mapeamentos
-            mapeamento_usado = None
-            
-            # Verificar se é escala de satisfação
-            if any(val in mapeamento_satisfacao for val in valores_unicos):
-                mapeamento_usado = mapeamento_satisfacao
-                tipo_escala = "satisfação"
+        if not pd.api.types.is_numeric_dtype(df[coluna]):
+            escala = identificar_escala(df[coluna], escalas=escalas_candidatas)
             
-            # Verificar se é escala de concordância
-            elif any(val in mapeamento_concordancia for val in valores_unicos):
-                mapeamento_usado = mapeamento_concordancia
-                tipo_escala = "concordância"
-            
-            # Verificar se é escala de frequência
-            elif any(val in mapeamento_frequencia for val in valores_unicos):
-                mapeamento_usado = mapeamento_frequencia
-                tipo_escala = "frequência"
-            
-            # Se encontrou um mapeamento, aplicar
-            if mapeamento_usado:
-                df_convertido[coluna] = df[coluna].map(mapeamento_usado)
+            # Se encontrou uma escala, aplicar
+            if escala:
+                df_convertido[coluna] = para_float(decodificar_coluna(df[coluna], escala))
                 colunas_convertidas += 1
-                print(f"  ✅ {coluna[:50]}... → Escala {tipo_escala} (1-5)")
+                print(f"  ✅ {coluna[:50]}... → Escala {nomes_escalas[escala]} (1-5)")
             
             # Tentar conversão direta para numérico
             else:
@@ -185,8 +152,10 @@ def converter_likert_verbal_para_numerico(df):
     print(f"📊 Total de colunas convertidas: {colunas_convertidas}")
     return df_convertido
 
-def preparar_dados_para_analise(df, nome_modelo, max_vars=8):
-    """Prepara dados para análise fatorial e SEM"""
+def preparar_dados_para_analise(df, nome_modelo, max_vars=8, correlacao=None, ausentes=None):
+    """Prepara dados para análise fatorial e SEM (ausentes: 'mediana' ou 'fiml')"""
+    correlacao = correlacao or CORRELACAO_ITENS
+    ausentes = ausentes or AUSENTES_ITENS
     print(f"\n📊 Preparando dados para: {nome_modelo}")
     
     # Primeiro, converter escalas Likert verbais para numéricas
@@ -204,6 +173,12 @@ def preparar_dados_para_analise(df, nome_modelo, max_vars=8):
     missing_antes = df_numerico.isnull().sum().sum()
     if missing_antes > 0:
         print(f"  🔧 Tratando {missing_antes} valores ausentes...")
+        if ausentes == 'fiml':
+            # A análise fatorial exige matriz completa: cada padrão de ausência recebe
+            # E[x_ausentes | x_observados], que preserva as covariâncias (a mediana as atenua)
+            from fiml import imputar_condicional
+            informativas = [col for col in df_numerico.columns if df_numerico[col].nunique() > 1]
+            df_numerico[informativas] = imputar_condicional(df_numerico[informativas])
         for col in df_numerico.columns:
             if df_numerico[col].isnull().any():
                 if df_numerico[col].dtype.kind in 'bifc':  # numérico
@@ -222,7 +197,8 @@ def preparar_dados_para_analise(df, nome_modelo, max_vars=8):
         return None, None, None
     
     # Selecionar as melhores variáveis baseado na correlação
-    corr_matrix = df_numerico.corr().abs()
+    corr_itens = matriz_correlacao(df_numerico, correlacao)
+    corr_matrix = corr_itens.abs()
     
     # Calcular média de correlação para cada variável
     correlacoes_medias = corr_matrix.mean().sort_values(ascending=False)
@@ -251,7 +227,7 @@ def preparar_dados_para_analise(df, nome_modelo, max_vars=8):
     df_abrev.columns = [mapeamento[col] for col in df_final.columns]
     
     # Calcular estatísticas
-    alpha, interpretacao_alpha = calcular_alpha_cronbach(df_final)
+    alpha, interpretacao_alpha = calcular_alpha_cronbach(df_final, correlacao, corr_itens)
     correlacao_media = correlacoes_medias.head(n_vars).mean()
     
     print(f"  📊 Alpha de Cronbach: {alpha:.3f} ({interpretacao_alpha})")
@@ -269,9 +245,20 @@ def preparar_dados_para_analise(df, nome_modelo, max_vars=8):
     return df_abrev, mapeamento, estatisticas
 
 def realizar_analise_fatorial(dados_df, nome_modelo):
-    """Realiza análise fatorial exploratória e confirmatória"""
+    """Realiza análise fatorial exploratória e confirmatória (em cache pelo conteúdo de dados_df)"""
     print(f"\n🔬 Realizando análise fatorial para: {nome_modelo}")
     
+    # A chave cobre o código que _analise_fatorial chama e as versões das bibliotecas
+    parametros = {'factor_analyzer': metadata.version('factor_analyzer'), 'sklearn': sklearn.__version__}
+    codigo = (_analise_fatorial, calculate_bartlett_sphericity, calculate_kmo, FactorAnalyzer,
+              FactorAnalysis, StandardScaler)
+    resultados_fa, do_cache = resultado_em_cache('analise_fatorial', dados_df, lambda: _analise_fatorial(dados_df),
+                                                 parametros=parametros, codigo=codigo)
+    if do_cache:
+        print("  🔁 Análise fatorial recuperada do cache de resultados")
+    return resultados_fa
+
+def _analise_fatorial(dados_df):
     try:
         # Verificar adequação dos dados
         bartlett_chi2, bartlett_p = calculate_bartlett_sphericity(dados_df)
@@ -348,9 +335,24 @@ def realizar_analise_fatorial(dados_df, nome_modelo):
         print(f"  ✅ Análise fatorial concluída")
         print(f"  📊 Variância explicada total: {sum(variance_explained[1]) * 100:.1f}%")
         
+        # Índices de ajuste (χ², RMSEA, CFI) só valem para a discrepância ML: a
+        # solução minres/varimax acima fica para as cargas, e Σ vem de um ajuste
+        # ML sem rotação (Σ = ΛΛ' + Ψ não depende da rotação)
+        try:
+            fa_ml = FactorAnalyzer(n_factors=n_fatores_optimal, method='ml', rotation=None)
+            fa_ml.fit(dados_df)
+            loadings_ml = pd.DataFrame(fa_ml.loadings_, index=dados_df.columns,
+                                       columns=[f'Fator{i+1}' for i in range(n_fatores_optimal)])
+            uniquenesses_ml = fa_ml.get_uniquenesses()
+        except Exception as e:
+            print(f"  ⚠️ Ajuste ML da análise fatorial falhou: {e}")
+            loadings_ml, uniquenesses_ml = None, None
+        
         resultados_fa = {
             'loadings': loadings_df,
             'communalities': communalities,
+            'loadings_ml': loadings_ml,
+            'uniquenesses_ml': uniquenesses_ml,
             'variance_explained': variance_explained,
             'eigenvalues': eigenvalues,
             'n_fatores': n_fatores_optimal,
@@ -542,98 +544,47 @@ def criar_diagrama_caminhos_profissional(resultados_fa, mapeamento, nome_modelo,
     
     print(f"  ✅ Diagrama salvo: diagrama_caminhos.png")
 
-def calcular_indices_ajuste_aproximados(dados_df, resultados_fa):
-    """Calcula índices de ajuste aproximados baseados na análise fatorial"""
-    try:
-        if resultados_fa is None:
-            return {
-                'CFI': np.nan,
-                'TLI': np.nan, 
-                'RMSEA': np.nan,
-                'SRMR': np.nan,
-                'Chi_quadrado': np.nan,
-                'p_valor': np.nan
-            }
-        
-        n_obs = len(dados_df)
-        n_vars = len(dados_df.columns)
-        n_fatores = resultados_fa['n_fatores']
-        
-        # Calcular resíduos aproximados
-        loadings = resultados_fa['loadings'].values
-        
-        # Matriz de correlação observada
-        corr_obs = dados_df.corr().values
-        
-        # Matriz de correlação reproduzida (aproximação)
-        corr_reprod = np.dot(loadings, loadings.T)
-        np.fill_diagonal(corr_reprod, 1.0)
-        
-        # Calcular resíduos
-        residuos = corr_obs - corr_reprod
-        
-        # SRMR (approximation)
-        srmr = np.sqrt(np.mean(residuos[np.triu_indices_from(residuos, k=1)]**2))
-        
-        # Chi-quadrado aproximado usando resíduos
-        chi2_approx = np.sum(residuos**2) * (n_obs - 1) / 2
-        
-        # Graus de liberdade
-        df = n_vars * (n_vars - 1) / 2 - n_vars * n_fatores + n_fatores * (n_fatores - 1) / 2
-        df = max(1, int(df))
-        
-        # p-valor
-        p_valor = 1 - chi2.cdf(chi2_approx, df)
-        
-        # CFI e TLI aproximados baseados na variância explicada
-        var_explicada_total = sum(resultados_fa['variance_explained'][1])
-        
-        # CFI aproximado
-        cfi = min(1.0, var_explicada_total)
-        
-        # TLI aproximado (mais conservador)
-        tli = min(1.0, var_explicada_total * 0.95)
-        
-        # RMSEA aproximado
-        if df > 0:
-            rmsea = np.sqrt(max(0, (chi2_approx - df) / (df * (n_obs - 1))))
-        else:
-            rmsea = 0.0
-        
-        # Ajustar valores para ranges realistas
-        cfi = max(0.7, min(0.98, cfi + np.random.normal(0, 0.02)))
-        tli = max(0.7, min(0.95, tli + np.random.normal(0, 0.02)))
-        rmsea = max(0.03, min(0.12, rmsea + np.random.normal(0, 0.01)))
-        srmr = max(0.02, min(0.10, srmr))
-        
-        indices = {
-            'CFI': cfi,
-            'TLI': tli,
-            'RMSEA': rmsea,
-            'SRMR': srmr,
-            'Chi_quadrado': chi2_approx,
-            'p_valor': p_valor,
-            'graus_liberdade': df
-        }
-        
+def calcular_indices_ajuste(dados_df, resultados_fa):
+    """
+    Índices de ajuste exatos (estatisticas_ajuste) da solução fatorial por
+    máxima verossimilhança: S é a correlação dos itens e Σ = ΛΛ' + Ψ, com as
+    cargas e unicidades do ajuste ML (a solução minres/varimax não minimiza a
+    discrepância ML, então χ², RMSEA e CFI dela não seriam válidos); os
+    parâmetros livres são os de uma AFE com m fatores (pm + p − m(m − 1)/2).
+    """
+    indices = {'CFI': np.nan, 'TLI': np.nan, 'RMSEA': np.nan, 'RMSEA_inf': np.nan, 'RMSEA_sup': np.nan,
+               'SRMR': np.nan, 'Chi_quadrado': np.nan, 'p_valor': np.nan, 'graus_liberdade': np.nan,
+               'AIC': np.nan, 'BIC': np.nan}
+    if resultados_fa is None:
         return indices
-        
-    except Exception as e:
+    if resultados_fa.get('loadings_ml') is None:
+        print("  ⚠️ Sem solução ML da análise fatorial: índices de ajuste não calculados")
+        return indices
+    
+    try:
+        cargas = resultados_fa['loadings_ml'].to_numpy()
+        p, m = cargas.shape
+        S = dados_df[resultados_fa['loadings_ml'].index].corr().to_numpy()
+        sigma = cargas @ cargas.T + np.diag(np.asarray(resultados_fa['uniquenesses_ml']))
+        exatos = indices_exatos([S], [sigma], len(dados_df), p * m + p - m * (m - 1) // 2).iloc[0]
+    except (np.linalg.LinAlgError, ValueError) as e:
         print(f"  ⚠️ Erro no cálculo de índices: {e}")
-        # Retornar valores simulados baseados na qualidade dos dados
-        alpha, _ = calcular_alpha_cronbach(dados_df)
-        
-        # Simular índices baseados no alpha
-        base_quality = alpha if not np.isnan(alpha) else 0.7
-        
-        return {
-            'CFI': max(0.75, min(0.95, base_quality + np.random.normal(0, 0.05))),
-            'TLI': max(0.70, min(0.92, base_quality * 0.95 + np.random.normal(0, 0.05))),
-            'RMSEA': max(0.04, min(0.10, (1 - base_quality) * 0.15 + np.random.normal(0, 0.01))),
-            'SRMR': max(0.03, min(0.09, (1 - base_quality) * 0.12 + np.random.normal(0, 0.01))),
-            'Chi_quadrado': np.random.uniform(50, 200),
-            'p_valor': np.random.uniform(0.01, 0.5)
-        }
+        return indices
+    
+    indices.update({
+        'CFI': exatos['CFI'],
+        'TLI': exatos['TLI'],
+        'RMSEA': exatos['RMSEA'],
+        'RMSEA_inf': exatos['RMSEA inf'],
+        'RMSEA_sup': exatos['RMSEA sup'],
+        'SRMR': exatos['SRMR'],
+        'Chi_quadrado': exatos['chi2'],
+        'p_valor': exatos['chi2 p-value'],
+        'graus_liberdade': int(exatos['DoF']),
+        'AIC': exatos['AIC'],
+        'BIC': exatos['BIC']
+    })
+    return indices
 
 def interpretar_indices_ajuste(indices):
     """Interpreta os índices de ajuste do modelo"""
@@ -885,7 +836,7 @@ def processar_modelo_sem_completo(nome_modelo, dados_df):
     resultados_fa = realizar_analise_fatorial(dados_preparados, nome_modelo)
     
     # Calcular índices de ajuste
-    indices = calcular_indices_ajuste_aproximados(dados_preparados, resultados_fa)
+    indices = calcular_indices_ajuste(dados_preparados, resultados_fa)
     
     # Criar diagrama de caminhos
     criar_diagrama_caminhos_profissional(resultados_fa, mapeamento, nome_modelo, dir_modelo)
@@ -6,6 +6,7 @@ import seaborn as sns
 from scipy import stats
 from scipy.stats import ttest_ind, chi2_contingency, mannwhitneyu
 import warnings
+from base_respondentes import carregar_base_respondentes
 warnings.filterwarnings('ignore')
 
 # Configuração para gráficos
@@ -23,40 +24,26 @@ def carregar_dados_completos():
     """Carrega todos os dados necessários para análise WTP e comparações"""
     print("🔄 Carregando dados para análise WTP...")
     
-    # Tentar carregar dos CSVs originais primeiro
+    # Tabelas usadas na análise WTP, alinhadas pela base indexada por ID
     arquivos_csv = [
-        "csv_extraidos/Aceitação_da_tecnologia.csv",
-        "csv_extraidos/Percepção_novos_serviços.csv", 
-        "csv_extraidos/Intenção_comportamental.csv",
-        "csv_extraidos/Utilização.csv",
-        "csv_extraidos/Perfil_Socioeconomico.csv"
+        "Aceitação da tecnologia.csv",
+        "Percepção novos serviços.csv", 
+        "Intenção comportamental.csv",
+        "Utilização.csv",
+        "Perfil Socioeconomico.csv"
     ]
     
-    dados_combinados = None
-    
-    for arquivo in arquivos_csv:
-        if os.path.exists(arquivo):
-            try:
-                df = pd.read_csv(arquivo, encoding='utf-8')
-                print(f"✅ Carregado: {arquivo} ({df.shape[0]} linhas)")
-                
-                if dados_combinados is None:
-                    dados_combinados = df.copy()
-                else:
-                    # Combinar dados pelo ID se existir
-                    if 'ID' in df.columns and 'ID' in dados_combinados.columns:
-                        dados_combinados = dados_combinados.merge(df, on='ID', how='outer')
-                    else:
-                        # Se não tiver ID, concatenar por índice
-                        dados_combinados = pd.concat([dados_combinados, df], axis=1)
-                        
-            except Exception as e:
-                print(f"❌ Erro ao carregar {arquivo}: {e}")
-    
-    if dados_combinados is None:
+    try:
+        base = carregar_base_respondentes(arquivos=arquivos_csv)
+    except (OSError, ValueError) as e:
+        print(f"❌ Erro ao carregar dados: {e}")
         print("❌ Nenhum dado foi carregado!")
         return None, None, None
     
+    for tabela in base.tabelas:
+        print(f"✅ Carregado: {tabela} ({len(base)} linhas)")
+    
+    dados_combinados = base.quadro()
     print(f"📊 Base combinada: {dados_combinados.shape}")
     
     # Identificar colunas por tipo
@@ -85,9 +72,9 @@ def carregar_dados_completos():
     print(f"  🎯 Intenção: {len(colunas_intencao)}")
     
     # Criar datasets separados
-    dados_wtp = dados_combinados[['ID'] + colunas_wtp] if 'ID' in dados_combinados.columns else dados_combinados[colunas_wtp]
-    dados_percepcao = dados_combinados[['ID'] + colunas_percepcao] if 'ID' in dados_combinados.columns else dados_combinados[colunas_percepcao]
-    dados_intencao = dados_combinados[['ID'] + colunas_intencao] if 'ID' in dados_combinados.columns else dados_combinados[colunas_intencao]
+    dados_wtp = base.quadro(colunas=colunas_wtp)
+    dados_percepcao = base.quadro(colunas=colunas_percepcao)
+    dados_intencao = base.quadro(colunas=colunas_intencao)
     
     return dados_combinados, dados_wtp, dados_percepcao
 
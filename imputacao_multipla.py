@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IMPUTAÇÃO MÚLTIPLA COM COMBINAÇÃO DE RUBIN
+==========================================
+
+Alternativa ao FIML: as colunas Likert e categóricas (perfil e utilização)
+são imputadas por equações encadeadas e cada análise roda sobre m cópias
+completas, com estimativas e testes combinados no fim:
+- Cada coluna com ausentes é prevista pelas demais (Likert como escore,
+  categóricas como indicadoras) com coeficientes sorteados por bootstrap
+  dos casos observados; o valor imputado é o de um doador observado com
+  previsão próxima (predictive mean matching), então o resultado é sempre
+  um código válido da coluna
+- As m cadeias são independentes (SeedSequence.spawn) e ficam em um único
+  array int8 (m × respondentes × colunas), em cache em disco pela
+  assinatura da base: scripts e análises diferentes reutilizam as mesmas
+  cópias em vez de reimputar
+- As análises de cada cópia (SEM, logit, testes por segmento) rodam em um
+  pool de processos que lê o array publicado em memória compartilhada
+- Estimativas e erros padrão são combinados pelas regras de Rubin (graus
+  de liberdade de Barnard–Rubin); estatísticas qui-quadrado, pela regra D2
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2 as dist_chi2
+from scipy.stats import f as dist_f
+from scipy.stats import f_oneway
+from scipy.stats import t as dist_t
+
+from cache_dados import DIRETORIO_CACHE
+from cache_resultados import versao_codigo
+from codec_likert import LIKERT_AUSENTE
+from memoria_compartilhada import anexar_matriz, publicar_matriz
+from motor_sem import ModeloSEM, compilar_especificacao
+
+DIRETORIO_IMPUTACOES = os.path.join(DIRETORIO_CACHE, 'imputacoes')
+
+_VERSAO_IMPUTACAO = 1
+
+# Categóricas com mais categorias que isso (ou cujas categorias quase não se repetem,
+# como comentários em texto livre) ficam fora da imputação
+LIMITE_CATEGORIAS = 30
+
+ESTAGIOS = ('sem', 'logit', 'testes')
+
+# Colunas de segmento dos testes de diferença entre grupos (nomes finais do pipeline)
+SEGMENTOS_TESTE = ('genero', 'raca', 'idade_faixa', 'escolaridade', 'renda_faixa')
+
+# Memo em processo: chave do cache -> ImputacoesMultiplas
+_imputacoes_conhecidas = {}
+
+
+class ImputacoesMultiplas:
+    """m cópias completas das colunas imputáveis (int8: códigos 1..k)"""
+
+    def __init__(self, codigos, nomes, categorias, ausentes):
+        """
+        Args:
+            codigos: Array int8 (m × respondentes × colunas)
+            nomes: Nomes finais das colunas (como em clean_data)
+            categorias: dict nome -> rótulos das categorias (códigos 1..k); Likert fica de fora
+            ausentes: Máscara booleana (respondentes × colunas) dos valores imputados
+        """
+        self.codigos = codigos
+        self.nomes = list(nomes)
+        self.categorias = categorias
+        self.ausentes = ausentes
+        self._posicao = {nome: j for j, nome in enumerate(self.nomes)}
+
+    def __repr__(self):
+        return (f"ImputacoesMultiplas(m={self.m}, respondentes={self.codigos.shape[1]}, colunas={len(self.nomes)}, "
+                f"imputados={int(self.ausentes.sum())})")
+
+    @property
+    def m(self):
+        return self.codigos.shape[0]
+
+    def proporcao_ausentes(self):
+        """Fração de valores imputados por coluna"""
+        return pd.Series(self.ausentes.mean(axis=0), index=self.nomes)
+
+    def matriz(self, i, nomes=None):
+        """Matriz float64 dos códigos da cópia i (categóricas com a mesma codificação 1..k em todas as cópias)"""
+        indices = [self._posicao[nome] for nome in (self.nomes if nomes is None else nomes)]
+        return self.codigos[i][:, indices].astype(np.float64)
+
+    def quadro(self, i, nomes=None):
+        """DataFrame da cópia i: Likert como float (igual a clean_data), categóricas como pd.Categorical"""
+        nomes = self.nomes if nomes is None else list(nomes)
+        dados = {}
+        for nome in nomes:
+            codigos = self.codigos[i][:, self._posicao[nome]]
+            if nome in self.categorias:
+                dados[nome] = pd.Categorical.from_codes(codigos.astype(np.int16) - 1,
+                                                        categories=self.categorias[nome])
+            else:
+                dados[nome] = codigos.astype(np.float64)
+        return pd.DataFrame(dados)
+
+
+def colunas_imputaveis(base):
+    """
+    Colunas Likert e categóricas da base que entram na imputação.
+
+    Returns:
+        dict nome final -> coluna da base, e dict nome final -> rótulos (só categóricas)
+    """
+    from analise_transporte_sem import resolve_column_mapping
+
+    nomes_finais, _ = resolve_column_mapping(base.colunas())
+    colunas, categorias = {}, {}
+    for nome, coluna in zip(nomes_finais, base.colunas()):
+        valores = base.coluna(coluna)
+        if getattr(valores, 'dtype', None) == np.int8:
+            if len(np.unique(valores[valores != LIKERT_AUSENTE])) > 1:
+                colunas[nome] = coluna
+        elif isinstance(valores, pd.Categorical):
+            observados = valores.codes[valores.codes >= 0]
+            k = len(valores.categories)
+            if 1 < k <= LIMITE_CATEGORIAS and k <= len(observados) / 2:
+                colunas[nome] = coluna
+                categorias[nome] = [str(c).strip() for c in valores.categories]
+    return colunas, categorias
+
+
+def _codigos_base(base, colunas, categorias):
+    """Matriz int8 (respondentes × colunas) com 0 nos ausentes e categóricas em 1..k"""
+    x = np.empty((len(base), len(colunas)), dtype=np.int8)
+    for j, (nome, coluna) in enumerate(colunas.items()):
+        valores = base.coluna(coluna)
+        x[:, j] = valores.codes + 1 if nome in categorias else valores
+    return x
+
+
+def _bloco_preditor(valores, k):
+    """Colunas de preditores de uma variável: escore padronizado (Likert) ou indicadoras centradas (k categorias)"""
+    if k is None:
+        v = valores.astype(np.float64)
+        dp = v.std()
+        return ((v - v.mean()) / (dp if dp > 0 else 1.0))[:, None]
+    indicadoras = (valores[:, None] == np.arange(2, k + 1)).astype(np.float64)
+    return indicadoras - indicadoras.mean(axis=0)
+
+
+def _doadores(previsto_obs, previsto_aus, rng, k_doadores, tamanho_bloco=2_000):
+    """Para cada caso ausente, um dos k_doadores observados com previsão mais próxima"""
+    normas_obs = (previsto_obs * previsto_obs).sum(axis=1)
+    k = min(k_doadores, len(previsto_obs))
+    escolhidos = np.empty(len(previsto_aus), dtype=np.int64)
+    for inicio in range(0, len(previsto_aus), tamanho_bloco):
+        bloco = previsto_aus[inicio:inicio + tamanho_bloco]
+        distancias = normas_obs[None, :] - 2.0 * bloco @ previsto_obs.T
+        proximos = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+        escolhidos[inicio:inicio + len(bloco)] = proximos[np.arange(len(bloco)), rng.integers(0, k, len(bloco))]
+    return escolhidos
+
+
+def _imputar_cadeia(codigos, n_categorias, iteracoes, semente, k_doadores=5, penalidade=1e-3):
+    """
+    Uma cadeia de equações encadeadas com predictive mean matching.
+
+    Args:
+        codigos: int8 (respondentes × colunas), 0 = ausente
+        n_categorias: Por coluna, número de categorias (None = Likert)
+        iteracoes: Voltas completas sobre as colunas com ausentes
+        semente: SeedSequence da cadeia
+
+    Returns:
+        Cópia completa int8
+    """
+    rng = np.random.default_rng(semente)
+    x = np.array(codigos, dtype=np.int8)
+    ausente = x == LIKERT_AUSENTE
+    alvos = np.flatnonzero(ausente.any(axis=0))
+    # Partida: sorteio entre os valores observados da própria coluna
+    for j in alvos:
+        x[ausente[:, j], j] = rng.choice(x[~ausente[:, j], j], ausente[:, j].sum())
+    blocos = [_bloco_preditor(x[:, j], n_categorias[j]) for j in range(x.shape[1])]
+    uns = np.ones((x.shape[0], 1))
+
+    for _ in range(iteracoes if len(alvos) else 0):
+        for j in alvos:
+            obs, aus = ~ausente[:, j], ausente[:, j]
+            z = np.hstack([uns] + [b for k, b in enumerate(blocos) if k != j])
+            y = x[obs, j].astype(np.float64)[:, None] if n_categorias[j] is None else \
+                (x[obs, j][:, None] == np.arange(1, n_categorias[j] + 1)).astype(np.float64)
+            z_obs = z[obs]
+            regularizacao = penalidade * len(z_obs) * np.identity(z.shape[1])
+            regularizacao[0, 0] = 0.0
+            beta = np.linalg.solve(z_obs.T @ z_obs + regularizacao, z_obs.T @ y)
+            # Incerteza dos coeficientes: reajuste em uma reamostragem dos casos observados
+            reamostra = rng.integers(0, len(z_obs), len(z_obs))
+            z_boot = z_obs[reamostra]
+            beta_boot = np.linalg.solve(z_boot.T @ z_boot + regularizacao, z_boot.T @ y[reamostra])
+            doadores = _doadores(z_obs @ beta, z[aus] @ beta_boot, rng, k_doadores)
+            x[aus, j] = x[obs, j][doadores]
+            blocos[j] = _bloco_preditor(x[:, j], n_categorias[j])
+    return x
+
+
+def _cadeias(codigos, n_categorias, iteracoes, sementes):
+    return np.stack([_imputar_cadeia(codigos, n_categorias, iteracoes, s) for s in sementes])
+
+
+def _chave_cache(base, colunas, m, iteracoes, semente):
+    codigo = versao_codigo(_imputar_cadeia, _doadores, _bloco_preditor, _codigos_base)
+    chave = json.dumps([base.assinatura, list(colunas.values()), m, iteracoes, semente, _VERSAO_IMPUTACAO,
+                        codigo, np.__version__], ensure_ascii=False)
+    return hashlib.blake2b(chave.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def imputacoes_da_base(base, m=20, iteracoes=10, semente=0, n_workers=1, diretorio_cache=DIRETORIO_IMPUTACOES):
+    """
+    m cópias imputadas das colunas Likert e categóricas da base, com cache.
+
+    Args:
+        base: BaseRespondentes carregada em modo 'codificado'
+        m: Número de imputações
+        iteracoes: Voltas das equações encadeadas por cadeia
+        semente: Semente da SeedSequence (faz parte da chave do cache)
+        n_workers: Processos para as cadeias (1 = sequencial, None = todos os núcleos)
+        diretorio_cache: Diretório do cache em disco (None desativa)
+
+    Returns:
+        ImputacoesMultiplas
+    """
+    colunas, categorias = colunas_imputaveis(base)
+    codigos = _codigos_base(base, colunas, categorias)
+    ausentes = codigos == LIKERT_AUSENTE
+    assinatura = getattr(base, 'assinatura', None)
+    chave = _chave_cache(base, colunas, m, iteracoes, semente) if assinatura else None
+    if chave is not None and chave in _imputacoes_conhecidas:
+        return _imputacoes_conhecidas[chave]
+
+    caminho = os.path.join(diretorio_cache, chave + '.npy') if chave and diretorio_cache else None
+    if caminho and os.path.exists(caminho):
+        copias = np.load(caminho, mmap_mode='r')
+    else:
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_categorias = [len(categorias[nome]) if nome in categorias else None for nome in colunas]
+        sementes = np.random.SeedSequence(semente).spawn(m)
+        print(f"🧩 Imputação múltipla: {m} cópias, {len(colunas)} colunas, {int(ausentes.sum())} valores ausentes")
+        if n_workers <= 1 or m <= 1:
+            copias = _cadeias(codigos, n_categorias, iteracoes, sementes)
+        else:
+            partes = np.array_split(np.arange(m), min(n_workers, m))
+            with ProcessPoolExecutor(max_workers=len(partes)) as pool:
+                copias = np.concatenate(list(pool.map(
+                    _cadeias, *zip(*[(codigos, n_categorias, iteracoes, [sementes[i] for i in p]) for p in partes]))))
+        if caminho:
+            os.makedirs(diretorio_cache, exist_ok=True)
+            np.save(caminho + '.tmp.npy', copias)
+            os.replace(caminho + '.tmp.npy', caminho)
+            copias = np.load(caminho, mmap_mode='r')
+
+    imputacoes = ImputacoesMultiplas(copias, list(colunas), categorias, ausentes)
+    if chave is not None:
+        _imputacoes_conhecidas[chave] = imputacoes
+    return imputacoes
+
+
+def regras_rubin(estimativas, variancias, gl_completo=np.inf):
+    """
+    Combina estimativas de m análises pelas regras de Rubin.
+
+    Args:
+        estimativas: DataFrame m × parâmetros
+        variancias: DataFrame m × parâmetros (erros padrão ao quadrado)
+        gl_completo: Graus de liberdade com dados completos (correção de Barnard–Rubin)
+
+    Returns:
+        DataFrame por parâmetro: Estimate, Std. Err, t-value, DoF, p-value,
+        Within, Between, RIV (aumento relativo da variância) e FMI (fração de informação perdida)
+    """
+    m = len(estimativas)
+    media = estimativas.mean()
+    dentro = variancias.mean()
+    entre = estimativas.var(ddof=1) if m > 1 else media * 0.0
+    total = dentro + (1 + 1 / m) * entre
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lambda_ = ((1 + 1 / m) * entre / total).fillna(0.0)
+        riv = (1 + 1 / m) * entre / dentro
+        gl_antigo = (m - 1) / lambda_ ** 2
+        gl_observado = (gl_completo + 1) / (gl_completo + 3) * gl_completo * (1 - lambda_) \
+            if np.isfinite(gl_completo) else np.inf
+        gl = 1 / (1 / gl_antigo + 1 / gl_observado)
+        t = media / np.sqrt(total)
+        fmi = (riv + 2 / (gl + 3)) / (riv + 1)
+    return pd.DataFrame({'Estimate': media, 'Std. Err': np.sqrt(total), 't-value': t, 'DoF': gl,
+                         'p-value': 2 * dist_t.sf(np.abs(t), gl), 'Within': dentro, 'Between': entre,
+                         'RIV': riv, 'FMI': fmi})
+
+
+def regra_d2(estatisticas, gl):
+    """
+    Combina m estatísticas qui-quadrado com gl graus de liberdade (regra D2 de Li, Meng, Raghunathan e Rubin).
+
+    Returns:
+        dict com D2 (estatística F), DoF1, DoF2, p-value e RIV
+    """
+    d = np.asarray(estatisticas, dtype=np.float64)
+    m = len(d)
+    riv = (1 + 1 / m) * np.var(np.sqrt(np.maximum(d, 0)), ddof=1) if m > 1 else 0.0
+    d2 = max((d.mean() / gl - (m + 1) / (m - 1) * riv) / (1 + riv), 0.0) if m > 1 else d.mean() / gl
+    if riv > 0:
+        gl2 = gl ** (-3 / m) * (m - 1) * (1 + 1 / riv) ** 2
+        p = dist_f.sf(d2, gl, gl2)
+    else:
+        gl2, p = np.inf, dist_chi2.sf(d2 * gl, gl)
+    return {'D2': float(d2), 'DoF1': gl, 'DoF2': float(gl2), 'p-value': float(p), 'RIV': float(riv)}
+
+
+def _estagio_sem(imputacoes, i, modelos):
+    """Estimativas (com variâncias) e qui-quadrado de cada modelo SEM na cópia i"""
+    estimativas, testes = {}, {}
+    for nome_modelo, (especificacao, colunas) in modelos.items():
+        modelo = ModeloSEM(especificacao)
+        try:
+            modelo.fit(pd.DataFrame(imputacoes.matriz(i, colunas), columns=colunas))
+            params = modelo.inspect()
+        except (np.linalg.LinAlgError, ValueError) as e:
+            print(f"⚠️ {nome_modelo} (imputação {i + 1}): ajuste falhou ({e})")
+            continue
+        for lval, op, rval, estimativa, erro in params[['lval', 'op', 'rval', 'Estimate', 'Std. Err']].itertuples(
+                index=False):
+            if erro != '-':
+                estimativas[(nome_modelo, f"{lval} {op} {rval}")] = (float(estimativa), float(erro) ** 2)
+        indices = modelo.calc_indices()
+        testes[(nome_modelo, 'qui-quadrado do modelo')] = (indices['chi2'], indices['DoF'])
+    return estimativas, testes
+
+
+def _estagio_logit(imputacoes, i):
+    """Coeficientes e erros padrão dos logit de run_mixed_logit_analysis na cópia i"""
+    from analise_transporte_sem import run_mixed_logit_analysis
+
+    ajustes = run_mixed_logit_analysis(imputacoes.quadro(i), output_dir=None) or {}
+    return {(nome, parametro): (float(valor), float(erro) ** 2)
+            for nome, ajuste in ajustes.items()
+            for parametro, valor, erro in zip(ajuste.params.index, ajuste.params, ajuste.bse)}
+
+
+def _estagio_testes(imputacoes, i, construtos):
+    """ANOVA do escore médio de cada construto por segmento na cópia i, como qui-quadrado (F·gl) para a regra D2"""
+    testes = {}
+    segmentos = [s for s in SEGMENTOS_TESTE if s in imputacoes.categorias]
+    rotulos = imputacoes.matriz(i, segmentos)
+    for nome_construto, colunas in construtos.items():
+        escore = imputacoes.matriz(i, colunas).mean(axis=1)
+        for j, segmento in enumerate(segmentos):
+            grupos = [escore[rotulos[:, j] == g] for g in np.unique(rotulos[:, j])]
+            grupos = [g for g in grupos if len(g) > 1]
+            if len(grupos) < 2:
+                continue
+            estatistica, _ = f_oneway(*grupos)
+            testes[(nome_construto, segmento)] = (float(estatistica) * (len(grupos) - 1), len(grupos) - 1)
+    return testes
+
+
+def _analisar_copia(info_matriz, meta, i, estagios, modelos, construtos):
+    """Tarefa do pool: roda os estágios pedidos sobre a cópia i do array publicado"""
+    imputacoes = ImputacoesMultiplas(anexar_matriz(info_matriz), **meta)
+    resultado = {'sem': {}, 'logit': {}, 'testes': {}}
+    if 'sem' in estagios:
+        resultado['sem'], resultado['testes'] = _estagio_sem(imputacoes, i, modelos)
+    if 'logit' in estagios:
+        resultado['logit'] = _estagio_logit(imputacoes, i)
+    if 'testes' in estagios:
+        resultado['testes'].update(_estagio_testes(imputacoes, i, construtos))
+    return resultado
+
+
+def _combinar(partes, chaves_indice):
+    """Rubin sobre dicts chave -> (estimativa, variância); só parâmetros presentes em todas as cópias"""
+    comuns = set.intersection(*(set(p) for p in partes)) if partes else set()
+    if not comuns:
+        return pd.DataFrame()
+    chaves = sorted(comuns, key=str)
+    estimativas = pd.DataFrame([[p[c][0] for c in chaves] for p in partes])
+    variancias = pd.DataFrame([[p[c][1] for c in chaves] for p in partes])
+    tabela = regras_rubin(estimativas, variancias)
+    tabela.index = pd.MultiIndex.from_tuples(chaves, names=chaves_indice)
+    return tabela
+
+
+def analisar_imputacoes(imputacoes, estagios=ESTAGIOS, modelos=None, n_workers=1):
+    """
+    Roda os estágios de análise em cada cópia imputada e combina os resultados.
+
+    Args:
+        imputacoes: ImputacoesMultiplas (imputacoes_da_base)
+        estagios: Subconjunto de ESTAGIOS: 'sem' (modelos de sem_models pelo motor_sem),
+            'logit' (run_mixed_logit_analysis) e 'testes' (ANOVA dos construtos por segmento)
+        modelos: Nomes dos modelos de sem_models (padrão: todos com colunas imputadas)
+        n_workers: Processos (1 = sequencial, None = todos os núcleos)
+
+    Returns:
+        dict com 'sem' e 'logit' (DataFrames de regras_rubin indexados por
+        (modelo, parâmetro)) e 'testes' (DataFrame da regra D2 por (análise, teste))
+    """
+    from analise_transporte_sem import sem_models
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    especificacoes = {}
+    for nome_modelo, especificacao in sem_models.items():
+        if modelos is not None and nome_modelo not in modelos:
+            continue
+        colunas = sorted(compilar_especificacao(especificacao).observadas)
+        if all(c in imputacoes.nomes for c in colunas):
+            especificacoes[nome_modelo] = (especificacao, colunas)
+        else:
+            print(f"⚠️ {nome_modelo}: colunas fora da imputação, modelo ignorado")
+    construtos = {nome: colunas for nome, (_, colunas) in especificacoes.items() if nome != 'Modelo Global'}
+    meta = {'nomes': imputacoes.nomes, 'categorias': imputacoes.categorias, 'ausentes': imputacoes.ausentes}
+
+    print(f"🧩 Analisando {imputacoes.m} imputações ({', '.join(estagios)}) com {n_workers} processo(s)")
+    with publicar_matriz(imputacoes.codigos) as info_matriz:
+        argumentos = [(info_matriz, meta, i, tuple(estagios), especificacoes, construtos) for i in range(imputacoes.m)]
+        if n_workers <= 1 or imputacoes.m <= 1:
+            partes = [_analisar_copia(*a) for a in argumentos]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_workers, imputacoes.m)) as pool:
+                partes = list(pool.map(_analisar_copia, *zip(*argumentos)))
+
+    resultado = {
+        'sem': _combinar([p['sem'] for p in partes], ['modelo', 'parametro']),
+        'logit': _combinar([p['logit'] for p in partes], ['modelo', 'parametro']),
+    }
+    comuns = set.intersection(*(set(p['testes']) for p in partes)) if partes else set()
+    linhas = []
+    for chave in sorted(comuns, key=str):
+        linhas.append({'analise': chave[0], 'teste': chave[1],
+                       **regra_d2([p['testes'][chave][0] for p in partes], partes[0]['testes'][chave][1])})
+    resultado['testes'] = pd.DataFrame(linhas)
+    return resultado
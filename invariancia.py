@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+INVARIÂNCIA DE MEDIDA ENTRE GRUPOS
+==================================
+
+Escada de invariância de uma especificação de sem_models entre os grupos de
+um segmento (gênero, raça, renda, ...), pré-requisito para comparar médias
+de construtos:
+- configural: mesma estrutura, parâmetros livres em cada grupo
+- métrica:    cargas iguais
+- escalar:    cargas e interceptos iguais (médias latentes livres fora do
+              grupo de referência)
+- estrita:    cargas, interceptos e variâncias residuais iguais
+
+Os quatro níveis são ajustados ao mesmo tempo em processos do pool, todos a
+partir das mesmas médias e covariâncias dos grupos publicadas em memória
+compartilhada. As comparações entre níveis consecutivos trazem Δχ² (com
+p-valor), ΔCFI e ΔRMSEA, com os critérios de Chen (2007).
+
+Quando um nível falha, a busca de invariância parcial libera, um por vez, o
+parâmetro restrito daquele nível cuja liberação mais reduz o χ²; os
+candidatos de cada passo são ajustados em paralelo. A partida dos níveis é
+calculada uma vez por segmento (multigrupo.estimativas_agregadas) e cada
+candidato parte da solução do passo aceito anterior. Cada ajuste é guardado
+em cache (memória do processo e disco) pelo hash da especificação, das
+restrições, dos momentos e do código do ajuste, de modo que passos e
+reexecuções não reajustam modelos já vistos.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+import scipy
+from scipy.stats import chi2 as dist_chi2
+
+import motor_sem
+import multigrupo
+from cache_dados import DIRETORIO_CACHE
+from cache_resultados import versao_codigo
+from multigrupo import (ModeloMultigrupo, estimativas_agregadas, grupos_validos, momentos_por_segmento,
+                        momentos_publicados, publicar_momentos)
+
+NIVEIS_INVARIANCIA = {
+    'configural': (),
+    'metrica': ('loadings',),
+    'escalar': ('loadings', 'intercepts'),
+    'estrita': ('loadings', 'intercepts', 'residuals'),
+}
+
+# Classe de parâmetros acrescentada em cada nível (liberada na busca parcial)
+CLASSE_NIVEL = {'metrica': 'loadings', 'escalar': 'intercepts', 'estrita': 'residuals'}
+
+# Critérios de Chen (2007) para aceitar um nível mais restrito
+LIMIAR_DELTA_CFI = -0.010
+LIMIAR_DELTA_RMSEA = 0.015
+
+DIRETORIO_INVARIANCIA = os.path.join(DIRETORIO_CACHE, 'invariancia')
+
+INDICES_INVARIANCIA = ['chi2', 'DoF', 'CFI', 'TLI', 'RMSEA']
+
+_VERSAO_CACHE = 3
+
+# Memo em processo: chave do ajuste -> resumo
+_ajustes_conhecidos = {}
+
+
+def _chave_ajuste(descricao, momentos, iguais, liberar):
+    """Hash da especificação, restrições, momentos (rótulo, n, médias, covariância) dos grupos, código do ajuste e versão do scipy"""
+    h = hashlib.blake2b(digest_size=16)
+    cabecalho = {'versao': _VERSAO_CACHE, 'descricao': descricao, 'iguais': sorted(iguais),
+                 'liberar': sorted(liberar), 'grupos': [str(g) for g in momentos], 'scipy': scipy.__version__,
+                 'codigo': versao_codigo(_ajustar_restricoes, _ajustar_varios, multigrupo, motor_sem)}
+    h.update(json.dumps(cabecalho, ensure_ascii=False).encode('utf-8'))
+    for m in momentos.values():
+        h.update(str(m.n).encode('utf-8'))
+        h.update(np.ascontiguousarray(m.media.to_numpy(dtype=np.float64)).tobytes())
+        h.update(np.ascontiguousarray(m.cov.to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def _ler_cache(chave, diretorio):
+    if chave in _ajustes_conhecidos:
+        return _ajustes_conhecidos[chave]
+    if diretorio is None:
+        return None
+    caminho = os.path.join(diretorio, f"{chave}.json")
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as f:
+        resumo = json.load(f)
+    _ajustes_conhecidos[chave] = resumo
+    return resumo
+
+
+def _gravar_cache(chave, resumo, diretorio):
+    _ajustes_conhecidos[chave] = resumo
+    if diretorio is None:
+        return
+    os.makedirs(diretorio, exist_ok=True)
+    with open(os.path.join(diretorio, f"{chave}.json"), 'w', encoding='utf-8') as f:
+        json.dump(resumo, f, ensure_ascii=False)
+
+
+def _ajustar_restricoes(descricao, info, colunas, grupos, iguais, liberar, partida):
+    """
+    Tarefa do pool: ajuste multigrupo (com médias) e resumo dos índices e das
+    estimativas por grupo ('estimativas': [parâmetros, médias] na ordem de grupos)
+    """
+    momentos = momentos_publicados(info, colunas)
+    modelo = ModeloMultigrupo(descricao, grupos, iguais, liberar, medias=True)
+    try:
+        resultado = modelo.fit({g: momentos[g] for g in grupos}, estimativas=_estimativas_partida(partida, grupos))
+    except np.linalg.LinAlgError as e:
+        print(f"⚠️ Ajuste com restrições {list(iguais)} falhou ({e})")
+        return {**{k: None for k in INDICES_INVARIANCIA}, 'convergiu': False}
+    indices = modelo.calc_indices()
+    locais = modelo.estimativas_locais()
+    return {**{k: indices[k] for k in INDICES_INVARIANCIA}, 'convergiu': bool(resultado.success),
+            'estimativas': [[locais[g][0].tolist(), locais[g][1].tolist()] for g in grupos]}
+
+
+def _estimativas_partida(partida, grupos):
+    """
+    Partida de ModeloMultigrupo.fit: partida é o vetor de estimativas_agregadas
+    (o mesmo em todos os grupos) ou a lista 'estimativas' do resumo de um ajuste
+    """
+    if len(partida) and isinstance(partida[0], list):
+        return {g: (np.array(locais), np.array(medias)) for g, (locais, medias) in zip(grupos, partida)}
+    return dict.fromkeys(grupos, np.asarray(partida, dtype=np.float64))
+
+
+def _tabela_ajustes(resumos, indice):
+    return pd.DataFrame([{k: r[k] for k in INDICES_INVARIANCIA + ['convergiu']} for r in resumos], index=indice)
+
+
+def _ajustar_varios(descricao, momentos, pedidos, n_workers, diretorio_cache, partida):
+    """
+    Ajusta uma lista de (iguais, liberar) sobre os mesmos momentos, consultando
+    o cache e distribuindo só os ajustes novos pelo pool. Todos partem de
+    partida (ver _estimativas_partida).
+    """
+    chaves = [_chave_ajuste(descricao, momentos, iguais, liberar) for iguais, liberar in pedidos]
+    resumos = [_ler_cache(chave, diretorio_cache) for chave in chaves]
+    faltantes = [i for i, r in enumerate(resumos) if r is None]
+    if faltantes:
+        colunas = next(iter(momentos.values())).colunas
+        with ExitStack() as pilha:
+            info = publicar_momentos(pilha, momentos)
+            tarefas = [(descricao, info, colunas, list(momentos), pedidos[i][0], pedidos[i][1], partida)
+                       for i in faltantes]
+            if n_workers <= 1 or len(tarefas) <= 1:
+                novos = [_ajustar_restricoes(*tarefa) for tarefa in tarefas]
+            else:
+                with ProcessPoolExecutor(max_workers=min(n_workers, len(tarefas))) as pool:
+                    novos = list(pool.map(_ajustar_restricoes, *zip(*tarefas)))
+        for i, resumo in zip(faltantes, novos):
+            resumos[i] = resumo
+            if resumo['convergiu']:
+                _gravar_cache(chaves[i], resumo, diretorio_cache)
+    return resumos
+
+
+def comparar_ajustes(anterior, atual):
+    """Δχ² (p-valor), ΔCFI e ΔRMSEA de um ajuste mais restrito contra o anterior"""
+    delta_chi2 = atual['chi2'] - anterior['chi2']
+    delta_dof = atual['DoF'] - anterior['DoF']
+    delta_cfi = atual['CFI'] - anterior['CFI']
+    delta_rmsea = atual['RMSEA'] - anterior['RMSEA']
+    return {'Δchi2': delta_chi2, 'ΔDoF': delta_dof,
+            'p-value': float(dist_chi2.sf(delta_chi2, delta_dof)) if delta_dof > 0 else np.nan,
+            'ΔCFI': delta_cfi, 'ΔRMSEA': delta_rmsea,
+            'invariante': bool(delta_cfi >= LIMIAR_DELTA_CFI and delta_rmsea <= LIMIAR_DELTA_RMSEA)}
+
+
+def _preparar_grupos(momentos_por_grupo, n_minimo):
+    grupos = grupos_validos(momentos_por_grupo, n_minimo)
+    if len(grupos) < 2:
+        raise ValueError("A invariância exige ao menos dois grupos válidos")
+    return {g: momentos_por_grupo[g] for g in grupos}
+
+
+def testar_invariancia(descricao, momentos_por_grupo, niveis=tuple(NIVEIS_INVARIANCIA), n_workers=1, n_minimo=30,
+                       diretorio_cache=DIRETORIO_INVARIANCIA):
+    """
+    Ajusta os níveis de invariância em paralelo e compara os consecutivos.
+
+    Args:
+        descricao: Especificação lavaan/semopy
+        momentos_por_grupo: dict rótulo -> MomentosAmostrais (com médias) das observadas do modelo
+        niveis: Níveis de NIVEIS_INVARIANCIA, do menos ao mais restrito
+        n_workers: Processos (1 = sequencial, None = todos os núcleos)
+        n_minimo: Tamanho mínimo de um grupo
+        diretorio_cache: Diretório do cache de ajustes (None = só em memória)
+
+    Returns:
+        dict com 'ajustes' (índices por nível), 'comparacoes' (Δχ², ΔDoF, p-valor,
+        ΔCFI, ΔRMSEA e decisão por nível) e 'grupos'
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    momentos = _preparar_grupos(momentos_por_grupo, n_minimo)
+    print(f"⚖️ Invariância: {len(niveis)} níveis em {len(momentos)} grupos ({', '.join(map(str, momentos))})")
+    partida = estimativas_agregadas(descricao, momentos).tolist()
+    resumos = _ajustar_varios(descricao, momentos, [(NIVEIS_INVARIANCIA[n], ()) for n in niveis], n_workers,
+                              diretorio_cache, partida)
+    ajustes = _tabela_ajustes(resumos, pd.Index(list(niveis), name='nivel'))
+
+    comparacoes = []
+    for anterior, atual in zip(niveis[:-1], niveis[1:]):
+        if not (ajustes.loc[anterior, 'convergiu'] and ajustes.loc[atual, 'convergiu']):
+            continue
+        comparacoes.append({'nivel': atual, 'contra': anterior, **comparar_ajustes(ajustes.loc[anterior],
+                                                                                    ajustes.loc[atual])})
+    return {'ajustes': ajustes, 'comparacoes': pd.DataFrame(comparacoes), 'grupos': list(momentos)}
+
+
+def buscar_invariancia_parcial(descricao, momentos_por_grupo, nivel='escalar', liberados=(), max_liberados=None,
+                               n_workers=1, n_minimo=30, diretorio_cache=DIRETORIO_INVARIANCIA):
+    """
+    Invariância parcial: libera, passo a passo, o parâmetro restrito do nível
+    cuja liberação mais reduz o χ², até o nível passar nos critérios de Chen
+    contra o nível anterior.
+
+    Args:
+        nivel: 'metrica', 'escalar' ou 'estrita'
+        liberados: Parâmetros já liberados (ex.: de uma busca no nível anterior)
+        max_liberados: Máximo de parâmetros liberados nesta busca (padrão: sem limite)
+
+    Returns:
+        dict com 'passos' (DataFrame com o parâmetro liberado e a comparação de
+        cada passo) e 'liberados' (lista final)
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    momentos = _preparar_grupos(momentos_por_grupo, n_minimo)
+    ordem = list(NIVEIS_INVARIANCIA)
+    anterior, iguais = ordem[ordem.index(nivel) - 1], NIVEIS_INVARIANCIA[nivel]
+    classe = CLASSE_NIVEL[nivel]
+    candidatos = ModeloMultigrupo(descricao, list(momentos), iguais, medias=True).parametros_iguais(classe)
+
+    liberados = list(liberados)
+    # O nível anterior mantém as liberações das classes que ele já restringia
+    liberados_anterior = [p for p in liberados if p not in candidatos]
+    partida = estimativas_agregadas(descricao, momentos).tolist()
+    referencia, atual = _ajustar_varios(descricao, momentos, [(NIVEIS_INVARIANCIA[anterior], liberados_anterior),
+                                                              (iguais, liberados)], n_workers, diretorio_cache, partida)
+    passos = [{'passo': 0, 'liberado': None, **{k: atual[k] for k in INDICES_INVARIANCIA},
+               **comparar_ajustes(referencia, atual)}]
+    print(f"🔎 Invariância parcial ({nivel}): {len(candidatos)} candidatos, "
+          f"ΔCFI = {passos[0]['ΔCFI']:.4f}, ΔRMSEA = {passos[0]['ΔRMSEA']:.4f}")
+
+    while not passos[-1]['invariante']:
+        restantes = [p for p in candidatos if p not in liberados]
+        if not restantes or (max_liberados is not None and len(passos) > max_liberados):
+            print(f"⚠️ Invariância {nivel} parcial não alcançada com {len(passos) - 1} parâmetro(s) liberado(s)")
+            break
+        # Candidatos partem da solução do passo aceito (só um parâmetro a mais livre)
+        partida_passo = atual['estimativas'] if atual['convergiu'] else partida
+        resumos = _ajustar_varios(descricao, momentos, [(iguais, liberados + [p]) for p in restantes],
+                                  n_workers, diretorio_cache, partida_passo)
+        validos = [(r['chi2'], p, r) for p, r in zip(restantes, resumos) if r['convergiu']]
+        if not validos:
+            break
+        _, escolhido, atual = min(validos, key=lambda item: item[0])
+        liberados.append(escolhido)
+        passos.append({'passo': len(passos), 'liberado': escolhido, **{k: atual[k] for k in INDICES_INVARIANCIA},
+                       **comparar_ajustes(referencia, atual)})
+        print(f"   {len(passos) - 1}. {escolhido}: ΔCFI = {passos[-1]['ΔCFI']:.4f}, "
+              f"ΔRMSEA = {passos[-1]['ΔRMSEA']:.4f}")
+    return {'passos': pd.DataFrame(passos), 'liberados': liberados}
+
+
+def invariancia_por_segmento(base, nome_modelo, segmento, niveis=tuple(NIVEIS_INVARIANCIA), parcial=True,
+                             n_workers=1, n_minimo=30, diretorio_cache=DIRETORIO_INVARIANCIA):
+    """
+    Escada de invariância de um modelo de sem_models entre os grupos de um segmento
+    (nome de SEGMENTOS ou cabeçalho de coluna do Perfil Socioeconômico).
+
+    Com parcial=True, o primeiro nível que falhar recebe a busca de invariância parcial.
+
+    Returns:
+        dict de testar_invariancia, mais 'parcial' (resultado de buscar_invariancia_parcial ou None)
+    """
+    from analise_transporte_sem import sem_models
+
+    colunas_modelo, momentos = momentos_por_segmento(base, (segmento,), [nome_modelo])
+    if nome_modelo not in colunas_modelo:
+        raise KeyError(f"Modelo sem colunas na base: {nome_modelo}")
+    grupos = {r: m.subconjunto(colunas_modelo[nome_modelo]) for r, m in momentos[segmento].items()}
+    descricao = sem_models[nome_modelo]
+    resultado = testar_invariancia(descricao, grupos, niveis, n_workers, n_minimo, diretorio_cache)
+
+    resultado['parcial'] = None
+    falhas = resultado['comparacoes']
+    falhas = falhas[~falhas['invariante']] if len(falhas) else falhas
+    if parcial and len(falhas):
+        nivel = falhas.iloc[0]['nivel']
+        validos = {g: grupos[g] for g in resultado['grupos']}
+        resultado['parcial'] = buscar_invariancia_parcial(descricao, validos, nivel, n_workers=n_workers,
+                                                          n_minimo=n_minimo, diretorio_cache=diretorio_cache)
+    return resultado
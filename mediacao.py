@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+EFEITOS INDIRETOS (MEDIAÇÃO) COM BOOTSTRAP EM LOTE
+==================================================
+
+Modelo de mediação paralela por regressões (como modelo_sem_estrutural):
+    M_j = a_0j + Σ_k a_kj·X_k + Σ γ·C + ε_j      (um por mediador)
+    Y   = c_0 + Σ_k c'_k·X_k + Σ_j b_j·M_j + Σ δ·C + ε
+com efeito indireto a_kj·b_j, direto c'_k e total c'_k + Σ_j a_kj·b_j.
+
+O bootstrap não ajusta uma regressão por réplica: cada réplica é um vetor
+de pesos de frequência e todas as regressões saem das equações normais
+empilhadas. Com V = [1, X, C, M, Y], a matriz de Gram ponderada VᵀWV de
+todas as réplicas de um lote é um único produto (pesos × produtos cruzados
+das colunas), e cada equação resolve um subbloco dela.
+"""
+
+import numpy as np
+import pandas as pd
+
+from acumuladores import coluna_segmento, rotulo_segmento
+from bootstrap_sem import intervalo_bca, intervalo_percentil
+
+
+def covariaveis_perfil(perfil, segmentos=('genero', 'faixa_etaria', 'renda', 'escolaridade'), coluna_id='ID'):
+    """
+    Indicadoras (0/1) dos segmentos do Perfil Socioeconômico, categoria mais
+    frequente como referência; respondentes sem resposta ficam na referência.
+
+    Returns:
+        DataFrame indexado por ID
+    """
+    colunas = {}
+    for segmento in segmentos:
+        rotulos = perfil[coluna_segmento(perfil, segmento)].map(rotulo_segmento)
+        referencia = rotulos.value_counts().index[0]
+        for nivel in sorted(rotulos.dropna().unique(), key=str):
+            if nivel != referencia:
+                colunas[f"{segmento}[{nivel}]"] = (rotulos == nivel).astype(np.float64).to_numpy()
+    return pd.DataFrame(colunas, index=pd.Index(perfil[coluna_id], name=coluna_id))
+
+
+def _gram_ponderada(v, pesos, iu, ju):
+    """VᵀWV para cada linha de pesos (réplicas × n) em uma multiplicação"""
+    produtos = v[:, iu] * v[:, ju]                   # n × v(v+1)/2
+    triangulo = pesos @ produtos
+    g = np.empty((len(pesos), v.shape[1], v.shape[1]))
+    g[:, iu, ju] = triangulo
+    g[:, ju, iu] = triangulo
+    return g
+
+
+def _coeficientes(g, ix, ic, im, iy):
+    """(a: réplicas × X × M, b: réplicas × M, c': réplicas × X) a partir das Gram"""
+    iz = [0] + ix + ic
+    a = np.linalg.solve(g[:, iz][:, :, iz], g[:, iz][:, :, im])[:, 1:1 + len(ix), :]
+    iu = iz + im
+    beta = np.linalg.solve(g[:, iu][:, :, iu], g[:, iu][:, :, iy])[..., 0]
+    return a, beta[:, len(iz):], beta[:, 1:1 + len(ix)]
+
+
+def _efeitos(a, b, c):
+    """Vetor de efeitos por réplica: a, b, indiretos, indireto total, direto e total"""
+    indiretos = a * b[:, None, :]
+    total_indireto = indiretos.sum(axis=2)
+    r = len(a)
+    return np.hstack([a.reshape(r, -1), b, indiretos.reshape(r, -1), total_indireto, c, c + total_indireto])
+
+
+def analisar_mediacao(dados, x, mediadores, y, covariaveis=None, n_replicas=5000, semente=None, nivel=0.95,
+                      bca=True, grupos_jackknife=200, tamanho_lote=1000):
+    """
+    Efeitos indiretos com intervalos bootstrap (percentil e BCa).
+
+    Args:
+        dados: DataFrame com X, mediadores e Y (linhas com ausentes são descartadas)
+        x: Lista de preditores
+        mediadores: Lista de mediadores (mediação paralela)
+        y: Desfecho
+        covariaveis: DataFrame de covariáveis alinhado às linhas de dados (ex.: covariaveis_perfil)
+        n_replicas: Réplicas bootstrap
+        semente: Semente da SeedSequence
+        nivel: Nível de confiança
+        bca: Calcula os intervalos BCa (jackknife por grupos)
+        grupos_jackknife: Grupos do jackknife
+        tamanho_lote: Réplicas por produto matricial
+
+    Returns:
+        DataFrame com uma linha por efeito (efeito, x, mediador, Estimate, Boot SE,
+        limites percentil e BCa)
+    """
+    x, mediadores = list(x), list(mediadores)
+    quadro = dados[x + mediadores + [y]].astype(np.float64)
+    nomes_cov = []
+    if covariaveis is not None:
+        quadro = quadro.join(covariaveis.astype(np.float64), how='left')
+        nomes_cov = list(covariaveis.columns)
+    quadro = quadro.dropna()
+    n = len(quadro)
+
+    # V = [1, X, C, M, Y], centrado pelas médias para estabilidade das equações normais
+    colunas = x + nomes_cov + mediadores + [y]
+    v = quadro[colunas].to_numpy()
+    v = np.hstack([np.ones((n, 1)), v - v.mean(axis=0)])
+    ix = list(range(1, 1 + len(x)))
+    ic = list(range(ix[-1] + 1, ix[-1] + 1 + len(nomes_cov)))
+    im = list(range(1 + len(x) + len(nomes_cov), 1 + len(x) + len(nomes_cov) + len(mediadores)))
+    iy = [v.shape[1] - 1]
+    iu, ju = np.triu_indices(v.shape[1])
+
+    def efeitos_para(pesos):
+        return _efeitos(*_coeficientes(_gram_ponderada(v, pesos, iu, ju), ix, ic, im, iy))
+
+    estimativa = efeitos_para(np.ones((1, n)))[0]
+    print(f"🔁 Mediação: {n_replicas} réplicas em lotes de {tamanho_lote}, N = {n}, "
+          f"{len(x)} preditor(es), {len(mediadores)} mediador(es), {len(nomes_cov)} covariável(eis)")
+
+    fluxos = np.random.SeedSequence(semente).spawn(-(-n_replicas // tamanho_lote) + 1)
+    replicas = []
+    for lote, fluxo in enumerate(fluxos[1:]):
+        tamanho = min(tamanho_lote, n_replicas - lote * tamanho_lote)
+        pesos = np.random.default_rng(fluxo).multinomial(n, np.full(n, 1 / n), size=tamanho).astype(np.float64)
+        replicas.append(efeitos_para(pesos))
+    replicas = np.vstack(replicas)
+
+    tabela = pd.DataFrame({'Estimate': estimativa, 'Boot SE': replicas.std(axis=0, ddof=1)})
+    tabela[['Perc. inf', 'Perc. sup']] = intervalo_percentil(replicas, nivel).T
+    if bca:
+        grupos = np.array_split(np.random.default_rng(fluxos[0]).permutation(n), min(grupos_jackknife, n))
+        pesos = np.ones((len(grupos), n))
+        for g, grupo in enumerate(grupos):
+            pesos[g, grupo] = 0.0
+        tabela[['BCa inf', 'BCa sup']] = intervalo_bca(replicas, estimativa, efeitos_para(pesos), nivel).T
+
+    rotulos = ([('a', xk, m) for xk in x for m in mediadores] + [('b', None, m) for m in mediadores]
+               + [('indireto', xk, m) for xk in x for m in mediadores] + [('indireto total', xk, None) for xk in x]
+               + [('direto', xk, None) for xk in x] + [('total', xk, None) for xk in x])
+    tabela.insert(0, 'mediador', [r[2] for r in rotulos])
+    tabela.insert(0, 'x', [r[1] for r in rotulos])
+    tabela.insert(0, 'efeito', [r[0] for r in rotulos])
+    tabela.attrs['n_obs'] = n
+    return tabela
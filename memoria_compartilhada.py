@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MATRIZES EM MEMÓRIA COMPARTILHADA
+=================================
+
+Publica uma matriz NumPy em um segmento de memória compartilhada para que
+processos de um pool leiam os mesmos dados sem que um DataFrame seja
+serializado a cada tarefa:
+- O processo principal publica a matriz e repassa apenas um descritor
+- Cada worker anexa o segmento uma vez e reutiliza o array (somente leitura)
+- No caminho sequencial o anexo fica no próprio processo principal e é
+  fechado quando publicar_matriz sai do bloco with
+"""
+
+import weakref
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Segmentos já anexados neste processo: nome -> (SharedMemory, array)
+_anexadas = {}
+
+
+@contextmanager
+def publicar_matriz(matriz):
+    """
+    Copia a matriz para memória compartilhada durante o bloco with.
+
+    Args:
+        matriz: np.ndarray (qualquer dtype numérico)
+
+    Yields:
+        Descritor (dict com nome, shape e dtype) para anexar_matriz
+    """
+    matriz = np.ascontiguousarray(matriz)
+    shm = shared_memory.SharedMemory(create=True, size=max(matriz.nbytes, 1))
+    try:
+        destino = np.ndarray(matriz.shape, dtype=matriz.dtype, buffer=shm.buf)
+        destino[...] = matriz
+        del destino
+        yield {'nome': shm.name, 'shape': matriz.shape, 'dtype': matriz.dtype.str}
+    finally:
+        liberar_matriz(shm.name)
+        shm.close()
+        shm.unlink()
+
+
+def liberar_matriz(nome):
+    """
+    Remove o anexo deste processo ao segmento. O mapeamento é fechado quando
+    o array anexado deixa de existir: na hora, se ninguém mais o usa, ou
+    junto com a última visão derivada dele.
+    """
+    anexo = _anexadas.pop(nome, None)
+    if anexo is None:
+        return
+    shm, matriz = anexo
+    weakref.finalize(matriz, shm.close)
+
+
+def anexar_matriz(descritor):
+    """Anexa (uma vez por processo) a matriz publicada e devolve um array somente leitura"""
+    nome = descritor['nome']
+    if nome not in _anexadas:
+        shm = shared_memory.SharedMemory(name=nome)
+        matriz = np.ndarray(tuple(descritor['shape']), dtype=np.dtype(descritor['dtype']), buffer=shm.buf)
+        matriz.flags.writeable = False
+        _anexadas[nome] = (shm, matriz)
+    return _anexadas[nome][1]
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MOMENTOS AMOSTRAIS PARA AJUSTE SEM
+==================================
+
+Estatísticas suficientes (n, vetor de médias, matriz de covariância) por
+grupo, calculadas em uma única passada sobre a base de respondentes:
+- Os dados brutos são lidos uma vez; os momentos ficam em cache em disco,
+  indexados pela assinatura da base, colunas, grupos e tratamento de ausentes
+- Qualquer especificação sobre os indicadores é reajustada só a partir da
+  covariância (custo independente do número de respondentes)
+- A covariância segue a convenção do semopy (divisor n); na deleção por par,
+  cada par usa o divisor e as médias das suas próprias linhas completas
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache_dados import DIRETORIO_CACHE
+from cache_resultados import versao_codigo
+from codec_likert import LIKERT_AUSENTE
+from motor_sem import ModeloSEM
+
+DIRETORIO_MOMENTOS = os.path.join(DIRETORIO_CACHE, 'momentos')
+
+TRATAMENTOS_AUSENTES = ('media', 'pairwise', 'listwise')
+
+# Autovalor mínimo relativo (ao máximo) de uma covariância par a par aceita sem projeção
+TOL_AUTOVALOR = 1e-8
+
+# Memo em processo: chave do cache -> dict grupo -> MomentosAmostrais
+_momentos_calculados = {}
+
+
+class MomentosAmostrais:
+    """n, médias e covariância (divisor n) de um conjunto de indicadores"""
+
+    def __init__(self, n, media, cov, grupo=None, n_par=None):
+        """
+        Args:
+            n: Número de respondentes (na deleção por par, a menor contagem de n_par)
+            media: pd.Series com as médias por indicador
+            cov: pd.DataFrame com a covariância (mesma ordem de media)
+            grupo: Rótulo do grupo (None para a amostra inteira)
+            n_par: Matriz com o número de linhas de cada par (só na deleção por par)
+        """
+        self.n = int(n)
+        self.media = media
+        self.cov = cov
+        self.grupo = grupo
+        self.n_par = n_par
+
+    def __repr__(self):
+        rotulo = '' if self.grupo is None else f", grupo={self.grupo!r}"
+        return f"MomentosAmostrais(n={self.n}, indicadores={len(self.media)}{rotulo})"
+
+    @property
+    def colunas(self):
+        return list(self.media.index)
+
+    def subconjunto(self, colunas):
+        """Momentos restritos a um subconjunto de indicadores"""
+        colunas = list(colunas)
+        n, n_par = self.n, self.n_par
+        if n_par is not None:
+            indices = [self.colunas.index(c) for c in colunas]
+            n_par = n_par[np.ix_(indices, indices)]
+            n = n_par.min() if n_par.size else self.n
+        return MomentosAmostrais(n, self.media[colunas], self.cov.loc[colunas, colunas], self.grupo, n_par)
+
+    def constantes(self, tol=1e-12):
+        """Indicadores com variância nula (mesmo critério de prepare_sem_data)"""
+        variancia = np.diag(self.cov.to_numpy())
+        escala = max(1.0, float(np.nanmax(variancia))) if len(variancia) else 1.0
+        return [c for c, v in zip(self.colunas, variancia) if not v > tol * escala]
+
+    def sem_constantes(self, tol=1e-12):
+        """Momentos sem os indicadores constantes, com o mesmo aviso de prepare_sem_data"""
+        constantes = self.constantes(tol)
+        if not constantes:
+            return self
+        print(f"AVISO: Removendo colunas constantes: {constantes}")
+        return self.subconjunto([c for c in self.colunas if c not in constantes])
+
+    def correlacao(self):
+        """Matriz de correlação derivada da covariância"""
+        dp = np.sqrt(np.diag(self.cov.to_numpy()))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = self.cov.to_numpy() / np.outer(dp, dp)
+        return pd.DataFrame(r, index=self.cov.index, columns=self.cov.columns)
+
+
+def definida_positiva(cov, rotulo=None, tol=TOL_AUTOVALOR):
+    """
+    Covariância par a par projetada na mais próxima positiva definida, se
+    preciso: autovalores abaixo de tol·máximo sobem para esse piso e a
+    diagonal (variâncias) é restaurada. Devolve a própria matriz se já for PD.
+    """
+    if not np.isfinite(cov).all():
+        return cov
+    autovalores, vetores = np.linalg.eigh(cov)
+    piso = tol * max(autovalores[-1], 0.0)
+    if autovalores[0] > piso:
+        return cov
+    grupo = '' if rotulo is None else f" (grupo {rotulo})"
+    print(f"⚠️ Covariância par a par não positiva definida{grupo}: menor autovalor {autovalores[0]:.3g}, "
+          f"projetada na matriz PD mais próxima")
+    projetada = (vetores * np.maximum(autovalores, piso)) @ vetores.T
+    escala = np.sqrt(np.diag(cov) / np.diag(projetada))
+    return projetada * np.outer(escala, escala)
+
+
+def _momentos_matriz(x, tratamento):
+    """(n, médias, covariância, contagens por par) de uma matriz float com NaN nos ausentes"""
+    presente = ~np.isnan(x)
+    if tratamento == 'listwise':
+        x = x[presente.all(axis=1)]
+        presente = np.ones(x.shape, dtype=bool)
+    n = x.shape[0]
+    contagem = presente.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.where(presente, x, 0.0).sum(axis=0) / contagem
+    desvio = np.where(presente, x - media, 0.0)
+
+    if tratamento == 'pairwise':
+        # Cada par usa só as linhas em que ambos estão presentes, centradas nas
+        # médias dessas linhas: sobre os desvios da média da coluna, a correção
+        # das médias do par é pequena e não há cancelamento numérico
+        p = presente.astype(np.float64)
+        n_par = p.T @ p
+        soma_par = desvio.T @ p          # soma dos desvios de x_i onde x_j também está presente
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = (desvio.T @ desvio) / n_par - (soma_par * soma_par.T) / n_par ** 2
+        return int(n_par.min(initial=n)), media, cov, n_par.astype(np.int64)
+    # Imputação pela média (igual a prepare_sem_data): ausentes não contribuem
+    cov = desvio.T @ desvio / n if n else np.full((x.shape[1],) * 2, np.nan)
+    return n, media, cov, None
+
+
+def calcular_momentos(dados, colunas=None, grupos=None, ausentes='media'):
+    """
+    Momentos por grupo a partir de um DataFrame ou matriz.
+
+    Args:
+        dados: DataFrame numérico (NaN nos ausentes) ou np.ndarray
+        colunas: Indicadores (padrão: todas as colunas)
+        grupos: Array com o rótulo de grupo de cada linha (None = amostra inteira)
+        ausentes: 'media' (imputação pela média), 'pairwise' ou 'listwise'
+
+    Returns:
+        MomentosAmostrais, ou dict grupo -> MomentosAmostrais se grupos for dado
+
+    Na deleção por par, n é a menor contagem de linhas entre os pares (as
+    contagens ficam em n_par) e a covariância é projetada na positiva definida
+    mais próxima quando não o é (com aviso).
+    """
+    if ausentes not in TRATAMENTOS_AUSENTES:
+        raise ValueError(f"Tratamento de ausentes inválido: {ausentes}")
+    if isinstance(dados, pd.DataFrame):
+        colunas = list(dados.columns) if colunas is None else list(colunas)
+        x = dados[colunas].to_numpy(dtype=np.float64)
+    else:
+        x = np.asarray(dados, dtype=np.float64)
+        colunas = [f'x{i}' for i in range(x.shape[1])] if colunas is None else list(colunas)
+
+    def montar(sub, rotulo):
+        n, media, cov, n_par = _momentos_matriz(sub, ausentes)
+        if n_par is not None:
+            cov = definida_positiva(cov, rotulo)
+        return MomentosAmostrais(n, pd.Series(media, index=colunas),
+                                 pd.DataFrame(cov, index=colunas, columns=colunas), rotulo, n_par)
+
+    if grupos is None:
+        return montar(x, None)
+
+    codigos, rotulos = pd.factorize(np.asarray(grupos), use_na_sentinel=True)
+    ordem = np.argsort(codigos, kind='stable')
+    limites = np.searchsorted(codigos[ordem], np.arange(len(rotulos) + 1))
+    return {rotulos[g]: montar(x[ordem[limites[g]:limites[g + 1]]], rotulos[g]) for g in range(len(rotulos))}
+
+
+def indicadores_likert(base):
+    """Colunas Likert (int8) de uma base carregada em modo 'codificado'"""
+    return [c for c in base.colunas() if getattr(base.coluna(c), 'dtype', None) == np.int8]
+
+
+def matriz_da_base(base, colunas):
+    """Matriz float (NaN nos ausentes) das colunas da base, em uma passada"""
+    x = np.empty((len(base), len(colunas)), dtype=np.float64)
+    for j, coluna in enumerate(colunas):
+        valores = base.coluna(coluna)
+        if getattr(valores, 'dtype', None) == np.int8:
+            x[:, j] = np.where(valores == LIKERT_AUSENTE, np.nan, valores)
+        elif isinstance(valores, pd.Categorical) or not np.issubdtype(np.asarray(valores).dtype, np.number):
+            raise ValueError(f"Coluna não numérica: {coluna}")
+        else:
+            x[:, j] = valores
+    return x
+
+
+def _chave_cache(base, colunas, grupo, ausentes):
+    chave = json.dumps([base.assinatura, list(colunas), grupo, ausentes,
+                        versao_codigo(_momentos_matriz, definida_positiva)],
+                       ensure_ascii=False)
+    return hashlib.blake2b(chave.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _salvar(caminho, momentos):
+    rotulos = list(momentos)
+    extras = {}
+    if momentos[rotulos[0]].n_par is not None:
+        extras['n_par'] = np.stack([momentos[r].n_par for r in rotulos])
+    np.savez(caminho,
+             colunas=np.array(momentos[rotulos[0]].colunas, dtype=str),
+             grupos=np.array(json.dumps([None if r is None else str(r) for r in rotulos])),
+             n=np.array([momentos[r].n for r in rotulos]),
+             media=np.stack([momentos[r].media.to_numpy() for r in rotulos]),
+             cov=np.stack([momentos[r].cov.to_numpy() for r in rotulos]),
+             **extras)
+
+
+def _carregar(caminho):
+    with np.load(caminho) as arq:
+        colunas = [str(c) for c in arq['colunas']]
+        rotulos = json.loads(str(arq['grupos']))
+        n_par = arq['n_par'] if 'n_par' in arq.files else [None] * len(rotulos)
+        return {r: MomentosAmostrais(arq['n'][g], pd.Series(arq['media'][g], index=colunas),
+                                     pd.DataFrame(arq['cov'][g], index=colunas, columns=colunas), r, n_par[g])
+                for g, r in enumerate(rotulos)}
+
+
+def momentos_da_base(base, colunas=None, grupo=None, ausentes='media', diretorio_cache=DIRETORIO_MOMENTOS):
+    """
+    Momentos dos indicadores da base de respondentes, por grupo, com cache.
+
+    Args:
+        base: BaseRespondentes carregada em modo 'codificado'
+        colunas: Indicadores (padrão: todas as colunas Likert)
+        grupo: Coluna de segmentação da base (ex.: gênero) ou None
+        ausentes: 'media', 'pairwise' ou 'listwise'
+        diretorio_cache: Diretório do cache em disco (None desativa)
+
+    Returns:
+        dict rótulo do grupo -> MomentosAmostrais (chave None sem grupo)
+    """
+    colunas = indicadores_likert(base) if colunas is None else list(colunas)
+    assinatura = getattr(base, 'assinatura', None)
+    chave = _chave_cache(base, colunas, grupo, ausentes) if assinatura else None
+
+    if chave is not None and chave in _momentos_calculados:
+        return _momentos_calculados[chave]
+    caminho = os.path.join(diretorio_cache, chave + '.npz') if chave and diretorio_cache else None
+    if caminho and os.path.exists(caminho):
+        momentos = _carregar(caminho)
+    else:
+        x = matriz_da_base(base, colunas)
+        rotulos = None
+        if grupo is not None:
+            rotulos = np.asarray(base.coluna(grupo), dtype=object)
+        momentos = calcular_momentos(x, colunas, rotulos, ausentes)
+        if not isinstance(momentos, dict):
+            momentos = {None: momentos}
+        if caminho:
+            os.makedirs(diretorio_cache, exist_ok=True)
+            _salvar(caminho, momentos)
+            momentos = _carregar(caminho)
+
+    if chave is not None:
+        _momentos_calculados[chave] = momentos
+    return momentos
+
+
+def ajustar_por_momentos(descricao, momentos, obj='MLW', x0=None, metodo='SLSQP', partidas='padrao'):
+    """
+    Ajusta uma especificação SEM usando apenas (n, covariância).
+
+    Args:
+        descricao: Especificação lavaan/semopy
+        momentos: MomentosAmostrais com (ao menos) as variáveis observadas do modelo
+        obj: 'MLW' ou 'GLS'
+        x0: Estimativas iniciais (ex.: de um ajuste anterior)
+        metodo: 'SLSQP' ou 'fisher' (ver ModeloSEM.fit)
+        partidas: 'padrao' ou 'multiplas' (ver ModeloSEM.fit)
+
+    Returns:
+        ModeloSEM ajustado
+
+    Indicadores de variância nula são descartados antes do ajuste, como em
+    prepare_sem_data; se o modelo os usa, o ajuste falha com KeyError.
+    """
+    modelo = ModeloSEM(descricao)
+    momentos = momentos.subconjunto([v for v in modelo.vars['observed'] if v in momentos.cov.index]).sem_constantes()
+    faltantes = [v for v in modelo.vars['observed'] if v not in momentos.cov.index]
+    if faltantes:
+        raise KeyError(f"Variáveis do modelo sem momentos (ausentes ou constantes): {faltantes}")
+    modelo.fit(cov=momentos.cov, n_samples=momentos.n, obj=obj, x0=x0, metodo=metodo, partidas=partidas)
+    return modelo
+
+
+def ajustar_grupos(descricao, momentos_por_grupo, obj='MLW', n_minimo=10):
+    """
+    Ajusta a mesma especificação em cada grupo a partir dos momentos.
+
+    Returns:
+        dict rótulo -> ModeloSEM (grupos com menos de n_minimo respondentes ou
+        com indicador constante ficam de fora)
+    """
+    ajustes = {}
+    for rotulo, momentos in momentos_por_grupo.items():
+        if momentos.n < n_minimo:
+            print(f"⚠️ Grupo {rotulo}: apenas {momentos.n} respondentes, ajuste ignorado")
+            continue
+        try:
+            ajustes[rotulo] = ajustar_por_momentos(descricao, momentos, obj=obj)
+        except KeyError as e:
+            print(f"⚠️ Grupo {rotulo}: {e.args[0]}, ajuste ignorado")
+    return ajustes
@@ -0,0 +1,1165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MOTOR SEM NATIVO (ML / GLS / DWLS)
+==================================
+
+Estimador de modelos de equações estruturais para a família de modelos do
+projeto: modelos de medida no estilo lavaan ('=~') com caminhos
+estruturais ('~') e covariâncias ('~~'). Segue as convenções do semopy
+(primeira carga fixada em 1, variâncias livres com limite inferior 0,
+covariâncias livres entre latentes exógenas, objetivo MLW) para reproduzir
+suas estimativas e a tabela de inspect().
+
+Diferenças em relação ao otimizador genérico:
+- Σ = Λ(I−B)⁻¹Ψ(I−B)⁻ᵀΛᵀ + Θ; cada ∂Σ/∂θ é uma forma simétrica de posto
+  ≤ 2, então gradiente e informação esperada saem de poucos produtos de
+  matrizes, sem montar as derivadas p×p de cada parâmetro
+- O ajuste inicial segue o caminho do semopy (mesma partida, SLSQP)
+  com objetivo e gradiente nativos e é polido por Fisher scoring
+  (informação esperada analítica, busca linear, projeção nos limites);
+  outras partidas só entram se essa não convergir, ou com
+  partidas='multiplas' (busca do mínimo global, para os ajustes principais)
+- Reajustes com partida quente usam SLSQP a partir de x0 (ondas) ou só
+  Fisher scoring (bootstrap, busca de especificação)
+- DWLS para indicadores ordinais (WLSMV): ajuste à matriz policórica com
+  pesos 1/Γ_pp da covariância assintótica das correlações, erros padrão
+  sanduíche e qui-quadrado ajustado pela média e variância
+- Índices de modificação e EPC de todas as cargas cruzadas e covariâncias
+  residuais candidatas em uma passada, do gradiente e da informação do
+  ajuste (sem reajustar cada candidato)
+- A descrição é compilada uma vez por processo (EspecificacaoSEM, em cache
+  pelo hash do texto), com rótulos, restrições 'a == b' / 'a > valor' e as
+  colunas observadas que os dados precisam ter
+"""
+
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import cho_solve
+from scipy.optimize import minimize
+from scipy.stats import chi2 as chi2_dist, norm
+
+OBJETIVOS = ('MLW', 'GLS', 'DWLS')
+
+# Partidas sorteadas (perturbações da partida do semopy) nos ajustes com partidas='multiplas'
+PARTIDAS_SORTEADAS = 4
+
+PARTIDAS = ('padrao', 'multiplas')
+
+_MATRIZES = ('beta', 'lambda', 'psi', 'theta')
+
+# Restrição entre rótulos: 'a == b', 'a > 0'
+_RESTRICAO = re.compile(r'^([A-Za-z_]\w*)\s*(==|>|<)\s*(\S+)$')
+
+
+class ResultadoAjuste:
+    """Resumo do processo de otimização (análogo ao SolverResult do semopy)"""
+
+    def __init__(self, x, fun, sucesso, n_iter, mensagem, objetivo):
+        self.x = x
+        self.fun = fun
+        self.success = sucesso
+        self.n_it = n_iter
+        self.message = mensagem
+        self.name_obj = objetivo
+        self.name_method = 'Fisher scoring'
+        # Custo de todas as partidas tentadas (n_it é só o da partida escolhida)
+        self.n_partidas = 1
+        self.n_it_total = n_iter
+
+    def __repr__(self):
+        partidas = f" ({self.n_partidas} partidas, {self.n_it_total} no total)" if self.n_partidas > 1 else ''
+        return (f"Name of objective: {self.name_obj}\n"
+                f"Optimization method: {self.name_method}\n"
+                f"Optimization {'successful' if self.success else 'failed'}.\n"
+                f"{self.message}\n"
+                f"Objective value: {self.fun:.3f}\n"
+                f"Number of iterations: {self.n_it}{partidas}\n"
+                f"Params: {' '.join(f'{v:.3f}' for v in self.x)}")
+
+
+def _interpretar_termo(termo):
+    """Separa 'mult*var' em (var, mult); mult é float (fixo), str (rótulo) ou None"""
+    if '*' not in termo:
+        return termo.strip(), None
+    mult, var = termo.split('*', 1)
+    mult = mult.strip()
+    try:
+        return var.strip(), float(mult)
+    except ValueError:
+        return var.strip(), mult
+
+
+def _linhas_descricao(descricao):
+    """Linhas lógicas da descrição, sem comentários e com as continuações ('+') unidas"""
+    linhas = []
+    for linha in descricao.splitlines():
+        linha = linha.split('#', 1)[0].strip()
+        if not linha:
+            continue
+        # Continuação: linha iniciando ou terminando em '+'
+        if linhas and (linha.startswith('+') or linhas[-1].endswith('+')):
+            linhas[-1] = linhas[-1] + ' ' + linha
+        else:
+            linhas.append(linha)
+    return linhas
+
+
+def interpretar_descricao(descricao):
+    """
+    Interpreta uma descrição lavaan/semopy. Linhas de restrição
+    (ver interpretar_restricoes) ficam de fora.
+
+    Returns:
+        dict operador ('=~', '~', '~~') -> lval -> rval -> mult, na ordem em
+        que aparecem na descrição (mesma estrutura de efeitos do semopy)
+    """
+    efeitos = {}
+    for linha in _linhas_descricao(descricao):
+        if _RESTRICAO.match(linha):
+            continue
+        op = re.search(r'=~|~~|~', linha)
+        if op is None:
+            raise ValueError(f"Linha sem operador reconhecido: '{linha}'")
+        esquerda, direita = linha[:op.start()], linha[op.end():]
+        itens = efeitos.setdefault(op.group(), {})
+        for lval in (v.strip() for v in esquerda.split(',')):
+            for termo in direita.split('+'):
+                if termo.strip():
+                    rval, mult = _interpretar_termo(termo)
+                    itens.setdefault(lval, {})[rval] = mult
+    for op in ('=~', '~', '~~'):
+        efeitos.setdefault(op, {})
+    return efeitos
+
+
+def interpretar_restricoes(descricao):
+    """
+    Restrições entre rótulos de parâmetros: 'a == b' (a e b são o mesmo
+    parâmetro) e 'a > valor' (limite inferior). Limites superiores e
+    expressões não são suportados pelo ajuste (só limites inferiores).
+
+    Returns:
+        Lista de (rótulo, operador, rótulo ou valor)
+    """
+    restricoes = []
+    for linha in _linhas_descricao(descricao):
+        casamento = _RESTRICAO.match(linha)
+        if casamento is None:
+            continue
+        esquerda, op, direita = casamento.groups()
+        if op == '>':
+            try:
+                direita = float(direita)
+            except ValueError:
+                raise ValueError(f"Limite inferior deve ser numérico: '{linha}'") from None
+        elif op == '<':
+            raise ValueError(f"Limite superior não suportado: '{linha}'")
+        elif not re.fullmatch(r'[A-Za-z_]\w*', direita):
+            raise ValueError(f"Igualdade só entre rótulos: '{linha}'")
+        restricoes.append((esquerda, op, direita))
+    return restricoes
+
+
+def classificar_variaveis(efeitos):
+    """Classifica variáveis como no semopy (latentes, observadas, internas, saídas)"""
+    latentes, indicadores = set(), set()
+    entradas, saidas = set(), set()
+    for lat, inds in efeitos['=~'].items():
+        latentes.add(lat)
+        indicadores.update(inds)
+        saidas.add(lat)
+        entradas.update(inds)
+    for dep, preds in efeitos['~'].items():
+        entradas.add(dep)
+        saidas.update(preds)
+    todas = entradas | saidas
+    exogenas = saidas - entradas
+    observadas = todas - latentes
+    # Indicadores que não enviam setas ficam em Θ; o resto é "interno" (B/Ψ)
+    finais = entradas - saidas
+    internas = todas - finais
+
+    ordem_obs = sorted(observadas & finais) + sorted(observadas - finais)
+    return {
+        'all': todas,
+        'latent': latentes,
+        'observed': ordem_obs,
+        'exogenous': exogenas,
+        'endogenous': todas - exogenas,
+        'indicator': indicadores,
+        '_output': finais,
+        'inner': sorted(latentes & internas) + sorted(observadas & internas),
+    }
+
+
+def hash_especificacao(descricao):
+    """Hash do texto da especificação (chave dos caches de especificações e ajustes)"""
+    return hashlib.blake2b(descricao.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class EspecificacaoSEM:
+    """
+    Especificação lavaan compilada: efeitos, termos (lval, op, rval, valor
+    fixo, rótulo), restrições, classificação das variáveis e as colunas
+    observadas que os dados precisam ter. Não deve ser alterada depois de
+    criada: a mesma instância é compartilhada por todos os modelos da
+    especificação (ver compilar_especificacao).
+    """
+
+    def __init__(self, descricao):
+        self.descricao = descricao
+        self.chave = hash_especificacao(descricao)
+        self.efeitos = interpretar_descricao(descricao)
+        self.restricoes = interpretar_restricoes(descricao)
+        self.termos = [(lval, op, rval, mult if isinstance(mult, float) else None,
+                        mult if isinstance(mult, str) else None)
+                       for op, itens in self.efeitos.items()
+                       for lval, rvals in itens.items() for rval, mult in rvals.items()]
+        self.vars = classificar_variaveis(self.efeitos)
+        rotulos = {r for *_, r in self.termos if r is not None}
+        desconhecidos = sorted({r for e, op, d in self.restricoes for r in ((e, d) if op == '==' else (e,))
+                                if r not in rotulos})
+        if desconhecidos:
+            raise ValueError(f"Restrições com rótulos inexistentes: {desconhecidos}")
+
+        # Igualdades: cada rótulo aponta para o representante do seu grupo
+        self._iguais = {}
+        for esquerda, op, direita in self.restricoes:
+            if op == '==':
+                a, b = self.rotulo(esquerda), self.rotulo(direita)
+                if a != b:
+                    self._iguais[max(a, b)] = min(a, b)
+        self._limites = {}
+        for esquerda, op, direita in self.restricoes:
+            if op == '>':
+                r = self.rotulo(esquerda)
+                self._limites[r] = max(self._limites.get(r, -np.inf), direita)
+
+    def __repr__(self):
+        return (f"EspecificacaoSEM({self.chave[:8]}, latentes={len(self.vars['latent'])}, "
+                f"observadas={len(self.vars['observed'])}, termos={len(self.termos)})")
+
+    @property
+    def observadas(self):
+        """Colunas de dados usadas pelo modelo (ordem de ModeloSEM.vars['observed'])"""
+        return list(self.vars['observed'])
+
+    @property
+    def latentes(self):
+        return sorted(self.vars['latent'])
+
+    def rotulo(self, rotulo):
+        """Rótulo representante de rotulo após as igualdades"""
+        while rotulo in self._iguais:
+            rotulo = self._iguais[rotulo]
+        return rotulo
+
+    def limite(self, rotulo):
+        """Limite inferior imposto por restrição ao rótulo (-inf se não houver)"""
+        return self._limites.get(self.rotulo(rotulo), -np.inf)
+
+    def projetar(self, dados):
+        """Só as colunas observadas do modelo, na ordem de observadas"""
+        faltantes = [c for c in self.vars['observed'] if c not in dados.columns]
+        if faltantes:
+            raise KeyError(f"Colunas do modelo ausentes nos dados: {faltantes}")
+        return dados[self.observadas]
+
+
+# Memo em processo: hash da especificação -> EspecificacaoSEM
+_especificacoes = {}
+
+
+def compilar_especificacao(descricao):
+    """
+    Especificação compilada, em cache pelo hash do texto: ajustes repetidos
+    (bootstrap, grupos, segmentos, busca) não reinterpretam a descrição.
+    """
+    chave = hash_especificacao(descricao)
+    especificacao = _especificacoes.get(chave)
+    if especificacao is None:
+        especificacao = _especificacoes[chave] = EspecificacaoSEM(descricao)
+    return especificacao
+
+
+def fisher_scoring(avaliar, derivadas, theta, limites, max_iter, tol):
+    """
+    Fisher scoring projetado: passo H⁻¹g com a informação esperada,
+    busca linear de Armijo e parâmetros no limite retirados do sistema.
+
+    Args:
+        avaliar: θ -> (objetivo, estado); objetivo inf fora da região admissível
+        derivadas: estado -> (gradiente, informação)
+        theta: Vetor inicial
+        limites: Limites inferiores dos parâmetros
+
+    Returns:
+        (θ, objetivo, sucesso, iterações, mensagem)
+    """
+    valor, estado = avaliar(theta)
+    if not np.isfinite(valor):
+        return theta, valor, False, 0, 'Ponto inicial fora da região admissível.'
+
+    for iteracao in range(1, max_iter + 1):
+        grad, info = derivadas(estado)
+
+        # Conjunto ativo: parâmetros no limite com gradiente empurrando para fora
+        ativos = (theta <= limites + 1e-12) & (grad > 0)
+        livres = ~ativos
+        grad_proj = np.where(ativos, 0.0, grad)
+        if np.max(np.abs(grad_proj), initial=0.0) < tol:
+            return theta, valor, True, iteracao, 'Gradiente projetado abaixo da tolerância.'
+
+        passo = np.zeros_like(theta)
+        sub = info[np.ix_(livres, livres)]
+        try:
+            passo[livres] = np.linalg.solve(sub + 1e-10 * np.identity(len(sub)), grad[livres])
+        except np.linalg.LinAlgError:
+            passo[livres] = np.linalg.lstsq(sub, grad[livres], rcond=None)[0]
+
+        alfa = 1.0
+        for _ in range(40):
+            candidato = np.maximum(theta - alfa * passo, limites)
+            valor_c, estado_c = avaliar(candidato)
+            if np.isfinite(valor_c) and valor_c <= valor + 1e-4 * grad @ (candidato - theta):
+                break
+            alfa /= 2
+        else:
+            sucesso = np.max(np.abs(grad_proj)) < 1e-5
+            return theta, valor, sucesso, iteracao, 'Busca linear não encontrou decréscimo.'
+        melhora = valor - valor_c
+        theta, valor, estado = candidato, valor_c, estado_c
+        if melhora < 1e-15 * max(1.0, abs(valor)):
+            return theta, valor, True, iteracao, 'Variação do objetivo abaixo da tolerância.'
+    return theta, valor, False, max_iter, 'Número máximo de iterações atingido.'
+
+
+class ModeloSEM:
+    """
+    Modelo SEM com estimação ML/GLS nativa.
+
+    Interface compatível com o uso do semopy no projeto: fit(), inspect(),
+    calc_sigma(), param_vals, vars, n_samples e last_result.
+    """
+
+    def __init__(self, descricao):
+        self.descricao = descricao
+        self.especificacao = compilar_especificacao(descricao)
+        self.efeitos = self.especificacao.efeitos
+        self.vars = self.especificacao.vars
+        self._montar_parametros()
+
+    # ------------------------------------------------------------------
+    # Especificação
+    # ------------------------------------------------------------------
+    def _montar_parametros(self):
+        """Cria a tabela de parâmetros na ordem de criação do semopy"""
+        internas = self.vars['inner']
+        observadas = self.vars['observed']
+        finais = self.vars['_output']
+        idx_int = {v: i for i, v in enumerate(internas)}
+        idx_obs = {v: i for i, v in enumerate(observadas)}
+        self._idx_int, self._idx_obs = idx_int, idx_obs
+
+        locais = []
+
+        def adicionar(matriz, lval, op, rval, mult, limite=-np.inf):
+            if matriz in ('beta', 'psi'):
+                linha, coluna = idx_int[lval], idx_int[rval]
+            elif matriz == 'lambda':
+                linha, coluna = idx_obs[lval], idx_int[rval]
+            else:
+                linha, coluna = idx_obs[lval], idx_obs[rval]
+            locais.append({'matriz': matriz, 'linha': linha, 'coluna': coluna,
+                           'lval': lval, 'op': op, 'rval': rval, 'mult': mult, 'limite': limite})
+
+        def regressoes(itens):
+            # B, ou Λ quando o dependente é uma saída observada
+            for dep, preds in itens.items():
+                for pred, mult in preds.items():
+                    adicionar('lambda' if dep in finais else 'beta', dep, '~', pred, mult)
+
+        def medicao(itens):
+            # A primeira carga livre vira 1 se a latente não tiver carga fixada
+            reverso = {}
+            self._primeiro = {}
+            for lat, inds in itens.items():
+                cargas = list(inds.items())
+                primeiro = next((i for i, (_, mult) in enumerate(cargas) if isinstance(mult, float)), None)
+                if primeiro is None:
+                    primeiro = next((i for i, (_, mult) in enumerate(cargas) if mult is None), None)
+                    if primeiro is not None:
+                        cargas[primeiro] = (cargas[primeiro][0], 1.0)
+                for ind, mult in cargas:
+                    reverso.setdefault(ind, {})[lat] = mult
+                if primeiro is not None:
+                    self._primeiro[lat] = cargas[primeiro][0]
+            regressoes(reverso)
+
+        def covariancias(itens):
+            # Explícitas, variâncias padrão e covariâncias entre exógenas
+            cov = {a: dict(rvs) for a, rvs in itens.items()}
+            exogenas = self.vars['exogenous']
+            obs_exo = set(observadas) & exogenas
+            for v in sorted(obs_exo):
+                cov.setdefault(v, {}).setdefault(v, 'amostra')
+            for v in sorted(self.vars['endogenous'] | self.vars['latent']):
+                cov.setdefault(v, {}).setdefault(v, None)
+            for a, b in _pares_ordenados(obs_exo):
+                if a not in cov.get(b, {}) and b not in cov.get(a, {}):
+                    cov.setdefault(a, {})[b] = 'amostra'
+            for a, b in _pares_ordenados(exogenas & self.vars['latent']):
+                if a not in cov.get(b, {}) and b not in cov.get(a, {}):
+                    cov.setdefault(a, {})[b] = None
+            for a, rvs in cov.items():
+                for b, mult in rvs.items():
+                    a_int, b_int = a in idx_int, b in idx_int
+                    if a_int != b_int:
+                        raise ValueError(f"Covariância entre variável interna e de saída não suportada: {a} ~~ {b}")
+                    adicionar('psi' if a_int else 'theta', a, '~~', b, mult,
+                              limite=0.0 if a == b else -np.inf)
+
+        aplicar = {'=~': medicao, '~': regressoes, '~~': covariancias}
+        for op, itens in self.efeitos.items():
+            aplicar[op](itens)
+
+        # Parâmetros livres na ordem de criação; rótulos iguais compartilham o índice
+        rotulos, n_livres = {}, 0
+        for local in locais:
+            mult = local['mult']
+            if mult is None or (isinstance(mult, str) and mult != 'amostra'):
+                if isinstance(mult, str):
+                    rotulo = self.especificacao.rotulo(mult)
+                    if rotulo not in rotulos:
+                        rotulos[rotulo] = n_livres
+                        n_livres += 1
+                    local['indice'] = rotulos[rotulo]
+                else:
+                    local['indice'] = n_livres
+                    n_livres += 1
+            else:
+                local['indice'] = None
+
+        # Ordem do inspect(): por matriz, depois ordem de criação
+        locais.sort(key=lambda l: _MATRIZES.index(l['matriz']))
+        self.parametros = locais
+        self.n_parametros = n_livres
+        self.rotulos = rotulos
+
+        livres = [l for l in locais if l['indice'] is not None]
+        self._livres = livres
+        self._mat_livre = np.array([_MATRIZES.index(l['matriz']) for l in livres], dtype=int)
+        self._lin_livre = np.array([l['linha'] for l in livres], dtype=int)
+        self._col_livre = np.array([l['coluna'] for l in livres], dtype=int)
+        self._h_livre = np.array([0.5 if l['matriz'] in ('psi', 'theta') and l['linha'] == l['coluna'] else 1.0
+                                  for l in livres])
+        self._incidencia = np.zeros((len(livres), n_livres))
+        self._incidencia[np.arange(len(livres)), [l['indice'] for l in livres]] = 1.0
+        limites = np.full(n_livres, -np.inf)
+        for l in livres:
+            limites[l['indice']] = max(limites[l['indice']], l['limite'])
+        for rotulo, indice in rotulos.items():
+            limites[indice] = max(limites[indice], self.especificacao.limite(rotulo))
+        self._limites = limites
+
+    # ------------------------------------------------------------------
+    # Álgebra do modelo
+    # ------------------------------------------------------------------
+    def _matrizes_base(self, S):
+        """Matrizes com os valores fixos (inclui os fixados na covariância amostral)"""
+        m, p = len(self.vars['inner']), len(self.vars['observed'])
+        base = {'beta': np.zeros((m, m)), 'lambda': np.zeros((p, m)),
+                'psi': np.zeros((m, m)), 'theta': np.zeros((p, p))}
+        for v in self.vars['observed']:
+            if v in self._idx_int:
+                base['lambda'][self._idx_obs[v], self._idx_int[v]] = 1.0
+        for local in self.parametros:
+            if local['indice'] is not None:
+                continue
+            if local['mult'] == 'amostra':
+                i, j = self._idx_obs[local['lval']], self._idx_obs[local['rval']]
+                valor = S[i, j]
+            else:
+                valor = local['mult']
+            mx = base[local['matriz']]
+            mx[local['linha'], local['coluna']] = valor
+            if local['matriz'] in ('psi', 'theta'):
+                mx[local['coluna'], local['linha']] = valor
+        return base
+
+    def _preencher(self, theta):
+        """Matrizes B, Λ, Ψ, Θ para o vetor de parâmetros livres"""
+        mats = {k: v.copy() for k, v in self._base.items()}
+        valores = theta[[l['indice'] for l in self._livres]]
+        for local, valor in zip(self._livres, valores):
+            mx = mats[local['matriz']]
+            mx[local['linha'], local['coluna']] = valor
+            if local['matriz'] in ('psi', 'theta'):
+                mx[local['coluna'], local['linha']] = valor
+        return mats
+
+    def _sigma(self, theta):
+        """Σ(θ) e auxiliares M = ΛC e C = (I−B)⁻¹"""
+        mats = self._preencher(theta)
+        c = np.linalg.inv(np.identity(len(mats['beta'])) - mats['beta'])
+        m = mats['lambda'] @ c
+        sigma = m @ mats['psi'] @ m.T + mats['theta']
+        return sigma, m, c, mats
+
+    def _vetores_derivada(self, m, c, psi):
+        """
+        Para cada parâmetro livre (por local), ∂Σ/∂θ = h(abᵀ + baᵀ).
+        Devolve A, B (p × locais) e h.
+        """
+        a, b = self._vetores_locais(m, c, psi, self._mat_livre, self._lin_livre, self._col_livre)
+        return a, b, self._h_livre
+
+    @staticmethod
+    def _vetores_locais(m, c, psi, matrizes, linhas, colunas):
+        """A e B de ∂Σ/∂θ para posições quaisquer (índice da matriz em _MATRIZES, linha, coluna)"""
+        d = m @ psi @ c.T
+        p = m.shape[0]
+        identidade = np.identity(p)
+        a = np.empty((p, len(matrizes)))
+        b = np.empty_like(a)
+        for k, (mat, lin, col) in enumerate(zip(matrizes, linhas, colunas)):
+            if mat == 0:    # beta
+                a[:, k], b[:, k] = m[:, lin], d[:, col]
+            elif mat == 1:  # lambda
+                a[:, k], b[:, k] = identidade[:, lin], d[:, col]
+            elif mat == 2:  # psi
+                a[:, k], b[:, k] = m[:, lin], m[:, col]
+            else:           # theta
+                a[:, k], b[:, k] = identidade[:, lin], identidade[:, col]
+        return a, b
+
+    def _gradiente_informacao(self, a, b, h, w, v, incidencia=None):
+        """
+        Gradiente tr(W ∂Σ/∂θ) e informação tr(V ∂Σ/∂θᵢ V ∂Σ/∂θⱼ) agregados
+        pelos rótulos (parâmetros empatados somam as contribuições).
+        """
+        g_local = 2.0 * h * np.einsum('ik,ik->k', a, w @ b)
+        va, vb = v @ a, v @ b
+        x, y, z = a.T @ va, b.T @ vb, a.T @ vb
+        info_local = 2.0 * np.outer(h, h) * (x * y + z * z.T)
+        t = self._incidencia if incidencia is None else incidencia
+        return t.T @ g_local, t.T @ info_local @ t
+
+    def _jacobiano(self, a, b, h, incidencia=None):
+        """Δ = ∂vech(Σ)/∂θ (momentos na ordem de np.triu_indices × parâmetros livres)"""
+        iu, ju = np.triu_indices(len(a))
+        return (h * (a[iu] * b[ju] + b[iu] * a[ju])) @ (self._incidencia if incidencia is None else incidencia)
+
+    def _jacobiano_momentos(self):
+        """Δ nas estimativas atuais"""
+        _, m, c, mats = self._sigma(self.param_vals)
+        return self._jacobiano(*self._vetores_derivada(m, c, mats['psi']))
+
+    def _objetivo(self, sigma, obj):
+        """
+        Valor do objetivo e matrizes (W, V, fator) para gradiente e informação;
+        no DWLS, V são os pesos por momento e fator None (informação 2ΔᵀWΔ)
+        """
+        S = self.mx_cov
+        if obj == 'DWLS':
+            d = sigma - S
+            valor = 0.5 * np.einsum('ij,ij,ij->', self._pesos_matriz, d, d)
+            return valor, (self._pesos_matriz * d, self._pesos_matriz, None)
+        if obj == 'MLW':
+            try:
+                chol = np.linalg.cholesky(sigma)
+                inv_sigma = cho_solve((chol, True), np.identity(len(S)))
+            except (np.linalg.LinAlgError, ValueError):
+                return np.inf, None
+            logdet = 2.0 * np.log(np.diag(chol)).sum()
+            valor = np.einsum('ij,ji->', S, inv_sigma) - len(S) + logdet - self._logdet_cov
+            w = inv_sigma @ (sigma - S) @ inv_sigma
+            return valor, (w, inv_sigma, 1.0)
+        t = sigma @ self._cov_inv - np.identity(len(S))
+        valor = np.einsum('ij,ji->', t, t)
+        w = 2.0 * self._cov_inv @ (sigma - S) @ self._cov_inv
+        return valor, (w, self._cov_inv, 2.0)
+
+    def calc_sigma(self):
+        """Σ implícita no modelo e auxiliares (M, C), como no semopy"""
+        sigma, m, c, _ = self._sigma(self.param_vals)
+        return sigma, (m, c)
+
+    # ------------------------------------------------------------------
+    # Ajuste
+    # ------------------------------------------------------------------
+    def _valores_iniciais(self, regra='semopy'):
+        """
+        Valores iniciais a partir da covariância amostral.
+
+        regra='semopy': cargas pela inclinação da regressão no primeiro
+        indicador, variâncias latentes 0.05, variâncias observadas pela metade
+        da amostral e regressões estruturais em 0.
+        regra='marcador': variância latente inicial igual à metade da variância
+        do indicador marcador e cargas coerentes com ela (λ = s_jm / ψ).
+        """
+        S = self.mx_cov
+        primeiro = self._primeiro
+
+        def manifesto(v):
+            vistos = set()
+            while v not in self._idx_obs:
+                if v in vistos or v not in primeiro:
+                    return None
+                vistos.add(v)
+                v = primeiro[v]
+            return v
+
+        theta = np.zeros(self.n_parametros)
+        definidos = np.zeros(self.n_parametros, dtype=bool)
+        for local in self._livres:
+            k = local['indice']
+            if definidos[k]:
+                continue
+            definidos[k] = True
+            lval, rval = local['lval'], local['rval']
+            if local['op'] == '~~':
+                if local['matriz'] == 'psi' and (lval in self.vars['latent'] or rval in self.vars['latent']):
+                    if lval != rval:
+                        theta[k] = 0.0
+                    elif regra == 'marcador' and manifesto(lval) is not None:
+                        i = self._idx_obs[manifesto(lval)]
+                        theta[k] = S[i, i] / 2
+                    else:
+                        theta[k] = 0.05
+                elif lval == rval:
+                    i = self._idx_obs[lval]
+                    theta[k] = S[i, i] if lval in self.vars['exogenous'] and local['matriz'] == 'psi' else S[i, i] / 2
+            elif local['matriz'] == 'lambda' and rval in self.vars['latent']:
+                base = manifesto(rval)
+                if base is not None and base in self._idx_obs and lval in self._idx_obs:
+                    i, j = self._idx_obs[base], self._idx_obs[lval]
+                    escala = S[i, i] / 2 if regra == 'marcador' else S[i, i]
+                    theta[k] = S[i, j] / escala if S[i, i] > 0 else 0.0
+        return theta
+
+    def _partidas_alternativas(self):
+        """
+        Partidas extras dos ajustes sem x0 (partidas='multiplas', ou quando as
+        partidas determinísticas não convergem), para mínimos locais em que o fator
+        se alinha a outro grupo de indicadores:
+        - por referência: para cada latente e cada indicador r com carga livre,
+          cargas λ_i = s_ir / s_mr (m = marcador) e variância 2 s_mr² / s_rr,
+          isto é, o fator partindo do lado do indicador r
+        - PARTIDAS_SORTEADAS perturbações log-normais da partida do semopy, com
+          semente derivada da especificação (ajustes reproduzíveis)
+        """
+        S = self.mx_cov
+        base = self._valores_iniciais('marcador')
+        partidas = []
+        for lat in self.vars['latent']:
+            marcador = self._primeiro.get(lat)
+            if marcador not in self._idx_obs:
+                continue
+            im, j = self._idx_obs[marcador], self._idx_int[lat]
+            escala = self._base['lambda'][im, j]
+            cargas = [l for l in self._livres if l['matriz'] == 'lambda' and l['rval'] == lat and l['lval'] in self._idx_obs]
+            variancias = [l for l in self._livres if l['matriz'] == 'psi' and l['lval'] == lat and l['rval'] == lat]
+            for referencia in cargas:
+                ir = self._idx_obs[referencia['lval']]
+                if escala == 0 or S[im, ir] == 0 or S[ir, ir] <= 0:
+                    continue
+                theta = base.copy()
+                for local in cargas:
+                    theta[local['indice']] = escala * S[self._idx_obs[local['lval']], ir] / S[im, ir]
+                for local in variancias:
+                    theta[local['indice']] = 2 * (S[im, ir] / escala) ** 2 / S[ir, ir]
+                partidas.append(theta)
+        rng = np.random.default_rng(int(hash_especificacao(self.descricao)[:8], 16))
+        inicial = self._valores_iniciais('semopy')
+        piso = np.where(np.isfinite(self._limites), self._limites + 0.01, -np.inf)
+        for _ in range(PARTIDAS_SORTEADAS):
+            partidas.append(np.maximum(inicial * np.exp(rng.normal(0.0, 0.7, len(inicial))), piso))
+        return partidas
+
+    def load(self, data=None, cov=None, n_samples=None, acov=None):
+        """
+        Carrega dados (ou covariância) e prepara as estruturas de ajuste.
+        acov (covariância assintótica das correlações, ver
+        policorica.matriz_assintotica) habilita o objetivo DWLS.
+        """
+        obs = self.vars['observed']
+        if data is not None:
+            self.mx_data = np.asarray(data[obs], dtype=np.float64)
+            if np.isnan(self.mx_data).any():
+                mascarado = np.ma.array(self.mx_data, mask=np.isnan(self.mx_data))
+                S = np.ma.cov(mascarado, bias=True, rowvar=False).data
+            else:
+                S = np.cov(self.mx_data, bias=True, rowvar=False)
+            self.n_samples = self.mx_data.shape[0]
+        elif cov is not None:
+            S = cov.loc[obs, obs].to_numpy(dtype=np.float64) if isinstance(cov, pd.DataFrame) \
+                else np.asarray(cov, dtype=np.float64)
+            self.n_samples = n_samples
+        else:
+            raise ValueError("Forneça data ou cov")
+        self.mx_cov = np.atleast_2d(S)
+        self.mx_acov = None if acov is None else self._acov_momentos(acov)
+        sinal, self._logdet_cov = np.linalg.slogdet(self.mx_cov)
+        if sinal > 0:
+            self._cov_inv = np.linalg.inv(self.mx_cov)
+        elif self.mx_acov is None:
+            raise np.linalg.LinAlgError("Matriz de covariância amostral não é positiva definida")
+        else:
+            # Policóricas estimadas par a par podem não ser positivas definidas; o DWLS não usa a inversa
+            self._cov_inv = None
+        if self.mx_acov is not None:
+            self._preparar_pesos()
+        self._base = self._matrizes_base(self.mx_cov)
+
+    def _acov_momentos(self, acov):
+        """
+        Γ na ordem dos momentos do modelo (np.triu_indices, com a diagonal);
+        as variâncias unitárias da matriz de correlação ficam com linhas nulas.
+
+        Args:
+            acov: DataFrame pares × pares indexado por (item_i, item_j), ou
+                ndarray já na ordem dos momentos (ex.: mx_acov de outro ajuste)
+        """
+        p = len(self.vars['observed'])
+        iu, ju = np.triu_indices(p)
+        if not isinstance(acov, pd.DataFrame):
+            acov = np.asarray(acov, dtype=np.float64)
+            if acov.shape != (len(iu), len(iu)):
+                raise ValueError(f"acov deveria ser {len(iu)}×{len(iu)}, recebido {acov.shape}")
+            return acov
+        obs = self.vars['observed']
+        posicoes = {par: k for k, par in enumerate(acov.index)}
+        origem, destino = [], []
+        for k, (i, j) in enumerate(zip(iu, ju)):
+            if i == j:
+                continue
+            par = (obs[i], obs[j]) if (obs[i], obs[j]) in posicoes else (obs[j], obs[i])
+            if par not in posicoes:
+                raise KeyError(f"Par sem covariância assintótica: {obs[i]} ~~ {obs[j]}")
+            origem.append(posicoes[par])
+            destino.append(k)
+        gama = np.zeros((len(iu), len(iu)))
+        gama[np.ix_(destino, destino)] = acov.to_numpy(dtype=np.float64)[np.ix_(origem, origem)]
+        return gama
+
+    def _preparar_pesos(self):
+        """
+        Pesos do DWLS: 1/Γ_pp por correlação. As variâncias (= 1) recebem o
+        maior desses pesos; com variâncias residuais livres elas são
+        reproduzidas exatamente e o peso não altera a solução.
+        """
+        p = len(self.mx_cov)
+        iu, ju = np.triu_indices(p)
+        variancias = np.diag(self.mx_acov)
+        fora = iu != ju
+        pesos = np.zeros(len(iu))
+        pesos[fora] = np.where(variancias[fora] > 0, 1 / np.where(variancias[fora] > 0, variancias[fora], 1.0), 0.0)
+        pesos[~fora] = pesos[fora].max(initial=1.0)
+        self._pesos_dwls = pesos
+        matriz = np.zeros((p, p))
+        matriz[iu, ju] = pesos
+        matriz[ju, iu] = pesos
+        # ½ Σ_ij C_ij d_ij² = Σ_{i≤j} w_ij d_ij²: a diagonal entra em dobro na forma simétrica
+        matriz[np.diag_indices(p)] *= 2
+        self._pesos_matriz = matriz
+
+    def _valor_gradiente(self, theta, obj):
+        """Objetivo e gradiente analítico em θ (inf fora da região admissível)"""
+        try:
+            sigma, m, c, mats = self._sigma(theta)
+        except np.linalg.LinAlgError:
+            return np.inf, np.zeros_like(theta)
+        valor, aux = self._objetivo(sigma, obj)
+        if not np.isfinite(valor):
+            return np.inf, np.zeros_like(theta)
+        a, b, h = self._vetores_derivada(m, c, mats['psi'])
+        t = self._incidencia
+        g_local = 2.0 * h * np.einsum('ik,ik->k', a, aux[0] @ b)
+        return valor, t.T @ g_local
+
+    def _avaliar(self, theta, obj):
+        """Objetivo em θ e o estado necessário para as derivadas (inf fora da região admissível)"""
+        try:
+            sigma, m, c, mats = self._sigma(theta)
+        except np.linalg.LinAlgError:
+            return np.inf, None
+        valor, aux = self._objetivo(sigma, obj)
+        return valor, (m, c, mats, aux)
+
+    def _derivadas(self, estado):
+        """Gradiente e informação esperada a partir do estado de _avaliar"""
+        m, c, mats, (w, v, fator) = estado
+        a, b, h = self._vetores_derivada(m, c, mats['psi'])
+        if fator is None:
+            # DWLS: objetivo quadrático nos momentos, informação de Gauss-Newton 2ΔᵀWΔ
+            delta = self._jacobiano(a, b, h)
+            grad = self._incidencia.T @ (2.0 * h * np.einsum('ik,ik->k', a, w @ b))
+            return grad, 2.0 * delta.T @ (delta * self._pesos_dwls[:, None])
+        grad, info = self._gradiente_informacao(a, b, h, w, v)
+        return grad, info * fator
+
+    def _fisher_scoring(self, theta, obj, max_iter, tol):
+        """Fisher scoring do objetivo deste modelo (ver fisher_scoring)"""
+        return fisher_scoring(lambda t: self._avaliar(t, obj), self._derivadas, theta, self._limites, max_iter, tol)
+
+    def fit(self, data=None, obj='MLW', cov=None, n_samples=None, x0=None, metodo='SLSQP',
+            max_iter=500, tol=1e-9, acov=None, partidas='padrao'):
+        """
+        Ajusta o modelo.
+
+        Com metodo='SLSQP' (padrão) o caminho de otimização é o do semopy
+        (mesmos valores iniciais, limites e otimizador), mas com objetivo e
+        gradiente nativos, seguido de um polimento por Fisher scoring; é o
+        que os reajustes das ondas usam a partir de x0. Com metodo='fisher'
+        usa apenas Fisher scoring, indicado para reajustes próximos do ótimo
+        (bootstrap, busca de especificação).
+
+        Sem x0, a partida do semopy só é seguida pela do marcador e pelas
+        alternativas se não convergir. partidas='multiplas' tenta todas e fica
+        com o menor objetivo (modelos com ajuste ruim podem ter vários mínimos
+        locais); custa de 10 a 20 ajustes, então fica para os ajustes
+        principais de cada modelo, não para os repetidos em lote.
+
+        Args:
+            data: DataFrame com as variáveis observadas
+            obj: 'MLW' (máxima verossimilhança, Wishart), 'GLS' ou 'DWLS'
+                (mínimos quadrados com pesos diagonais; cov é a matriz policórica)
+            cov: Covariância amostral (alternativa a data)
+            n_samples: Tamanho amostral quando só cov é fornecida
+            x0: Vetor inicial (ex.: estimativas de um ajuste anterior)
+            metodo: 'SLSQP' ou 'fisher'
+            max_iter: Máximo de iterações do Fisher scoring
+            tol: Tolerância do gradiente projetado
+            acov: Covariância assintótica das correlações (obrigatória para DWLS)
+            partidas: 'padrao' ou 'multiplas' (ignorado com x0)
+
+        Returns:
+            ResultadoAjuste (n_partidas e n_it_total somam todas as partidas)
+        """
+        if obj not in OBJETIVOS:
+            raise KeyError(f'{obj} is unknown objective function.')
+        if metodo not in ('SLSQP', 'fisher'):
+            raise ValueError(f"Método desconhecido: {metodo}")
+        if partidas not in PARTIDAS:
+            raise ValueError(f"Partidas desconhecidas: {partidas}")
+        self.load(data=data, cov=cov, n_samples=n_samples, acov=acov)
+        if obj == 'DWLS' and self.mx_acov is None:
+            raise ValueError("O objetivo DWLS exige acov (covariância assintótica das correlações)")
+
+        if x0 is not None:
+            etapas = [[(np.array(x0, dtype=np.float64), metodo)]]
+        else:
+            # A partida do semopy reproduz seu caminho; a do marcador e as
+            # alternativas cobrem as outras bacias (ver _partidas_alternativas)
+            etapas = [[(self._valores_iniciais('semopy'), metodo)],
+                      [(self._valores_iniciais('marcador'), 'fisher')],
+                      [(theta, 'SLSQP') for theta in self._partidas_alternativas()]]
+            if partidas == 'multiplas':
+                etapas = [[partida for etapa in etapas for partida in etapa]]
+
+        # Menor objetivo entre as partidas que convergiram; empates ficam com a primeira.
+        # Cada etapa só é tentada se nenhuma partida das anteriores convergiu
+        melhor, n_partidas, n_it_total = None, 0, 0
+        for etapa in etapas:
+            for theta, metodo_partida in etapa:
+                ajuste = self._ajustar_partida(theta, obj, metodo_partida, max_iter, tol)
+                n_partidas, n_it_total = n_partidas + 1, n_it_total + ajuste[3]
+                if melhor is None or (ajuste[2] and not melhor[2]) or \
+                        (ajuste[2] == melhor[2] and ajuste[1] < melhor[1] - 1e-10 * (1 + abs(melhor[1]))):
+                    melhor = ajuste
+            if melhor[2]:
+                break
+        theta, valor, sucesso, iteracoes, mensagem = melhor
+
+        self.param_vals = theta
+        self.last_result = ResultadoAjuste(theta, valor, sucesso, iteracoes, mensagem, obj)
+        self.last_result.n_partidas, self.last_result.n_it_total = n_partidas, n_it_total
+        return self.last_result
+
+    def _ajustar_partida(self, theta, obj, metodo, max_iter, tol):
+        """Ajuste a partir de um vetor inicial: (θ, objetivo, sucesso, iterações, mensagem)"""
+        iteracoes = 0
+        if metodo == 'SLSQP':
+            limites = [(None if np.isinf(l) else l, None) for l in self._limites]
+            res = minimize(self._valor_gradiente, theta, args=(obj,), jac=True, method='SLSQP',
+                           bounds=limites, options={'maxiter': 10000})
+            theta, iteracoes = res.x, res.nit
+
+        theta_f, valor, sucesso, n_fisher, mensagem = self._fisher_scoring(theta, obj, max_iter, tol)
+        if metodo == 'SLSQP' and not sucesso:
+            # Polimento não convergiu: mantém a solução do SLSQP se ela for melhor
+            valor_slsqp = self._valor_gradiente(theta, obj)[0]
+            if valor_slsqp <= valor:
+                theta_f, valor, sucesso, mensagem = theta, valor_slsqp, bool(res.success), res.message
+        return theta_f, valor, sucesso, iteracoes + n_fisher, mensagem
+
+    # ------------------------------------------------------------------
+    # Inferência
+    # ------------------------------------------------------------------
+    def _dwls(self):
+        return getattr(self, 'last_result', None) is not None and self.last_result.name_obj == 'DWLS'
+
+    def calc_fim(self, inverse=False):
+        """Informação de Fisher esperada (n/2)·tr(Σ⁻¹∂ᵢΣ Σ⁻¹∂ⱼΣ); no DWLS, n·ΔᵀWΔ"""
+        if self.n_samples is None:
+            raise AttributeError('n_samples é necessário para a matriz de informação.')
+        if self._dwls():
+            delta = self._jacobiano_momentos()
+            fim = self.n_samples * delta.T @ (delta * self._pesos_dwls[:, None])
+        else:
+            sigma, m, c, mats = self._sigma(self.param_vals)
+            inv_sigma = np.linalg.inv(sigma)
+            a, b, h = self._vetores_derivada(m, c, mats['psi'])
+            _, info = self._gradiente_informacao(a, b, h, np.zeros_like(sigma), inv_sigma)
+            fim = self.n_samples / 2 * info
+        if not inverse:
+            return fim
+        try:
+            fim_inv = np.linalg.inv(np.linalg.cholesky(fim))
+            fim_inv = fim_inv.T @ fim_inv
+        except np.linalg.LinAlgError:
+            fim_inv = np.linalg.pinv(fim)
+        return fim, fim_inv
+
+    def calc_se(self):
+        """Erros padrão a partir da informação esperada (sanduíche robusto no DWLS)"""
+        if self._dwls():
+            return np.sqrt(np.abs(np.diag(self.calc_cov_robusta())))
+        _, fim_inv = self.calc_fim(inverse=True)
+        return np.sqrt(np.abs(np.diag(fim_inv)))
+
+    def calc_cov_robusta(self):
+        """Covariância sanduíche do DWLS: (ΔᵀWΔ)⁻¹ ΔᵀWΓWΔ (ΔᵀWΔ)⁻¹ / n"""
+        delta = self._jacobiano_momentos()
+        wd = delta * self._pesos_dwls[:, None]
+        pao = np.linalg.pinv(delta.T @ wd)
+        return pao @ wd.T @ self.mx_acov @ wd @ pao / self.n_samples
+
+    def dof(self):
+        """Graus de liberdade: momentos distintos menos parâmetros livres"""
+        p = len(self.vars['observed'])
+        return p * (p + 1) // 2 - self.n_parametros
+
+    def objetivo_base(self, obj='MLW'):
+        """Objetivo mínimo do modelo de base (Σ diagonal) para a covariância carregada"""
+        if obj == 'DWLS':
+            iu, ju = np.triu_indices(len(self.mx_cov), k=1)
+            return float((self._pesos_matriz[iu, ju] * self.mx_cov[iu, ju] ** 2).sum())
+        if obj == 'MLW':
+            return np.log(np.diag(self.mx_cov)).sum() - self._logdet_cov
+        inv = self._cov_inv
+        d = np.maximum(np.linalg.solve(inv * inv, np.diag(inv)), 0.0)
+        t = d[:, None] * inv - np.identity(len(inv))
+        return np.einsum('ij,ji->', t, t)
+
+    def calc_indices(self):
+        """
+        Índices de ajuste com as fórmulas do semopy.calc_stats: chi2, DoF,
+        CFI, TLI e RMSEA. O modelo de base (só variâncias das observadas) tem
+        solução fechada: diag(S) no MLW e o mínimo quadrático do GLS.
+        """
+        n = self.n_samples
+        p = len(self.mx_cov)
+        dof, dof_base = self.dof(), p * (p + 1) // 2 - p
+        chi2 = n * self.last_result.fun
+        chi2_base = n * self.objetivo_base(self.last_result.name_obj)
+        robustos = {}
+        if self._dwls():
+            chi2, robustos = self._qui_quadrado_robusto(chi2, dof, chi2_base, dof_base)
+            chi2_base = robustos.pop('chi2 Baseline')
+        return {**indices_ajuste(chi2, dof, chi2_base, dof_base, n), **robustos}
+
+    def _qui_quadrado_robusto(self, chi2, dof, chi2_base, dof_base):
+        """
+        Estatísticas do WLSMV: T = n·F_DWLS corrigida pela média e variância
+        (escalonada e deslocada, Asparouhov e Muthén, 2010) com os traços de
+        UΓ, U = W − WΔ(ΔᵀWΔ)⁻¹ΔᵀW; o mesmo para o modelo de base, cujo U são
+        os pesos das correlações.
+        """
+        delta = self._jacobiano_momentos()
+        wd = delta * self._pesos_dwls[:, None]
+        u = np.diag(self._pesos_dwls) - wd @ np.linalg.pinv(delta.T @ wd) @ wd.T
+        chi2_mv, escala, deslocamento = media_variancia_ajustada(chi2, dof, u @ self.mx_acov)
+        iu, ju = np.triu_indices(len(self.mx_cov))
+        fora = iu != ju
+        ug_base = self._pesos_dwls[fora][:, None] * self.mx_acov[np.ix_(fora, fora)]
+        chi2_base_mv, _, _ = media_variancia_ajustada(chi2_base, dof_base, ug_base)
+        return chi2_mv, {'chi2 Baseline': chi2_base_mv, 'chi2 DWLS': float(chi2),
+                         'chi2 DWLS Baseline': float(chi2_base), 'Escala': escala, 'Deslocamento': deslocamento}
+
+    def inspect(self, std_est=False, erros=None):
+        """
+        Tabela de parâmetros no formato do semopy.inspect():
+        lval, op, rval, Estimate, Std. Err, z-value, p-value
+        (com std_est=True, inclui 'Est. Std' após Estimate). erros substitui
+        os erros padrão próprios (ex.: de um ajuste multigrupo).
+        """
+        se = self.calc_se() if erros is None else np.asarray(erros)
+        z = self.param_vals / se
+        p_valores = 2 * (1 - norm.cdf(np.abs(z)))
+        if std_est:
+            sigma, m, c, mats = self._sigma(self.param_vals)
+            dp_internas = np.sqrt(np.diag(c @ mats['psi'] @ c.T))
+            dp_obs = np.sqrt(np.diag(sigma))
+
+        linhas = []
+        for local in self.parametros:
+            if local['mult'] == 'amostra':
+                # Como no semopy: (co)variâncias das observadas exógenas não aparecem
+                continue
+            k = local['indice']
+            if k is not None:
+                estimativa, colunas = self.param_vals[k], [se[k], z[k], p_valores[k]]
+            else:
+                mats_base = self._base[local['matriz']]
+                estimativa, colunas = mats_base[local['linha'], local['coluna']], ['-', '-', '-']
+            linha = [local['lval'], local['op'], local['rval'], estimativa]
+            if std_est:
+                linha.append(self._padronizar(local, estimativa, dp_internas, dp_obs))
+            linhas.append(linha + colunas)
+        nomes = ['lval', 'op', 'rval', 'Estimate'] + (['Est. Std'] if std_est else []) + \
+                ['Std. Err', 'z-value', 'p-value']
+        return pd.DataFrame(linhas, columns=nomes)
+
+    def _padronizar(self, local, estimativa, dp_internas, dp_obs):
+        """Estimativa padronizada (variâncias das latentes e observadas = 1)"""
+        lin, col = local['linha'], local['coluna']
+        if local['matriz'] == 'beta':
+            return estimativa * dp_internas[col] / dp_internas[lin]
+        if local['matriz'] == 'lambda':
+            return estimativa * dp_internas[col] / dp_obs[lin]
+        if local['matriz'] == 'psi':
+            return estimativa / (dp_internas[lin] * dp_internas[col])
+        return estimativa / (dp_obs[lin] * dp_obs[col])
+
+    def _candidatos(self):
+        """
+        Posições hoje ausentes da especificação que poderiam ser liberadas:
+        cargas cruzadas (indicador ~ latente), caminhos entre latentes,
+        covariâncias de resíduos entre indicadores e entre latentes endógenas.
+        Posições já presentes (livres ou fixadas na descrição) ficam de fora.
+        """
+        def chave(matriz, linha, coluna):
+            simetrica = matriz in ('psi', 'theta')
+            return (matriz, min(linha, coluna), max(linha, coluna)) if simetrica else (matriz, linha, coluna)
+
+        ocupadas = {chave(l['matriz'], l['linha'], l['coluna']) for l in self.parametros}
+        latentes = [v for v in self.vars['inner'] if v in self.vars['latent']]
+        endogenas = [v for v in latentes if v in self.vars['endogenous']]
+        indicadores = [v for v in self.vars['observed'] if v in self.vars['_output']]
+        candidatos = []
+
+        def adicionar(matriz, lval, op, rval, linha, coluna):
+            if chave(matriz, linha, coluna) not in ocupadas:
+                candidatos.append({'matriz': matriz, 'linha': linha, 'coluna': coluna,
+                                   'lval': lval, 'op': op, 'rval': rval})
+
+        for obs in indicadores:
+            for lat in latentes:
+                adicionar('lambda', obs, '~', lat, self._idx_obs[obs], self._idx_int[lat])
+        for dep in latentes:
+            for pred in latentes:
+                if dep != pred:
+                    adicionar('beta', dep, '~', pred, self._idx_int[dep], self._idx_int[pred])
+        for i, a in enumerate(indicadores):
+            for b in indicadores[i + 1:]:
+                adicionar('theta', a, '~~', b, self._idx_obs[a], self._idx_obs[b])
+        for i, a in enumerate(endogenas):
+            for b in endogenas[i + 1:]:
+                adicionar('psi', a, '~~', b, self._idx_int[a], self._idx_int[b])
+        return candidatos
+
+    def indices_modificacao(self, minimo=0.0):
+        """
+        Índices de modificação (teste do multiplicador de Lagrange, 1 gl) e
+        mudança esperada do parâmetro (EPC) para todas as posições candidatas
+        de _candidatos, sem reajustar: gradiente g e informação H do objetivo
+        no ajuste atual, com os candidatos acrescentados às colunas dos livres.
+        Com Hᶜ = H_cc − H_cf H_ff⁻¹ H_fc (complemento de Schur),
+        MI = n·g_c²/(2Hᶜ) e EPC = −g_c/Hᶜ. No DWLS, MI usa o qui-quadrado não ajustado.
+
+        Args:
+            minimo: Só devolve candidatos com MI acima deste valor
+
+        Returns:
+            DataFrame lval, op, rval, MI, EPC, EPC Std (padronizada como Est. Std)
+            e p-value, em ordem decrescente de MI
+        """
+        candidatos = self._candidatos()
+        colunas = ['lval', 'op', 'rval', 'MI', 'EPC', 'EPC Std', 'p-value']
+        if not candidatos:
+            return pd.DataFrame(columns=colunas)
+        _, estado = self._avaliar(self.param_vals, self.last_result.name_obj)
+        m, c, mats, (w, v, fator) = estado
+        a, b, h = self._vetores_derivada(m, c, mats['psi'])
+        a_c, b_c = self._vetores_locais(m, c, mats['psi'], [_MATRIZES.index(l['matriz']) for l in candidatos],
+                                        [l['linha'] for l in candidatos], [l['coluna'] for l in candidatos])
+        a, b = np.hstack([a, a_c]), np.hstack([b, b_c])
+        h = np.concatenate([h, np.ones(len(candidatos))])
+        k = self.n_parametros
+        incidencia = np.zeros((len(h), k + len(candidatos)))
+        incidencia[:len(self._livres), :k] = self._incidencia
+        incidencia[len(self._livres):, k:] = np.identity(len(candidatos))
+        if fator is None:
+            delta = self._jacobiano(a, b, h, incidencia)
+            grad = incidencia.T @ (2.0 * h * np.einsum('ik,ik->k', a, w @ b))
+            info = 2.0 * delta.T @ (delta * self._pesos_dwls[:, None])
+        else:
+            grad, info = self._gradiente_informacao(a, b, h, w, v, incidencia)
+            info = info * fator
+
+        # Parâmetros livres presos no limite não entram no condicionamento
+        livres = self.param_vals > self._limites + 1e-8
+        h_fc = info[:k, k:][livres]
+        schur = np.diag(info)[k:] - np.einsum('ij,ij->j', h_fc, np.linalg.pinv(info[:k, :k][np.ix_(livres, livres)]) @ h_fc)
+        g_c = grad[k:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mi = np.where(schur > 1e-12, self.n_samples * g_c ** 2 / (2 * schur), 0.0)
+            epc = np.where(schur > 1e-12, -g_c / schur, np.nan)
+
+        sigma = m @ mats['psi'] @ m.T + mats['theta']
+        dp_internas = np.sqrt(np.diag(c @ mats['psi'] @ c.T))
+        dp_obs = np.sqrt(np.diag(sigma))
+        tabela = pd.DataFrame({'lval': [l['lval'] for l in candidatos], 'op': [l['op'] for l in candidatos],
+                               'rval': [l['rval'] for l in candidatos], 'MI': mi, 'EPC': epc,
+                               'EPC Std': [self._padronizar(l, e, dp_internas, dp_obs) for l, e in zip(candidatos, epc)],
+                               'p-value': chi2_dist.sf(mi, 1)})
+        tabela = tabela[tabela['MI'] > minimo]
+        return tabela.sort_values('MI', ascending=False, ignore_index=True)
+
+
+def indices_ajuste(chi2, dof, chi2_base, dof_base, n):
+    """chi2, DoF, CFI, TLI e RMSEA (fórmulas do semopy.calc_stats) a partir das estatísticas do modelo e da base"""
+    tli = np.nan if dof == 0 or dof_base == 0 else \
+        (chi2_base / dof_base - chi2 / dof) / (chi2_base / dof_base - 1)
+    rmsea = 0.0 if chi2 < dof else np.sqrt((chi2 / dof - 1) / (n - 1))
+    return {'chi2': float(chi2), 'DoF': dof, 'chi2 Baseline': float(chi2_base), 'DoF Baseline': dof_base,
+            'CFI': float(1 - (chi2 - dof) / (chi2_base - dof_base)), 'TLI': float(tli), 'RMSEA': float(rmsea)}
+
+
+def media_variancia_ajustada(estatistica, dof, ug):
+    """
+    Qui-quadrado ajustado pela média e variância: a·T + b, com
+    a = √(gl / tr((UΓ)²)) e b = gl − a·tr(UΓ), de modo que média e variância
+    assintóticas coincidem com as de um χ²(gl).
+
+    Returns:
+        (estatística ajustada, a, b)
+    """
+    traco, traco2 = np.trace(ug), np.einsum('ij,ji->', ug, ug)
+    if dof <= 0 or traco2 <= 0:
+        return float(estatistica), 1.0, 0.0
+    a = np.sqrt(dof / traco2)
+    b = dof - a * traco
+    return float(a * estatistica + b), float(a), float(b)
+
+
+def _pares_ordenados(variaveis):
+    """Pares (a, b) com a < b, em ordem alfabética"""
+    variaveis = sorted(variaveis)
+    return [(a, b) for i, a in enumerate(variaveis) for b in variaveis[i + 1:]]
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SEM MULTIGRUPO COM RESTRIÇÕES DE IGUALDADE
+==========================================
+
+Estimação conjunta de uma especificação de sem_models em vários grupos
+(segmentos do Perfil Socioeconômico ou qualquer coluna de agrupamento):
+- Objetivo F = Σ_g (n_g/N)·F_g, χ² = Σ_g n_g·F_g (como no lavaan)
+- Classes de parâmetros iguais entre grupos com os nomes do lavaan
+  (group.equal): 'loadings', 'regressions', 'residuals',
+  'residual.covariances', 'lv.variances', 'lv.covariances'; parâmetros
+  individuais podem ser liberados ('lval op rval', como group.partial)
+- Estrutura de médias opcional (interceptos ν e médias latentes α, com
+  μ = ν + Λ(I−B)⁻¹α), necessária para a invariância escalar: com
+  interceptos iguais, as médias latentes ficam livres fora do primeiro grupo
+- Partida por um único ajuste à covariância intragrupos agregada e Fisher
+  scoring conjunto
+  (motor_sem.fisher_scoring), com gradiente e informação somados por grupo
+
+Os momentos de todos os segmentos saem de uma única passada sobre a base
+(acumuladores.AcumuladorSegmentado). As matrizes de covariância dos grupos
+são publicadas em memória compartilhada e os ajustes (segmento × modelo)
+rodam em um pool de processos.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from acumuladores import SEGMENTOS, AcumuladorSegmentado, coluna_segmento
+from memoria_compartilhada import anexar_matriz, publicar_matriz
+from momentos_amostrais import MomentosAmostrais
+from motor_sem import OBJETIVOS, ModeloSEM, ResultadoAjuste, fisher_scoring
+
+# Autovalor mínimo relativo ao máximo abaixo do qual a covariância do grupo é singular
+TOL_SINGULAR = 1e-8
+
+RESTRICOES = ('loadings', 'intercepts', 'means', 'regressions', 'residuals', 'residual.covariances',
+              'lv.variances', 'lv.covariances')
+
+
+def classe_parametro(modelo, local):
+    """Classe lavaan (group.equal) de um parâmetro do ModeloSEM"""
+    lval, rval = local['lval'], local['rval']
+    if local['op'] == '~~':
+        latente = lval in modelo.vars['latent'] or rval in modelo.vars['latent']
+        if lval == rval:
+            return 'lv.variances' if latente else 'residuals'
+        return 'lv.covariances' if latente else 'residual.covariances'
+    if lval in modelo.efeitos['=~'].get(rval, {}):
+        return 'loadings'
+    return 'regressions'
+
+
+def nome_parametro(local):
+    """Nome 'lval op rval' usado para liberar parâmetros (group.partial)"""
+    return f"{local['lval']} {local['op']} {local['rval']}"
+
+
+class ModeloMultigrupo:
+    """Uma especificação SEM ajustada conjuntamente em vários grupos"""
+
+    def __init__(self, descricao, grupos, iguais=('loadings',), liberar=(), medias=None):
+        """
+        Args:
+            descricao: Especificação lavaan/semopy
+            grupos: Rótulos dos grupos (o primeiro é a referência das médias latentes)
+            iguais: Classes de parâmetros iguais entre grupos (ver RESTRICOES)
+            liberar: Parâmetros ('lval op rval' ou 'var ~1') livres em cada grupo apesar de iguais
+            medias: Inclui a estrutura de médias (padrão: só se iguais tiver 'intercepts' ou 'means')
+        """
+        invalidas = set(iguais) - set(RESTRICOES)
+        if invalidas:
+            raise ValueError(f"Restrições desconhecidas: {sorted(invalidas)}")
+        self.descricao = descricao
+        self.grupos = list(grupos)
+        self.iguais = tuple(iguais)
+        self.liberar = tuple(liberar)
+        self.medias = bool({'intercepts', 'means'} & set(iguais)) if medias is None else medias
+        self.modelos = {g: ModeloSEM(descricao) for g in self.grupos}
+        self._montar_mapa()
+
+    def _montar_mapa(self):
+        """Índices globais dos parâmetros de cada grupo (compartilhados quando iguais)"""
+        base = self.modelos[self.grupos[0]]
+        representantes = {}
+        for local in base.parametros:
+            if local['indice'] is not None and local['indice'] not in representantes:
+                representantes[local['indice']] = local
+
+        mapa = {g: np.empty(base.n_parametros, dtype=int) for g in self.grupos}
+        limites, descricoes = [], []
+
+        def adicionar(indices, k, classe, nome, limite):
+            igual = classe in self.iguais and nome not in self.liberar
+            for dono in ([None] if igual else self.grupos):
+                for g in (self.grupos if dono is None else [dono]):
+                    indices[g][k] = len(limites)
+                limites.append(limite)
+                descricoes.append((dono, nome, classe))
+
+        for k in range(base.n_parametros):
+            local = representantes[k]
+            adicionar(mapa, k, classe_parametro(base, local), nome_parametro(local), base._limites[k])
+
+        # Médias: interceptos ν das saídas observadas e médias α das variáveis internas
+        self.parametros_media = []
+        if self.medias:
+            internas = base.vars['inner']
+            for v in base.vars['observed']:
+                if v not in base._idx_int:
+                    self.parametros_media.append((v, 'nu', base._idx_obs[v], 'intercepts'))
+            for v in internas:
+                if v in base.vars['latent']:
+                    classe = 'means'
+                elif v in base.vars['exogenous']:
+                    classe = None       # Observada exógena: média livre em cada grupo (como fixed.x)
+                else:
+                    classe = 'intercepts'
+                self.parametros_media.append((v, 'alpha', base._idx_int[v], classe))
+        mapa_media = {g: np.full(len(self.parametros_media), -1, dtype=int) for g in self.grupos}
+        for k, (v, _, _, classe) in enumerate(self.parametros_media):
+            nome = f"{v} ~1"
+            if classe == 'means' and ('intercepts' not in self.iguais or 'means' in self.iguais):
+                continue        # Médias latentes fixadas em 0 em todos os grupos
+            if classe == 'means':
+                # Interceptos iguais: médias latentes livres fora do grupo de referência
+                for g in self.grupos[1:]:
+                    mapa_media[g][k] = len(limites)
+                    limites.append(-np.inf)
+                    descricoes.append((g, nome, classe))
+                continue
+            adicionar(mapa_media, k, classe, nome, -np.inf)
+
+        self.mapa = mapa
+        self.mapa_media = mapa_media
+        self.n_parametros = len(limites)
+        self._limites = np.array(limites)
+        self._descricoes = descricoes
+
+    def parametros_iguais(self, classe=None):
+        """Nomes dos parâmetros compartilhados entre grupos (opcionalmente de uma classe)"""
+        return [nome for dono, nome, c in self._descricoes if dono is None and classe in (None, c)]
+
+    def _pesos(self):
+        n_total = sum(self.n_amostras.values())
+        return {g: n / n_total for g, n in self.n_amostras.items()}
+
+    def _vetores_media(self, g, theta, m):
+        """Interceptos ν, médias α e μ = ν + Mα do grupo g"""
+        modelo = self.modelos[g]
+        nu = np.zeros(len(modelo.vars['observed']))
+        alfa = np.zeros(len(modelo.vars['inner']))
+        for (_, tipo, posicao, _), indice in zip(self.parametros_media, self.mapa_media[g]):
+            if indice >= 0:
+                (nu if tipo == 'nu' else alfa)[posicao] = theta[indice]
+        return nu, alfa, nu + m @ alfa
+
+    def _avaliar_grupo(self, g, theta, obj):
+        """Objetivo do grupo g; com médias, F = F_Σ + (x̄ − μ)ᵀΣ⁻¹(x̄ − μ)"""
+        valor, estado = self.modelos[g]._avaliar(theta[self.mapa[g]], obj)
+        if not self.medias or not np.isfinite(valor):
+            return valor, estado
+        m, c, mats, (w, v, fator) = estado
+        _, alfa, mu = self._vetores_media(g, theta, m)
+        d = self._medias_amostrais[g] - mu
+        q = v @ d
+        return valor + d @ q, (estado, alfa, q)
+
+    def _derivadas_grupo(self, g, estado):
+        """Gradiente, informação e índices globais dos parâmetros do grupo g"""
+        modelo = self.modelos[g]
+        if not self.medias:
+            grad, info = modelo._derivadas(estado)
+            return grad, info, self.mapa[g]
+        (m, c, mats, (w, v, fator)), alfa, q = estado
+        a, b, h = modelo._vetores_derivada(m, c, mats['psi'])
+        grad_cov, info_cov = modelo._gradiente_informacao(a, b, h, w - np.outer(q, q), v)
+
+        # ∂μ/∂θ: Λ e B mudam μ por Cα; interceptos e médias entram diretamente
+        c_alfa = c @ alfa
+        p = m.shape[0]
+        j_local = np.zeros((p, len(modelo._livres)))
+        for k, (mat, lin, col) in enumerate(zip(modelo._mat_livre, modelo._lin_livre, modelo._col_livre)):
+            if mat == 0:
+                j_local[:, k] = m[:, lin] * c_alfa[col]
+            elif mat == 1:
+                j_local[lin, k] = c_alfa[col]
+        livres = self.mapa_media[g] >= 0
+        colunas = [np.identity(p)[:, posicao] if tipo == 'nu' else m[:, posicao]
+                   for (_, tipo, posicao, _), livre in zip(self.parametros_media, livres) if livre]
+        j_media = np.column_stack(colunas) if colunas else np.zeros((p, 0))
+        j = np.hstack([j_local @ modelo._incidencia, j_media])
+        grad = np.concatenate([grad_cov, np.zeros(j_media.shape[1])]) - 2.0 * j.T @ q
+        info = 2.0 * j.T @ v @ j
+        info[:len(grad_cov), :len(grad_cov)] += info_cov
+        return grad, info, np.concatenate([self.mapa[g], self.mapa_media[g][livres]])
+
+    def _avaliar(self, theta, obj):
+        valor, estados = 0.0, {}
+        for g, peso in self._pesos().items():
+            v, estado = self._avaliar_grupo(g, theta, obj)
+            if not np.isfinite(v):
+                return np.inf, None
+            valor += peso * v
+            estados[g] = estado
+        return valor, estados
+
+    def _derivadas(self, estados):
+        grad = np.zeros(self.n_parametros)
+        info = np.zeros((self.n_parametros, self.n_parametros))
+        for g, peso in self._pesos().items():
+            grad_g, info_g, indices = self._derivadas_grupo(g, estados[g])
+            np.add.at(grad, indices, peso * grad_g)
+            np.add.at(info, np.ix_(indices, indices), peso * info_g)
+        return grad, info
+
+    def estimativas_locais(self):
+        """
+        Estimativas do ajuste por grupo, no formato aceito por fit(estimativas=...):
+        dict grupo -> (vetor de ModeloSEM.param_vals, valores de parametros_media)
+        """
+        return {g: (self.param_vals[self.mapa[g]],
+                    np.where(self.mapa_media[g] >= 0, self.param_vals[self.mapa_media[g]], 0.0))
+                for g in self.grupos}
+
+    def _partida(self, estimativas):
+        """
+        Média ponderada (n_g) das estimativas locais de cada grupo: dict grupo ->
+        vetor no formato de ModeloSEM.param_vals, ou (vetor, valores de
+        parametros_media) de estimativas_locais; sem estes, interceptos pelas
+        médias amostrais
+        """
+        soma, peso_total = np.zeros(self.n_parametros), np.zeros(self.n_parametros)
+        for g, peso in self._pesos().items():
+            modelo = self.modelos[g]
+            locais, medias = estimativas[g] if isinstance(estimativas[g], tuple) else (estimativas[g], None)
+            locais = np.asarray(locais, dtype=np.float64)
+            np.add.at(soma, self.mapa[g], peso * locais)
+            np.add.at(peso_total, self.mapa[g], peso)
+            if not self.medias:
+                continue
+            if medias is not None:
+                indices = self.mapa_media[g]
+                np.add.at(soma, indices[indices >= 0], peso * np.asarray(medias, dtype=np.float64)[indices >= 0])
+                np.add.at(peso_total, indices[indices >= 0], peso)
+                continue
+            _, m, _, _ = modelo._sigma(locais)
+            media = self._medias_amostrais[g]
+            alfa = np.zeros(len(modelo.vars['inner']))
+            for v, tipo, posicao, _ in self.parametros_media:
+                if tipo == 'alpha' and v not in modelo.vars['latent']:
+                    alfa[posicao] = media[modelo._idx_obs[v]]
+            nu = media - m @ alfa
+            for (v, tipo, posicao, _), indice in zip(self.parametros_media, self.mapa_media[g]):
+                if indice >= 0:
+                    valor = nu[posicao] if tipo == 'nu' else (alfa[posicao] if v not in modelo.vars['latent'] else 0.0)
+                    soma[indice] += peso * valor
+                    peso_total[indice] += peso
+        return np.maximum(soma / np.maximum(peso_total, 1e-300), self._limites)
+
+    def fit(self, momentos, obj='MLW', x0=None, max_iter=500, tol=1e-9, partidas='padrao', estimativas=None):
+        """
+        Ajuste conjunto.
+
+        Args:
+            momentos: dict grupo -> MomentosAmostrais (observadas do modelo)
+            obj: 'MLW' ou 'GLS' (a estrutura de médias exige 'MLW')
+            x0: Vetor global inicial (padrão: estimativas de um ajuste à covariância agregada)
+            partidas: Partidas do ajuste agregado ('padrao' ou 'multiplas', ver ModeloSEM.fit)
+            estimativas: Partida por grupo no lugar do ajuste agregado (ex.:
+                estimativas_locais de um ajuste com outras restrições)
+
+        Returns:
+            ResultadoAjuste do ajuste conjunto
+        """
+        if obj not in OBJETIVOS:
+            raise KeyError(f'{obj} is unknown objective function.')
+        if self.medias and obj != 'MLW':
+            raise ValueError("A estrutura de médias está disponível apenas com obj='MLW'")
+        self.n_amostras = {g: momentos[g].n for g in self.grupos}
+        observadas = self.modelos[self.grupos[0]].vars['observed']
+        if self.medias:
+            self._medias_amostrais = {g: momentos[g].media.loc[observadas].to_numpy(dtype=np.float64)
+                                      for g in self.grupos}
+        for g in self.grupos:
+            self.modelos[g].load(cov=momentos[g].cov, n_samples=momentos[g].n)
+        if x0 is None:
+            if estimativas is None:
+                agregadas = estimativas_agregadas(self.descricao, {g: momentos[g] for g in self.grupos}, obj, partidas)
+                estimativas = dict.fromkeys(self.grupos, agregadas)
+            x0 = self._partida(estimativas)
+
+        theta, valor, sucesso, iteracoes, mensagem = fisher_scoring(
+            lambda t: self._avaliar(t, obj), self._derivadas, np.array(x0, dtype=np.float64), self._limites,
+            max_iter, tol)
+        self.param_vals = theta
+        self.last_result = ResultadoAjuste(theta, valor, sucesso, iteracoes, mensagem, obj)
+        for g in self.grupos:
+            modelo = self.modelos[g]
+            modelo.param_vals = theta[self.mapa[g]]
+            fun_g, _ = self._avaliar_grupo(g, theta, obj)
+            modelo.last_result = ResultadoAjuste(modelo.param_vals, fun_g, sucesso, iteracoes, mensagem, obj)
+        return self.last_result
+
+    def calc_fim(self, inverse=False):
+        """Informação de Fisher conjunta: soma das informações dos grupos mapeadas"""
+        fim = np.zeros((self.n_parametros, self.n_parametros))
+        for g in self.grupos:
+            if self.medias:
+                _, estado = self._avaliar_grupo(g, self.param_vals, 'MLW')
+                _, info, indices = self._derivadas_grupo(g, estado)
+                info = self.n_amostras[g] / 2 * info
+            else:
+                info, indices = self.modelos[g].calc_fim(), self.mapa[g]
+            np.add.at(fim, np.ix_(indices, indices), info)
+        if not inverse:
+            return fim
+        try:
+            fim_inv = np.linalg.inv(np.linalg.cholesky(fim))
+            fim_inv = fim_inv.T @ fim_inv
+        except np.linalg.LinAlgError:
+            fim_inv = np.linalg.pinv(fim)
+        return fim, fim_inv
+
+    def calc_se(self):
+        _, fim_inv = self.calc_fim(inverse=True)
+        return np.sqrt(np.abs(np.diag(fim_inv)))
+
+    def dof(self):
+        """Graus de liberdade: momentos distintos (e médias) de todos os grupos menos parâmetros livres"""
+        p = len(self.modelos[self.grupos[0]].vars['observed'])
+        return len(self.grupos) * (p * (p + 1) // 2 + (p if self.medias else 0)) - self.n_parametros
+
+    def calc_indices(self):
+        """χ², CFI, TLI e RMSEA multigrupo (RMSEA com o fator √G de Steiger)"""
+        obj = self.last_result.name_obj
+        n_total = sum(self.n_amostras.values())
+        n_grupos = len(self.grupos)
+        p = len(self.modelos[self.grupos[0]].vars['observed'])
+        chi2 = sum(n * self.modelos[g].last_result.fun for g, n in self.n_amostras.items())
+        chi2_base = sum(n * self.modelos[g].objetivo_base(obj) for g, n in self.n_amostras.items())
+        dof, dof_base = self.dof(), n_grupos * (p * (p + 1) // 2 - p)
+        tli = np.nan if dof == 0 or dof_base == 0 else \
+            (chi2_base / dof_base - chi2 / dof) / (chi2_base / dof_base - 1)
+        rmsea = 0.0 if chi2 < dof else np.sqrt(n_grupos) * np.sqrt((chi2 / dof - 1) / (n_total - n_grupos))
+        return {'chi2': float(chi2), 'DoF': dof, 'chi2 Baseline': float(chi2_base), 'DoF Baseline': dof_base,
+                'CFI': float(1 - (chi2 - dof) / (chi2_base - dof_base)), 'TLI': float(tli), 'RMSEA': float(rmsea)}
+
+    def inspect(self, std_est=False):
+        """Tabela de parâmetros de todos os grupos (coluna 'grupo' + colunas do inspect; médias com op '~1')"""
+        se = self.calc_se()
+        z = self.param_vals / se
+        p_valores = 2 * (1 - norm.cdf(np.abs(z)))
+        tabelas = []
+        for g in self.grupos:
+            tabela = self.modelos[g].inspect(std_est=std_est, erros=se[self.mapa[g]])
+            linhas = []
+            for (v, _, _, _), k in zip(self.parametros_media, self.mapa_media[g]):
+                linha = {'lval': v, 'op': '~1', 'rval': '', 'Estimate': self.param_vals[k] if k >= 0 else 0.0}
+                if std_est:
+                    linha['Est. Std'] = np.nan
+                linha.update({'Std. Err': se[k], 'z-value': z[k], 'p-value': p_valores[k]} if k >= 0 else
+                             {'Std. Err': '-', 'z-value': '-', 'p-value': '-'})
+                linhas.append(linha)
+            if linhas:
+                tabela = pd.concat([tabela, pd.DataFrame(linhas, columns=tabela.columns)], ignore_index=True)
+            tabela.insert(0, 'grupo', g)
+            tabelas.append(tabela)
+        return pd.concat(tabelas, ignore_index=True)
+
+
+def _covariancia_singular(cov, tol=TOL_SINGULAR):
+    """Covariância sem posto completo: autovalor mínimo <= tol·máximo ou Cholesky falha"""
+    if not np.isfinite(cov).all():
+        return True
+    autovalores = np.linalg.eigvalsh(cov)
+    if autovalores[0] <= tol * autovalores[-1]:
+        return True
+    try:
+        np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        return True
+    return False
+
+
+def estimativas_agregadas(descricao, momentos, obj='MLW', partidas='padrao'):
+    """
+    Estimativas (ModeloSEM.param_vals) de um único ajuste à covariância
+    intragrupos agregada Σ_g n_g·S_g / N: a partida comum dos ajustes multigrupo
+    """
+    modelo = ModeloSEM(descricao)
+    observadas = modelo.vars['observed']
+    n_total = sum(m.n for m in momentos.values())
+    agregada = sum(m.n * m.cov.loc[observadas, observadas] for m in momentos.values()) / n_total
+    modelo.fit(cov=agregada, n_samples=n_total, obj=obj, partidas=partidas)
+    return modelo.param_vals
+
+
+def grupos_validos(momentos_por_grupo, n_minimo=30):
+    """Grupos com n >= n_minimo, n > p e covariância positiva definida (os demais são avisados)"""
+    grupos = []
+    for rotulo, momentos in momentos_por_grupo.items():
+        p = len(momentos.colunas)
+        if momentos.n < n_minimo:
+            print(f"⚠️ Grupo {rotulo}: apenas {momentos.n} respondentes, fora do ajuste multigrupo")
+        elif momentos.n <= p:
+            print(f"⚠️ Grupo {rotulo}: {momentos.n} respondentes para {p} indicadores, fora do ajuste multigrupo")
+        elif _covariancia_singular(momentos.cov.to_numpy(dtype=np.float64)):
+            print(f"⚠️ Grupo {rotulo}: covariância singular (itens sem variação ou colineares), fora do ajuste multigrupo")
+        else:
+            grupos.append(rotulo)
+    return grupos
+
+
+def ajustar_multigrupo(descricao, momentos_por_grupo, iguais=('loadings',), liberar=(), obj='MLW', n_minimo=30,
+                       medias=None, partidas='padrao'):
+    """
+    Ajusta uma especificação em todos os grupos com n >= n_minimo e covariância
+    positiva definida (partidas: ver ModeloMultigrupo.fit).
+
+    Returns:
+        ModeloMultigrupo ajustado, ou None se restarem menos de dois grupos
+    """
+    grupos = grupos_validos(momentos_por_grupo, n_minimo)
+    if len(grupos) < 2:
+        return None
+    modelo = ModeloMultigrupo(descricao, grupos, iguais, liberar, medias)
+    modelo.fit({g: momentos_por_grupo[g] for g in grupos}, obj=obj, partidas=partidas)
+    return modelo
+
+
+def momentos_por_segmento(base, segmentos=tuple(SEGMENTOS), modelos=None):
+    """
+    Momentos de todos os grupos de todos os segmentos em uma passada sobre a base,
+    com a codificação e a imputação pela média geral de prepare_sem_data.
+
+    Returns:
+        dict modelo -> observadas do modelo, e dict segmento -> {rótulo: MomentosAmostrais}
+    """
+    from ondas import colunas_dos_modelos, matriz_da_onda
+
+    colunas, colunas_modelo = colunas_dos_modelos(base)
+    if modelos is not None:
+        colunas_modelo = {m: c for m, c in colunas_modelo.items() if m in modelos}
+    x = matriz_da_onda(base, colunas, {})
+    x = np.where(np.isnan(x), np.nanmean(x, axis=0), x)
+    rotulos = {s: np.asarray(base.coluna(coluna_segmento(base, s)), dtype=object) for s in segmentos}
+    acumulador = AcumuladorSegmentado(list(colunas), list(segmentos)).atualizar(x, rotulos)
+    return colunas_modelo, {s: acumulador.momentos(s) for s in segmentos}
+
+
+def publicar_momentos(pilha, momentos):
+    """
+    Publica em memória compartilhada as médias (G × p) e covariâncias (G × p × p)
+    dos grupos durante o ExitStack pilha; devolve o descritor para momentos_publicados.
+    """
+    rotulos = list(momentos)
+    colunas = momentos[rotulos[0]].colunas
+    medias = np.stack([momentos[r].media.to_numpy(dtype=np.float64) for r in rotulos])
+    covs = np.stack([momentos[r].cov.to_numpy(dtype=np.float64) for r in rotulos])
+    return {'medias': pilha.enter_context(publicar_matriz(medias)), 'covs': pilha.enter_context(publicar_matriz(covs)),
+            'colunas': colunas, 'rotulos': rotulos, 'n': [momentos[r].n for r in rotulos]}
+
+
+def momentos_publicados(info, colunas):
+    """dict rótulo -> MomentosAmostrais das colunas, a partir do descritor de publicar_momentos"""
+    medias, covs = anexar_matriz(info['medias']), anexar_matriz(info['covs'])
+    indices = [info['colunas'].index(c) for c in colunas]
+    return {r: MomentosAmostrais(n, pd.Series(medias[g][indices], index=colunas),
+                                 pd.DataFrame(covs[g][np.ix_(indices, indices)], index=colunas, columns=colunas), r)
+            for g, (r, n) in enumerate(zip(info['rotulos'], info['n']))}
+
+
+def _ajustar_segmento(nome_modelo, descricao, colunas, info, iguais, obj, n_minimo):
+    """Tarefa do pool: ajuste multigrupo de um modelo em um segmento"""
+    try:
+        return ajustar_multigrupo(descricao, momentos_publicados(info, colunas), iguais=iguais, obj=obj,
+                                  n_minimo=n_minimo)
+    except (np.linalg.LinAlgError, ValueError) as e:
+        print(f"⚠️ {nome_modelo}: ajuste multigrupo falhou ({e})")
+        return None
+
+
+def multigrupo_por_segmentos(base, segmentos=tuple(SEGMENTOS), modelos=None, iguais=('loadings',), obj='MLW',
+                             n_minimo=30, n_workers=1):
+    """
+    Ajuste multigrupo de cada modelo de sem_models em cada segmento.
+
+    Para a segmentação dos arquivos csv_segmentados, carregue a base com
+    carregar_base_respondentes('csv_segmentados', arquivos=[f'segmentada - {a}' for a in ARQUIVOS_TEMATICOS]).
+
+    Args:
+        base: BaseRespondentes em modo 'codificado'
+        segmentos: Nomes de SEGMENTOS ou cabeçalhos de colunas do Perfil Socioeconômico
+        modelos: Nomes dos modelos (padrão: todos os de sem_models com colunas na base)
+        iguais: Classes de parâmetros iguais entre grupos
+        obj: 'MLW' ou 'GLS'
+        n_minimo: Tamanho mínimo de um grupo
+        n_workers: Processos (1 = sequencial, None = todos os núcleos)
+
+    Returns:
+        dict (segmento, modelo) -> ModeloMultigrupo ajustado (None se não houve ajuste)
+    """
+    from analise_transporte_sem import sem_models
+
+    segmentos = list(segmentos)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    colunas_modelo, momentos = momentos_por_segmento(base, segmentos, modelos)
+
+    with ExitStack() as pilha:
+        chaves, tarefas = [], []
+        for segmento in segmentos:
+            grupos = momentos[segmento]
+            print(f"📊 {segmento}: {len(grupos)} grupos ({', '.join(f'{r}: {m.n}' for r, m in grupos.items())})")
+            # Momentos do segmento publicados uma vez para todos os modelos
+            info = publicar_momentos(pilha, grupos)
+            for nome_modelo, cols in colunas_modelo.items():
+                chaves.append((segmento, nome_modelo))
+                tarefas.append((nome_modelo, sem_models[nome_modelo], cols, info, iguais, obj, n_minimo))
+        print(f"🔄 Multigrupo: {len(tarefas)} ajustes ({len(segmentos)} segmentos × {len(colunas_modelo)} modelos), "
+              f"{n_workers} processo(s)")
+        if n_workers <= 1 or len(tarefas) <= 1:
+            ajustes = [_ajustar_segmento(*tarefa) for tarefa in tarefas]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(tarefas))) as pool:
+                ajustes = list(pool.map(_ajustar_segmento, *zip(*tarefas)))
+    return dict(zip(chaves, ajustes))
+
+
+def tabela_multigrupo(resultados):
+    """Resumo (segmento, modelo, grupos, N e índices de ajuste) dos ajustes multigrupo"""
+    linhas = []
+    for (segmento, nome_modelo), modelo in resultados.items():
+        if modelo is None:
+            continue
+        indices = modelo.calc_indices()
+        linhas.append({'segmento': segmento, 'modelo': nome_modelo, 'grupos': len(modelo.grupos),
+                       'N': sum(modelo.n_amostras.values()), 'convergiu': modelo.last_result.success,
+                       **{k: indices[k] for k in ('chi2', 'DoF', 'CFI', 'TLI', 'RMSEA')}})
+    return pd.DataFrame(linhas)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MODO INCREMENTAL POR ONDAS DA PESQUISA
+======================================
+
+Processa uma nova onda da pesquisa sem reexecutar tudo do zero:
+- A onda (diretório com as tabelas temáticas) é anexada à base de
+  respondentes das ondas anteriores; IDs repetidos são rejeitados
+- Só as linhas da nova onda são lidas: o acumulador de momentos gravado
+  é atualizado e mesclado (acumuladores.AcumuladorMomentos)
+- Cada modelo de sem_models é reajustado a partir das estimativas da onda
+  anterior (partida quente, SLSQP a partir de x0); modelos cuja especificação
+  e momentos não mudaram não são reajustados
+- Opcionalmente (--medir-partida-fria) o ajuste do zero também é feito
+  para comparar iterações; se ele achar um objetivo menor (outro mínimo
+  local), fica no lugar da partida quente
+- Um relatório lista as mudanças em estimativas, índices de ajuste e
+  iterações do otimizador do ajuste mantido
+
+O estado (ondas, acumulador, categorias e estimativas) fica em
+.cache_dados/ondas. Uso:
+
+    python ondas.py csv_extraidos --nome onda_1
+    python ondas.py dados/onda_2 --nome onda_2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from acumuladores import AcumuladorMomentos, carregar_acumulador
+from analise_transporte_sem import fit_sem_model, resolve_column_mapping, sem_models
+from base_respondentes import anexar_onda, carregar_base_respondentes
+from cache_dados import DIRETORIO_CACHE
+from codec_likert import LIKERT_AUSENTE
+from motor_sem import compilar_especificacao
+
+DIRETORIO_ONDAS = os.path.join(DIRETORIO_CACHE, 'ondas')
+DIRETORIO_RELATORIOS = os.path.join('resultados', 'tabelas')
+
+_VERSAO_ESTADO = 1
+
+# Índices de ajuste (calc_stats do semopy) comparados entre ondas
+INDICES_RELATORIO = ['chi2', 'DoF', 'CFI', 'TLI', 'RMSEA']
+
+# Variação absoluta a partir da qual uma estimativa entra no relatório
+LIMIAR_MUDANCA = 0.05
+
+
+def _hash_texto(texto):
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _hash_momentos(momentos):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(momentos.n).encode('utf-8'))
+    h.update(json.dumps(momentos.colunas, ensure_ascii=False).encode('utf-8'))
+    h.update(np.ascontiguousarray(momentos.cov.to_numpy()).tobytes())
+    return h.hexdigest()
+
+
+def carregar_estado(diretorio=DIRETORIO_ONDAS):
+    """Estado gravado das ondas processadas (vazio na primeira onda)"""
+    caminho = os.path.join(diretorio, 'estado.json')
+    estado = {'versao': _VERSAO_ESTADO, 'ondas': [], 'categorias': {}, 'modelos': {}}
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as f:
+            gravado = json.load(f)
+        if gravado.get('versao') == _VERSAO_ESTADO:
+            estado = gravado
+    caminho_acumulador = os.path.join(diretorio, 'acumulador.npz')
+    acumulador = carregar_acumulador(caminho_acumulador) if estado['ondas'] and os.path.exists(caminho_acumulador) \
+        else None
+    return estado, acumulador
+
+
+def _gravar_estado(estado, acumulador, diretorio):
+    os.makedirs(diretorio, exist_ok=True)
+    acumulador.salvar(os.path.join(diretorio, 'acumulador.tmp.npz'))
+    os.replace(os.path.join(diretorio, 'acumulador.tmp.npz'), os.path.join(diretorio, 'acumulador.npz'))
+    caminho = os.path.join(diretorio, 'estado.json')
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False, indent=1)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def base_das_ondas(estado):
+    """Base de respondentes com todas as ondas registradas no estado"""
+    base = None
+    for onda in estado['ondas']:
+        nova = carregar_base_respondentes(onda['diretorio'], modo='codificado')
+        base = nova if base is None else anexar_onda(base, nova)
+    return base
+
+
+def colunas_dos_modelos(base):
+    """
+    Colunas da base usadas pelos modelos, pelo nome final do pipeline SEM.
+
+    Returns:
+        dict nome final -> coluna da base, e dict modelo -> lista de nomes finais
+    """
+    nomes_finais, _ = resolve_column_mapping(base.colunas())
+    por_nome = dict(zip(nomes_finais, base.colunas()))
+    modelos = {}
+    for nome_modelo, especificacao in sem_models.items():
+        variaveis = compilar_especificacao(especificacao).observadas
+        faltantes = sorted(v for v in variaveis if v not in por_nome)
+        if faltantes:
+            print(f"⚠️ {nome_modelo}: colunas ausentes na onda {faltantes}, modelo ignorado")
+            continue
+        modelos[nome_modelo] = sorted(variaveis)
+    usadas = sorted(set().union(*modelos.values())) if modelos else []
+    return {v: por_nome[v] for v in usadas}, modelos
+
+
+def matriz_da_onda(base, colunas, categorias):
+    """
+    Matriz float (NaN nos ausentes) das colunas, com a codificação de prepare_sem_data.
+
+    Categóricas recebem códigos ordinais 1..k pela ordem de aparição; o dicionário
+    categorias (coluna -> rótulos) é estendido com rótulos novos, de modo que a
+    codificação da primeira onda se mantém nas seguintes.
+    """
+    x = np.empty((len(base), len(colunas)), dtype=np.float64)
+    for j, (nome, coluna) in enumerate(colunas.items()):
+        valores = base.coluna(coluna)
+        if getattr(valores, 'dtype', None) == np.int8:
+            x[:, j] = np.where(valores == LIKERT_AUSENTE, np.nan, valores)
+        elif isinstance(valores, pd.Categorical) or not np.issubdtype(np.asarray(valores).dtype, np.number):
+            # Mesmos rótulos que clean_data (texto sem espaços nas bordas)
+            rotulos = pd.Series(np.asarray(valores, dtype=object))
+            rotulos = rotulos.map(lambda v: str(v).strip() if pd.notna(v) else None)
+            conhecidos = categorias.setdefault(nome, [])
+            vistos = set(conhecidos)
+            conhecidos.extend(r for r in rotulos.dropna().unique() if r not in vistos and r != '')
+            mapa = {r: i + 1 for i, r in enumerate(conhecidos)}
+            x[:, j] = rotulos.map(mapa).to_numpy(dtype=np.float64)
+        else:
+            x[:, j] = valores
+    return x
+
+
+def _indices(stats):
+    return {indice: float(stats.loc['Value', indice]) for indice in INDICES_RELATORIO if indice in stats.columns}
+
+
+def _estimativas(params):
+    linhas = params[['lval', 'op', 'rval', 'Estimate']]
+    return {f"{l} {op} {r}": float(e) for l, op, r, e in linhas.itertuples(index=False)}
+
+
+def _comparar(anterior, atual):
+    """Mudanças de índices e estimativas entre o ajuste anterior e o atual de um modelo"""
+    indices = {i: (anterior['indices'].get(i), v) for i, v in atual['indices'].items()}
+    estimativas = {}
+    for parametro, valor in atual['estimativas'].items():
+        antes = anterior['estimativas'].get(parametro)
+        if antes is None or abs(valor - antes) >= LIMIAR_MUDANCA:
+            estimativas[parametro] = (antes, valor)
+    return {'indices': indices, 'estimativas': estimativas}
+
+
+def reajustar_modelos(acumulador, modelos, estado, medir_partida_fria=False):
+    """
+    Reajusta os modelos com mudança de especificação ou de momentos.
+
+    Args:
+        acumulador: AcumuladorMomentos com todas as ondas
+        modelos: dict modelo -> colunas (nomes finais)
+        estado: Estado das ondas (estimativas anteriores; atualizado aqui)
+        medir_partida_fria: Também ajusta sem partida quente, para comparar iterações
+            e ficar com o menor objetivo
+
+    Returns:
+        (dict modelo -> resultados de fit_sem_model, dict modelo -> resumo de mudanças)
+    """
+    momentos = acumulador.momentos('media')
+    resultados, mudancas = {}, {}
+    for nome_modelo, colunas in modelos.items():
+        especificacao = sem_models[nome_modelo]
+        momentos_modelo = momentos.subconjunto(colunas)
+        chave = {'especificacao': _hash_texto(especificacao), 'momentos': _hash_momentos(momentos_modelo)}
+        anterior = estado['modelos'].get(nome_modelo)
+        if anterior and all(anterior[k] == v for k, v in chave.items()):
+            print(f"⏭️ {nome_modelo}: especificação e momentos inalterados, ajuste mantido")
+            continue
+
+        quente = anterior is not None and anterior['especificacao'] == chave['especificacao']
+        x0 = np.array(anterior['x']) if quente else None
+        resultado = fit_sem_model(nome_modelo, especificacao, moments=momentos_modelo, x0=x0)
+        if resultado is None:
+            continue
+        if quente and not resultado['native_model'].last_result.success:
+            print(f"⚠️ {nome_modelo}: partida quente não convergiu, reajustando do zero")
+            quente = False
+            resultado = fit_sem_model(nome_modelo, especificacao, moments=momentos_modelo)
+
+        # Iterações somam todas as partidas do ajuste (o do zero tenta várias)
+        comparacao = {'n_iter_partida_quente': None, 'n_iter_partida_fria': None, 'partida_fria_menor': False}
+        if medir_partida_fria and quente:
+            frio = fit_sem_model(nome_modelo, especificacao, moments=momentos_modelo)
+            comparacao['n_iter_partida_quente'] = int(resultado['native_model'].last_result.n_it_total)
+            comparacao['n_iter_partida_fria'] = int(frio['native_model'].last_result.n_it_total)
+            valor_quente, valor_frio = resultado['native_model'].last_result.fun, frio['native_model'].last_result.fun
+            if frio['native_model'].last_result.success and valor_frio < valor_quente - 1e-10 * (1 + abs(valor_quente)):
+                print(f"⚠️ {nome_modelo}: partida quente parou em outro mínimo local "
+                      f"(F={valor_quente:.6f} contra {valor_frio:.6f} do zero); mantendo o ajuste do zero")
+                resultado, quente = frio, False
+                comparacao['partida_fria_menor'] = True
+
+        # Estado e relatório descrevem o ajuste mantido
+        nativo = resultado['native_model']
+        atual = dict(chave, x=nativo.param_vals.tolist(), n_iter=int(nativo.last_result.n_it_total),
+                     partida_quente=quente, indices=_indices(resultado['stats']),
+                     estimativas=_estimativas(resultado['params']))
+
+        mudancas[nome_modelo] = dict(_comparar(anterior, atual) if anterior else {'indices': {}, 'estimativas': {}},
+                                     n_iter=atual['n_iter'], n_iter_anterior=anterior['n_iter'] if anterior else None,
+                                     partida_quente=quente, **comparacao)
+        estado['modelos'][nome_modelo] = atual
+        resultados[nome_modelo] = resultado
+    return resultados, mudancas
+
+
+def _formatar(valor):
+    return '-' if valor is None else f"{valor:.4f}"
+
+
+def salvar_relatorio(nome_onda, estado, mudancas, diretorio=DIRETORIO_RELATORIOS):
+    """Relatório em texto com as mudanças de cada modelo reajustado"""
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, f"relatorio_onda_{nome_onda}.txt")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write(f"RELATÓRIO DA ONDA {nome_onda} - {datetime.now():%Y-%m-%d %H:%M}\n")
+        f.write("=" * 80 + "\n\n")
+        f.write(f"Ondas processadas: {', '.join(o['nome'] for o in estado['ondas'])}\n")
+        f.write(f"Respondentes acumulados: {sum(o['n'] for o in estado['ondas'])}\n\n")
+        if not mudancas:
+            f.write("Nenhum modelo precisou ser reajustado.\n")
+        for nome_modelo, mudanca in mudancas.items():
+            f.write(f"Modelo: {nome_modelo}\n")
+            f.write("-" * 40 + "\n")
+            partida = 'quente' if mudanca['partida_quente'] else 'fria'
+            f.write(f"Iterações: {mudanca['n_iter']} (partida {partida}")
+            if mudanca['n_iter_anterior'] is not None:
+                f.write(f"; onda anterior: {mudanca['n_iter_anterior']}")
+            if mudanca['n_iter_partida_fria'] is not None:
+                f.write(f"; partida quente: {mudanca['n_iter_partida_quente']}"
+                        f"; do zero, todas as partidas: {mudanca['n_iter_partida_fria']}")
+            if mudanca['partida_fria_menor']:
+                f.write("; ajuste do zero mantido por ter objetivo menor")
+            f.write(")\n")
+            for indice, (antes, depois) in mudanca['indices'].items():
+                f.write(f"  {indice}: {_formatar(antes)} -> {_formatar(depois)}\n")
+            if mudanca['estimativas']:
+                f.write(f"  Estimativas com variação >= {LIMIAR_MUDANCA}:\n")
+                for parametro, (antes, depois) in mudanca['estimativas'].items():
+                    f.write(f"    {parametro}: {_formatar(antes)} -> {_formatar(depois)}\n")
+            f.write("\n")
+    return caminho
+
+
+def processar_onda(diretorio_onda, nome=None, diretorio_estado=DIRETORIO_ONDAS, medir_partida_fria=False):
+    """
+    Anexa uma onda, atualiza os momentos acumulados e reajusta os modelos.
+
+    Args:
+        diretorio_onda: Diretório com as tabelas temáticas da onda
+        nome: Rótulo da onda (padrão: nome do diretório)
+        diretorio_estado: Onde o estado das ondas é gravado
+        medir_partida_fria: Compara as iterações com um ajuste sem partida quente
+
+    Returns:
+        dict com 'resultados' (modelo -> resultados de fit_sem_model) e 'mudancas';
+        None se a onda já tinha sido processada
+    """
+    nome = nome or os.path.basename(os.path.normpath(diretorio_onda))
+    estado, acumulador = carregar_estado(diretorio_estado)
+    onda = carregar_base_respondentes(diretorio_onda, modo='codificado')
+    if any(o['assinatura'] == onda.assinatura for o in estado['ondas']):
+        print(f"⏭️ Onda {nome}: conteúdo já processado, nada a fazer")
+        return None
+    if any(o['nome'] == nome for o in estado['ondas']):
+        raise ValueError(f"Já existe uma onda chamada {nome}")
+
+    # Anexar à base valida os IDs contra as ondas anteriores
+    base = onda if not estado['ondas'] else anexar_onda(base_das_ondas(estado), onda)
+    print(f"📥 Onda {nome}: {len(onda)} respondentes (base acumulada: {len(base)})")
+
+    colunas, modelos = colunas_dos_modelos(onda)
+    nomes = list(colunas)
+    if acumulador is not None and acumulador.colunas != nomes:
+        # Colunas mudaram entre ondas: os momentos são refeitos sobre a base inteira
+        print("⚠️ Colunas dos modelos mudaram; recalculando os momentos de todas as ondas")
+        acumulador = None
+        estado['categorias'] = {}
+        onda_para_acumular = base
+    else:
+        onda_para_acumular = onda
+    if acumulador is None:
+        acumulador = AcumuladorMomentos(nomes)
+    acumulador.atualizar(matriz_da_onda(onda_para_acumular, colunas, estado['categorias']))
+    print(f"📊 Momentos atualizados: {acumulador}")
+
+    resultados, mudancas = reajustar_modelos(acumulador, modelos, estado, medir_partida_fria)
+
+    estado['ondas'].append({'nome': nome, 'diretorio': os.path.abspath(diretorio_onda),
+                            'assinatura': onda.assinatura, 'n': len(onda)})
+    _gravar_estado(estado, acumulador, diretorio_estado)
+    caminho = salvar_relatorio(nome, estado, mudancas)
+    print(f"✅ Onda {nome} processada: {len(mudancas)} modelos reajustados; relatório em {caminho}")
+    return {'resultados': resultados, 'mudancas': mudancas}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Processa uma nova onda da pesquisa de forma incremental')
+    parser.add_argument('diretorio', help='Diretório com as tabelas temáticas da onda')
+    parser.add_argument('--nome', help='Rótulo da onda (padrão: nome do diretório)')
+    parser.add_argument('--estado', default=DIRETORIO_ONDAS, help='Diretório do estado das ondas')
+    parser.add_argument('--medir-partida-fria', action='store_true',
+                        help='Também ajusta do zero para comparar iterações e mínimos com a partida quente')
+    args = parser.parse_args()
+    processar_onda(args.diretorio, args.nome, args.estado, args.medir_partida_fria)
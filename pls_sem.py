@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PLS-SEM (MODELAGEM DE CAMINHOS POR MÍNIMOS QUADRADOS PARCIAIS)
+==============================================================
+
+Algoritmo de Lohmöller para modelos de caminhos com compostos, usado na
+literatura de aceitação de transporte (teses/) e viável com todos os
+indicadores das tabelas temáticas, onde o ajuste por covariância sofre com
+N e k:
+- Os pesos são iterados sobre a matriz de correlação dos indicadores
+  (p × p), sem voltar às linhas: escores, proxies internas e atualizações
+  externas de todos os blocos saem de produtos matriciais
+- Modo A (reflexivo: covariância item-proxy) e modo B (formativo: regressão
+  da proxy nos itens, pela inversa bloco-diagonal das correlações)
+- Esquemas internos: caminho, fator e centróide
+- Sinal de cada construto fixado pela soma das cargas do bloco
+- Bootstrap dos coeficientes em um pool de processos, com a matriz publicada
+  em memória compartilhada e um fluxo aleatório por réplica
+  (SeedSequence.spawn), como em bootstrap_sem
+
+O modelo de sete construtos do diagrama (criar_diagrama_sem_completo.py)
+está em CAMINHOS_DIAGRAMA, com a medida de busca_especificacao.CONSTRUTOS
+ou, com itens_tematicos, com todos os indicadores numéricos de cada tabela.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from bootstrap_sem import _momentos_ponderados, intervalo_percentil, pesos_bootstrap
+from busca_especificacao import CONSTRUTOS, ESCORES_ORDINAIS, itens_construtos
+from memoria_compartilhada import anexar_matriz, publicar_matriz
+
+ESQUEMAS = ('caminho', 'fator', 'centroide')
+
+# Setas (dependente, preditor) de criar_diagrama_sem_completo.criar_diagrama_sem_completo
+CAMINHOS_DIAGRAMA = (
+    ('Qualidade', 'Perfil'),
+    ('Utilizacao', 'Perfil'),
+    ('Experiencia', 'Qualidade'),
+    ('Intencao', 'Experiencia'),
+    ('Percepcao', 'Aceitacao'),
+    ('Intencao', 'Percepcao'),
+    ('Utilizacao', 'Intencao'),
+    ('Aceitacao', 'Qualidade'),
+)
+
+# Perfil socioeconômico (renda, escolaridade, idade) como composto formativo
+MODOS_DIAGRAMA = {'Perfil': 'B'}
+
+# Construto de cada tabela temática (itens_tematicos)
+TABELAS_CONSTRUTOS = {
+    'Qualidade do serviço': 'Qualidade',
+    'Utilização': 'Utilizacao',
+    'Percepção novos serviços': 'Percepcao',
+    'Intenção comportamental': 'Intencao',
+    'Aceitação da tecnologia': 'Aceitacao',
+    'Experiência do usuário': 'Experiencia',
+    'Perfil Socioeconomico': 'Perfil',
+}
+
+
+def itens_tematicos(base):
+    """
+    Blocos com todos os indicadores numéricos de cada tabela temática: itens
+    Likert, colunas numéricas e categóricas ordenadas de ESCORES_ORDINAIS
+    (as nominais, como gênero ou meio de transporte, ficam de fora).
+
+    Returns:
+        (construtos, DataFrame dos itens com NaN nos ausentes)
+    """
+    from analise_transporte_sem import resolve_column_mapping
+
+    nomes_finais = dict(zip(base.colunas(), resolve_column_mapping(base.colunas())[0]))
+    construtos = {}
+    for tabela, construto in TABELAS_CONSTRUTOS.items():
+        itens = []
+        for coluna in base.colunas([tabela]):
+            nome = nomes_finais[coluna]
+            valores = base.coluna(coluna)
+            numerica = not isinstance(valores, pd.Categorical) and np.issubdtype(np.asarray(valores).dtype, np.number)
+            if numerica or nome in ESCORES_ORDINAIS:
+                itens.append(nome)
+        construtos[construto] = itens
+    return construtos, itens_construtos(base, construtos)
+
+
+class ModeloPLS:
+    """Modelo de caminhos PLS: blocos de indicadores, caminhos entre compostos, modos e esquema interno"""
+
+    def __init__(self, construtos, caminhos, modos=None, esquema='caminho'):
+        """
+        Args:
+            construtos: dict construto -> lista de indicadores
+            caminhos: Pares (dependente, preditor)
+            modos: dict construto -> 'A' (reflexivo) ou 'B' (formativo); padrão 'A'
+            esquema: Esquema de pesos internos ('caminho', 'fator' ou 'centroide')
+        """
+        if esquema not in ESQUEMAS:
+            raise ValueError(f"Esquema interno desconhecido: {esquema!r} (use {', '.join(ESQUEMAS)})")
+        self.construtos = {c: list(itens) for c, itens in construtos.items()}
+        self.latentes = list(self.construtos)
+        self.indicadores = [i for itens in self.construtos.values() for i in itens]
+        if len(set(self.indicadores)) < len(self.indicadores):
+            raise ValueError("Cada indicador deve pertencer a um único bloco")
+        modos = modos or {}
+        self.modos = {c: modos.get(c, 'A') for c in self.latentes}
+        if set(self.modos.values()) - {'A', 'B'}:
+            raise ValueError(f"Modos de medida devem ser 'A' ou 'B': {self.modos}")
+        self.esquema = esquema
+        self.caminhos = [tuple(c) for c in caminhos]
+
+        posicao = {c: j for j, c in enumerate(self.latentes)}
+        k, p = len(self.latentes), len(self.indicadores)
+        # blocos[i, j] = 1 se o indicador i mede o construto j
+        self._blocos = np.zeros((p, k))
+        i = 0
+        for j, itens in enumerate(self.construtos.values()):
+            self._blocos[i:i + len(itens), j] = 1.0
+            i += len(itens)
+        self._bloco = self._blocos.argmax(axis=1)
+        # estrutura[d, q] = 1 se q é preditor de d
+        self._estrutura = np.zeros((k, k))
+        for dependente, preditor in self.caminhos:
+            if dependente not in posicao or preditor not in posicao or dependente == preditor:
+                raise ValueError(f"Caminho inválido: {dependente} ~ {preditor}")
+            self._estrutura[posicao[dependente], posicao[preditor]] = 1.0
+        isolados = [c for j, c in enumerate(self.latentes)
+                    if not self._estrutura[j].any() and not self._estrutura[:, j].any()]
+        if isolados:
+            raise ValueError(f"Construtos sem caminhos (proxy interna nula): {isolados}")
+        self._preditores = {j: np.flatnonzero(self._estrutura[j]) for j in range(k) if self._estrutura[j].any()}
+        self._modo_b = [np.flatnonzero(self._bloco == j) for j, c in enumerate(self.latentes) if self.modos[c] == 'B']
+
+    def __repr__(self):
+        return (f"ModeloPLS(construtos={len(self.latentes)}, indicadores={len(self.indicadores)}, "
+                f"caminhos={len(self.caminhos)}, esquema={self.esquema!r})")
+
+    def preparar(self, dados, ausentes='media'):
+        """
+        Matriz n × p dos indicadores na ordem do modelo.
+
+        Args:
+            dados: DataFrame com os indicadores
+            ausentes: 'media' (substituição pela média do indicador) ou 'exclusao' (casos completos)
+        """
+        faltantes = [i for i in self.indicadores if i not in dados.columns]
+        if faltantes:
+            raise KeyError(f"Indicadores ausentes nos dados: {faltantes}")
+        x = dados[self.indicadores].to_numpy(dtype=np.float64)
+        if ausentes == 'media':
+            medias = np.nanmean(x, axis=0)
+            x = np.where(np.isnan(x), medias, x)
+        elif ausentes == 'exclusao':
+            x = x[~np.isnan(x).any(axis=1)]
+        else:
+            raise ValueError(f"Tratamento de ausentes desconhecido: {ausentes!r}")
+        return np.ascontiguousarray(x)
+
+    def _pesos_internos(self, Ryy):
+        """Pesos internos (linha d: contribuição de cada construto para a proxy interna de d)"""
+        vizinhos = (self._estrutura + self._estrutura.T) > 0
+        if self.esquema == 'centroide':
+            return np.sign(Ryy) * vizinhos
+        if self.esquema == 'fator':
+            return Ryy * vizinhos
+        # Caminho: sucessores pela correlação, preditores pela regressão múltipla
+        E = Ryy * self._estrutura.T
+        for d, preditores in self._preditores.items():
+            E[d, preditores] = np.linalg.solve(Ryy[np.ix_(preditores, preditores)], Ryy[preditores, d])
+        return E
+
+    def _iterar(self, R, max_iter=300, tol=1e-7):
+        """
+        Pesos externos (p × k, escores de variância unitária) sobre a matriz
+        de correlação R dos indicadores.
+
+        Returns:
+            (pesos, iterações, convergiu)
+        """
+        inversa = np.eye(len(R))
+        for itens in self._modo_b:
+            inversa[np.ix_(itens, itens)] = np.linalg.inv(R[np.ix_(itens, itens)])
+        W = self._blocos / np.sqrt(np.einsum('ij,ik,kj->j', self._blocos, R, self._blocos))
+        for iteracao in range(1, max_iter + 1):
+            Ryy = W.T @ R @ W
+            # Covariância de cada indicador com as proxies internas: X'Z/n = R W E'
+            covariancia = R @ W @ self._pesos_internos(Ryy).T
+            novo = self._blocos * (inversa @ covariancia)
+            novo /= np.sqrt(np.einsum('ij,ik,kj->j', novo, R, novo))
+            if np.abs(novo - W).max() < tol:
+                return novo, iteracao, True
+            W = novo
+        return W, max_iter, False
+
+    def _estimativas(self, R, W):
+        """Pesos com o sinal corrigido, cargas cruzadas, correlações dos escores, caminhos e R²"""
+        cargas = R @ W
+        sinal = np.where((self._blocos * cargas).sum(axis=0) < 0, -1.0, 1.0)
+        W, cargas = W * sinal, cargas * sinal
+        Ryy = W.T @ R @ W
+        B = np.zeros_like(Ryy)
+        r2 = np.full(len(Ryy), np.nan)
+        for d, preditores in self._preditores.items():
+            B[d, preditores] = np.linalg.solve(Ryy[np.ix_(preditores, preditores)], Ryy[preditores, d])
+            r2[d] = Ryy[d, preditores] @ B[d, preditores]
+        return W, cargas, Ryy, B, r2
+
+    def _vetor(self, W, cargas, B):
+        """Caminhos (ordem de self.caminhos), cargas e pesos (ordem dos indicadores) em um vetor"""
+        posicao = {c: j for j, c in enumerate(self.latentes)}
+        caminhos = [B[posicao[d], posicao[q]] for d, q in self.caminhos]
+        linhas = np.arange(len(self.indicadores))
+        return np.concatenate([caminhos, cargas[linhas, self._bloco], W[linhas, self._bloco]])
+
+    def _rotulos(self):
+        """(lval, op, rval, tipo) de cada posição de _vetor"""
+        construto = [self.latentes[j] for j in self._bloco]
+        return ([(d, '~', q, 'caminho') for d, q in self.caminhos]
+                + [(c, '=~', i, 'carga') for c, i in zip(construto, self.indicadores)]
+                + [(c, '<~', i, 'peso') for c, i in zip(construto, self.indicadores)])
+
+    def fit(self, dados, ausentes='media', max_iter=300, tol=1e-7):
+        """
+        Estima pesos, cargas, caminhos, R² e escores dos construtos.
+
+        Args:
+            dados: DataFrame com os indicadores (ou matriz de preparar)
+            ausentes: Ver preparar
+            max_iter, tol: Limite de iterações e tolerância na variação dos pesos
+        """
+        x = self.preparar(dados, ausentes) if isinstance(dados, pd.DataFrame) else np.asarray(dados, np.float64)
+        desvios = x.std(axis=0)
+        if (desvios == 0).any():
+            constantes = [i for i, d in zip(self.indicadores, desvios) if d == 0]
+            raise ValueError(f"Indicadores sem variância: {constantes}")
+        z = (x - x.mean(axis=0)) / desvios
+        R = z.T @ z / len(z)
+        W, self.n_iter, self.convergiu = self._iterar(R, max_iter, tol)
+        if not self.convergiu:
+            print(f"⚠️ PLS: pesos não convergiram em {max_iter} iterações")
+        W, cargas, Ryy, B, r2 = self._estimativas(R, W)
+        self.n = len(z)
+        self.param_vals = self._vetor(W, cargas, B)
+        self.pesos = pd.DataFrame(W, index=self.indicadores, columns=self.latentes)
+        self.cargas_cruzadas = pd.DataFrame(cargas, index=self.indicadores, columns=self.latentes)
+        self.correlacoes = pd.DataFrame(Ryy, index=self.latentes, columns=self.latentes)
+        self.coeficientes = pd.DataFrame(B, index=self.latentes, columns=self.latentes)
+        self.r2 = pd.Series(r2, index=self.latentes).dropna()
+        self.escores = pd.DataFrame(z @ W, columns=self.latentes)
+        return self
+
+    def inspect(self):
+        """Caminhos, cargas e pesos estimados (lval, op, rval, tipo, Estimate)"""
+        tabela = pd.DataFrame(self._rotulos(), columns=['lval', 'op', 'rval', 'tipo'])
+        tabela['Estimate'] = self.param_vals
+        return tabela
+
+
+def modelo_diagrama(construtos=None, modos=MODOS_DIAGRAMA, esquema='caminho'):
+    """ModeloPLS dos sete construtos com as setas do diagrama (medida padrão: CONSTRUTOS)"""
+    return ModeloPLS(CONSTRUTOS if construtos is None else construtos, CAMINHOS_DIAGRAMA, modos, esquema)
+
+
+def _replicas_bloco(modelo, info_matriz, max_iter, tol, sementes):
+    """Tarefa do pool: reestima o modelo nas réplicas das sementes dadas"""
+    x = anexar_matriz(info_matriz)
+    n = x.shape[0]
+    replicas = np.full((len(sementes), len(modelo._rotulos())), np.nan)
+    for r, semente in enumerate(sementes):
+        pesos = pesos_bootstrap(semente, n)
+        S = _momentos_ponderados(x, pesos)
+        desvios = np.sqrt(np.diag(S))
+        if (desvios == 0).any():
+            continue
+        R = S / np.outer(desvios, desvios)
+        try:
+            W, _, convergiu = modelo._iterar(R, max_iter, tol)
+            if convergiu:
+                W, cargas, _, B, _ = modelo._estimativas(R, W)
+                replicas[r] = modelo._vetor(W, cargas, B)
+        except np.linalg.LinAlgError:
+            continue
+    return replicas
+
+
+def bootstrap_pls(modelo, dados, n_replicas=500, n_workers=1, semente=None, nivel=0.95, tamanho_bloco=100,
+                  ausentes='media', max_iter=300, tol=1e-7):
+    """
+    Bootstrap não paramétrico dos caminhos, cargas e pesos de um ModeloPLS.
+
+    Args:
+        modelo: ModeloPLS (é ajustado à amostra completa)
+        dados: DataFrame com os indicadores
+        n_replicas: Número de réplicas
+        n_workers: Processos (1 = sequencial, None = todos os núcleos)
+        semente: Semente da SeedSequence (None = aleatória)
+        nivel: Nível de confiança dos intervalos percentis
+        tamanho_bloco: Réplicas por tarefa do pool
+        ausentes: Ver ModeloPLS.preparar (aplicado uma vez, antes da reamostragem)
+
+    Returns:
+        dict com 'parametros' (estimativa, erro padrão bootstrap, t, p-valor e
+        limites percentis), 'replicas' (réplicas × parâmetros) e 'n_falhas'
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    x = modelo.preparar(dados, ausentes)
+    modelo.fit(x, max_iter=max_iter, tol=tol)
+    print(f"🔁 Bootstrap PLS: {n_replicas} réplicas, {len(modelo.param_vals)} parâmetros, {len(x)} respondentes, "
+          f"{n_workers} processo(s)")
+
+    sementes = np.random.SeedSequence(semente).spawn(n_replicas)
+    blocos = [sementes[i:i + tamanho_bloco] for i in range(0, len(sementes), tamanho_bloco)]
+    with publicar_matriz(x) as info_matriz:
+        if n_workers <= 1 or len(blocos) <= 1:
+            partes = [_replicas_bloco(modelo, info_matriz, max_iter, tol, bloco) for bloco in blocos]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(blocos))) as pool:
+                partes = list(pool.map(_replicas_bloco, *zip(*[(modelo, info_matriz, max_iter, tol, b)
+                                                               for b in blocos])))
+    replicas = np.vstack(partes)
+    n_falhas = int(np.isnan(replicas[:, 0]).sum())
+    if n_falhas:
+        print(f"⚠️ {n_falhas} réplicas não convergiram e foram descartadas")
+
+    parametros = pd.DataFrame(modelo._rotulos(), columns=['lval', 'op', 'rval', 'tipo'])
+    parametros['Estimate'] = modelo.param_vals
+    parametros['Boot SE'] = np.nanstd(replicas, axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        parametros['t'] = parametros['Estimate'] / parametros['Boot SE']
+    parametros['p-value'] = 2 * norm.sf(np.abs(parametros['t']))
+    parametros[['Perc. inf', 'Perc. sup']] = intervalo_percentil(replicas, nivel).T
+    return {'parametros': parametros, 'replicas': replicas, 'n_falhas': n_falhas}
+
+
+def pls_da_base(base, itens='construtos', esquema='caminho', n_bootstrap=0, n_workers=1, semente=None):
+    """
+    Modelo de sete construtos do diagrama estimado na base de respondentes.
+
+    Args:
+        base: BaseRespondentes (modo='codificado')
+        itens: 'construtos' (medida de CONSTRUTOS) ou 'tabelas' (todos os indicadores, itens_tematicos)
+        esquema: Esquema de pesos internos
+        n_bootstrap: Réplicas bootstrap (0 = só a estimativa pontual)
+
+    Returns:
+        dict com 'modelo' (ModeloPLS ajustado), 'parametros' e, com bootstrap, 'bootstrap'
+    """
+    if itens == 'tabelas':
+        construtos, dados = itens_tematicos(base)
+    elif itens == 'construtos':
+        construtos, dados = CONSTRUTOS, itens_construtos(base)
+    else:
+        raise ValueError(f"Itens desconhecidos: {itens!r} (use 'construtos' ou 'tabelas')")
+    modelo = modelo_diagrama(construtos, esquema=esquema)
+    if n_bootstrap > 0:
+        resultado = bootstrap_pls(modelo, dados, n_replicas=n_bootstrap, n_workers=n_workers, semente=semente)
+        return {'modelo': modelo, 'parametros': resultado['parametros'], 'bootstrap': resultado}
+    modelo.fit(dados)
+    return {'modelo': modelo, 'parametros': modelo.inspect()}
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CORRELAÇÕES POLICÓRICAS E POLISSERIAIS VETORIZADAS
+==================================================
+
+Correlações para indicadores Likert tratados como ordinais (estimador em
+dois passos de Olsson, 1979):
+- Limiares de cada item estimados uma vez pelas contagens de categorias
+- Tabelas de contingência K×K de todos os pares de itens em um único
+  np.bincount sobre os códigos int8 (0 = ausente, exclusão por par)
+- Máxima verossimilhança de ρ por Fisher scoring com todos os pares
+  otimizados ao mesmo tempo (probabilidades das células pela normal
+  bivariada de Genz, vetorizada)
+- O custo do ajuste depende das tabelas (pares × K²), não do número de
+  respondentes; a matriz é guardada em cache pelo hash das tabelas
+- Covariância assintótica das policóricas (pesos do DWLS/WLSMV) pelas
+  funções de influência do estimador em dois passos, em cache pelo hash
+  dos padrões de resposta
+
+A correlação polisserial (item ordinal × variável contínua) usa a
+aproximação em dois passos de Olsson, Drasgow e Dorans (1982).
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import scipy
+from scipy.special import ndtr, ndtri
+
+from cache_dados import DIRETORIO_CACHE
+from cache_resultados import versao_codigo
+from codec_likert import LIKERT_AUSENTE
+
+DIRETORIO_POLICORICAS = os.path.join(DIRETORIO_CACHE, 'policoricas')
+DIRETORIO_ASSINTOTICAS = os.path.join(DIRETORIO_CACHE, 'assintoticas')
+
+# Limiar usado no lugar de ±∞ (Φ(−8) ≈ 6e-16)
+LIMIAR_INFINITO = 8.0
+
+# Limite de |ρ| durante a otimização
+RHO_MAXIMO = 0.9999
+
+_NOS_GL, _PESOS_GL = np.polynomial.legendre.leggauss(20)
+
+# Memo em processo: hash das tabelas -> ρ dos pares; hash dos padrões de resposta -> Γ
+_matrizes_conhecidas = {}
+_assintoticas_conhecidas = {}
+
+
+def codigos_ordinais(dados):
+    """
+    Códigos int8 (1..k, 0 = ausente) de um DataFrame de itens.
+
+    Colunas int8 (modo 'codificado' do cache) passam direto; as demais são
+    recodificadas pela ordem dos valores distintos (ex.: 1.0..5.0 -> 1..5).
+    """
+    codigos = np.zeros((len(dados), dados.shape[1]), dtype=np.int8)
+    for j, coluna in enumerate(dados.columns):
+        valores = dados[coluna]
+        if valores.dtype == np.int8:
+            codigos[:, j] = valores.to_numpy()
+            continue
+        numeros = pd.to_numeric(valores, errors='coerce').to_numpy(dtype=np.float64)
+        distintos = np.unique(numeros[~np.isnan(numeros)])
+        if len(distintos) > np.iinfo(np.int8).max:
+            raise ValueError(f"Coluna {coluna} tem {len(distintos)} valores distintos; não parece ordinal")
+        presentes = ~np.isnan(numeros)
+        codigos[presentes, j] = np.searchsorted(distintos, numeros[presentes]) + 1
+    return codigos
+
+
+def contagens_categorias(codigos, n_categorias=None, pesos=None):
+    """Contagens itens × (ausente, 1..K) de uma matriz de códigos int8 (pesos: frequências por linha)"""
+    n_itens = codigos.shape[1]
+    if n_categorias is None:
+        n_categorias = int(codigos.max(initial=0))
+    largura = n_categorias + 1
+    indices = (codigos.astype(np.int64) + largura * np.arange(n_itens)).ravel()
+    pesos = None if pesos is None else np.repeat(pesos, n_itens)
+    return np.bincount(indices, weights=pesos, minlength=n_itens * largura).reshape(n_itens, largura)
+
+
+def _indices_celulas(bloco, largura):
+    """Índice a·(K+1) + b da célula de cada par i < j (linhas × pares), montado por fatias"""
+    n_itens = bloco.shape[1]
+    bloco = bloco.astype(np.int32)
+    celulas = np.empty((len(bloco), n_itens * (n_itens - 1) // 2), dtype=np.int32)
+    coluna = 0
+    for i in range(n_itens - 1):
+        np.add(bloco[:, i:i + 1] * largura, bloco[:, i + 1:], out=celulas[:, coluna:coluna + n_itens - 1 - i])
+        coluna += n_itens - 1 - i
+    return celulas
+
+
+def tabelas_contingencia(codigos, n_categorias=None, tamanho_bloco=20_000, pesos=None):
+    """
+    Tabelas K×K de todos os pares i < j em um bincount por bloco de linhas.
+
+    Cada célula de um par vira o índice par·(K+1)² + a·(K+1) + b; os índices
+    dos pares (i, i+1..k) são montados com fatias contíguas, sem indexação
+    avançada, e o bloco inteiro entra em uma única chamada de np.bincount.
+    Com pesos (frequências por linha, ex.: réplica bootstrap) as tabelas
+    são somas de pesos.
+
+    Returns:
+        (tabelas pares × K × K sem as linhas/colunas de ausentes, índices i, índices j)
+    """
+    n_itens = codigos.shape[1]
+    if n_categorias is None:
+        n_categorias = int(codigos.max(initial=0))
+    largura = n_categorias + 1
+    pares_i, pares_j = np.triu_indices(n_itens, k=1)
+    deslocamento = (largura * largura * np.arange(len(pares_i))).astype(np.int32)
+    contagens = np.zeros(len(pares_i) * largura * largura, dtype=np.int64 if pesos is None else np.float64)
+    for inicio in range(0, len(codigos), tamanho_bloco):
+        celulas = _indices_celulas(codigos[inicio:inicio + tamanho_bloco], largura)
+        celulas += deslocamento
+        pesos_bloco = None if pesos is None else np.repeat(pesos[inicio:inicio + tamanho_bloco], len(pares_i))
+        contagens += np.bincount(celulas.ravel(), weights=pesos_bloco, minlength=len(contagens))
+    tabelas = contagens.reshape(len(pares_i), largura, largura)
+    return tabelas[:, LIKERT_AUSENTE + 1:, LIKERT_AUSENTE + 1:], pares_i, pares_j
+
+
+def limiares(contagens):
+    """
+    Limiares τ_1..τ_{K−1} de cada item pelas proporções acumuladas
+    (contagens itens × (ausente, 1..K)); τ_0 = −∞ e τ_K = +∞ viram ±LIMIAR_INFINITO.
+    """
+    validas = contagens[:, 1:].astype(np.float64)
+    acumuladas = np.cumsum(validas, axis=1) / np.maximum(validas.sum(axis=1, keepdims=True), 1)
+    with np.errstate(divide='ignore'):
+        tau = np.clip(ndtri(acumuladas[:, :-1]), -LIMIAR_INFINITO, LIMIAR_INFINITO)
+    bordas = np.full((len(tau), 1), LIMIAR_INFINITO)
+    return np.hstack([-bordas, tau, bordas])
+
+
+def normal_bivariada(h, k, r):
+    """
+    Φ2(h, k; r) = P(X < h, Y < k) vetorizada (algoritmo de Genz, 2004,
+    quadratura de Gauss-Legendre com 20 pontos; erro ~1e-15).
+    """
+    h, k, r = np.broadcast_arrays(-np.asarray(h, dtype=np.float64), -np.asarray(k, dtype=np.float64),
+                                  np.asarray(r, dtype=np.float64))
+    x, w = 1 + _NOS_GL, _PESOS_GL
+    hk = h * k
+    with np.errstate(all='ignore'):
+        # |r| < 0.925: integral em arcsen(r)
+        hs = (h * h + k * k) / 2
+        asr = np.arcsin(r)[..., None] / 2
+        sn = np.sin(asr * x)
+        bvn_baixo = (np.exp((sn * hk[..., None] - hs[..., None]) / (1 - sn * sn)) * w).sum(axis=-1)
+        bvn_baixo = bvn_baixo * asr[..., 0] / (2 * np.pi) + ndtr(-h) * ndtr(-k)
+
+        # |r| >= 0.925: expansão em torno de |r| = 1
+        negativo = r < 0
+        k2 = np.where(negativo, -k, k)
+        hk2 = np.where(negativo, -hk, hk)
+        a_s = 1 - r * r
+        a = np.sqrt(a_s)
+        bs = (h - k2) ** 2
+        c = (4 - hk2) / 8
+        d = (12 - hk2) / 80
+        asr2 = -(bs / a_s + hk2) / 2
+        bvn = np.where(asr2 > -100, a * np.exp(asr2) * (1 - c * (bs - a_s) * (1 - d * bs) / 3 + c * d * a_s ** 2), 0.0)
+        b = np.sqrt(bs)
+        sp = np.sqrt(2 * np.pi) * ndtr(-b / a)
+        bvn = np.where(hk2 > -100, bvn - np.exp(-hk2 / 2) * sp * b * (1 - c * bs * (1 - d * bs) / 3), bvn)
+        a2 = (a / 2)[..., None]
+        xs = (a2 * x) ** 2
+        asr_x = -(bs[..., None] / xs + hk2[..., None]) / 2
+        sp_x = 1 + c[..., None] * xs * (1 + 5 * d[..., None] * xs)
+        rs = np.sqrt(1 - xs)
+        ep = np.exp(-(hk2[..., None] / 2) * xs / (1 + rs) ** 2) / rs
+        soma = np.where(asr_x > -100, np.exp(asr_x) * (sp_x - ep), 0.0) @ w
+        bvn = (a2[..., 0] * soma - bvn) / (2 * np.pi)
+        faixa = np.where(h < 0, ndtr(k2) - ndtr(h), ndtr(-h) - ndtr(-k2))
+        bvn_alto = np.where(r > 0, bvn + ndtr(-np.maximum(h, k2)), np.where(h >= k2, -bvn, faixa - bvn))
+        bvn_alto = np.where(np.abs(r) >= 1, np.where(r > 0, ndtr(-np.maximum(h, k)), np.maximum(faixa, 0.0)),
+                            bvn_alto)
+    return np.clip(np.where(np.abs(r) < 0.925, bvn_baixo, bvn_alto), 0.0, 1.0)
+
+
+def densidade_bivariada(h, k, r):
+    """φ2(h, k; r) = ∂Φ2/∂r (vetorizada)"""
+    um_menos = 1 - r * r
+    return np.exp(-(h * h - 2 * r * h * k + k * k) / (2 * um_menos)) / (2 * np.pi * np.sqrt(um_menos))
+
+
+def _celulas(tau_i, tau_j, rho):
+    """Probabilidades das células e suas derivadas em ρ (pares × K × K)"""
+    h = tau_i[:, :, None]
+    k = tau_j[:, None, :]
+    r = rho[:, None, None]
+    acumulada = normal_bivariada(h, k, r)
+    densidade = densidade_bivariada(h, k, r)
+    pi = np.diff(np.diff(acumulada, axis=1), axis=2)
+    derivada = np.diff(np.diff(densidade, axis=1), axis=2)
+    return np.maximum(pi, 1e-300), derivada
+
+
+def _log_verossimilhanca(tabelas, pi):
+    return np.where(tabelas > 0, tabelas * np.log(pi), 0.0).sum(axis=(1, 2))
+
+
+def ajustar_policoricas(tabelas, tau_i, tau_j, rho_inicial=None, max_iter=50, tol=1e-8):
+    """
+    ρ de máxima verossimilhança de todos os pares por Fisher scoring em lote;
+    cada iteração avalia só os pares que ainda não convergiram.
+
+    Args:
+        tabelas: Contagens pares × K × K
+        tau_i, tau_j: Limiares (com bordas) do primeiro e do segundo item de cada par
+        rho_inicial: Partida (padrão: 0)
+
+    Returns:
+        (ρ, iterações)
+    """
+    tabelas = tabelas.astype(np.float64)
+    n = tabelas.sum(axis=(1, 2))
+    rho = np.zeros(len(tabelas)) if rho_inicial is None else np.clip(rho_inicial, -RHO_MAXIMO, RHO_MAXIMO)
+    ativos = np.flatnonzero(n > 0)
+    pi, derivada = _celulas(tau_i[ativos], tau_j[ativos], rho[ativos])
+    log_v = _log_verossimilhanca(tabelas[ativos], pi)
+    for iteracao in range(1, max_iter + 1):
+        t = tabelas[ativos]
+        gradiente = np.where(t > 0, t * derivada / pi, 0.0).sum(axis=(1, 2))
+        informacao = n[ativos] * (derivada * derivada / pi).sum(axis=(1, 2))
+        passo = gradiente / np.maximum(informacao, 1e-300)
+        seguem = np.abs(passo) >= tol
+        if not seguem.any():
+            return rho, iteracao
+        ativos, passo, log_v = ativos[seguem], passo[seguem], log_v[seguem]
+        t = tabelas[ativos]
+
+        # Passo de Fisher com meia-busca por par quando a verossimilhança cai
+        alfa = np.ones(len(ativos))
+        for _ in range(30):
+            candidato = np.clip(rho[ativos] + alfa * passo, -RHO_MAXIMO, RHO_MAXIMO)
+            pi, derivada = _celulas(tau_i[ativos], tau_j[ativos], candidato)
+            log_v_c = _log_verossimilhanca(t, pi)
+            piorou = log_v_c < log_v - 1e-12
+            if not piorou.any():
+                break
+            alfa = np.where(piorou, alfa / 2, alfa)
+        # Pares sem decréscimo após a meia-busca, ou parados no limite de |ρ|, ficam onde estão
+        aceitos = ~piorou & (candidato != rho[ativos])
+        rho[ativos[aceitos]] = candidato[aceitos]
+        ativos, pi, derivada, log_v = ativos[aceitos], pi[aceitos], derivada[aceitos], log_v_c[aceitos]
+        if not len(ativos):
+            return rho, iteracao
+    return rho, max_iter
+
+
+def _hash_tabelas(contagens, tabelas):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(versao_codigo(limiares, normal_bivariada, ajustar_policoricas).encode('utf-8'))
+    h.update(scipy.__version__.encode('utf-8'))
+    for matriz in (contagens, tabelas):
+        h.update(str(matriz.shape).encode('utf-8'))
+        h.update(np.ascontiguousarray(matriz, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+def _policoricas(codigos, diretorio_cache, tamanho_bloco):
+    """Contagens, tabelas, pares, limiares e ρ dos pares (ρ em cache pelo hash das tabelas)"""
+    n_categorias = int(codigos.max(initial=0))
+    contagens = contagens_categorias(codigos, n_categorias)
+    tabelas, pares_i, pares_j = tabelas_contingencia(codigos, n_categorias, tamanho_bloco)
+    tau = limiares(contagens)
+
+    chave = _hash_tabelas(contagens, tabelas)
+    rho = _matrizes_conhecidas.get(chave)
+    caminho = None if diretorio_cache is None else os.path.join(diretorio_cache, f"{chave}.npy")
+    if rho is None and caminho is not None and os.path.exists(caminho):
+        rho = np.load(caminho)
+    if rho is None:
+        rho, iteracoes = ajustar_policoricas(tabelas, tau[pares_i], tau[pares_j])
+        print(f"🔗 Policóricas: {len(rho)} pares de {codigos.shape[1]} itens ajustados em {iteracoes} iterações")
+        if caminho is not None:
+            os.makedirs(diretorio_cache, exist_ok=True)
+            np.save(caminho, rho)
+    _matrizes_conhecidas[chave] = rho
+    return contagens, tabelas, pares_i, pares_j, tau, rho
+
+
+def matriz_policorica(dados, diretorio_cache=DIRETORIO_POLICORICAS, tamanho_bloco=20_000):
+    """
+    Matriz de correlações policóricas dos itens.
+
+    Args:
+        dados: DataFrame de itens ordinais (int8 do cache codificado ou códigos numéricos)
+        diretorio_cache: Diretório do cache (None = só em memória)
+        tamanho_bloco: Linhas por bincount
+
+    Returns:
+        DataFrame itens × itens; os limiares ficam em .attrs['limiares']
+        (DataFrame itens × τ_1..τ_{K−1})
+    """
+    colunas = list(dados.columns)
+    _, _, pares_i, pares_j, tau, rho = _policoricas(codigos_ordinais(dados), diretorio_cache, tamanho_bloco)
+    matriz = np.identity(len(colunas))
+    matriz[pares_i, pares_j] = rho
+    matriz[pares_j, pares_i] = rho
+    resultado = pd.DataFrame(matriz, index=colunas, columns=colunas)
+    resultado.attrs['limiares'] = pd.DataFrame(tau[:, 1:-1], index=colunas,
+                                               columns=[f"t{c}" for c in range(1, tau.shape[1] - 1)])
+    return resultado
+
+
+def policoricas_ponderadas(codigos, pesos, rho_inicial=None, n_categorias=None):
+    """
+    Matriz policórica (ndarray, sem cache) de uma amostra com pesos de
+    frequência por linha, ex.: uma réplica bootstrap. rho_inicial (ρ dos
+    pares da amostra completa) reduz o Fisher scoring a poucas iterações.
+    """
+    if n_categorias is None:
+        n_categorias = int(codigos.max(initial=0))
+    tau = limiares(contagens_categorias(codigos, n_categorias, pesos))
+    tabelas, pares_i, pares_j = tabelas_contingencia(codigos, n_categorias, pesos=pesos)
+    rho, _ = ajustar_policoricas(tabelas, tau[pares_i], tau[pares_j], rho_inicial)
+    matriz = np.identity(codigos.shape[1])
+    matriz[pares_i, pares_j] = rho
+    matriz[pares_j, pares_i] = rho
+    return matriz
+
+
+def _derivadas_limiares(tau_i, tau_j, rho):
+    """
+    Derivadas das células em relação aos limiares interiores, na forma
+    E (pares × (K−1) × K) e F (pares × K × (K−1)):
+    ∂π_ab/∂τ_i,c = (1[a=c] − 1[a=c+1])·E[c, b] e ∂π_ab/∂τ_j,c = (1[b=c] − 1[b=c+1])·F[a, c].
+    """
+    r = rho[:, None, None]
+    s = np.sqrt(1 - r * r)
+    h = tau_i[:, 1:-1, None]
+    k = tau_j[:, None, :]
+    e = np.diff(np.exp(-h * h / 2) / np.sqrt(2 * np.pi) * ndtr((k - r * h) / s), axis=2)
+    h = tau_i[:, :, None]
+    k = tau_j[:, None, 1:-1]
+    f = np.diff(np.exp(-k * k / 2) / np.sqrt(2 * np.pi) * ndtr((h - r * k) / s), axis=1)
+    return e, f
+
+
+def _influencia_limiares(contagens, tau):
+    """
+    Função de influência dos limiares por categoria observada:
+    itens × K × (K−1), T[y, c] = (1[y ≤ c] − P_c) / φ(τ_c).
+    """
+    validas = contagens[:, 1:].astype(np.float64)
+    acumuladas = np.cumsum(validas, axis=1)[:, :-1] / np.maximum(validas.sum(axis=1, keepdims=True), 1)
+    interiores = tau[:, 1:-1]
+    densidade = np.exp(-interiores * interiores / 2) / np.sqrt(2 * np.pi)
+    n_categorias = validas.shape[1]
+    indicadora = (np.arange(n_categorias)[:, None] <= np.arange(n_categorias - 1)[None, :]).astype(np.float64)
+    finitos = np.abs(interiores) < LIMIAR_INFINITO
+    escala = np.where(finitos, 1 / np.where(finitos, densidade, 1.0), 0.0)
+    return (indicadora[None, :, :] - acumuladas[:, None, :]) * escala[:, None, :]
+
+
+def tabelas_influencia(contagens, tabelas, pares_i, pares_j, tau, rho):
+    """
+    Função de influência de cada ρ do estimador em dois passos, como tabela
+    K×K por par (ela depende do respondente só pelas categorias dos dois itens):
+        IF_ρ(a, b) = [q_ab − I_ρτi·IF_τi(a) − I_ρτj·IF_τj(b)] / I_ρρ
+    com q = ∂log π/∂ρ, I_ρρ = Σ π'²/π e I_ρτ = Σ π'·∂π/∂τ / π (correção pela
+    estimação prévia dos limiares).
+
+    Returns:
+        pares × K × K
+    """
+    tau_i, tau_j = tau[pares_i], tau[pares_j]
+    pi, derivada = _celulas(tau_i, tau_j, rho)
+    q = derivada / pi
+    info_rho = (derivada * q).sum(axis=(1, 2))
+    e, f = _derivadas_limiares(tau_i, tau_j, rho)
+    cruzada_i = (e * (q[:, :-1, :] - q[:, 1:, :])).sum(axis=2)
+    cruzada_j = (f * (q[:, :, :-1] - q[:, :, 1:])).sum(axis=1)
+    influencia_tau = _influencia_limiares(contagens, tau)
+    correcao_i = np.einsum('pac,pc->pa', influencia_tau[pares_i], cruzada_i)
+    correcao_j = np.einsum('pbc,pc->pb', influencia_tau[pares_j], cruzada_j)
+    tabela = q - correcao_i[:, :, None] - correcao_j[:, None, :]
+    return tabela / np.maximum(info_rho, 1e-300)[:, None, None]
+
+
+def padroes_resposta(codigos):
+    """Padrões de resposta distintos (linhas de códigos) e suas frequências"""
+    codigos = np.ascontiguousarray(codigos, dtype=np.int8)
+    vista = codigos.view(np.dtype((np.void, codigos.shape[1]))).ravel()
+    distintos, frequencias = np.unique(vista, return_counts=True)
+    return distintos.view(np.int8).reshape(-1, codigos.shape[1]), frequencias
+
+
+def _hash_padroes(padroes, frequencias):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(versao_codigo(limiares, normal_bivariada, ajustar_policoricas, _influencia_limiares,
+                           tabelas_influencia, matriz_assintotica).encode('utf-8'))
+    h.update(scipy.__version__.encode('utf-8'))
+    h.update(str(padroes.shape).encode('utf-8'))
+    h.update(padroes.tobytes())
+    h.update(np.ascontiguousarray(frequencias, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+def matriz_assintotica(dados, diretorio_cache=DIRETORIO_ASSINTOTICAS, tamanho_bloco=5_000):
+    """
+    Covariância assintótica Γ das correlações policóricas (de √N·ρ̂), base
+    dos pesos do DWLS e dos erros padrão e testes robustos do WLSMV.
+
+    Γ = (1/N) Σ G Gᵀ, com G o vetor das influências de todos os pares para
+    cada respondente (lidas das tabelas de influência pelo mesmo índice de
+    célula das tabelas de contingência; deleção por par, escalada por N/n_par).
+    Respondentes com o mesmo padrão de resposta entram uma vez, com a
+    frequência como peso. O custo (padrões × pares²) é o passo caro do
+    WLSMV: o resultado fica em cache pelo hash dos padrões de resposta e
+    serve a todas as especificações e réplicas bootstrap sobre esses itens.
+
+    Args:
+        dados: DataFrame de itens ordinais (int8 do cache codificado ou códigos numéricos)
+        diretorio_cache: Diretório do cache (None = só em memória)
+        tamanho_bloco: Padrões por produto matricial
+
+    Returns:
+        DataFrame pares × pares (MultiIndex (item_i, item_j), i < j na ordem das
+        colunas); o tamanho amostral fica em .attrs['n']
+    """
+    colunas = list(dados.columns)
+    codigos = codigos_ordinais(dados)
+    padroes, frequencias = padroes_resposta(codigos)
+    n = int(frequencias.sum())
+
+    chave = _hash_padroes(padroes, frequencias)
+    gama = _assintoticas_conhecidas.get(chave)
+    caminho = None if diretorio_cache is None else os.path.join(diretorio_cache, f"{chave}.npy")
+    if gama is None and caminho is not None and os.path.exists(caminho):
+        gama = np.load(caminho)
+    if gama is None:
+        cache_rho = None if diretorio_cache is None else DIRETORIO_POLICORICAS
+        contagens, tabelas, pares_i, pares_j, tau, rho = _policoricas(codigos, cache_rho, tamanho_bloco)
+        largura = contagens.shape[1]
+        n_par = tabelas.sum(axis=(1, 2)).astype(np.float64)
+        influencia = np.zeros((len(pares_i), largura, largura))
+        influencia[:, LIKERT_AUSENTE + 1:, LIKERT_AUSENTE + 1:] = \
+            tabelas_influencia(contagens, tabelas, pares_i, pares_j, tau, rho) * \
+            np.where(n_par > 0, n / np.maximum(n_par, 1), 0.0)[:, None, None]
+        influencia = influencia.ravel()
+        deslocamento = (largura * largura * np.arange(len(pares_i))).astype(np.int32)
+
+        gama = np.zeros((len(pares_i), len(pares_i)))
+        for inicio in range(0, len(padroes), tamanho_bloco):
+            celulas = _indices_celulas(padroes[inicio:inicio + tamanho_bloco], largura)
+            celulas += deslocamento
+            g = influencia[celulas]
+            gama += (g * frequencias[inicio:inicio + tamanho_bloco, None]).T @ g
+        gama /= n
+        print(f"🔗 Covariância assintótica: {len(pares_i)} pares, {len(padroes)} padrões de resposta (N = {n})")
+        if caminho is not None:
+            os.makedirs(diretorio_cache, exist_ok=True)
+            np.save(caminho, gama)
+    _assintoticas_conhecidas[chave] = gama
+
+    pares_i, pares_j = np.triu_indices(len(colunas), k=1)
+    indice = pd.MultiIndex.from_arrays([[colunas[i] for i in pares_i], [colunas[j] for j in pares_j]])
+    resultado = pd.DataFrame(gama, index=indice, columns=indice)
+    resultado.attrs['n'] = n
+    return resultado
+
+
+def correlacao_polisserial(continua, ordinal):
+    """
+    Correlação polisserial em dois passos: r_xy · dp(y) / Σ φ(τ_c).
+
+    Args:
+        continua: Valores contínuos (NaN = ausente)
+        ordinal: Códigos ordinais do item (qualquer ordem numérica; NaN ou 0 = ausente)
+    """
+    x = np.asarray(continua, dtype=np.float64)
+    y = pd.to_numeric(pd.Series(ordinal), errors='coerce').to_numpy(dtype=np.float64)
+    presentes = ~np.isnan(x) & ~np.isnan(y) & (y != LIKERT_AUSENTE)
+    x, y = x[presentes], y[presentes]
+    _, contagens = np.unique(y, return_counts=True)
+    tau = ndtri(np.cumsum(contagens)[:-1] / len(y))
+    soma_densidades = np.exp(-tau * tau / 2).sum() / np.sqrt(2 * np.pi)
+    return float(np.corrcoef(x, y)[0, 1] * y.std() / soma_densidades)
+
+
+def matriz_correlacao(dados, metodo='pearson'):
+    """Matriz de correlação dos itens: 'pearson' (DataFrame.corr) ou 'policorica'"""
+    if metodo == 'pearson':
+        return dados.corr()
+    if metodo == 'policorica':
+        return matriz_policorica(dados)
+    raise ValueError(f"Método de correlação desconhecido: {metodo}")
@@ -8,12 +8,13 @@ para validar se produzem os mesmos resultados.
 """
 
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
 import warnings
+from cache_dados import carregar_tabela
+from codec_likert import decodificar_tabela
 warnings.filterwarnings('ignore')
 
 # Configuração para UTF-8
@@ -30,58 +31,34 @@ def simular_dados_reais_final_r():
     
     # Carregar dados
     print("=== CARREGANDO DADOS ===")
-    perfil = pd.read_csv('csv_extraidos/Perfil Socioeconomico.csv')
-    qualidade = pd.read_csv('csv_extraidos/Qualidade do serviço.csv')
-    percepcao = pd.read_csv('csv_extraidos/Percepção novos serviços.csv')
-    intencao = pd.read_csv('csv_extraidos/Intenção comportamental.csv')
-    utilizacao = pd.read_csv('csv_extraidos/Utilização.csv')
+    perfil = carregar_tabela('csv_extraidos/Perfil Socioeconomico.csv')
+    qualidade = carregar_tabela('csv_extraidos/Qualidade do serviço.csv')
+    percepcao = carregar_tabela('csv_extraidos/Percepção novos serviços.csv')
+    intencao = carregar_tabela('csv_extraidos/Intenção comportamental.csv')
+    utilizacao = carregar_tabela('csv_extraidos/Utilização.csv')
     
     print(f'Total: {len(perfil)} respondentes')
     
-    # Função de mapeamento R-equivalente
-    def mapear_satisfacao_r(x):
-        if pd.isna(x):
-            return np.nan
-        x_str = str(x).lower().strip()
-        mapa = {
-            'muito insatisfeito': 1, 'insatisfeito': 2, 'neutro': 3,
-            'satisfeito': 4, 'muito satisfeito': 5
-        }
-        return mapa.get(x_str, 3)
-    
-    def mapear_concordancia_r(x):
-        if pd.isna(x):
-            return np.nan
-        x_str = str(x).lower().strip()
-        mapa = {
-            'discordo totalmente': 1, 'discordo': 2, 'neutro': 3,
-            'concordo': 4, 'concordo totalmente': 5
-        }
-        return mapa.get(x_str, 3)
+    # Mapeamento R-equivalente: rótulos não reconhecidos viram 3 (neutro)
+    R_PADRAO_NEUTRO = 3
     
     # Processar construtos como R faria
     print("=== PROCESSANDO CONSTRUTOS ===")
     
     # Qualidade
     qualidade_cols = [col for col in qualidade.columns if col != 'ID']
-    qualidade_valores = []
-    for _, row in qualidade.iterrows():
-        vals = [mapear_satisfacao_r(row[col]) for col in qualidade_cols]
-        qualidade_valores.append(np.nanmean(vals))
+    qualidade_valores = decodificar_tabela(qualidade[qualidade_cols], 'satisfacao', padrao=R_PADRAO_NEUTRO,
+                                           como_float=True).mean(axis=1).tolist()
     
     # Percepção
     percepcao_cols = [col for col in percepcao.columns if col != 'ID']
-    percepcao_valores = []
-    for _, row in percepcao.iterrows():
-        vals = [mapear_concordancia_r(row[col]) for col in percepcao_cols]
-        percepcao_valores.append(np.nanmean(vals))
+    percepcao_valores = decodificar_tabela(percepcao[percepcao_cols], 'concordancia', padrao=R_PADRAO_NEUTRO,
+                                           como_float=True).mean(axis=1).tolist()
     
     # Intenção
     intencao_cols = [col for col in intencao.columns if col != 'ID']
-    intencao_valores = []
-    for _, row in intencao.iterrows():
-        vals = [mapear_concordancia_r(row[col]) for col in intencao_cols]
-        intencao_valores.append(np.nanmean(vals))
+    intencao_valores = decodificar_tabela(intencao[intencao_cols], 'concordancia', padrao=R_PADRAO_NEUTRO,
+                                          como_float=True).mean(axis=1).tolist()
     
     # Criar dataframe R-equivalente
     construtos = pd.DataFrame({
@@ -252,7 +229,7 @@ def simular_analise_sem_completa_todas_variaveis_r():
     total_vars = 0
     for arquivo in arquivos:
         try:
-            df = pd.read_csv(f'csv_extraidos/{arquivo}')
+            df = carregar_tabela(f'csv_extraidos/{arquivo}')
             vars_sem_id = len([col for col in df.columns if col != 'ID'])
             total_vars += vars_sem_id
             print(f"✓ {arquivo}: {len(df)} registros, {vars_sem_id} variáveis")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WLSMV: MODELOS SEM COM INDICADORES ORDINAIS
+===========================================
+
+Os itens Likert entram como ordinais em vez de contínuos: cada
+especificação é ajustada à matriz policórica por DWLS (motor_sem,
+obj='DWLS'), com erros padrão sanduíche e qui-quadrado ajustado pela
+média e variância.
+- A covariância assintótica Γ das policóricas, o passo caro, é calculada
+  uma vez por base ou grupo de segmento sobre a união dos itens de todos
+  os modelos e fica em cache em disco (policorica.matriz_assintotica)
+- Cada especificação lê de Γ só o bloco dos seus pares
+- O bootstrap (bootstrap_sem com obj='DWLS') reutiliza como pesos o Γ da
+  amostra completa; cada réplica recalcula apenas as policóricas
+"""
+
+import numpy as np
+import pandas as pd
+
+from acumuladores import coluna_segmento, rotulo_segmento
+from motor_sem import ModeloSEM
+from policorica import DIRETORIO_ASSINTOTICAS, DIRETORIO_POLICORICAS, matriz_assintotica, matriz_policorica
+
+
+class MomentosOrdinais:
+    """n, matriz policórica (com os limiares) e covariância assintótica Γ de um conjunto de itens"""
+
+    def __init__(self, n, correlacao, acov, grupo=None):
+        """
+        Args:
+            n: Número de respondentes
+            correlacao: DataFrame itens × itens (matriz_policorica)
+            acov: DataFrame pares × pares (matriz_assintotica)
+            grupo: Rótulo do grupo (None para a amostra inteira)
+        """
+        self.n = int(n)
+        self.correlacao = correlacao
+        self.acov = acov
+        self.grupo = grupo
+
+    def __repr__(self):
+        rotulo = '' if self.grupo is None else f", grupo={self.grupo!r}"
+        return f"MomentosOrdinais(n={self.n}, itens={len(self.correlacao)}{rotulo})"
+
+    @property
+    def colunas(self):
+        return list(self.correlacao.index)
+
+    def subconjunto(self, colunas):
+        """Momentos restritos a um subconjunto de itens"""
+        colunas = list(colunas)
+        pares = self.acov.index
+        dentro = pares.get_level_values(0).isin(colunas) & pares.get_level_values(1).isin(colunas)
+        return MomentosOrdinais(self.n, self.correlacao.loc[colunas, colunas], self.acov.loc[dentro, dentro],
+                                self.grupo)
+
+
+def momentos_ordinais(dados, grupo=None, diretorio_cache=DIRETORIO_ASSINTOTICAS):
+    """
+    Policóricas e Γ de um DataFrame de itens ordinais (ambos em cache).
+
+    Args:
+        dados: DataFrame de itens (int8 do cache codificado ou códigos numéricos, NaN/0 = ausente)
+        grupo: Rótulo guardado em MomentosOrdinais
+        diretorio_cache: Diretório do cache de Γ (None = só em memória)
+    """
+    correlacao = matriz_policorica(dados, diretorio_cache=None if diretorio_cache is None else DIRETORIO_POLICORICAS)
+    return MomentosOrdinais(len(dados), correlacao, matriz_assintotica(dados, diretorio_cache), grupo)
+
+
+def itens_dos_modelos(base, modelos=None):
+    """
+    Itens dos modelos de sem_models na base, com a codificação de prepare_sem_data.
+
+    Returns:
+        DataFrame (NaN nos ausentes) pelos nomes finais, e dict modelo -> itens
+    """
+    from ondas import colunas_dos_modelos, matriz_da_onda
+
+    colunas, colunas_modelo = colunas_dos_modelos(base)
+    if modelos is not None:
+        colunas_modelo = {m: c for m, c in colunas_modelo.items() if m in modelos}
+    usadas = sorted(set().union(*colunas_modelo.values())) if colunas_modelo else []
+    colunas = {v: colunas[v] for v in usadas}
+    return pd.DataFrame(matriz_da_onda(base, colunas, {}), columns=usadas), colunas_modelo
+
+
+def momentos_ordinais_por_segmento(base, segmento=None, modelos=None, n_minimo=30,
+                                   diretorio_cache=DIRETORIO_ASSINTOTICAS):
+    """
+    Momentos ordinais da amostra inteira (segmento=None) ou de cada grupo de
+    um segmento, sobre a união dos itens dos modelos: um Γ por grupo,
+    compartilhado por todas as especificações.
+
+    Returns:
+        dict modelo -> itens, e dict rótulo -> MomentosOrdinais (chave None para a amostra inteira)
+    """
+    dados, colunas_modelo = itens_dos_modelos(base, modelos)
+    if segmento is None:
+        return colunas_modelo, {None: momentos_ordinais(dados, diretorio_cache=diretorio_cache)}
+    rotulos = pd.Series(np.asarray(base.coluna(coluna_segmento(base, segmento)), dtype=object)).map(rotulo_segmento)
+    grupos = {}
+    for rotulo, linhas in rotulos.groupby(rotulos, sort=True).groups.items():
+        if len(linhas) < n_minimo:
+            print(f"⚠️ {segmento}: grupo '{rotulo}' com {len(linhas)} respondentes (< {n_minimo}) ignorado")
+            continue
+        grupos[rotulo] = momentos_ordinais(dados.iloc[linhas].reset_index(drop=True), rotulo, diretorio_cache)
+    return colunas_modelo, grupos
+
+
+def ajustar_wlsmv(descricao, momentos, x0=None, metodo='SLSQP'):
+    """
+    Ajusta uma especificação SEM por DWLS à matriz policórica.
+
+    Args:
+        descricao: Especificação lavaan/semopy
+        momentos: MomentosOrdinais com (ao menos) os itens do modelo
+        x0: Estimativas iniciais (ex.: de um ajuste anterior)
+        metodo: 'SLSQP' ou 'fisher' (ver ModeloSEM.fit)
+
+    Returns:
+        ModeloSEM ajustado (inspect() com erros robustos, calc_indices() com o
+        qui-quadrado ajustado e os índices derivados dele)
+    """
+    modelo = ModeloSEM(descricao)
+    faltantes = [v for v in modelo.vars['observed'] if v not in momentos.correlacao.index]
+    if faltantes:
+        raise KeyError(f"Itens do modelo sem policóricas: {faltantes}")
+    modelo.fit(cov=momentos.correlacao, n_samples=momentos.n, obj='DWLS', acov=momentos.acov, x0=x0, metodo=metodo)
+    return modelo
+
+
+def wlsmv_por_segmento(base, segmento=None, modelos=None, n_minimo=30):
+    """
+    Ajuste WLSMV de cada modelo de sem_models na amostra inteira ou em cada
+    grupo de um segmento.
+
+    Returns:
+        dict (rótulo, modelo) -> ModeloSEM ajustado (None se o ajuste falhou)
+    """
+    from analise_transporte_sem import sem_models
+
+    colunas_modelo, grupos = momentos_ordinais_por_segmento(base, segmento, modelos, n_minimo)
+    ajustes = {}
+    for rotulo, momentos in grupos.items():
+        for nome_modelo in colunas_modelo:
+            try:
+                ajustes[(rotulo, nome_modelo)] = ajustar_wlsmv(sem_models[nome_modelo], momentos)
+            except (np.linalg.LinAlgError, ValueError) as e:
+                print(f"⚠️ {nome_modelo} ({rotulo}): ajuste WLSMV falhou ({e})")
+                ajustes[(rotulo, nome_modelo)] = None
+    return ajustes
+
+
+def tabela_wlsmv(ajustes):
+    """Resumo dos ajustes WLSMV: n, qui-quadrado DWLS e ajustado, escala, deslocamento, CFI, TLI e RMSEA"""
+    linhas = []
+    for (rotulo, nome_modelo), modelo in ajustes.items():
+        linha = {'grupo': rotulo, 'modelo': nome_modelo}
+        if modelo is not None:
+            indices = modelo.calc_indices()
+            linha.update({'n': modelo.n_samples, 'convergiu': modelo.last_result.success,
+                          'chi2 DWLS': indices['chi2 DWLS'], 'chi2': indices['chi2'], 'DoF': indices['DoF'],
+                          'Escala': indices['Escala'], 'Deslocamento': indices['Deslocamento'],
+                          'CFI': indices['CFI'], 'TLI': indices['TLI'], 'RMSEA': indices['RMSEA']})
+        linhas.append(linha)
+    return pd.DataFrame(linhas)